@@ -1,22 +1,59 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.schemas.agent import AgentCreate, AgentUpdate, AgentOut
 from app.services import agent_service
 from app.db.session import get_db
+from app.api.params import page_params, run_page_query, set_page_headers, snapshot_response
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.streaming import STREAM_FORMATS
+from app.core.tracing import TracedRoute
 
-router = APIRouter(prefix="/agent", tags=["Agent"])
+router = APIRouter(prefix="/agent", tags=["Agent"], route_class=TracedRoute)
 
 @router.post("/", response_model=AgentOut)
 def create_agent(data: AgentCreate, db: Session = Depends(get_db)):
     return agent_service.create_agent(db, data)
 
 @router.get("/", response_model=list[AgentOut])
-def list_agents(db: Session = Depends(get_db)):
-    return agent_service.get_agents(db)
+def list_agents(
+    response: Response,
+    is_active: Optional[bool] = Query(None, description="按启用状态过滤"),
+    mcp_id: Optional[str] = Query(None, description="按关联的MCP过滤"),
+    provider: Optional[str] = Query(None, description="按关联MCP的提供商过滤"),
+    model: Optional[str] = Query(None, description="按关联MCP的模型过滤"),
+    include_total: bool = Query(False, description="是否在响应头 X-Total-Count 中返回总数"),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """分页获取Agent列表，可按 id/name 排序；下一页游标在响应头 X-Next-Cursor 中"""
+    filters = {"is_active": is_active, "mcp_id": mcp_id, "provider": provider, "model": model}
+    agents, next_cursor = run_page_query(agent_service.get_agents, db, **filters, **page)
+    total = agent_service.count_agents(db, **filters) if include_total else None
+    set_page_headers(response, next_cursor, total)
+    return agents
+
+@router.get("/export")
+def export_agents(
+    format: str = Query("json", description="输出格式：json-JSON数组，ndjson-每行一个JSON对象"),
+    is_active: Optional[bool] = Query(None, description="按启用状态过滤"),
+    mcp_id: Optional[str] = Query(None, description="按关联的MCP过滤"),
+    provider: Optional[str] = Query(None, description="按关联MCP的提供商过滤"),
+    model: Optional[str] = Query(None, description="按关联MCP的模型过滤"),
+):
+    """流式导出全部Agent，适合同步工具一次性拉取，内存占用与数据量无关"""
+    if format not in STREAM_FORMATS:
+        raise HTTPException(400, f"不支持的格式: {format}")
+    body = agent_service.stream_agents(format, is_active=is_active, mcp_id=mcp_id, provider=provider, model=model)
+    return StreamingResponse(body, media_type=STREAM_FORMATS[format])
 
 @router.get("/{agent_id}", response_model=AgentOut)
 def get_agent(agent_id: str, db: Session = Depends(get_db)):
-    agent = agent_service.get_agent_by_id(db, agent_id)
+    hit = catalog_snapshot.get("agent", agent_id)
+    if hit is not None:
+        return snapshot_response(hit)
+    agent = agent_service.get_agent_out(db, agent_id)
     if not agent:
         raise HTTPException(404, "Agent not found")
     return agent
@@ -36,5 +73,12 @@ def delete_agent(agent_id: str, db: Session = Depends(get_db)):
     return {"message": "Deleted"}
 
 @router.get("/mcp/{mcp_id}", response_model=list[AgentOut])
-def get_agents_by_mcp(mcp_id: str, db: Session = Depends(get_db)):
-    return agent_service.get_agents_by_mcp(db, mcp_id) 
\ No newline at end of file
+def get_agents_by_mcp(
+    mcp_id: str,
+    response: Response,
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    agents, next_cursor = run_page_query(agent_service.get_agents_by_mcp, db, mcp_id, **page)
+    set_page_headers(response, next_cursor)
+    return agents
@@ -1,18 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from datetime import datetime
 from typing import Optional
 
 from app.db.session import get_db
-from app.services.ai_app import AIAppService
+from app.api.params import page_params, run_page_query, snapshot_response
+from app.services.ai_app import AIAppService, PatchError, VersionConflict
 from app.schemas.ai_app import (
     AIAppCreate,
+    AIAppPatch,
     AIAppUpdate,
     AIAppResponse,
     AIAppListResponse,
-    GenerateSystemPromptRequest
+    AIAppVersionDetail,
+    AIAppVersionInfo,
+    AIAppVersionListResponse,
+    ChangeHistoryListResponse,
+    GenerateSystemPromptRequest,
+    PublishRequest,
+    RollbackRequest,
+    RenderPromptRequest,
+    RenderPromptResponse,
+    RouteRequest,
+    RouteResponse
 )
+from app.core.template import TemplateError, TemplateSyntaxError
+from app.services import app_version_service, prompt_service
+from app.api.jobs import job_response
+from app.schemas.job import JobResponse
+from app.schemas.usage import UsageResponse
+from app.services import job_service, usage_service
+from app.services.agent_router import agent_router
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.history_service import get_history
+from app.services.reference_service import DanglingReferences
+from app.core.tracing import TracedRoute
 
-router = APIRouter(prefix="/ai-apps", tags=["AI应用管理"])
+router = APIRouter(prefix="/ai-apps", tags=["AI应用管理"], route_class=TracedRoute)
 
 @router.post("/", response_model=AIAppResponse, summary="创建AI应用")
 async def create_ai_app(
@@ -32,12 +57,18 @@ async def create_ai_app(
     - **agent_list**: Agent列表（可选）
     - **mcp_list**: MCP列表（可选）
     - **llm_config**: 大模型配置（可选）
-    - **system_prompt**: 系统提示词（可选）
+    - **system_prompt**: 系统提示词（可选），可以是模板，见 POST /ai-apps/{app_id}/render-prompt
     - **app_type**: 应用类型（platform-平台应用，user-我的应用）
     - **user_id**: 创建用户ID（可选）
+    
+    引用的Agent/MCP不存在时返回422，detail 中列出全部不存在的引用；系统提示词模板语法有误时返回422
     """
     try:
         return AIAppService.create_ai_app(db, ai_app_data)
+    except DanglingReferences as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    except TemplateSyntaxError as e:
+        raise _template_syntax_error(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"创建AI应用失败: {str(e)}")
 
@@ -61,23 +92,230 @@ async def get_ai_apps(
     result = AIAppService.get_ai_apps(db, app_type, user_id, skip, size)
     return AIAppListResponse(**result)
 
+@router.get("/by-identifier/{identifier}", response_model=AIAppResponse, summary="按标识符获取AI应用")
+async def get_ai_app_by_identifier(
+    identifier: str,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    根据应用标识符获取AI应用详情，响应头 ETag 为配置版本号
+    """
+    hit = catalog_snapshot.get_ai_app_by_identifier(identifier)
+    if hit is not None:
+        return snapshot_response(hit, etag=True)
+    ai_app = AIAppService.get_ai_app_by_identifier(db, identifier)
+    if not ai_app:
+        raise HTTPException(status_code=404, detail="AI应用不存在")
+    response.headers["ETag"] = f'"{ai_app.version}"'
+    return ai_app
+
 @router.get("/{app_id}", response_model=AIAppResponse, summary="获取单个AI应用")
 async def get_ai_app(
     app_id: str,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """
     根据ID获取单个AI应用详情
+    
+    响应头 ETag 为配置版本号，更新时通过 If-Match 带回；启用目录快照时从快照读取
     """
+    hit = catalog_snapshot.get("ai_app", app_id)
+    if hit is not None:
+        return snapshot_response(hit, etag=True)
     ai_app = AIAppService.get_ai_app(db, app_id)
     if not ai_app:
         raise HTTPException(status_code=404, detail="AI应用不存在")
+    response.headers["ETag"] = f'"{ai_app.version}"'
     return ai_app
 
+@router.get("/{app_id}/history", response_model=ChangeHistoryListResponse, summary="获取AI应用变更历史")
+async def get_ai_app_history(
+    app_id: str,
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取AI应用的字段级变更历史，按时间倒序
+    
+    变更历史异步批量写入，最近约1秒内的更新可能还未出现在结果中
+    """
+    skip = (page - 1) * size
+    return ChangeHistoryListResponse(**get_history(db, "ai_app", app_id, skip, size))
+
+@router.get("/{app_id}/usage", response_model=UsageResponse, summary="获取AI应用的大模型用量")
+def get_ai_app_usage(
+    app_id: str,
+    granularity: str = Query("hour", description="时间粒度：hour/day"),
+    start: Optional[datetime] = Query(None, description="开始时间，默认 hour 为最近24小时、day 为最近30天"),
+    end: Optional[datetime] = Query(None, description="结束时间（不含），默认到当前时间段结束"),
+    group_by: Optional[str] = Query(None, description="再按 provider/model/user_id 分组"),
+    db: Session = Depends(get_db)
+):
+    """
+    按小时或天读取应用的调用次数、失败次数、token数和耗时，数据来自汇总表
+    
+    用量记录在内存中缓冲后批量写入，最近 USAGE_FLUSH_INTERVAL 秒内的调用可能还未计入
+    """
+    try:
+        return usage_service.get_usage(db, app_id, granularity, start, end, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/{app_id}/publish", response_model=AIAppVersionInfo, summary="发布AI应用")
+async def publish_ai_app(
+    app_id: str,
+    request: Optional[PublishRequest] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    把应用当前配置快照为不可变版本并发布
+    
+    配置与最新版本相同时不产生新版本，直接发布最新版本
+    """
+    try:
+        return app_version_service.publish(db, app_id, request.note if request else None)
+    except app_version_service.VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="同一应用正在并发发布，请重试")
+
+@router.post("/{app_id}/rollback", response_model=AIAppVersionInfo, summary="回滚AI应用")
+async def rollback_ai_app(
+    app_id: str,
+    request: RollbackRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    把已有版本的内容复制为新版本并发布，不修改任何已有版本
+    
+    目标版本与最新版本内容相同时不产生新版本，直接发布最新版本
+    """
+    try:
+        return app_version_service.rollback(db, app_id, request.version)
+    except app_version_service.VersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="同一应用正在并发发布，请重试")
+
+@router.get("/{app_id}/versions", response_model=AIAppVersionListResponse, summary="获取AI应用版本列表")
+async def get_ai_app_versions(
+    app_id: str,
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取AI应用的发布版本列表，按版本号倒序
+    """
+    skip = (page - 1) * size
+    return AIAppVersionListResponse(**app_version_service.list_versions(db, app_id, skip, size))
+
+@router.get("/{app_id}/versions/{version}", response_model=AIAppVersionDetail, summary="获取AI应用指定版本")
+async def get_ai_app_version(
+    app_id: str,
+    version: int,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    获取指定版本的完整配置
+    
+    版本不可变，响应可以被客户端和代理永久缓存
+    """
+    detail = app_version_service.get_version(db, app_id, version)
+    if not detail:
+        raise HTTPException(status_code=404, detail="版本不存在")
+    return _versioned_response(request, response, detail, "public, max-age=31536000, immutable")
+
+@router.get("/{app_id}/published", response_model=AIAppVersionDetail, summary="获取AI应用发布版本")
+async def get_published_ai_app(
+    app_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db)
+):
+    """
+    获取当前发布版本的完整配置，运行时读取应用配置应使用该接口
+    
+    发布版本可能被切换，响应需要用 ETag 重新验证；Content-Location 指向可永久缓存的版本地址
+    """
+    detail = app_version_service.get_published(db, app_id)
+    if not detail:
+        raise HTTPException(status_code=404, detail="AI应用不存在或未发布")
+    response.headers["Content-Location"] = f"/ai-apps/{app_id}/versions/{detail['version']}"
+    return _versioned_response(request, response, detail, "no-cache")
+
+def _versioned_response(request: Request, response: Response, detail: dict, cache_control: str):
+    """设置版本响应的缓存头，If-None-Match 命中时返回304"""
+    etag = f'"{detail["config_hash"]}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag in request.headers.get("if-none-match", ""):
+        if "Content-Location" in response.headers:
+            headers["Content-Location"] = response.headers["Content-Location"]
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return detail
+
+@router.post("/{app_id}/route", response_model=RouteResponse, summary="为消息选择Agent")
+def route_message(
+    app_id: str,
+    request: RouteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    按向量相似度从应用的 agent_list 中选出最相关的 top_k 个Agent，不调用大模型
+    
+    agent_list 为空时返回空列表；停用的Agent不参与路由
+    """
+    ai_app = AIAppService.get_ai_app(db, app_id)
+    if not ai_app:
+        raise HTTPException(status_code=404, detail="AI应用不存在")
+    candidates = [agent.agent_id for agent in ai_app.agent_list or []]
+    if not candidates:
+        return RouteResponse(agents=[])
+    return RouteResponse(agents=agent_router.route([request.message], candidates, request.top_k)[0])
+
+@router.post("/{app_id}/render-prompt", response_model=RenderPromptResponse, summary="渲染系统提示词")
+def render_prompt(
+    app_id: str,
+    request: RenderPromptRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    按模板变量和语言渲染应用的系统提示词，模板编译一次后按内容哈希缓存
+    
+    - **variables**: 模板变量，内置变量 app、agents、mcps、locale 优先
+    - **locale**: 语言，如 zh、en-US
+    - **published**: 为 true 时渲染当前发布版本，未发布时返回404
+    """
+    if request.published:
+        detail = app_version_service.get_published(db, app_id)
+        if detail is None:
+            raise HTTPException(status_code=404, detail="AI应用不存在或未发布")
+        config, version = detail["config"], detail["version"]
+    else:
+        config = AIAppService.get_ai_app(db, app_id)
+        if not config:
+            raise HTTPException(status_code=404, detail="AI应用不存在")
+        version = config.version
+    try:
+        result = prompt_service.render_app_prompt(config, request.variables, request.locale)
+    except TemplateError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return RenderPromptResponse(version=version, **result)
+
 @router.put("/{app_id}", response_model=AIAppResponse, summary="更新AI应用")
 async def update_ai_app(
     app_id: str,
     ai_app_data: AIAppUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """
@@ -94,13 +332,81 @@ async def update_ai_app(
     - **agent_list**: Agent列表
     - **mcp_list**: MCP列表
     - **llm_config**: 大模型配置
-    - **system_prompt**: 系统提示词
+    - **system_prompt**: 系统提示词（模板语法有误时返回422）
+    
+    带 If-Match 时只在版本一致时更新，否则返回412；不带时被并发修改会基于最新配置重试
     """
-    ai_app = AIAppService.update_ai_app(db, app_id, ai_app_data)
+    expected_version = _expected_version(if_match)
+    try:
+        ai_app = AIAppService.update_ai_app(db, app_id, ai_app_data, expected_version)
+    except DanglingReferences as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    except TemplateSyntaxError as e:
+        raise _template_syntax_error(e)
+    except VersionConflict as e:
+        raise _version_conflict(e, expected_version)
     if not ai_app:
         raise HTTPException(status_code=404, detail="AI应用不存在")
+    response.headers["ETag"] = f'"{ai_app.version}"'
     return ai_app
 
+@router.patch("/{app_id}", response_model=AIAppResponse, summary="修改AI应用的列表配置")
+async def patch_ai_app(
+    app_id: str,
+    patch: AIAppPatch,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    在服务端按顺序执行 agent_list/mcp_list/llm_config 的单条目操作，只写入被修改的列
+    
+    - **add**: 添加 value 到 index 位置（默认末尾），ID已存在时报错
+    - **remove**: 删除 id（agent_id/mcp_id/model）或 index 指定的条目
+    - **move**: 把 id 指定的条目移动到 index 位置（默认末尾）
+    
+    带 If-Match 时只在版本一致时修改，否则返回412；不带时两个编辑者同时添加条目都会生效。
+    操作无法执行时返回422，所有操作都不生效
+    """
+    expected_version = _expected_version(if_match)
+    try:
+        ai_app = AIAppService.patch_ai_app(db, app_id, patch.ops, expected_version)
+    except DanglingReferences as e:
+        raise HTTPException(status_code=422, detail=e.errors)
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except VersionConflict as e:
+        raise _version_conflict(e, expected_version)
+    if not ai_app:
+        raise HTTPException(status_code=404, detail="AI应用不存在")
+    response.headers["ETag"] = f'"{ai_app.version}"'
+    return ai_app
+
+def _expected_version(if_match: Optional[str]) -> Optional[int]:
+    """解析 If-Match 中的版本号，未提供或为 * 时返回 None"""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    # 响应压缩后 ETag 为弱 ETag，W/"3" 和 "3" 都接受
+    tag = if_match.split(",")[0].strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=412, detail="If-Match 与当前版本不一致")
+    return int(tag)
+
+def _version_conflict(e: VersionConflict, expected_version: Optional[int]) -> HTTPException:
+    """带 If-Match 时返回412，否则（重试次数用尽）返回409；响应头带当前版本的 ETag"""
+    headers = {"ETag": f'"{e.current_version}"'} if e.current_version is not None else None
+    return HTTPException(status_code=412 if expected_version is not None else 409, detail=str(e), headers=headers)
+
+def _template_syntax_error(e: TemplateSyntaxError) -> HTTPException:
+    return HTTPException(status_code=422, detail=[{
+        "loc": ["body", "system_prompt"],
+        "msg": str(e),
+        "type": "template_syntax_error",
+    }])
+
 @router.delete("/{app_id}", summary="删除AI应用")
 async def delete_ai_app(
     app_id: str,
@@ -132,25 +438,51 @@ async def generate_system_prompt(
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"生成系统提示词失败: {str(e)}")
 
+@router.post("/generate-system-prompt/jobs", response_model=JobResponse, status_code=202, summary="后台生成系统提示词")
+def submit_generate_system_prompt(
+    request: GenerateSystemPromptRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    提交生成系统提示词的后台任务，立即返回任务ID，通过 GET /jobs/{job_id}?wait=10 获取结果
+    """
+    job = job_service.submit(db, "generate_system_prompt", request.model_dump())
+    return job_response(job)
+
 @router.get("/available/agents", summary="获取可用的Agent列表")
 async def get_available_agents(
+    mcp_id: Optional[str] = Query(None, description="按关联的MCP过滤"),
+    provider: Optional[str] = Query(None, description="按关联MCP的提供商过滤"),
+    model: Optional[str] = Query(None, description="按关联MCP的模型过滤"),
+    page: dict = Depends(page_params),
     db: Session = Depends(get_db)
 ):
     """
     获取可用的Agent列表，用于AI应用配置时选择
+    
+    - **next_cursor**: 下一页游标，没有更多数据时为null
     """
-    agents = AIAppService.get_available_agents(db)
-    return {"agents": agents}
+    agents, next_cursor = run_page_query(
+        AIAppService.get_available_agents, db, mcp_id=mcp_id, provider=provider, model=model, **page
+    )
+    return {"agents": agents, "next_cursor": next_cursor}
 
 @router.get("/available/mcps", summary="获取可用的MCP列表")
 async def get_available_mcps(
+    provider: Optional[str] = Query(None, description="按提供商过滤"),
+    model: Optional[str] = Query(None, description="按模型过滤"),
+    page: dict = Depends(page_params),
     db: Session = Depends(get_db)
 ):
     """
     获取可用的MCP列表，用于AI应用配置时选择
+    
+    - **next_cursor**: 下一页游标，没有更多数据时为null
     """
-    mcps = AIAppService.get_available_mcps(db)
-    return {"mcps": mcps}
+    mcps, next_cursor = run_page_query(
+        AIAppService.get_available_mcps, db, provider=provider, model=model, **page
+    )
+    return {"mcps": mcps, "next_cursor": next_cursor}
 
 @router.get("/platform", response_model=AIAppListResponse, summary="获取平台应用列表")
 async def get_platform_apps(
@@ -0,0 +1,100 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.session import get_db
+from app.schemas.conversation import (
+    AppendMessagesRequest,
+    ConversationCreate,
+    ConversationListResponse,
+    ConversationOut,
+    MessageOut,
+    MessageWindowResponse
+)
+from app.services import conversation_service
+from app.services.ai_app import AIAppService
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["会话"], route_class=TracedRoute)
+
+@router.post("/ai-apps/{app_id}/conversations", response_model=ConversationOut, summary="创建会话")
+def create_conversation(
+    app_id: str,
+    data: ConversationCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    为AI应用创建会话
+    """
+    if not AIAppService.get_ai_app(db, app_id):
+        raise HTTPException(status_code=404, detail="AI应用不存在")
+    return conversation_service.create_conversation(db, app_id, data.user_id, data.title)
+
+@router.get("/ai-apps/{app_id}/conversations", response_model=ConversationListResponse, summary="获取会话列表")
+def list_conversations(
+    app_id: str,
+    user_id: Optional[str] = Query(None, description="用户ID"),
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db)
+):
+    """
+    获取AI应用的会话列表，按最后活跃时间倒序
+    """
+    skip = (page - 1) * size
+    return ConversationListResponse(**conversation_service.list_conversations(db, app_id, user_id, skip, size))
+
+@router.get("/conversations/{conversation_id}", response_model=ConversationOut, summary="获取会话")
+def get_conversation(conversation_id: str, db: Session = Depends(get_db)):
+    conversation = conversation_service.get_conversation(db, conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    return conversation
+
+@router.delete("/conversations/{conversation_id}", summary="删除会话")
+def delete_conversation(conversation_id: str, db: Session = Depends(get_db)):
+    if not conversation_service.delete_conversation(db, conversation_id):
+        raise HTTPException(status_code=404, detail="会话不存在")
+    return {"message": "会话删除成功"}
+
+@router.post("/conversations/{conversation_id}/messages", response_model=list[MessageOut], summary="追加消息")
+def append_messages(
+    conversation_id: str,
+    data: AppendMessagesRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    向会话追加消息，只需上传新消息，耗时与会话长度无关
+    """
+    rows = conversation_service.append_messages(
+        db, conversation_id, [(message.role, message.content) for message in data.messages]
+    )
+    if rows is None:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    return rows
+
+@router.get("/conversations/{conversation_id}/messages", response_model=MessageWindowResponse, summary="读取消息窗口")
+def get_messages(
+    conversation_id: str,
+    last: Optional[int] = Query(None, ge=1, le=1000, description="最近N条消息"),
+    max_tokens: Optional[int] = Query(None, ge=1, description="完整落在最近K个token内的消息"),
+    db: Session = Depends(get_db)
+):
+    """
+    读取会话最近的消息，两个条件同时给出时取交集，都不给时返回最近20条
+    
+    较早的消息会被后台压缩进 summary，不再单独返回
+    """
+    conversation = conversation_service.get_conversation(db, conversation_id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    if last is None and max_tokens is None:
+        last = 20
+    messages = conversation_service.get_window(db, conversation, last, max_tokens)
+    return {
+        "conversation_id": conversation.id,
+        "summary": conversation.summary,
+        "messages": messages,
+        "message_count": conversation.message_count,
+        "token_count": conversation.token_count,
+    }
@@ -0,0 +1,88 @@
+import json
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.services.event_stream import EventFilter, event_broker, event_payload, format_sse
+from app.services.sync_service import ENTITY_TYPES
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["事件推送"], route_class=TracedRoute)
+
+# 客户端断线后的重连间隔（毫秒）
+RETRY_MS = 3000
+
+def _parse_filter(types: Optional[str], app: Optional[str], user_id: Optional[str]) -> EventFilter:
+    entity_types = None
+    if types:
+        entity_types = tuple(t.strip() for t in types.split(",") if t.strip())
+        unknown = set(entity_types) - set(ENTITY_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的实体类型: {', '.join(sorted(unknown))}")
+    return EventFilter(entity_types, app, user_id)
+
+def _parse_last_event_id(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效的 Last-Event-ID")
+
+@router.get("/events", summary="订阅应用、Agent和MCP的变更事件（SSE）")
+async def stream_events(
+    types: Optional[str] = Query(None, description="实体类型过滤，逗号分隔：ai_app,agent,mcp"),
+    app: Optional[str] = Query(None, description="按AI应用标识符过滤"),
+    user_id: Optional[str] = Query(None, description="按AI应用所属用户过滤"),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID", description="断点续传：上次收到的事件ID")
+):
+    """
+    以 Server-Sent Events 推送变更通知，事件ID即变更序号
+    
+    - **change**: 实体变更，data 为 {seq, entity_type, entity_id, op, identifier, user_id}
+    - **dropped**: 客户端消费太慢被断开，应带 Last-Event-ID 重连
+    - **reset**: 需要补发的事件过多，应改用 GET /changes 重新同步
+    - 无事件时定期发送注释行作为心跳
+    """
+    event_filter = _parse_filter(types, app, user_id)
+    since = _parse_last_event_id(last_event_id)
+
+    async def body():
+        yield f"retry: {RETRY_MS}\n\n"
+        async for kind, event in event_broker.listen(event_filter, since):
+            yield format_sse(kind, event)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/events/ws")
+async def websocket_events(
+    websocket: WebSocket,
+    types: Optional[str] = None,
+    app: Optional[str] = None,
+    user_id: Optional[str] = None,
+    last_event_id: Optional[str] = None
+):
+    """
+    以 WebSocket 推送变更通知，参数与 /events 相同，断点续传使用 last_event_id 查询参数；
+    每条消息为 {"event": 类型, "data": 变更}
+    """
+    try:
+        event_filter = _parse_filter(types, app, user_id)
+        since = _parse_last_event_id(last_event_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    await websocket.accept()
+    try:
+        async for kind, event in event_broker.listen(event_filter, since):
+            data = event_payload(event) if event is not None else None
+            await websocket.send_text(json.dumps({"event": kind, "data": data}, ensure_ascii=False))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.services.health_service import readiness
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["健康检查"], route_class=TracedRoute)
+
+@router.get("/healthz", summary="存活检查")
+async def healthz():
+    """
+    进程能够处理请求即返回200，不检查数据库
+    """
+    return {"status": "ok"}
+
+@router.get("/readyz", summary="就绪检查")
+def readyz():
+    """
+    连接池、数据库结构版本和启动预热都就绪时返回200，否则返回503
+    """
+    ready, body = readiness.check()
+    return JSONResponse(body, status_code=200 if ready else 503)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.session import get_db
+from app.models.job import Job
+from app.schemas.job import JobCreate, JobListResponse, JobResponse
+from app.services import job_service
+from app.core.tracing import TracedRoute
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"], route_class=TracedRoute)
+
+# 长轮询时检查任务状态的间隔（秒）
+WAIT_POLL_INTERVAL = 0.2
+
+def job_response(job: Job) -> JobResponse:
+    response = JobResponse.model_validate(job)
+    if job.result is not None:
+        response.result = json.loads(job.result)
+    return response
+
+@router.post("", response_model=JobResponse, status_code=202, summary="提交后台任务")
+def create_job(
+    data: JobCreate,
+    db: Session = Depends(get_db)
+):
+    """
+    提交后台任务，立即返回任务ID，通过 GET /jobs/{job_id} 查询结果
+    
+    - **type**: 任务类型，如 generate_system_prompt、bulk_publish
+    - **payload**: 任务参数
+    """
+    try:
+        job = job_service.submit(db, data.type, data.payload, data.max_attempts)
+    except job_service.UnknownJobType as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job_response(job)
+
+@router.get("", response_model=JobListResponse, summary="获取任务列表")
+def list_jobs(
+    status: Optional[str] = Query(None, description="按状态过滤"),
+    type: Optional[str] = Query(None, description="按任务类型过滤"),
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(20, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db)
+):
+    result = job_service.list_jobs(db, status, type, (page - 1) * size, size)
+    result["jobs"] = [job_response(job) for job in result["jobs"]]
+    return result
+
+@router.get("/{job_id}", response_model=JobResponse, summary="查询任务状态和结果")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="任务未完成时最多等待的秒数（长轮询）"),
+    db: Session = Depends(get_db)
+):
+    """
+    查询任务；指定 wait 时在任务完成或超时后返回
+    """
+    deadline = time.monotonic() + wait
+    while True:
+        # 结束当前事务，读取其他worker提交的最新状态
+        await run_in_threadpool(db.rollback)
+        job = await run_in_threadpool(job_service.get_job, db, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        if job.status in job_service.FINISHED_STATUSES or time.monotonic() >= deadline:
+            return job_response(job)
+        await asyncio.sleep(WAIT_POLL_INTERVAL)
+
+@router.post("/{job_id}/cancel", response_model=JobResponse, summary="取消任务")
+def cancel_job(
+    job_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    取消排队中的任务，已开始执行或已完成的任务返回409
+    """
+    if not job_service.cancel(db, job_id):
+        job = job_service.get_job(db, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="任务不存在")
+        raise HTTPException(status_code=409, detail=f"任务状态为 {job.status}，不能取消")
+    return job_response(job_service.get_job(db, job_id))
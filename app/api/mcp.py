@@ -1,18 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.schemas.mcp import MCPCreate, MCPUpdate, MCPOut
 from app.services import mcp_service
 from app.db.session import get_db
+from app.api.params import page_params, run_page_query, set_page_headers, snapshot_response
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.streaming import STREAM_FORMATS
+from app.core.tracing import TracedRoute
 
-router = APIRouter(prefix="/mcp", tags=["MCP"])
+router = APIRouter(prefix="/mcp", tags=["MCP"], route_class=TracedRoute)
 
 @router.post("/", response_model=MCPOut)
 def create_mcp(data: MCPCreate, db: Session = Depends(get_db)):
     return mcp_service.create_mcp(db, data)
 
 @router.get("/", response_model=list[MCPOut])
-def list_mcps(db: Session = Depends(get_db)):
-    return mcp_service.get_mcps(db)
+def list_mcps(
+    response: Response,
+    provider: Optional[str] = Query(None, description="按提供商过滤"),
+    model: Optional[str] = Query(None, description="按模型过滤"),
+    include_total: bool = Query(False, description="是否在响应头 X-Total-Count 中返回总数"),
+    page: dict = Depends(page_params),
+    db: Session = Depends(get_db)
+):
+    """分页获取MCP列表，可按 id/name/provider/model 排序；下一页游标在响应头 X-Next-Cursor 中"""
+    filters = {"provider": provider, "model": model}
+    mcps, next_cursor = run_page_query(mcp_service.get_mcps, db, **filters, **page)
+    total = mcp_service.count_mcps(db, **filters) if include_total else None
+    set_page_headers(response, next_cursor, total)
+    return mcps
+
+@router.get("/export")
+def export_mcps(
+    format: str = Query("json", description="输出格式：json-JSON数组，ndjson-每行一个JSON对象"),
+    provider: Optional[str] = Query(None, description="按提供商过滤"),
+    model: Optional[str] = Query(None, description="按模型过滤"),
+):
+    """流式导出全部MCP，适合同步工具一次性拉取，内存占用与数据量无关"""
+    if format not in STREAM_FORMATS:
+        raise HTTPException(400, f"不支持的格式: {format}")
+    body = mcp_service.stream_mcps(format, provider=provider, model=model)
+    return StreamingResponse(body, media_type=STREAM_FORMATS[format])
+
+@router.get("/{mcp_id}", response_model=MCPOut)
+def get_mcp(mcp_id: str, db: Session = Depends(get_db)):
+    hit = catalog_snapshot.get("mcp", mcp_id)
+    if hit is not None:
+        return snapshot_response(hit)
+    mcp = mcp_service.get_mcp_out(db, mcp_id)
+    if not mcp:
+        raise HTTPException(404, "MCP not found")
+    return mcp
 
 @router.put("/{mcp_id}", response_model=MCPOut)
 def update_mcp(mcp_id: str, data: MCPUpdate, db: Session = Depends(get_db)):
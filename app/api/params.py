@@ -0,0 +1,37 @@
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+
+from app.services.pagination import DEFAULT_LIMIT, MAX_LIMIT, InvalidPageRequest
+
+def page_params(
+    sort: str = Query("id", description="排序字段"),
+    order: str = Query("asc", description="排序方向：asc/desc"),
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_LIMIT, description=f"每页数量，不指定时返回全部；使用 cursor 时默认 {DEFAULT_LIMIT}"
+    ),
+    offset: int = Query(0, ge=0, description="跳过的条数（offset分页）"),
+    cursor: Optional[str] = Query(None, description="游标分页：上一页响应头 X-Next-Cursor 的值"),
+) -> Dict[str, Any]:
+    """列表接口通用的分页/排序参数"""
+    return {"sort": sort, "order": order, "limit": limit, "offset": offset, "cursor": cursor}
+
+def run_page_query(query_fn, *args, **kwargs):
+    """执行分页查询，将参数错误转换为400"""
+    try:
+        return query_fn(*args, **kwargs)
+    except InvalidPageRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def snapshot_response(hit: Tuple[memoryview, int], etag: bool = False) -> Response:
+    """目录快照中的响应JSON直接作为响应体返回，etag 为 True 时标记（配置版本号）作为 ETag"""
+    body, tag = hit
+    headers = {"ETag": f'"{tag}"'} if etag else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def set_page_headers(response: Response, next_cursor: Optional[str], total: Optional[int] = None) -> None:
+    """分页信息通过响应头返回，保持列表接口的响应体仍为数组"""
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.session import get_db
+from app.schemas.search import SearchResponse
+from app.services.search_service import ENTITY_TYPES, search_service
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["搜索"], route_class=TracedRoute)
+
+@router.get("/search", response_model=SearchResponse, summary="全文检索应用、Agent和MCP")
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="检索关键词"),
+    types: Optional[str] = Query(None, description="实体类型过滤，逗号分隔：ai_app,agent,mcp"),
+    page: int = Query(1, ge=1, description="页码"),
+    size: int = Query(10, ge=1, le=100, description="每页数量"),
+    db: Session = Depends(get_db)
+):
+    """
+    按相关度检索 AI应用（名称/描述/系统提示词）、Agent（名称/描述/系统提示词）
+    和 MCP（名称/提供商/模型）；MySQL上只匹配系统提示词的前 SEARCH_PROMPT_EXCERPT_LENGTH 个字符
+    """
+    entity_types = ENTITY_TYPES
+    if types:
+        entity_types = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = set(entity_types) - set(ENTITY_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的实体类型: {', '.join(sorted(unknown))}")
+    skip = (page - 1) * size
+    return search_service.search(db, q, entity_types, skip, size)
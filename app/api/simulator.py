@@ -0,0 +1,49 @@
+import asyncio
+import json
+import time
+
+from fastapi import APIRouter, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.tracing import TracedRoute
+from app.services.llm_simulator import SimulatorError, simulator
+
+router = APIRouter(prefix="/simulator/v1", tags=["大模型模拟器"], route_class=TracedRoute)
+
+def _error_response(error: SimulatorError) -> JSONResponse:
+    headers = {"Retry-After": str(max(1, round(error.retry_after)))} if error.retry_after is not None else None
+    return JSONResponse(error.to_dict(), status_code=error.status, headers=headers)
+
+@router.post("/chat/completions", summary="模拟 chat completions")
+async def chat_completions(request: dict = Body(...)):
+    """
+    OpenAI 兼容的 chat completions 接口，按模拟器配置等待、输出确定性的内容或返回注入的错误；
+    stream 为 true 时以SSE逐个返回chunk，以 `data: [DONE]` 结束
+    """
+    plan = simulator.plan(request)
+    if plan.error is not None:
+        # 超时注入：挂起后才返回504，调用方通常已经先超时断开
+        await asyncio.sleep(plan.delay)
+        return _error_response(plan.error)
+
+    if not request.get("stream"):
+        await asyncio.sleep(sum(plan.delays))
+        return plan.completion()
+
+    async def events():
+        for delay, chunk in plan.chunks():
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/models", summary="模拟器模型列表")
+async def list_models():
+    """
+    已调用过的模型（去掉模型名中的参数），没有调用过时返回 simulator
+    """
+    names = simulator.models() or ["simulator"]
+    created = int(time.time())
+    return {"object": "list", "data": [{"id": name, "object": "model", "created": created, "owned_by": "simulator"} for name in names]}
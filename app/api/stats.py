@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.schemas.stats import StatsResponse
+from app.services.stats_service import stats_service
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["统计"], route_class=TracedRoute)
+
+@router.get("/stats", response_model=StatsResponse, summary="获取目录统计")
+def get_stats():
+    """
+    AI应用、Agent、MCP的计数统计，随实体写入增量维护，读取不访问数据库
+    """
+    return stats_service.snapshot()
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.db.session import get_db
+from app.schemas.sync import ChangeListResponse
+from app.services import sync_service
+from app.core.tracing import TracedRoute
+
+router = APIRouter(tags=["增量同步"], route_class=TracedRoute)
+
+@router.get("/changes", response_model=ChangeListResponse, summary="增量同步应用、Agent和MCP")
+def get_changes(
+    since: Optional[int] = Query(None, ge=0, description="上次响应的next_cursor；不传时只返回当前游标"),
+    types: Optional[str] = Query(None, description="实体类型过滤，逗号分隔：ai_app,agent,mcp"),
+    limit: int = Query(sync_service.DEFAULT_LIMIT, ge=1, le=sync_service.MAX_LIMIT, description="每页变更数"),
+    db: Session = Depends(get_db)
+):
+    """
+    返回 since 之后创建、更新或删除的实体
+    
+    首次同步：先不带 since 请求得到游标，再全量导出（/agent/export、/mcp/export 等），
+    之后从该游标开始增量拉取。删除的实体以墓碑返回（op=delete，data=null）
+    """
+    entity_types = None
+    if types:
+        entity_types = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = set(entity_types) - set(sync_service.ENTITY_TYPES)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"未知的实体类型: {', '.join(sorted(unknown))}")
+    if since is None:
+        return {"changes": [], "next_cursor": sync_service.get_cursor(db), "has_more": False}
+    return sync_service.get_changes(db, since, entity_types, limit)
@@ -8,6 +8,134 @@ class Settings(BaseSettings):
     MYSQL_USER: str = "root"
     MYSQL_PASSWORD: str = ""  # 新安装的MySQL没有密码
     MYSQL_DATABASE: str = "llm_platform"
+    DB_URL: Optional[str] = None  # 完整的数据库URL，设置后覆盖上面的MySQL配置（如测试时使用sqlite）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    SQL_ECHO: bool = True  # 开发环境下显示SQL语句
+    
+    # 启动配置
+    SKIP_SCHEMA_CHECK: bool = False  # 跳过启动时的数据库版本检查
+    WARMUP_ENABLED: bool = True  # 启动后预热连接池和缓存，完成前 /readyz 返回503
+    WARMUP_HOT_APPS: int = 50  # 预热最近会话最活跃的平台应用数量
+    
+    # 缓存配置
+    CACHE_TTL: int = 300  # 秒
+    CACHE_MAXSIZE: int = 10000
+    INVALIDATION_BACKEND: str = "memory"  # memory-单进程，database-多worker通过entity_change表广播
+    INVALIDATION_POLL_INTERVAL: float = 1.0  # 秒
+    REFERENCE_CACHE_TTL: float = 5.0  # 秒，AI应用引用的Agent/MCP是否存在的缓存时长
+    REFERENCE_CACHE_MAXSIZE: int = 100000
+    
+    # 变更历史配置
+    HISTORY_BATCH_SIZE: int = 500  # 每批写入条数
+    HISTORY_FLUSH_INTERVAL: float = 1.0  # 秒，进程崩溃最多丢失这段时间内的记录
+    HISTORY_QUEUE_SIZE: int = 10000  # 缓冲队列上限，写满时丢弃新记录并计数，更新请求不等待
+    
+    # 检索配置
+    SEARCH_BACKEND: str = "auto"  # auto-MySQL使用FULLTEXT索引，其他数据库使用内存倒排索引；也可指定 mysql/memory
+    SEARCH_PROMPT_EXCERPT_LENGTH: int = 2000  # 系统提示词压缩存储，前N个字符以明文另存一列参与FULLTEXT检索
+    
+    # 统计配置
+    STATS_RECONCILE_INTERVAL: float = 600.0  # 秒，定期全量重算以修正增量维护的偏差
+    STATS_TOP_N: int = 100  # 每用户应用数、每MCP Agent数只返回数量最多的前N项
+    
+    # 增量同步配置
+    CHANGES_SETTLE_SECONDS: float = 1.0  # 只返回写入超过该时长的变更，避免跳过尚未提交的较小序号；database 失效广播的轮询位置同样只前移到这些变更
+    
+    # 事件推送配置
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0  # 无事件时的心跳间隔
+    EVENTS_BUFFER_SIZE: int = 256  # 每个订阅者的待发送事件上限，超过即断开该订阅者
+    EVENTS_REPLAY_LIMIT: int = 1000  # Last-Event-ID 断点续传最多补发的事件数，超过时要求客户端重新同步
+    
+    # 会话配置
+    CONVERSATION_TTL_SECONDS: int = 7 * 24 * 3600  # 超过该时长未活跃的会话被清理
+    CONVERSATION_KEEP_MESSAGES: int = 200  # 压缩后保留的最近消息数
+    CONVERSATION_COMPACT_BATCH: int = 100  # 未压缩消息超过 KEEP + BATCH 时触发压缩
+    CONVERSATION_SUMMARY_MAX_TOKENS: int = 1000  # 摘要的token上限
+    CONVERSATION_MAINTENANCE_INTERVAL: float = 60.0  # 秒，后台压缩与清理的周期
+    
+    # 提示词模板配置
+    PROMPT_TEMPLATE_CACHE_SIZE: int = 10000  # 编译结果缓存的模板数
+    PROMPT_DEFAULT_LOCALE: str = "zh"  # 请求的语言在模板中不存在时使用的语言
+    
+    # 目录快照配置
+    SNAPSHOT_ENABLED: bool = False  # 单个AI应用/Agent/MCP的GET从共享的内存映射快照文件读取
+    SNAPSHOT_DIR: str = "data/catalog_snapshot"  # 同一台机器上的worker共用该目录
+    SNAPSHOT_BUILD_INTERVAL: float = 30.0  # 秒，有新变更时重建快照的周期
+    SNAPSHOT_POLL_INTERVAL: float = 1.0  # 秒，检查是否有新快照的周期
+    SNAPSHOT_KEEP: int = 3  # 保留的快照文件数
+    
+    # 用量计量配置
+    USAGE_BUFFER_SIZE: int = 100000  # 环形缓冲区容量，写满时丢弃最早的记录
+    USAGE_BATCH_SIZE: int = 5000  # 每批写入条数，缓冲区积累到该数量时提前写入
+    USAGE_FLUSH_INTERVAL: float = 5.0  # 秒，进程崩溃最多丢失这段时间内的记录
+    USAGE_RETENTION_DAYS: int = 7  # 调用明细保留天数，小时/日汇总长期保留
+    
+    # 向量化配置（Agent路由）
+    EMBEDDING_PROVIDER: str = "hashing"  # hashing-本地特征哈希，openai-OpenAI兼容的/embeddings接口
+    EMBEDDING_DIM: int = 256
+    EMBEDDING_API_BASE: str = "https://api.openai.com/v1"
+    EMBEDDING_API_KEY: str = ""
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    
+    # 后台任务配置
+    JOB_WORKERS: int = 4  # 每个进程的任务执行线程数
+    JOB_POLL_INTERVAL: float = 1.0  # 秒，空闲时检查新任务的间隔
+    JOB_LEASE_SECONDS: float = 60.0  # 租约时长，worker退出后其任务在租约过期后重新排队
+    JOB_MAX_ATTEMPTS: int = 3  # 默认最多执行次数
+    JOB_BACKOFF_SECONDS: float = 2.0  # 第一次重试的等待时间，之后每次翻倍
+    JOB_BACKOFF_MAX: float = 300.0  # 重试等待时间上限
+    
+    # 大文本列压缩配置
+    COMPRESSION_CODEC: str = "zstd"  # zstd/zlib/none；未安装zstandard时使用zlib
+    COMPRESSION_MIN_SIZE: int = 512  # 字节，小于该长度的值不压缩
+    COMPRESSION_LEVEL: Optional[int] = None  # 压缩级别，默认使用各算法的默认级别
+    COMPRESSION_ZSTD_DICTS: str = ""  # zstd字典文件路径，逗号分隔；第一个用于压缩，其余用于读取旧数据
+    
+    # 准入控制配置
+    ADMISSION_ENABLED: bool = True  # 过载时按路由优先级提前拒绝低优先级请求（503 + Retry-After）
+    ADMISSION_ROUTE_PRIORITIES: str = ""  # 额外的路由优先级规则，逗号分隔，如 "GET /jobs=low,GET /changes=runtime"，优先于内置规则
+    ADMISSION_LOW_MAX_QUEUE: int = 8  # 等待线程池的任务数达到该值时拒绝low请求
+    ADMISSION_NORMAL_MAX_QUEUE: int = 32  # 等待线程池的任务数达到该值时拒绝normal请求
+    ADMISSION_LOW_MAX_LATENCY: float = 1.0  # 秒，最近平均响应时间达到该值时拒绝low请求
+    ADMISSION_NORMAL_MAX_LATENCY: float = 3.0  # 秒，最近平均响应时间达到该值时拒绝normal请求
+    ADMISSION_MAX_IN_FLIGHT: int = 500  # 进行中（尚未发出响应头）的请求数上限，超过时除健康检查外都拒绝；流式响应发出响应头后不占用
+    ADMISSION_LATENCY_WINDOW: float = 5.0  # 秒，计算平均响应时间的窗口
+    ADMISSION_RETRY_AFTER: int = 2  # 秒，拒绝时 Retry-After 响应头的值
+    
+    # 追踪配置
+    TRACING_ENABLED: bool = False  # 记录请求、服务层、SQL和对外调用的span
+    TRACING_SAMPLE_RATIO: float = 0.1  # 没有上游 traceparent 时的采样比例，有时沿用上游的采样决定
+    TRACING_EXPORTER: str = "file"  # file-追加到 TRACING_FILE，console-输出到标准输出，none-不导出
+    TRACING_FILE: str = "data/traces.jsonl"
+    TRACING_SERVICE_NAME: str = "llm-platform-backend"
+    TRACING_QUEUE_SIZE: int = 10000  # 待导出span上限，写满时丢弃最早的span
+    TRACING_EXPORT_INTERVAL: float = 1.0  # 秒，后台批量导出的周期
+    TRACING_MAX_STATEMENT_LENGTH: int = 500  # span中记录的SQL最大长度
+
+    # 大模型调用配置
+    LLM_OPENAI_API_BASE: str = "https://api.openai.com/v1"  # provider 为 openai 时的接口地址，压测时可指向 /simulator/v1
+    LLM_REQUEST_TIMEOUT: float = 60.0  # 秒，单次调用等待完整响应（流式为等待下一个chunk）的上限
+
+    # 大模型模拟器配置（provider 为 simulator 时在进程内调用，启用后另外提供 /simulator/v1 接口）
+    LLM_SIMULATOR_ENABLED: bool = False  # 挂载 OpenAI 兼容的 /simulator/v1/chat/completions 接口
+    LLM_SIMULATOR_TTFT: str = "lognormal:0.3,0.5"  # 首token延迟分布（秒）：fixed/uniform/normal/lognormal/exponential
+    LLM_SIMULATOR_ITL: str = "normal:0.02,0.005"  # token间延迟分布（秒）
+    LLM_SIMULATOR_OUTPUT_TOKENS: int = 64  # 每次输出的token数，不超过请求的 max_tokens
+    LLM_SIMULATOR_ERROR_RATE: float = 0.0  # 返回500的比例
+    LLM_SIMULATOR_TIMEOUT_RATE: float = 0.0  # 挂起 LLM_SIMULATOR_HANG_SECONDS 秒不响应的比例
+    LLM_SIMULATOR_RATE_LIMIT_RATE: float = 0.0  # 返回429的比例
+    LLM_SIMULATOR_RPM: int = 0  # 每个模型每分钟请求数上限，超过返回429，0-不限制
+    LLM_SIMULATOR_HANG_SECONDS: float = 600.0
+    LLM_SIMULATOR_SEED: int = 0  # 输出内容、延迟和故障的随机种子
+
+    # 响应压缩配置
+    RESPONSE_COMPRESSION_ENCODINGS: str = "zstd,br,gzip"  # 客户端同样接受时的优先顺序；未安装对应库的算法自动跳过
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024  # 字节，小于该长度的响应不压缩
+    RESPONSE_GZIP_LEVEL: int = 6  # 1-9
+    RESPONSE_BROTLI_LEVEL: int = 4  # 0-11
+    RESPONSE_ZSTD_LEVEL: int = 3  # 1-22
+    RESPONSE_COMPRESSION_CACHE_SIZE: int = 512  # 按内容缓存的压缩结果数，相同响应（如缓存命中）不重复压缩
     
     @property
     def DATABASE_URL(self) -> str:
@@ -0,0 +1,260 @@
+"""
+准入控制
+
+数据库变慢时，同步处理函数（如 list_agents）在线程池前排队，所有接口一起变慢。准入中间件按路由把请求分为
+四个优先级，过载时提前拒绝低优先级的请求（503 + Retry-After），把线程池和数据库连接留给运行时请求：
+
+- critical：健康检查，从不拒绝
+- runtime：应用解析、发布配置、Agent路由、提示词渲染和会话，只在进行中的请求数超过上限时拒绝
+- normal：未匹配规则的其他请求
+- low：管理端列表/导出、检索、统计和系统提示词生成
+
+过载信号：
+- 排队深度：等待默认线程池的任务数（同步处理函数和 get_db 依赖都在线程池中执行）
+- 延迟：最近 window 秒内已准入请求的平均响应时间（到响应头发出为止，流式响应不计传输时间）
+- 进行中的请求数：已准入、尚未发出响应头的请求。流式响应（事件推送、NDJSON导出、模拟器的SSE）发出响应头后
+  不再占用，只计入 responding，长连接不会占满上限；critical 请求不计入
+
+路由规则为 `METHOD PATH=优先级`，PATH 中的 `{name}` 匹配一段路径，结尾的 `*` 匹配剩余部分，METHOD 可以是 `*`；
+按顺序第一条匹配的规则生效，配置中的规则排在内置规则之前。
+"""
+
+import json
+import re
+import time
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from anyio import to_thread
+
+from app.config import settings
+
+PRIORITIES = ("critical", "runtime", "normal", "low")
+
+DEFAULT_ROUTE_PRIORITIES = (
+    # 探针
+    "* /healthz=critical",
+    "* /readyz=critical",
+    # 管理端列表、导出、检索、统计和系统提示词生成（在 /ai-apps/{app_id} 之前匹配 /ai-apps/platform 等）
+    "GET /ai-apps=low",
+    "GET /ai-apps/platform=low",
+    "GET /ai-apps/user/{user_id}=low",
+    "GET /ai-apps/available/*=low",
+    "POST /ai-apps/generate-system-prompt*=low",
+    "GET /agent=low",
+    "GET /agent/export=low",
+    "GET /agent/mcp/{mcp_id}=low",
+    "GET /mcp=low",
+    "GET /mcp/export=low",
+    "GET /search=low",
+    "GET /stats=low",
+    # 运行时：应用解析、发布配置、Agent路由、提示词渲染、会话和事件推送
+    "GET /ai-apps/{app_id}=runtime",
+    "GET /ai-apps/by-identifier/{identifier}=runtime",
+    "GET /ai-apps/{app_id}/published=runtime",
+    "POST /ai-apps/{app_id}/route=runtime",
+    "POST /ai-apps/{app_id}/render-prompt=runtime",
+    "* /ai-apps/{app_id}/conversations=runtime",
+    "* /conversations/*=runtime",
+    "GET /agent/{agent_id}=runtime",
+    "GET /mcp/{mcp_id}=runtime",
+    "GET /events=runtime",
+    # 大模型模拟器（压测用）：注入的超时会挂起很久，不参与准入也不占用进行中请求数
+    "* /simulator/*=critical",
+)
+
+SHED_BODY = json.dumps({"detail": "服务繁忙，请稍后重试"}, ensure_ascii=False).encode("utf-8")
+
+
+def parse_rules(rules) -> List[Tuple[str, Pattern, str]]:
+    """解析 `METHOD PATH=优先级` 规则，格式错误时抛出 ValueError"""
+    parsed = []
+    for rule in rules:
+        rule = rule.strip()
+        if not rule:
+            continue
+        route, _, priority = rule.rpartition("=")
+        method, _, path = route.strip().partition(" ")
+        priority = priority.strip()
+        path = path.strip()
+        if not method or not path.startswith("/") or priority not in PRIORITIES:
+            raise ValueError(f"无效的路由优先级规则: {rule}")
+        pattern = ""
+        for part in re.split(r"(\{[^}/]+\})", _normalize(path)):
+            if part.startswith("{"):
+                pattern += "[^/]+"
+            elif part.endswith("*"):
+                pattern += re.escape(part[:-1]) + ".*"
+            else:
+                pattern += re.escape(part)
+        parsed.append((method.upper(), re.compile(pattern), priority))
+    return parsed
+
+
+def _normalize(path: str) -> str:
+    return path.rstrip("/") or "/"
+
+
+class _LatencyWindow:
+    """按秒分桶的滑动窗口，计算最近 window 秒的平均值"""
+
+    def __init__(self, window: float, clock: Callable[[], float]):
+        self.size = max(1, int(window))
+        self.clock = clock
+        # 每个桶: [秒, 次数, 总耗时]
+        self._buckets = [[-1, 0, 0.0] for _ in range(self.size)]
+
+    def add(self, seconds: float) -> None:
+        now = int(self.clock())
+        bucket = self._buckets[now % self.size]
+        if bucket[0] != now:
+            bucket[0], bucket[1], bucket[2] = now, 0, 0.0
+        bucket[1] += 1
+        bucket[2] += seconds
+
+    def average(self) -> float:
+        now = int(self.clock())
+        count, total = 0, 0.0
+        for second, n, elapsed in self._buckets:
+            if now - second < self.size:
+                count += n
+                total += elapsed
+        return total / count if count else 0.0
+
+
+class AdmissionController:
+    """按优先级和过载信号决定是否准入请求；只在事件循环线程中调用，不需要加锁"""
+
+    def __init__(
+        self,
+        rules=(),
+        max_queue: Optional[Dict[str, int]] = None,
+        max_latency: Optional[Dict[str, float]] = None,
+        max_in_flight: int = 500,
+        window: float = 5.0,
+        retry_after: int = 2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rules = parse_rules(list(rules) + list(DEFAULT_ROUTE_PRIORITIES))
+        # 各优先级允许的最大排队深度和平均延迟，未列出的优先级不按该信号拒绝
+        self.max_queue = {"normal": 32, "low": 8, **(max_queue or {})}
+        self.max_latency = {"normal": 3.0, "low": 1.0, **(max_latency or {})}
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.clock = clock
+        self.latency = _LatencyWindow(window, clock)
+        self.in_flight = 0
+        # 已发出响应头、仍在传输响应体的请求数（主要是流式响应）
+        self.responding = 0
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.shed = {priority: 0 for priority in PRIORITIES}
+
+    def classify(self, method: str, path: str) -> str:
+        path = _normalize(path)
+        for rule_method, pattern, priority in self.rules:
+            if (rule_method == "*" or rule_method == method) and pattern.fullmatch(path):
+                return priority
+        return "normal"
+
+    def check(self, priority: str, queue_depth: int) -> Optional[str]:
+        """返回拒绝原因，准入时返回 None"""
+        if priority == "critical":
+            return None
+        if self.in_flight >= self.max_in_flight:
+            return "in_flight"
+        limit = self.max_queue.get(priority)
+        if limit is not None and queue_depth >= limit:
+            return "queue"
+        limit = self.max_latency.get(priority)
+        if limit is not None and self.latency.average() >= limit:
+            return "latency"
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "responding": self.responding,
+            "queue_depth": queue_depth(),
+            "latency_avg": round(self.latency.average(), 4),
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+        }
+
+
+def queue_depth() -> int:
+    """等待默认线程池的任务数，不在事件循环中调用时返回0"""
+    try:
+        return to_thread.current_default_thread_limiter().statistics().tasks_waiting
+    except RuntimeError:
+        return 0
+
+
+class AdmissionMiddleware:
+    """按路由优先级做准入控制的ASGI中间件，应位于最外层"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        priority = controller.classify(scope["method"], scope["path"])
+        if controller.check(priority, queue_depth()) is not None:
+            controller.shed[priority] += 1
+            await _reject(send, controller.retry_after)
+            return
+
+        controller.admitted[priority] += 1
+        critical = priority == "critical"
+        if not critical:
+            controller.in_flight += 1
+        started = controller.clock()
+        # 进行中的请求在发出响应头时释放，之后到响应结束计入 responding
+        state = "pending" if not critical else "untracked"
+
+        async def timed_send(message):
+            nonlocal state
+            if state == "pending" and message["type"] == "http.response.start":
+                state = "responding"
+                controller.in_flight -= 1
+                controller.responding += 1
+                controller.latency.add(controller.clock() - started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            if state == "pending":
+                controller.in_flight -= 1
+            elif state == "responding":
+                controller.responding -= 1
+
+
+async def _reject(send, retry_after: int) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(SHED_BODY)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": SHED_BODY})
+
+
+def admission_options() -> dict:
+    """从配置读取准入控制参数"""
+    return {
+        "rules": [rule for rule in settings.ADMISSION_ROUTE_PRIORITIES.split(",") if rule.strip()],
+        "max_queue": {"normal": settings.ADMISSION_NORMAL_MAX_QUEUE, "low": settings.ADMISSION_LOW_MAX_QUEUE},
+        "max_latency": {"normal": settings.ADMISSION_NORMAL_MAX_LATENCY, "low": settings.ADMISSION_LOW_MAX_LATENCY},
+        "max_in_flight": settings.ADMISSION_MAX_IN_FLIGHT,
+        "window": settings.ADMISSION_LATENCY_WINDOW,
+        "retry_after": settings.ADMISSION_RETRY_AFTER,
+    }
+
+
+admission_controller = AdmissionController(**admission_options())
@@ -0,0 +1,132 @@
+"""
+进程内响应缓存
+
+缓存项可以带若干标签（tag），按标签批量失效：
+- ("ai_app", app_id)：单个实体相关的缓存
+- ("agent", "*")：依赖某类实体全集的缓存（如列表）
+
+实体变更事件（见 app.core.events）到达时，按 (entity_type, entity_id) 和
+(entity_type, "*") 两个标签失效对应的缓存项。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from app.config import settings
+
+Tag = Tuple[str, str]
+
+_MISSING = object()
+
+
+class TTLCache:
+    """线程安全的LRU + TTL缓存"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any, Tuple[Tag, ...]]]" = OrderedDict()
+        self._tag_index: Dict[Tag, Set[Hashable]] = {}
+        # 每个标签的失效次数，用于丢弃加载期间已失效的旧数据
+        self._generations: Dict[Tag, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value, _ = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Tag] = (), ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._set(key, value, tuple(tags), ttl)
+
+    def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Any],
+        tags: Iterable[Tag] = (),
+        ttl: Optional[float] = None,
+    ) -> Any:
+        """命中则返回缓存值，否则调用 loader 加载；loader 返回 None 时不缓存"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        tags = tuple(tags)
+        with self._lock:
+            generations = [self._generations.get(tag, 0) for tag in tags]
+        value = loader()
+        if value is None:
+            return None
+        with self._lock:
+            # 加载期间标签被失效过，说明读到的可能是旧数据，不写入缓存
+            if generations == [self._generations.get(tag, 0) for tag in tags]:
+                self._set(key, value, tags, ttl)
+        return value
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def invalidate(self, tag: Tag) -> int:
+        """失效所有带该标签的缓存项，返回失效数量"""
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+            keys = self._tag_index.pop(tag, ())
+            for key in list(keys):
+                self._remove(key)
+            return len(keys)
+
+    def invalidate_entity(self, entity_type: str, entity_id: str) -> int:
+        return self.invalidate((entity_type, entity_id)) + self.invalidate((entity_type, "*"))
+
+    def on_change(self, event) -> None:
+        """实体变更事件回调"""
+        self.invalidate_entity(event.entity_type, event.entity_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._tag_index.clear()
+
+    def _set(self, key: Hashable, value: Any, tags: Tuple[Tag, ...], ttl: Optional[float]) -> None:
+        if key in self._data:
+            self._remove(key)
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._data) > self.maxsize:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+
+response_cache = TTLCache(maxsize=settings.CACHE_MAXSIZE, ttl=settings.CACHE_TTL)
@@ -0,0 +1,275 @@
+"""
+实体变更事件总线
+
+服务层在实体写入的同一事务中调用 record_change 写入 entity_change 表，
+自增ID即全局单调递增的变更序号（增量同步接口 GET /changes 基于它分页）；
+提交后调用 publish_event 发布 ChangeEvent，各worker订阅事件并失效本地缓存。
+支持两种后端：
+
+- memory: 单进程内广播
+- database: 各worker后台线程轮询 entity_change 表的新记录，实现跨进程/跨节点广播。
+  并发事务中较小的序号可能晚于较大的序号提交，轮询位置只前移到写入超过
+  settle_seconds 的记录，之后的记录分发后仍重新读取，晚提交的记录不会被跳过
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Set, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    entity_type: str  # ai_app / agent / mcp
+    entity_id: str
+    op: str  # create / update / delete
+    version: int
+    origin: Optional[str] = None
+    # entity_change 中的变更序号，未随实体写入记录的事件为 None
+    seq: Optional[int] = None
+    # AI应用的标识符和所属用户，用于事件推送按应用/用户过滤
+    identifier: Optional[str] = None
+    user_id: Optional[str] = None
+    # 变更后参与目录统计的字段（见 stats_service.STAT_COLUMNS），删除或未提供时为 None
+    stats: Optional[Tuple] = None
+
+
+Subscriber = Callable[[ChangeEvent], None]
+
+
+class InvalidationBus:
+    """内存事件总线：发布即同步分发给本进程的订阅者"""
+
+    def __init__(self):
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber) -> None:
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, event: ChangeEvent) -> None:
+        self._dispatch(event)
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def _dispatch(self, event: ChangeEvent) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("处理变更事件失败: %s", event)
+
+
+class DatabaseInvalidationBus(InvalidationBus):
+    """基于 entity_change 表的跨进程事件总线"""
+
+    def __init__(self, poll_interval: float = 1.0, batch_size: int = 1000, settle_seconds: float = 1.0):
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.settle_seconds = settle_seconds
+        # 该序号及之前的记录都已稳定并处理过
+        self.last_seen_id = 0
+        # last_seen_id 之后已经分发过、尚未稳定的记录
+        self._dispatched: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, event: ChangeEvent) -> None:
+        from app.db.session import get_session_factory
+        from app.models.entity_change import EntityChangeLog
+
+        # 本进程立即生效，不等待轮询
+        self._dispatch(event)
+        if event.seq is not None:
+            # 已经随实体写入记录在 entity_change 中
+            return
+
+        db = get_session_factory()()
+        try:
+            db.add(EntityChangeLog(
+                entity_type=event.entity_type,
+                entity_id=event.entity_id,
+                op=event.op,
+                version=event.version,
+                origin=self.origin,
+                stats=_dump_stats(event.stats),
+                created_at=_utcnow(),
+            ))
+            db.commit()
+        except Exception:
+            # 实体写入已经提交，广播失败时其他worker的缓存依靠TTL过期
+            logger.exception("写入变更事件失败: %s", event)
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        # 新启动的worker缓存为空，只需要关心启动之后的变更；尚未稳定的记录在第一次轮询时分发
+        self.last_seen_id = self._max_id()
+        self._dispatched.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def poll(self) -> int:
+        """拉取并分发新的变更事件，返回本次新分发的记录数"""
+        from app.db.session import get_session_factory
+        from app.models.entity_change import EntityChangeLog
+
+        settled_before = _utcnow() - timedelta(seconds=self.settle_seconds)
+        db = get_session_factory()()
+        try:
+            rows = (
+                db.query(EntityChangeLog)
+                .filter(EntityChangeLog.id > self.last_seen_id)
+                .order_by(EntityChangeLog.id)
+                .limit(self.batch_size)
+                .all()
+            )
+        finally:
+            db.close()
+
+        dispatched = 0
+        settled = True
+        for row in rows:
+            if row.id not in self._dispatched:
+                dispatched += 1
+                # 自己发布的事件已经在 publish 时分发过
+                if row.origin != self.origin:
+                    self._dispatch(row_to_event(row))
+            # 之前的记录都已稳定时才前移轮询位置，否则之后重新读取，补上其间晚提交的记录
+            settled = settled and row.created_at is not None and row.created_at <= settled_before
+            if settled:
+                self.last_seen_id = row.id
+                self._dispatched.discard(row.id)
+            else:
+                self._dispatched.add(row.id)
+        return dispatched
+
+    def _max_id(self) -> int:
+        from sqlalchemy import func
+        from app.db.session import get_session_factory
+        from app.models.entity_change import EntityChangeLog
+
+        db = get_session_factory()()
+        try:
+            return db.query(func.max(EntityChangeLog.id)).filter(
+                EntityChangeLog.created_at <= _utcnow() - timedelta(seconds=self.settle_seconds)
+            ).scalar() or 0
+        finally:
+            db.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # 积压较多时连续拉取，否则等待下一个轮询周期
+                if self.poll() >= self.batch_size:
+                    continue
+            except Exception:
+                logger.exception("轮询变更事件失败")
+            self._stop.wait(self.poll_interval)
+
+
+_bus: Optional[InvalidationBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> InvalidationBus:
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                if settings.INVALIDATION_BACKEND == "database":
+                    _bus = DatabaseInvalidationBus(
+                        poll_interval=settings.INVALIDATION_POLL_INTERVAL,
+                        settle_seconds=settings.CHANGES_SETTLE_SECONDS,
+                    )
+                else:
+                    _bus = InvalidationBus()
+    return _bus
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _dump_stats(stats: Optional[Tuple]) -> Optional[str]:
+    return None if stats is None else json.dumps(list(stats), ensure_ascii=False)
+
+
+def row_to_event(row) -> ChangeEvent:
+    """entity_change 记录转换为事件"""
+    return ChangeEvent(
+        row.entity_type, row.entity_id, row.op, row.version, row.origin, row.id, row.identifier, row.user_id,
+        tuple(json.loads(row.stats)) if row.stats else None,
+    )
+
+
+def record_change(
+    db,
+    entity_type: str,
+    entity_id: str,
+    op: str,
+    identifier: Optional[str] = None,
+    user_id: Optional[str] = None,
+    stats: Optional[Tuple] = None,
+) -> ChangeEvent:
+    """
+    在实体写入的事务中记录变更，与实体写入一起提交或回滚；
+    提交后把返回的事件交给 publish_event 广播。stats 为变更后参与目录统计的字段，
+    各worker据此增量维护统计，不需要重新查询
+    """
+    from app.models.entity_change import EntityChangeLog
+
+    version = time.time_ns()
+    row = EntityChangeLog(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        op=op,
+        version=version,
+        origin=get_bus().origin,
+        identifier=identifier,
+        user_id=user_id,
+        stats=_dump_stats(stats),
+        created_at=_utcnow(),
+    )
+    db.add(row)
+    db.flush()
+    return row_to_event(row)
+
+
+def publish_event(event: ChangeEvent) -> None:
+    """广播已经记录的变更事件"""
+    get_bus().publish(event)
+
+
+def publish_change(entity_type: str, entity_id: str, op: str) -> ChangeEvent:
+    """广播未随实体写入记录的变更（database 后端会单独写入一条记录）"""
+    event = ChangeEvent(entity_type, entity_id, op, time.time_ns(), get_bus().origin)
+    get_bus().publish(event)
+    return event
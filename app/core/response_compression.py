@@ -0,0 +1,227 @@
+"""
+响应压缩
+
+按 Accept-Encoding 协商 zstd / br / gzip 压缩JSON和文本响应：
+
+- 小于 minimum_size 的响应、流式响应（导出、SSE）和已经设置 Content-Encoding 的响应原样返回
+- gzip/br 的压缩结果按响应体哈希缓存，相同内容的响应（如缓存命中的详情、不可变的版本）
+  直接复用压缩后的字节，不重复压缩
+- 压缩后 ETag 改为弱校验（W/前缀），If-None-Match 比较仍然命中
+"""
+
+import gzip
+from typing import Callable, Dict, List, Optional, Tuple
+
+from anyio import to_thread
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+# 压缩明显慢于计算摘要的算法，压缩结果按内容缓存
+CACHED_ENCODINGS = ("gzip", "br")
+
+# 超过该长度的响应在线程池中压缩，避免阻塞事件循环
+THREAD_THRESHOLD = 1024 * 1024
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # mtime=0 使相同内容的压缩结果相同
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def available_encodings() -> Dict[str, Callable[[bytes, int], bytes]]:
+    """已安装依赖的压缩算法"""
+    encodings = {"gzip": _gzip}
+    if brotli is not None:
+        encodings["br"] = _brotli
+    if zstandard is not None:
+        encodings["zstd"] = _zstd
+    return encodings
+
+
+def negotiate(accept_encoding: str, preferred: List[str]) -> Optional[str]:
+    """按客户端的q值和服务端的优先顺序选择压缩算法，都不接受时返回 None"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in preferred:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩响应的ASGI中间件"""
+
+    def __init__(
+        self,
+        app,
+        encodings: Optional[List[str]] = None,
+        minimum_size: int = 1024,
+        levels: Optional[Dict[str, int]] = None,
+        cache_size: int = 512,
+    ):
+        self.app = app
+        compressors = available_encodings()
+        self.encodings = [e for e in (encodings or ["zstd", "br", "gzip"]) if e in compressors]
+        self.compressors = compressors
+        self.minimum_size = minimum_size
+        self.levels = {"gzip": 6, "br": 4, "zstd": 3, **(levels or {})}
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf")) if cache_size else None
+        self.compressed = 0
+        self.reused = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope.get("headers", ()):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = negotiate(accept, self.encodings) if accept else None
+        responder = _Responder(self, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+    async def compress(self, body: bytes, encoding: str) -> bytes:
+        key = None
+        # zstd压缩与计算摘要的耗时相当，不缓存
+        if self.cache is not None and encoding in CACHED_ENCODINGS:
+            # bytes的哈希使用进程随机密钥的SipHash，加上长度作为键，碰撞概率可以忽略
+            key = (len(body), hash(body), encoding)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.reused += 1
+                return cached
+        compress = self.compressors[encoding]
+        level = self.levels[encoding]
+        if len(body) > THREAD_THRESHOLD:
+            compressed = await to_thread.run_sync(compress, body, level)
+        else:
+            compressed = compress(body, level)
+        self.compressed += 1
+        if key is not None:
+            self.cache.set(key, compressed)
+        return compressed
+
+
+class _Responder:
+    """缓存响应头，拿到完整响应体后决定是否压缩"""
+
+    def __init__(self, middleware: CompressionMiddleware, send, encoding: Optional[str]):
+        self.middleware = middleware
+        self._send = send
+        self.encoding = encoding
+        self.start = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if self.passthrough:
+            await self._send(message)
+            return
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.start is None:
+            await self._send(message)
+            return
+
+        headers = _Headers(self.start.get("headers", []))
+        compressible = headers.get(b"content-type", b"").decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+        if compressible:
+            headers.add_vary()
+        body = message.get("body", b"")
+        if (
+            not compressible
+            or self.encoding is None
+            or message.get("more_body", False)
+            or headers.get(b"content-encoding") is not None
+            or len(body) < self.middleware.minimum_size
+        ):
+            # 流式响应、已压缩的响应或太小的响应原样返回
+            self.passthrough = True
+            await self._send({**self.start, "headers": headers.items})
+            await self._send(message)
+            return
+
+        compressed = await self.middleware.compress(body, self.encoding)
+        headers.set(b"content-encoding", self.encoding.encode())
+        headers.set(b"content-length", str(len(compressed)).encode())
+        etag = headers.get(b"etag")
+        if etag is not None and not etag.startswith(b"W/"):
+            headers.set(b"etag", b"W/" + etag)
+        self.passthrough = True
+        await self._send({**self.start, "headers": headers.items})
+        await self._send({"type": "http.response.body", "body": compressed})
+
+
+class _Headers:
+    """ASGI响应头列表的简单封装，名称均为小写"""
+
+    def __init__(self, items):
+        self.items: List[Tuple[bytes, bytes]] = list(items)
+
+    def get(self, name: bytes, default=None):
+        for key, value in self.items:
+            if key == name:
+                return value
+        return default
+
+    def set(self, name: bytes, value: bytes) -> None:
+        self.items = [(k, v) for k, v in self.items if k != name]
+        self.items.append((name, value))
+
+    def add_vary(self) -> None:
+        vary = self.get(b"vary")
+        if vary is None:
+            self.set(b"vary", b"Accept-Encoding")
+        elif b"accept-encoding" not in vary.lower():
+            self.set(b"vary", vary + b", Accept-Encoding")
+
+
+def compression_options() -> dict:
+    """从配置读取中间件参数"""
+    return {
+        "encodings": [e.strip() for e in settings.RESPONSE_COMPRESSION_ENCODINGS.split(",") if e.strip()],
+        "minimum_size": settings.RESPONSE_COMPRESSION_MIN_SIZE,
+        "levels": {
+            "gzip": settings.RESPONSE_GZIP_LEVEL,
+            "br": settings.RESPONSE_BROTLI_LEVEL,
+            "zstd": settings.RESPONSE_ZSTD_LEVEL,
+        },
+        "cache_size": settings.RESPONSE_COMPRESSION_CACHE_SIZE,
+    }
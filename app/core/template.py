@@ -0,0 +1,630 @@
+"""
+系统提示词模板
+
+语法：
+- `{{ user.name }}`：变量，按字典键或对象属性逐级查找（`agents.0` 按下标），不存在或为 None 时输出空字符串
+- `{{ user.name | default("访客") }}`、`{{ agents | map("name") | join("、") }}`：过滤器，见 FILTERS
+- `{% if expr %}...{% elif expr %}...{% else %}...{% endif %}`：条件，expr 支持 ==、!=、in、and、or、not
+  和字符串/数字/true/false/none 字面量
+- `{% for agent in agents %}...{% else %}...{% endfor %}`：循环，列表为空时输出 else 部分；
+  循环内可用 loop.index（从1开始）、loop.first、loop.last、loop.length
+- `{% include "agents" %}`：插入命名片段，片段由渲染时传入的 include 函数提供
+- `{% locale "en" %}...{% endlocale %}`：只在选中的语言下输出。按请求的语言（en-US 依次匹配 en-us、en）
+  在模板声明的语言中选择，都不匹配时使用默认语言，模板未声明默认语言时使用第一个声明的语言
+- `{% raw %}...{% endraw %}`：原样输出；`{# 注释 #}`
+- 单独占一行的 `{% %}`、`{# #}` 标签连同所在行一起去掉，不留下空行
+
+模板编译为 Python 函数（只生成变量查找、字面量和控制语句，不执行模板中的任意代码），
+按源码的 SHA-256 缓存，渲染时只执行编译好的函数。
+"""
+
+import ast
+import hashlib
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+# include 的最大嵌套层数，防止片段互相引用
+MAX_INCLUDE_DEPTH = 10
+# if/for/locale 块和表达式中括号、not 的最大嵌套层数；生成的 Python 代码最多只能静态嵌套20个块，
+# 过深的表达式会使编译器递归溢出
+MAX_BLOCK_DEPTH = 16
+MAX_EXPRESSION_DEPTH = 32
+
+# 编译结果不会过期，只受容量限制
+template_cache = TTLCache(maxsize=settings.PROMPT_TEMPLATE_CACHE_SIZE, ttl=float("inf"))
+
+
+class TemplateError(ValueError):
+    """模板渲染失败"""
+
+
+class TemplateSyntaxError(TemplateError):
+    """模板语法错误"""
+
+    def __init__(self, message: str, lineno: int):
+        self.lineno = lineno
+        super().__init__(f"第{lineno}行: {message}")
+
+
+# ---------- 运行时辅助函数（生成的代码调用） ----------
+
+def _get(obj: Any, key: Union[str, int]) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(key)
+    if isinstance(key, int):
+        try:
+            return obj[key]
+        except (IndexError, KeyError, TypeError):
+            return None
+    return getattr(obj, key, None)
+
+
+def _str(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _seq(value: Any) -> Sequence:
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return value
+    return list(value)
+
+
+def _contains(container: Any, item: Any) -> bool:
+    return container is not None and item in container
+
+
+def _f_default(value: Any, default: Any = "") -> Any:
+    return default if value is None or value == "" else value
+
+
+def _f_join(value: Any, sep: str = "") -> str:
+    return sep.join(_str(item) for item in _seq(value))
+
+
+def _f_map(value: Any, key: Union[str, int]) -> List[Any]:
+    return [_get(item, key) for item in _seq(value)]
+
+
+def _f_length(value: Any) -> int:
+    return 0 if value is None else len(value)
+
+
+def _f_upper(value: Any) -> str:
+    return _str(value).upper()
+
+
+def _f_lower(value: Any) -> str:
+    return _str(value).lower()
+
+
+def _f_trim(value: Any) -> str:
+    return _str(value).strip()
+
+
+# 过滤器名 -> (函数, 最少参数个数, 最多参数个数)
+FILTERS = {
+    "default": (_f_default, 0, 1),
+    "join": (_f_join, 0, 1),
+    "map": (_f_map, 1, 1),
+    "length": (_f_length, 0, 0),
+    "upper": (_f_upper, 0, 0),
+    "lower": (_f_lower, 0, 0),
+    "trim": (_f_trim, 0, 0),
+}
+
+_RUNTIME = {
+    "_get": _get,
+    "_str": _str,
+    "_seq": _seq,
+    "_contains": _contains,
+    **{f"_f_{name}": fn for name, (fn, _, _) in FILTERS.items()},
+}
+
+
+# ---------- 语言选择 ----------
+
+def normalize_locale(locale: Optional[str]) -> Optional[str]:
+    return locale.replace("_", "-").lower() if locale else None
+
+
+def select_locale(requested: Optional[str], available: Sequence[str], default: Optional[str] = None) -> Optional[str]:
+    """在 available 中选择与 requested 最匹配的语言：完全匹配、语言前缀、默认语言、第一个"""
+    default = normalize_locale(default or settings.PROMPT_DEFAULT_LOCALE)
+    requested = normalize_locale(requested)
+    if not available:
+        return requested or default
+    if requested:
+        if requested in available:
+            return requested
+        language = requested.split("-", 1)[0]
+        if language in available:
+            return language
+    return default if default in available else available[0]
+
+
+# ---------- 编译 ----------
+
+_TAG_RE = re.compile(
+    r"(\{%\s*raw\s*%\}.*?\{%\s*endraw\s*%\}|\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\})",
+    re.DOTALL,
+)
+_RAW_RE = re.compile(r"\{%\s*raw\s*%\}(.*?)\{%\s*endraw\s*%\}", re.DOTALL)
+_EXPR_TOKEN_RE = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.(?:[A-Za-z_][A-Za-z0-9_]*|\d+))*)
+      | (?P<op>==|!=|[|(),])
+    )""",
+    re.VERBOSE,
+)
+_KEYWORDS = {"and", "or", "not", "in"}
+_CONSTANTS = {"true": "True", "false": "False", "none": "None", "True": "True", "False": "False", "None": "None"}
+_LOOP_ATTRS = {"index", "first", "last", "length"}
+
+
+def _standalone_trim(parts: List[str]) -> List[str]:
+    """去掉单独占一行的块标签所在的行（parts 为 re.split 结果，奇数下标为标签）"""
+    last = len(parts) - 2
+    standalone = {}
+    for i in range(1, len(parts), 2):
+        if parts[i].startswith("{{"):
+            continue
+        before, after = parts[i - 1], parts[i + 1]
+        if "\n" in before:
+            ok_before = not before[before.rfind("\n") + 1:].strip(" \t")
+        else:
+            ok_before = i == 1 and not before.strip(" \t")
+        if "\n" in after:
+            ok_after = not after[:after.find("\n")].strip(" \t\r")
+        else:
+            ok_after = i == last and not after.strip(" \t")
+        if ok_before and ok_after:
+            standalone[i] = True
+
+    trimmed = list(parts)
+    for j in range(0, len(parts), 2):
+        text = parts[j]
+        start, end = 0, len(text)
+        if standalone.get(j - 1):
+            start = text.find("\n") + 1 if "\n" in text else len(text)
+        if standalone.get(j + 1):
+            end = text.rfind("\n") + 1 if "\n" in text else 0
+        trimmed[j] = text[start:end] if start < end else ""
+    return trimmed
+
+
+class _Compiler:
+    """把模板源码翻译为 Python 函数的源码"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.lines: List[str] = []
+        self.indent = 1
+        self.pending_text: List[str] = []
+        # 块栈：(类型, 起始行号, 附加信息)
+        self.blocks: List[Tuple[str, int, Any]] = []
+        # 循环变量栈：(变量名, 循环编号)
+        self.scopes: List[Tuple[str, int]] = []
+        self.loop_count = 0
+        self.locales: List[str] = []
+        self.uses_include = False
+        self.lineno = 1
+        self.expression_depth = 0
+
+    def compile(self) -> Tuple[str, List[str], bool]:
+        parts = _standalone_trim(_TAG_RE.split(self.source))
+        raw_parts = _TAG_RE.split(self.source)
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                if part:
+                    self.pending_text.append(part)
+            else:
+                self._tag(part)
+            self.lineno += raw_parts[i].count("\n")
+        if self.blocks:
+            kind, lineno, _ = self.blocks[-1]
+            raise TemplateSyntaxError(f"{kind} 没有结束标签", lineno)
+        self._flush_text()
+        body = "\n".join(self.lines) or "    pass"
+        code = (
+            "def _render(_ctx, _locale, _include):\n"
+            "    _out = []\n"
+            "    _w = _out.append\n"
+            f"{body}\n"
+            "    return ''.join(_out)\n"
+        )
+        return code, self.locales, self.uses_include
+
+    # ---- 输出 ----
+
+    def _emit(self, line: str) -> None:
+        self.lines.append("    " * self.indent + line)
+
+    def _flush_text(self) -> None:
+        if self.pending_text:
+            self._emit(f"_w({''.join(self.pending_text)!r})")
+            self.pending_text = []
+
+    def _open(self, kind: str, header: str, extra: Any = None) -> None:
+        if len(self.blocks) >= MAX_BLOCK_DEPTH:
+            raise self._error(f"块嵌套超过 {MAX_BLOCK_DEPTH} 层")
+        self._emit(header)
+        self.indent += 1
+        self._emit("pass")
+        self.blocks.append((kind, self.lineno, extra))
+
+    def _error(self, message: str) -> TemplateSyntaxError:
+        return TemplateSyntaxError(message, self.lineno)
+
+    # ---- 标签 ----
+
+    def _tag(self, tag: str) -> None:
+        if tag.startswith("{#"):
+            return
+        raw = _RAW_RE.fullmatch(tag)
+        if raw:
+            if raw.group(1):
+                self.pending_text.append(raw.group(1))
+            return
+        if tag.startswith("{{"):
+            self._flush_text()
+            self._emit(f"_w(_str({self._expression(tag[2:-2])}))")
+            return
+
+        content = tag[2:-2].strip()
+        keyword, _, rest = content.partition(" ")
+        rest = rest.strip()
+        handler = getattr(self, f"_tag_{keyword}", None)
+        if handler is None:
+            raise self._error(f"未知的标签: {keyword or content}")
+        self._flush_text()
+        handler(rest)
+
+    def _tag_if(self, rest: str) -> None:
+        self._open("if", f"if {self._expression(rest)}:", {"else": False})
+
+    def _tag_elif(self, rest: str) -> None:
+        block = self._top("if", "elif")
+        if block[2]["else"]:
+            raise self._error("else 之后不能再有 elif")
+        self.indent -= 1
+        self._emit(f"elif {self._expression(rest)}:")
+        self.indent += 1
+        self._emit("pass")
+
+    def _tag_else(self, rest: str) -> None:
+        if not self.blocks or self.blocks[-1][0] not in ("if", "for"):
+            raise self._error("else 不在 if 或 for 中")
+        kind, _, extra = self.blocks[-1]
+        if extra["else"]:
+            raise self._error("重复的 else")
+        extra["else"] = True
+        self.indent -= 1
+        if kind == "if":
+            self._emit("else:")
+        else:
+            # for ... else：列表为空时输出，循环变量此时不可用
+            self.scopes.pop()
+            self._emit(f"if not _s{extra['loop']}:")
+        self.indent += 1
+        self._emit("pass")
+
+    def _tag_endif(self, rest: str) -> None:
+        self._top("if", "endif")
+        self._close()
+
+    def _tag_for(self, rest: str) -> None:
+        match = re.fullmatch(r"([A-Za-z][A-Za-z0-9_]*)\s+in\s+(.+)", rest, re.DOTALL)
+        if not match:
+            raise self._error("for 语法应为: for 变量 in 表达式")
+        name, expr = match.groups()
+        if name == "loop":
+            raise self._error("loop 是保留的变量名")
+        self.loop_count += 1
+        n = self.loop_count
+        self._emit(f"_s{n} = _seq({self._expression(expr)})")
+        self._emit(f"_n{n} = len(_s{n})")
+        self._open("for", f"for _i{n}, _v{n} in enumerate(_s{n}, 1):", {"else": False, "loop": n})
+        self.scopes.append((name, n))
+
+    def _tag_endfor(self, rest: str) -> None:
+        block = self._top("for", "endfor")
+        if not block[2]["else"]:
+            self.scopes.pop()
+        self._close()
+
+    def _tag_locale(self, rest: str) -> None:
+        locale = normalize_locale(self._string_literal(rest, "locale"))
+        if locale not in self.locales:
+            self.locales.append(locale)
+        self._open("locale", f"if _locale == {locale!r}:")
+
+    def _tag_endlocale(self, rest: str) -> None:
+        self._top("locale", "endlocale")
+        self._close()
+
+    def _tag_include(self, rest: str) -> None:
+        name = self._string_literal(rest, "include")
+        self.uses_include = True
+        if self.scopes:
+            # 片段中可以使用外层的循环变量
+            scope = ", ".join(f"{var!r}: _v{n}" for var, n in self.scopes)
+            self._emit(f"_w(_include({name!r}, {{**_ctx, {scope}}}))")
+        else:
+            self._emit(f"_w(_include({name!r}, _ctx))")
+
+    def _top(self, kind: str, tag: str) -> Tuple[str, int, Any]:
+        if not self.blocks or self.blocks[-1][0] != kind:
+            raise self._error(f"{tag} 没有对应的 {kind}")
+        return self.blocks[-1]
+
+    def _close(self) -> None:
+        self.blocks.pop()
+        self.indent -= 1
+
+    def _string_literal(self, rest: str, tag: str) -> str:
+        tokens = self._tokenize(rest)
+        if len(tokens) != 1 or tokens[0][0] != "string":
+            raise self._error(f"{tag} 的参数应为字符串字面量")
+        return self._literal(tokens[0])
+
+    # ---- 表达式 ----
+
+    def _tokenize(self, expr: str) -> List[Tuple[str, str]]:
+        tokens = []
+        pos = 0
+        expr = expr.strip()
+        while pos < len(expr):
+            match = _EXPR_TOKEN_RE.match(expr, pos)
+            if not match or match.end() == pos:
+                raise self._error(f"无法解析的表达式: {expr[pos:]}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "name" and value in _KEYWORDS:
+                kind = "keyword"
+            tokens.append((kind, value))
+            pos = match.end()
+            while pos < len(expr) and expr[pos].isspace():
+                pos += 1
+        return tokens
+
+    def _expression(self, expr: str) -> str:
+        tokens = self._tokenize(expr)
+        if not tokens:
+            raise self._error("表达式为空")
+        self._tokens = tokens
+        self._pos = 0
+        self.expression_depth = 0
+        code = self._or()
+        if self._pos != len(tokens):
+            raise self._error(f"表达式多余的部分: {' '.join(t[1] for t in tokens[self._pos:])}")
+        return code
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _accept(self, kind: str, value: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        token = self._peek()
+        if token and token[0] == kind and (value is None or token[1] == value):
+            self._pos += 1
+            return token
+        return None
+
+    def _or(self) -> str:
+        code = self._and()
+        while self._accept("keyword", "or"):
+            code = f"({code} or {self._and()})"
+        return code
+
+    def _and(self) -> str:
+        code = self._not()
+        while self._accept("keyword", "and"):
+            code = f"({code} and {self._not()})"
+        return code
+
+    def _not(self) -> str:
+        if self._accept("keyword", "not"):
+            self._enter()
+            code = f"(not {self._not()})"
+            self.expression_depth -= 1
+            return code
+        return self._comparison()
+
+    def _enter(self) -> None:
+        self.expression_depth += 1
+        if self.expression_depth > MAX_EXPRESSION_DEPTH:
+            raise self._error(f"表达式嵌套超过 {MAX_EXPRESSION_DEPTH} 层")
+
+    def _comparison(self) -> str:
+        left = self._filtered()
+        if self._accept("op", "=="):
+            return f"({left} == {self._filtered()})"
+        if self._accept("op", "!="):
+            return f"({left} != {self._filtered()})"
+        if self._accept("keyword", "in"):
+            return f"_contains({self._filtered()}, {left})"
+        if self._peek() == ("keyword", "not") and self._pos + 1 < len(self._tokens) \
+                and self._tokens[self._pos + 1] == ("keyword", "in"):
+            self._pos += 2
+            return f"(not _contains({self._filtered()}, {left}))"
+        return left
+
+    def _filtered(self) -> str:
+        code = self._primary()
+        while self._accept("op", "|"):
+            token = self._accept("name")
+            if token is None or token[1] not in FILTERS:
+                raise self._error(f"未知的过滤器: {token[1] if token else ''}")
+            name = token[1]
+            _, min_args, max_args = FILTERS[name]
+            args = []
+            if self._accept("op", "("):
+                if not self._accept("op", ")"):
+                    while True:
+                        args.append(self._literal(self._next_literal()))
+                        if self._accept("op", ")"):
+                            break
+                        if not self._accept("op", ","):
+                            raise self._error(f"过滤器 {name} 的参数列表不完整")
+            if not min_args <= len(args) <= max_args:
+                raise self._error(f"过滤器 {name} 的参数个数应为 {min_args}~{max_args}")
+            code = f"_f_{name}({', '.join([code] + [repr(arg) for arg in args])})"
+        return code
+
+    def _next_literal(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None or not (token[0] in ("string", "number") or token[1] in _CONSTANTS):
+            raise self._error("过滤器参数应为字面量")
+        self._pos += 1
+        return token
+
+    def _primary(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise self._error("表达式不完整")
+        if self._accept("op", "("):
+            self._enter()
+            code = self._or()
+            if not self._accept("op", ")"):
+                raise self._error("缺少右括号")
+            self.expression_depth -= 1
+            return code
+        self._pos += 1
+        kind, value = token
+        if kind in ("string", "number") or value in _CONSTANTS:
+            return repr(self._literal(token))
+        if kind == "name":
+            return self._lookup(value)
+        raise self._error(f"意外的符号: {value}")
+
+    def _literal(self, token: Tuple[str, str]) -> Any:
+        kind, value = token
+        if kind == "string":
+            return ast.literal_eval(value)
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        return {"True": True, "False": False, "None": None}[_CONSTANTS[value]]
+
+    def _lookup(self, path: str) -> str:
+        head, *rest = path.split(".")
+        if any(segment.startswith("_") for segment in [head, *rest]):
+            raise self._error(f"不能访问下划线开头的属性: {path}")
+        if head == "loop":
+            if not self.scopes:
+                raise self._error("loop 只能在 for 中使用")
+            n = self.scopes[-1][1]
+            if not rest or rest[0] not in _LOOP_ATTRS:
+                raise self._error(f"loop 只支持 {', '.join(sorted(_LOOP_ATTRS))}")
+            code = {
+                "index": f"_i{n}",
+                "first": f"(_i{n} == 1)",
+                "last": f"(_i{n} == _n{n})",
+                "length": f"_n{n}",
+            }[rest[0]]
+            rest = rest[1:]
+        else:
+            for var, n in reversed(self.scopes):
+                if var == head:
+                    code = f"_v{n}"
+                    break
+            else:
+                code = f"_ctx.get({head!r})"
+        for segment in rest:
+            key = int(segment) if segment.isdigit() else segment
+            code = f"_get({code}, {key!r})"
+        return code
+
+
+class Template:
+    """编译好的模板"""
+
+    __slots__ = ("source", "digest", "locales", "uses_include", "_render")
+
+    def __init__(self, source: str, digest: str, render: Callable, locales: Sequence[str] = (), uses_include: bool = False):
+        self.source = source
+        self.digest = digest
+        self.locales = tuple(locales)
+        self.uses_include = uses_include
+        self._render = render
+
+    def select_locale(self, locale: Optional[str] = None) -> Optional[str]:
+        return select_locale(locale, self.locales)
+
+    def render(
+        self,
+        context: Optional[Dict[str, Any]] = None,
+        locale: Optional[str] = None,
+        include: Optional[Callable[[str], Union[str, "Template", None]]] = None,
+        _depth: int = 0,
+    ) -> str:
+        """
+        渲染模板。include(name) 返回片段的模板源码或 Template，返回 None 表示片段不存在；
+        片段使用同一份变量和请求的语言渲染
+        """
+        ctx = context or {}
+        selected = select_locale(locale, self.locales)
+
+        include_fn = None
+        if self.uses_include:
+            def include_fn(name: str, scope: Dict[str, Any]) -> str:
+                if _depth >= MAX_INCLUDE_DEPTH:
+                    raise TemplateError(f"片段嵌套超过 {MAX_INCLUDE_DEPTH} 层: {name}")
+                partial = include(name) if include is not None else None
+                if partial is None:
+                    raise TemplateError(f"片段不存在: {name}")
+                if isinstance(partial, str):
+                    partial = compile_template(partial)
+                return partial.render(scope, locale, include, _depth + 1)
+
+        try:
+            return self._render(ctx, selected, include_fn)
+        except TemplateError:
+            raise
+        except Exception as e:
+            raise TemplateError(f"渲染失败: {e}") from e
+
+
+def literal(text: str) -> Template:
+    """原样输出 text 的模板，用于把普通文本作为片段插入"""
+    return Template(text, _digest(text), lambda ctx, locale, include: text)
+
+
+def _digest(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def _compile(source: str, digest: str) -> Template:
+    compiler = _Compiler(source)
+    try:
+        code, locales, uses_include = compiler.compile()
+        namespace = dict(_RUNTIME)
+        exec(compile(code, f"<template {digest[:12]}>", "exec"), namespace)
+    except (SyntaxError, RecursionError, MemoryError) as e:
+        # 嵌套限制之外的情况（如很长的 and/or 链）超出 Python 编译器的限制
+        raise TemplateSyntaxError(f"模板过于复杂，无法编译: {type(e).__name__}", compiler.lineno) from e
+    return Template(source, digest, namespace["_render"], locales, uses_include)
+
+
+def compile_template(source: str) -> Template:
+    """编译模板，按源码的 SHA-256 缓存；语法错误时抛出 TemplateSyntaxError"""
+    digest = _digest(source)
+    return template_cache.get_or_load(digest, lambda: _compile(source, digest))
+
+
+def render(
+    source: str,
+    context: Optional[Dict[str, Any]] = None,
+    locale: Optional[str] = None,
+    include: Optional[Callable[[str], Union[str, Template, None]]] = None,
+) -> str:
+    return compile_template(source).render(context, locale, include)
@@ -0,0 +1,519 @@
+"""
+分布式追踪
+
+按 OpenTelemetry 的数据模型记录请求内的耗时分布，不依赖采集器：
+
+- 请求：TracingMiddleware 为每个请求创建 server span（名称为 `METHOD 路由模板`），从请求头 `traceparent`
+  （W3C Trace Context）继承 trace ID 和采样决定，没有时按 sample_ratio 采样；响应头 `X-Trace-Id` 为 trace ID
+- 处理函数：TracedRoute 把路由的处理函数包在 `handler <函数名>` span 中，server span 中处理函数之外的时间
+  是参数校验、依赖和响应序列化
+- 服务层：@traced 装饰的函数记录为 `AIAppService.get_ai_app`、`agent_service.get_agent_out` 等 span
+- 数据库：instrument_sqlalchemy 为每次 cursor execute 记录 `db <语句类型>` span，含截断的SQL
+- 外部调用：client_span 记录对外HTTP请求，inject 把当前 trace 写入请求头 `traceparent`
+
+只在已采样的请求中创建子span；未采样或请求之外（后台线程）的调用只多一次 ContextVar 读取。结束的 span
+由后台线程批量导出到控制台或本地文件（JSON Lines），可以用下面的命令查看：
+
+    python -m app.core.tracing show data/traces.jsonl            # 耗时最长的请求
+    python -m app.core.tracing show data/traces.jsonl <trace_id> # 一个请求的span树，含各span自身耗时
+"""
+
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """一个计时区间；sampled 为 False 的 span 只用于传递 trace ID，不导出"""
+
+    __slots__ = (
+        "tracer", "name", "kind", "trace_id", "span_id", "parent_id", "sampled",
+        "start_ns", "end_ns", "attributes", "events", "status", "status_message",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: str,
+        trace_id: int,
+        parent_id: Optional[int],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes or {}
+        self.events: List[Tuple[str, int, Dict[str, Any]]] = []
+        self.status = "UNSET"
+        self.status_message: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append((name, time.time_ns(), attributes or {}))
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        self.status = "ERROR"
+        self.status_message = f"{type(exc).__name__}: {exc}"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                self.tracer.processor.on_end(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": f"{self.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_span_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "events": [
+                {"name": name, "time_unix_nano": at, "attributes": attributes}
+                for name, at, attributes in self.events
+            ],
+            "status": {"code": self.status, "message": self.status_message},
+            "resource": {"service.name": self.tracer.service_name},
+        }
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def parse_traceparent(value: str) -> Optional[Tuple[int, int, bool]]:
+    """解析 traceparent，返回 (trace ID, 父span ID, 是否采样)，格式不正确时返回 None"""
+    match = TRACEPARENT_RE.match(value.strip().lower())
+    if match is None:
+        return None
+    trace_id, parent_id = int(match.group(1), 16), int(match.group(2), 16)
+    if not trace_id or not parent_id:
+        return None
+    return trace_id, parent_id, bool(int(match.group(3), 16) & 0x01)
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """把当前 trace 写入对外请求的请求头"""
+    headers = dict(headers or {})
+    span = _current.get()
+    if span is not None:
+        headers["traceparent"] = span.traceparent
+    return headers
+
+
+class ConsoleExporter:
+    """每个span一行JSON，写到标准输出"""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        sys.stdout.write("".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans))
+        sys.stdout.flush()
+
+    def close(self) -> None:
+        pass
+
+
+class FileExporter:
+    """每个span一行JSON，追加到本地文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(span, ensure_ascii=False) + "\n" for span in spans))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BatchSpanProcessor:
+    """结束的span先放入有界队列，由后台线程批量导出；队列满时丢弃最早的span"""
+
+    def __init__(self, exporter=None, queue_size: int = 10000, interval: float = 1.0):
+        self.exporter = exporter
+        self.interval = interval
+        self._queue: deque = deque(maxlen=queue_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.dropped = 0
+
+    def on_end(self, span: Span) -> None:
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(span)
+
+    def flush(self) -> int:
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.popleft())
+            except IndexError:
+                break
+        if spans and self.exporter is not None:
+            self.exporter.export([span.to_dict() for span in spans])
+            self.exported += len(spans)
+        return len(spans)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        if self.exporter is not None:
+            self.exporter.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("导出追踪数据失败")
+
+
+class Tracer:
+    """创建span并决定是否采样"""
+
+    def __init__(self, processor: BatchSpanProcessor, sample_ratio: float = 1.0, service_name: str = "llm-platform-backend"):
+        self.processor = processor
+        self.sample_ratio = sample_ratio
+        self.service_name = service_name
+        # trace ID 的低64位小于该值时采样，同一个 trace 在各服务中的采样决定一致
+        self._threshold = int(max(0.0, min(1.0, sample_ratio)) * (1 << 64))
+
+    def start_root(self, name: str, kind: str = "server", parent: Optional[Tuple[int, int, bool]] = None,
+                   attributes: Optional[Dict[str, Any]] = None) -> Span:
+        """请求的根span：有上游 traceparent 时沿用其 trace ID 和采样决定"""
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = random.getrandbits(128) or 1, None
+            sampled = (trace_id & 0xFFFFFFFFFFFFFFFF) < self._threshold
+        return Span(self, name, kind, trace_id, parent_id, sampled, attributes)
+
+    def start_child(self, name: str, kind: str = "internal", attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """当前span已采样时创建子span（不设为当前span，与父span导出到同一处），否则返回 None"""
+        parent = _current.get()
+        if parent is None or not parent.sampled:
+            return None
+        return Span(parent.tracer, name, kind, parent.trace_id, parent.span_id, True, attributes)
+
+    def start(self) -> None:
+        self.processor.start()
+
+    def stop(self) -> None:
+        self.processor.stop()
+
+
+def _span_name(func: Callable) -> str:
+    qualname = func.__qualname__
+    if "." in qualname and "<locals>" not in qualname:
+        return qualname
+    return f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+
+def traced(func: Optional[Callable] = None, *, name: Optional[str] = None, kind: str = "internal"):
+    """在已采样的请求中把函数调用记录为子span；可直接装饰，也可以带 name/kind 参数"""
+    if func is None:
+        return functools.partial(traced, name=name, kind=kind)
+    span_name = name or _span_name(func)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            span = tracer.start_child(span_name, kind)
+            if span is None:
+                return await func(*args, **kwargs)
+            token = _current.set(span)
+            try:
+                with span:
+                    return await func(*args, **kwargs)
+            finally:
+                _current.reset(token)
+
+        async_wrapper.__traced__ = True
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        span = tracer.start_child(span_name, kind)
+        if span is None:
+            return func(*args, **kwargs)
+        token = _current.set(span)
+        try:
+            with span:
+                return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    wrapper.__traced__ = True
+    return wrapper
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def client_span(name: str, attributes: Optional[Dict[str, Any]] = None):
+    """对外调用的span（上下文管理器），未采样时为空操作"""
+    span = tracer.start_child(name, "client", attributes)
+    return span if span is not None else _NOOP_SPAN
+
+
+class TracedRoute(APIRoute):
+    """处理函数记录为 `handler <函数名>` span 的路由"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if not getattr(endpoint, "__traced__", False):
+            endpoint = traced(endpoint, name=f"handler {endpoint.__name__}")
+        super().__init__(path, endpoint, **kwargs)
+
+
+class TracingMiddleware:
+    """为每个请求创建 server span 的ASGI中间件"""
+
+    def __init__(self, app, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        parent = None
+        for key, value in scope.get("headers", ()):
+            if key == b"traceparent":
+                parent = parse_traceparent(value.decode("latin-1"))
+                break
+        method = scope["method"]
+        span = self.tracer.start_root(
+            f"{method} {scope['path']}", "server", parent,
+            {"http.method": method, "http.target": scope["path"]},
+        )
+        token = _current.set(span)
+        status_code = 500
+
+        async def traced_send(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if span.sampled:
+                    span.add_event("http.response.start")
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", f"{span.trace_id:032x}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            route = scope.get("route")
+            if route is not None and getattr(route, "path", None):
+                span.name = f"{method} {route.path}"
+                span.set_attribute("http.route", route.path)
+            span.set_attribute("http.status_code", status_code)
+            if status_code >= 500:
+                span.status = "ERROR"
+            span.end()
+            _current.reset(token)
+
+
+_sqlalchemy_instrumented = False
+
+
+def instrument_sqlalchemy(tracer: "Tracer", max_statement_length: int = 500) -> None:
+    """为所有引擎的 cursor execute 记录span"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        span = tracer.start_child(f"db {operation}", "client", {
+            "db.system": conn.dialect.name,
+            "db.statement": statement[:max_statement_length],
+        })
+        if span is not None and executemany:
+            span.set_attribute("db.executemany", True)
+        context._trace_span = span
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute("db.rowcount", cursor.rowcount)
+            span.end()
+
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None) if context is not None else None
+        if span is not None:
+            span.record_exception(exception_context.original_exception)
+            span.end()
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(Engine, "handle_error", handle_error)
+    _sqlalchemy_instrumented = True
+
+
+def create_exporter(name: str, path: str):
+    if name == "console":
+        return ConsoleExporter()
+    if name == "file":
+        return FileExporter(path)
+    if name == "none":
+        return None
+    raise ValueError(f"未知的追踪导出方式: {name}，可选: console, file, none")
+
+
+def _create_tracer() -> Tracer:
+    exporter = create_exporter(settings.TRACING_EXPORTER, settings.TRACING_FILE) if settings.TRACING_ENABLED else None
+    processor = BatchSpanProcessor(exporter, settings.TRACING_QUEUE_SIZE, settings.TRACING_EXPORT_INTERVAL)
+    return Tracer(processor, settings.TRACING_SAMPLE_RATIO, settings.TRACING_SERVICE_NAME)
+
+
+tracer = _create_tracer()
+
+
+# ---------- 查看导出的追踪数据 ----------
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces.setdefault(span["trace_id"], []).append(span)
+    return traces
+
+
+def format_trace(spans: List[Dict[str, Any]]) -> List[str]:
+    """按父子关系缩进输出span树，每行为 总耗时 / 自身耗时（去掉子span）"""
+    ids = {span["span_id"] for span in spans}
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for span in spans:
+        parent = span["parent_span_id"] if span["parent_span_id"] in ids else None
+        children.setdefault(parent, []).append(span)
+    lines = []
+
+    def visit(span, depth):
+        kids = sorted(children.get(span["span_id"], []), key=lambda s: s["start_time_unix_nano"])
+        own = span["duration_ms"] - sum(kid["duration_ms"] for kid in kids)
+        error = "  ❌" if span["status"]["code"] == "ERROR" else ""
+        lines.append(f"{span['duration_ms']:>10.3f}ms {max(own, 0):>10.3f}ms  {'  ' * depth}{span['name']}{error}")
+        for kid in kids:
+            visit(kid, depth + 1)
+
+    for root in sorted(children.get(None, []), key=lambda s: s["start_time_unix_nano"]):
+        visit(root, 0)
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查看导出的追踪数据")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="列出耗时最长的请求，或输出一个请求的span树")
+    show.add_argument("path")
+    show.add_argument("trace_id", nargs="?")
+    show.add_argument("-n", type=int, default=20, help="列出的请求数")
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.path)
+    if args.trace_id:
+        spans = traces.get(args.trace_id)
+        if not spans:
+            sys.exit(f"没有找到 trace {args.trace_id}")
+        print("\n".join(format_trace(spans)))
+        return
+    roots = [
+        max(spans, key=lambda s: s["duration_ms"])
+        for spans in traces.values()
+    ]
+    for span in sorted(roots, key=lambda s: s["duration_ms"], reverse=True)[:args.n]:
+        print(f"{span['trace_id']}  {span['duration_ms']:>10.3f}ms  {span['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+大文本列压缩
+
+CompressedText 列在写入时把超过 COMPRESSION_MIN_SIZE 字节的值压缩后存为二进制，读取时解压，
+对ORM和服务层透明：
+
+- 压缩值以 b"\\x00" + 算法标识开头（z: zlib，s: zstd），正常文本不会以NUL字节开头
+- 未压缩的值（短文本、压缩后没有变小的值、列改为二进制之前写入的旧数据）按UTF-8原样存储，
+  读取时原样返回，因此旧数据无需迁移即可读取，下次写入时再压缩
+- zstd 可使用在现有数据上训练的字典，对几KB的提示词压缩率明显高于无字典；字典ID记录在
+  zstd帧头中，重新训练字典后把旧字典保留在 COMPRESSION_ZSTD_DICTS 中即可继续读取旧数据
+
+训练字典和压缩已有数据：
+
+    python -m app.db.compression train-dict zstd.dict
+    COMPRESSION_ZSTD_DICTS=zstd.dict python -m app.db.compression recompress
+"""
+
+import argparse
+import logging
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"\x00"
+ZLIB = b"z"
+ZSTD = b"s"
+
+
+class Codec:
+    """按配置压缩，按数据头解压"""
+
+    def __init__(self, codec: str = "zstd", min_size: int = 512, level: Optional[int] = None, dict_paths: Iterable[str] = ()):
+        if codec == "zstd" and zstandard is None:
+            logger.warning("未安装zstandard，大文本列使用zlib压缩")
+            codec = "zlib"
+        self.codec = codec
+        self.min_size = min_size
+        self.level = level
+        self._dicts: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._compress_dict = None
+        for path in dict_paths:
+            self.add_dict(open(path, "rb").read())
+        self._local = threading.local()
+
+    def add_dict(self, data: bytes) -> int:
+        """加载zstd字典，第一个加载的字典用于压缩，返回字典ID"""
+        if zstandard is None:
+            raise RuntimeError("使用zstd字典需要安装zstandard")
+        dictionary = zstandard.ZstdCompressionDict(data)
+        self._dicts[dictionary.dict_id()] = dictionary
+        if self._compress_dict is None:
+            self._compress_dict = dictionary
+        return dictionary.dict_id()
+
+    def compress(self, value: str) -> bytes:
+        raw = value.encode("utf-8")
+        if self.codec == "none" or len(raw) < self.min_size:
+            return raw
+        if self.codec == "zstd":
+            compressed = ZSTD + self._zstd_compressor().compress(raw)
+        else:
+            compressed = ZLIB + zlib.compress(raw, 6 if self.level is None else self.level)
+        # 不可压缩的内容原样存储
+        if len(compressed) + 1 >= len(raw):
+            return raw
+        return MAGIC + compressed
+
+    def decompress(self, data: bytes) -> str:
+        if not data.startswith(MAGIC):
+            return data.decode("utf-8")
+        kind, payload = data[1:2], data[2:]
+        if kind == ZLIB:
+            return zlib.decompress(payload).decode("utf-8")
+        if kind == ZSTD:
+            if zstandard is None:
+                raise RuntimeError("读取zstd压缩的数据需要安装zstandard")
+            return self._zstd_decompressor(zstandard.get_frame_parameters(payload).dict_id).decompress(payload).decode("utf-8")
+        raise ValueError(f"未知的压缩格式: {kind!r}")
+
+    def _zstd_compressor(self):
+        # 压缩/解压对象不是线程安全的，每个线程各自创建
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            options = {"level": 3 if self.level is None else self.level}
+            if self._compress_dict is not None:
+                options["dict_data"] = self._compress_dict
+            compressor = self._local.compressor = zstandard.ZstdCompressor(**options)
+        return compressor
+
+    def _zstd_decompressor(self, dict_id: int):
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            if dict_id and dict_id not in self._dicts:
+                raise RuntimeError(f"缺少ID为 {dict_id} 的zstd字典，请检查 COMPRESSION_ZSTD_DICTS")
+            options = {"dict_data": self._dicts[dict_id]} if dict_id else {}
+            decompressor = decompressors[dict_id] = zstandard.ZstdDecompressor(**options)
+        return decompressor
+
+
+_codec: Optional[Codec] = None
+_codec_lock = threading.Lock()
+
+
+def get_codec() -> Codec:
+    global _codec
+    if _codec is None:
+        with _codec_lock:
+            if _codec is None:
+                _codec = Codec(
+                    settings.COMPRESSION_CODEC,
+                    settings.COMPRESSION_MIN_SIZE,
+                    settings.COMPRESSION_LEVEL,
+                    [path.strip() for path in settings.COMPRESSION_ZSTD_DICTS.split(",") if path.strip()],
+                )
+    return _codec
+
+
+def set_codec(codec: Codec) -> None:
+    """替换全局压缩配置（测试和基准使用）"""
+    global _codec
+    _codec = codec
+
+
+class CompressedText(TypeDecorator):
+    """读写为str、存储为可能压缩的二进制的文本列"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "mysql":
+            return dialect.type_descriptor(mysql.LONGBLOB())
+        return dialect.type_descriptor(LargeBinary())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return get_codec().compress(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # sqlite 中改列类型之前写入的旧数据仍以文本返回
+            return value
+        return get_codec().decompress(bytes(value))
+
+
+def compressed_columns():
+    """所有 CompressedText 列，[(表, 列)]"""
+    from app.db.session import Base
+
+    return [
+        (table, column)
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, CompressedText)
+    ]
+
+
+def train_dict(samples: List[bytes], size: int = 112640) -> bytes:
+    """用样本训练zstd字典"""
+    if zstandard is None:
+        raise RuntimeError("训练zstd字典需要安装zstandard")
+    return zstandard.train_dictionary(size, samples).as_bytes()
+
+
+def _sample_values(connection, limit: int) -> List[bytes]:
+    from sqlalchemy import select
+
+    samples = []
+    for table, column in compressed_columns():
+        # 读取时已经解压
+        for value in connection.execute(select(column).where(column.isnot(None)).limit(limit)).scalars():
+            if value:
+                samples.append(value.encode("utf-8"))
+    return samples
+
+
+def recompress(connection, batch_size: int = 500) -> int:
+    """按当前配置重写所有压缩列（压缩旧数据或改用新字典），返回重写的行数"""
+    from sqlalchemy import select, update
+
+    total = 0
+    for table, column in compressed_columns():
+        key = list(table.primary_key.columns)[0]
+        last = None
+        while True:
+            query = select(key, column).order_by(key).limit(batch_size)
+            if last is not None:
+                query = query.where(key > last)
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+            for row_id, value in rows:
+                if value is not None:
+                    connection.execute(update(table).where(key == row_id).values({column.name: value}))
+                    total += 1
+            last = rows[-1][0]
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from app.db.session import get_engine
+    # 导入模型，使压缩列注册到 Base.metadata
+    from app.models import agent, ai_app  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="大文本列压缩工具")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train-dict", help="用数据库中的现有数据训练zstd字典")
+    train.add_argument("output", help="字典输出路径")
+    train.add_argument("--size", type=int, default=112640, help="字典大小（字节）")
+    train.add_argument("--samples", type=int, default=10000, help="每列最多采样的行数")
+    commands.add_parser("recompress", help="按当前配置重写所有压缩列")
+    args = parser.parse_args(argv)
+
+    if args.command == "train-dict":
+        with get_engine().connect() as connection:
+            samples = _sample_values(connection, args.samples)
+        with open(args.output, "wb") as f:
+            f.write(train_dict(samples, args.size))
+        print(f"已用 {len(samples)} 个样本训练字典: {args.output}")
+    else:
+        with get_engine().begin() as connection:
+            print(f"已重写 {recompress(connection)} 行")
+
+
+if __name__ == "__main__":
+    main()
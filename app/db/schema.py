@@ -0,0 +1,59 @@
+"""
+数据库结构版本检查
+
+表结构由 alembic 迁移管理（见 migrations/），启动时只读取 alembic_version
+表中的一行与代码中的最新迁移版本比较，代替每次启动都执行 create_all。
+"""
+
+import os
+from functools import lru_cache
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.db.session import get_engine
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MIGRATIONS_DIR = os.path.join(PROJECT_ROOT, "migrations")
+
+
+class SchemaVersionError(RuntimeError):
+    """数据库结构版本与代码不一致"""
+
+
+@lru_cache(maxsize=None)
+def get_head_revision() -> str:
+    """代码中的最新迁移版本"""
+    # alembic 只在检查时导入，不影响普通导入路径的启动耗时
+    from alembic.script import ScriptDirectory
+
+    heads = ScriptDirectory(MIGRATIONS_DIR).get_heads()
+    if len(heads) != 1:
+        raise SchemaVersionError(f"迁移存在多个head: {heads}")
+    return heads[0]
+
+
+def get_current_revision(engine=None):
+    """数据库中记录的迁移版本，未初始化时返回 None"""
+    engine = engine or get_engine()
+    with engine.connect() as connection:
+        try:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+        except (OperationalError, ProgrammingError):
+            # 表不存在时 sqlite 报 OperationalError、PostgreSQL 报 ProgrammingError；
+            # 权限不足、连接断开等其他错误照常抛出
+            connection.rollback()
+            if inspect(connection).has_table("alembic_version"):
+                raise
+            return None
+
+
+def check_schema_version(engine=None) -> str:
+    """检查数据库结构是否为最新版本，不一致时抛出 SchemaVersionError"""
+    head = get_head_revision()
+    current = get_current_revision(engine)
+    if current is None:
+        raise SchemaVersionError("数据库未初始化，请先运行 python init_db.py")
+    if current != head:
+        raise SchemaVersionError(f"数据库版本 {current} 与代码版本 {head} 不一致，请先运行 alembic upgrade head")
+    return current
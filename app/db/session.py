@@ -1,27 +1,63 @@
-from sqlalchemy import create_engine
+import threading
+
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
 
-# 使用MySQL数据库
-DATABASE_URL = f"mysql+pymysql://{settings.MYSQL_USER}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
+Base = declarative_base()
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=True  # 开发环境下显示SQL语句
-)
+# 引擎和会话工厂在第一次使用时才创建，避免导入时加载数据库驱动和建立连接池
+_engine = None
+_session_factory = None
+_lock = threading.Lock()
+
+
+def get_database_url() -> str:
+    if settings.DB_URL:
+        return settings.DB_URL
+    # 使用MySQL数据库
+    return f"mysql+pymysql://{settings.MYSQL_USER}@{settings.MYSQL_HOST}:{settings.MYSQL_PORT}/{settings.MYSQL_DATABASE}"
+
+
+def get_engine():
+    global _engine, _session_factory
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+
+                url = get_database_url()
+                options = {"pool_pre_ping": True, "pool_recycle": 300, "echo": settings.SQL_ECHO}
+                if not url.startswith("sqlite"):
+                    options["pool_size"] = settings.DB_POOL_SIZE
+                    options["max_overflow"] = settings.DB_MAX_OVERFLOW
+                _engine = create_engine(url, **options)
+                _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+    return _engine
+
+
+def get_session_factory():
+    if _session_factory is None:
+        get_engine()
+    return _session_factory
+
+
+def __getattr__(name):
+    # 兼容旧代码中的 `from app.db.session import engine, SessionLocal`
+    if name == "engine":
+        return get_engine()
+    if name == "SessionLocal":
+        return get_session_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
 
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    """直接按模型建表，仅用于测试和基准环境；生产环境请使用 alembic 迁移"""
+    Base.metadata.create_all(bind=get_engine())
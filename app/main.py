@@ -1,12 +1,104 @@
 from fastapi import FastAPI
-from app.api import mcp, agent, ai_app
-from app.db.session import init_db
+from app.api import mcp, agent, ai_app, conversation, events, health, jobs, search, simulator, stats, sync
+from app.config import settings
+from app.core.admission import AdmissionMiddleware, admission_controller
+from app.core.cache import response_cache
+from app.core.events import get_bus
+from app.core.response_compression import CompressionMiddleware, compression_options
+from app.core.tracing import TracingMiddleware, instrument_sqlalchemy, tracer
+from app.db.schema import check_schema_version
+from app.services.agent_router import agent_router
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.conversation_service import conversation_maintainer
+from app.services.event_stream import event_broker
+from app.services.health_service import readiness, warmup
+from app.services.history_service import history_buffer
+from app.services.job_service import job_worker
+from app.services.reference_service import existence_cache
+from app.services.search_service import search_service
+from app.services.stats_service import stats_service
+from app.services.usage_service import usage_meter
 
 app = FastAPI()
+# 按 Accept-Encoding 压缩JSON响应
+app.add_middleware(CompressionMiddleware, **compression_options())
+# 为每个请求记录span，并记录SQL执行
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    instrument_sqlalchemy(tracer, settings.TRACING_MAX_STATEMENT_LENGTH)
+# 过载时按路由优先级拒绝低优先级请求，位于最外层，被拒绝的请求不经过其他中间件
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
 app.include_router(mcp.router)
 app.include_router(agent.router)
 app.include_router(ai_app.router)
+app.include_router(search.router)
+app.include_router(sync.router)
+app.include_router(events.router)
+app.include_router(conversation.router)
+app.include_router(jobs.router)
+app.include_router(health.router)
+app.include_router(stats.router)
+# OpenAI 兼容的大模型模拟器，供压测工具或 LLM_OPENAI_API_BASE 指向本服务时使用
+if settings.LLM_SIMULATOR_ENABLED:
+    app.include_router(simulator.router)
 
 @app.on_event("startup")
 def startup():
-    init_db()
+    # 表结构由 alembic 迁移管理，启动时只做一次版本检查
+    if not settings.SKIP_SCHEMA_CHECK:
+        check_schema_version()
+
+    # 订阅实体变更事件，失效本地缓存、更新内存检索索引、Agent路由向量和目录统计，并推送给事件订阅者
+    bus = get_bus()
+    bus.subscribe(response_cache.on_change)
+    bus.subscribe(existence_cache.on_change)
+    bus.subscribe(search_service.on_change)
+    bus.subscribe(event_broker.on_change)
+    bus.subscribe(agent_router.on_change)
+    bus.subscribe(stats_service.on_change)
+    if settings.SNAPSHOT_ENABLED:
+        bus.subscribe(catalog_snapshot.on_change)
+    bus.start()
+
+    history_buffer.start()
+    # 后台压缩长会话、清理过期会话
+    conversation_maintainer.start()
+    # 执行后台任务，并重新排队上次退出时未完成的任务
+    job_worker.start()
+    # 定期全量重算目录统计
+    stats_service.start()
+    # 批量写入大模型用量记录
+    usage_meter.start()
+    # 批量导出追踪数据
+    if settings.TRACING_ENABLED:
+        tracer.start()
+    # 构建并映射共享的目录快照
+    if settings.SNAPSHOT_ENABLED:
+        catalog_snapshot.start()
+
+    # 预热连接池和缓存，完成前 /readyz 返回503
+    if settings.WARMUP_ENABLED:
+        warmup.start()
+    else:
+        warmup.skip()
+
+@app.on_event("shutdown")
+def shutdown():
+    # 先标记为未就绪，负载均衡停止转发新请求
+    readiness.draining = True
+    # 关闭推送连接
+    event_broker.close()
+    get_bus().stop()
+    # 写入缓冲区中剩余的变更历史
+    history_buffer.stop()
+    conversation_maintainer.stop()
+    stats_service.stop()
+    catalog_snapshot.stop()
+    # 写入缓冲区中剩余的用量记录
+    usage_meter.stop()
+    # 等待执行中的任务结束
+    job_worker.stop(timeout=settings.JOB_LEASE_SECONDS)
+    # 导出剩余的追踪数据
+    if settings.TRACING_ENABLED:
+        tracer.stop()
@@ -1,15 +1,28 @@
-from sqlalchemy import Column, String, Text, VARCHAR, Boolean
+from sqlalchemy import Column, String, Text, VARCHAR, Boolean, Index
+from app.db.compression import CompressedText
 from app.db.session import Base
 
 class Agent(Base):
     __tablename__ = "agent"
+    __table_args__ = (
+        # 全文检索索引，ngram分词支持中文（仅MySQL）；system_prompt 压缩存储，以明文前缀 prompt_excerpt 参与全文索引
+        Index(
+            "ft_agent_text", "name", "description", "prompt_excerpt",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+        # 列表过滤/排序使用的复合索引，以id结尾以支持游标分页
+        Index("ix_agent_mcp_id", "mcp_id", "id"),
+        Index("ix_agent_is_active", "is_active", "id"),
+        Index("ix_agent_name", "name", "id"),
+    )
 
     id = Column(VARCHAR(255), primary_key=True, index=True)
     name = Column(VARCHAR(255), nullable=False)
     description = Column(Text)
-    system_prompt = Column(Text, nullable=False)
+    system_prompt = Column(CompressedText, nullable=False)
+    prompt_excerpt = Column(Text)  # 系统提示词的明文前缀，用于全文检索
     temperature = Column(VARCHAR(10), default="0.7")
     max_tokens = Column(VARCHAR(10), default="4000")
     is_active = Column(Boolean, default=True)
     mcp_id = Column(VARCHAR(255), nullable=False)  # 关联的MCP ID
-    tools = Column(Text)  # 可存 JSON 字符串，存储工具配置 
\ No newline at end of file
+    tools = Column(CompressedText)  # 可存 JSON 字符串，存储工具配置 
\ No newline at end of file
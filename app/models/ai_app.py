@@ -1,9 +1,17 @@
-from sqlalchemy import Column, String, Text, VARCHAR, Boolean, DateTime
+from sqlalchemy import Column, String, Text, VARCHAR, Boolean, DateTime, Index, Integer
 from sqlalchemy.sql import func
+from app.db.compression import CompressedText
 from app.db.session import Base
 
 class AIApp(Base):
     __tablename__ = "ai_app"
+    __table_args__ = (
+        # 全文检索索引，ngram分词支持中文（仅MySQL）；system_prompt 压缩存储，以明文前缀 prompt_excerpt 参与全文索引
+        Index(
+            "ft_ai_app_text", "name", "description", "prompt_excerpt",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+    )
 
     id = Column(VARCHAR(255), primary_key=True, index=True)
     name = Column(VARCHAR(255), nullable=False, comment="应用名称")
@@ -16,19 +24,26 @@ class AIApp(Base):
     
     # Agent配置
     main_agent_id = Column(VARCHAR(255), comment="主Agent ID，null表示使用默认Agent")
-    agent_list = Column(Text, comment="Agent列表，JSON格式存储")
+    agent_list = Column(CompressedText, comment="Agent列表，JSON格式存储，超过阈值时压缩")
     
     # MCP配置
     mcp_list = Column(Text, comment="MCP列表，JSON格式存储")
     
     # 系统配置
-    llm_config = Column(Text, comment="大模型配置，JSON格式存储")
-    system_prompt = Column(Text, comment="系统提示词")
+    llm_config = Column(CompressedText, comment="大模型配置，JSON格式存储，超过阈值时压缩")
+    system_prompt = Column(CompressedText, comment="系统提示词，超过阈值时压缩")
+    prompt_excerpt = Column(Text, comment="系统提示词的明文前缀，用于全文检索")
     
     # 应用类型
     app_type = Column(VARCHAR(50), default="platform", comment="应用类型：platform-平台应用，user-我的应用")
     user_id = Column(VARCHAR(255), comment="创建用户ID，平台应用为null")
     
+    # 发布版本
+    published_version = Column(Integer, comment="当前发布的版本号，null表示未发布")
+    
+    # 乐观并发控制：每次修改递增，条件UPDATE校验读取时的版本
+    version = Column(Integer, nullable=False, default=1, server_default="1", comment="配置版本号，每次修改递增，用作ETag")
+    
     # 时间戳
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now()) 
\ No newline at end of file
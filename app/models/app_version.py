@@ -0,0 +1,32 @@
+from sqlalchemy import Column, VARCHAR, Text, Integer, BigInteger, DateTime, Index, UniqueConstraint
+from sqlalchemy.dialects import mysql
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class ContentBlob(Base):
+    """按内容哈希去重存储的大字段（系统提示词、Agent列表、MCP列表、大模型配置）"""
+    __tablename__ = "content_blob"
+
+    hash = Column(VARCHAR(64), primary_key=True, comment="内容的SHA-256")
+    content = Column(Text().with_variant(mysql.LONGTEXT, "mysql"), nullable=False)
+    size = Column(Integer, nullable=False, comment="内容字节数")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AIAppVersion(Base):
+    """AI应用的不可变发布版本，大字段只保存内容哈希"""
+    __tablename__ = "ai_app_version"
+    __table_args__ = (
+        UniqueConstraint("app_id", "version", name="uq_ai_app_version"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    app_id = Column(VARCHAR(255), nullable=False, comment="AI应用ID")
+    version = Column(Integer, nullable=False, comment="版本号，从1开始递增")
+    config_hash = Column(VARCHAR(64), nullable=False, comment="完整配置的SHA-256，用作ETag")
+    base_config = Column(Text, nullable=False, comment="基础配置（名称、标识符等小字段），JSON格式")
+    system_prompt_hash = Column(VARCHAR(64), comment="系统提示词内容哈希")
+    agent_list_hash = Column(VARCHAR(64), comment="Agent列表内容哈希")
+    mcp_list_hash = Column(VARCHAR(64), comment="MCP列表内容哈希")
+    llm_config_hash = Column(VARCHAR(64), comment="大模型配置内容哈希")
+    note = Column(VARCHAR(500), comment="发布说明")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
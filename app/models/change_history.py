@@ -0,0 +1,17 @@
+from sqlalchemy import Column, VARCHAR, Text, BigInteger, Integer, DateTime, Index
+from app.db.session import Base
+
+class ChangeHistory(Base):
+    """字段级变更历史，只追加不修改"""
+    __tablename__ = "change_history"
+    __table_args__ = (
+        Index("ix_change_history_entity", "entity_type", "entity_id", "id"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity_type = Column(VARCHAR(50), nullable=False, comment="实体类型：ai_app/agent/mcp")
+    entity_id = Column(VARCHAR(255), nullable=False, comment="实体ID")
+    field = Column(VARCHAR(100), nullable=False, comment="变更字段")
+    old_value = Column(Text, comment="变更前的值")
+    new_value = Column(Text, comment="变更后的值")
+    changed_at = Column(DateTime(timezone=True), nullable=False, comment="变更时间（写入缓冲区的时间）")
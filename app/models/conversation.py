@@ -0,0 +1,42 @@
+from sqlalchemy import Column, VARCHAR, Text, BigInteger, Integer, DateTime, Index
+from sqlalchemy.dialects import mysql
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class Conversation(Base):
+    """AI应用的会话，按应用和用户区分"""
+    __tablename__ = "conversation"
+    __table_args__ = (
+        Index("ix_conversation_app_user", "app_id", "user_id", "last_active_at"),
+        # 按最后活跃时间清理过期会话
+        Index("ix_conversation_last_active", "last_active_at"),
+    )
+
+    id = Column(VARCHAR(64), primary_key=True)
+    app_id = Column(VARCHAR(255), nullable=False, comment="AI应用ID")
+    user_id = Column(VARCHAR(255), comment="用户ID")
+    title = Column(VARCHAR(255), comment="会话标题")
+    message_count = Column(Integer, nullable=False, default=0, comment="累计消息数，即最后一条消息的序号")
+    token_count = Column(BigInteger, nullable=False, default=0, comment="累计token数")
+    summary = Column(Text, comment="已压缩消息的摘要")
+    summarized_until = Column(Integer, nullable=False, default=0, comment="序号不大于该值的消息已压缩进摘要")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_active_at = Column(DateTime(timezone=True), nullable=False, comment="最后追加消息的时间")
+
+class ConversationMessage(Base):
+    """会话消息，只追加"""
+    __tablename__ = "conversation_message"
+    __table_args__ = (
+        Index("ix_conversation_message_seq", "conversation_id", "seq", unique=True),
+        # 按token窗口读取
+        Index("ix_conversation_message_tokens", "conversation_id", "token_offset"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    conversation_id = Column(VARCHAR(64), nullable=False, comment="会话ID")
+    seq = Column(Integer, nullable=False, comment="会话内序号，从1开始")
+    role = Column(VARCHAR(20), nullable=False, comment="角色：system/user/assistant/tool")
+    content = Column(Text().with_variant(mysql.LONGTEXT, "mysql"), nullable=False, comment="消息内容")
+    token_count = Column(Integer, nullable=False, comment="估算的token数")
+    token_offset = Column(BigInteger, nullable=False, comment="该消息之前的累计token数")
+    created_at = Column(DateTime(timezone=True), nullable=False)
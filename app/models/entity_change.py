@@ -0,0 +1,23 @@
+from sqlalchemy import Column, VARCHAR, BigInteger, Integer, DateTime, Index, Text
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class EntityChangeLog(Base):
+    """实体变更记录，多个worker轮询该表实现缓存失效广播，也是增量同步的变更序列"""
+    __tablename__ = "entity_change"
+    __table_args__ = (
+        # 增量同步按实体类型过滤时使用
+        Index("ix_entity_change_type", "entity_type", "id"),
+    )
+
+    # 自增ID即全局单调递增的变更序号
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity_type = Column(VARCHAR(50), nullable=False, comment="实体类型：ai_app/agent/mcp")
+    entity_id = Column(VARCHAR(255), nullable=False, comment="实体ID")
+    op = Column(VARCHAR(20), nullable=False, comment="操作：create/update/delete")
+    version = Column(BigInteger, nullable=False, comment="变更版本")
+    origin = Column(VARCHAR(64), comment="发布变更的worker标识")
+    identifier = Column(VARCHAR(255), comment="AI应用标识符，用于事件推送过滤")
+    user_id = Column(VARCHAR(255), comment="AI应用所属用户ID，用于事件推送过滤")
+    stats = Column(Text, comment="参与目录统计的字段（JSON数组），删除时为空")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
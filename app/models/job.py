@@ -0,0 +1,27 @@
+from sqlalchemy import Column, VARCHAR, Text, Integer, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class Job(Base):
+    """后台任务"""
+    __tablename__ = "job"
+    __table_args__ = (
+        # 领取任务：status='queued' AND run_after<=now
+        Index("ix_job_status_run_after", "status", "run_after"),
+        # 回收租约过期的任务：status='running' AND locked_at<...
+        Index("ix_job_status_locked_at", "status", "locked_at"),
+    )
+
+    id = Column(VARCHAR(64), primary_key=True)
+    type = Column(VARCHAR(100), nullable=False, comment="任务类型")
+    status = Column(VARCHAR(20), nullable=False, comment="状态：queued/running/succeeded/failed/cancelled")
+    payload = Column(Text, comment="任务参数，JSON格式")
+    result = Column(Text, comment="任务结果，JSON格式")
+    error = Column(Text, comment="最近一次失败的错误信息")
+    attempts = Column(Integer, nullable=False, default=0, comment="已执行次数")
+    max_attempts = Column(Integer, nullable=False, default=3, comment="最多执行次数")
+    run_after = Column(DateTime, nullable=False, comment="最早执行时间，失败重试时按退避时间推迟")
+    locked_by = Column(VARCHAR(64), comment="执行该任务的worker")
+    locked_at = Column(DateTime, comment="租约续期时间，超时未续期视为worker已退出")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, comment="完成时间")
@@ -1,12 +1,24 @@
-from sqlalchemy import Column, String, Text, VARCHAR
+from sqlalchemy import Column, String, Text, VARCHAR, Index
 from app.db.session import Base
 
 class MCP(Base):
     __tablename__ = "mcp"
+    __table_args__ = (
+        # 全文检索索引，ngram分词支持中文（仅MySQL）
+        Index(
+            "ft_mcp_text", "name", "provider", "model",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ).ddl_if(dialect="mysql"),
+        # 列表过滤/排序使用的复合索引，以id结尾以支持游标分页
+        Index("ix_mcp_provider_model", "provider", "model", "id"),
+        Index("ix_mcp_provider", "provider", "id"),
+        Index("ix_mcp_model", "model", "id"),
+        Index("ix_mcp_name", "name", "id"),
+    )
 
     id = Column(VARCHAR(255), primary_key=True, index=True)
     name = Column(VARCHAR(255), nullable=False)
-    provider = Column(VARCHAR(100), nullable=False)  # openai, azure, etc.
+    provider = Column(VARCHAR(100), nullable=False)  # openai, simulator（大模型模拟器）, etc.
     model = Column(VARCHAR(100), nullable=False)     # gpt-3.5-turbo, etc.
     temperature = Column(VARCHAR(10), default="0.7")
     api_key = Column(Text, nullable=False)
@@ -0,0 +1,49 @@
+from sqlalchemy import Column, VARCHAR, BigInteger, Integer, DateTime, Index
+from app.db.session import Base
+
+class LLMUsage(Base):
+    """大模型调用明细，由计量缓冲区批量写入，超过保留天数后清理"""
+    __tablename__ = "llm_usage"
+    __table_args__ = (
+        Index("ix_llm_usage_app_created", "app_id", "created_at"),
+        # 按时间清理过期明细
+        Index("ix_llm_usage_created", "created_at"),
+    )
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    app_id = Column(VARCHAR(255), nullable=False, comment="AI应用ID")
+    user_id = Column(VARCHAR(255), comment="调用用户ID")
+    provider = Column(VARCHAR(100), nullable=False, comment="大模型提供商")
+    model = Column(VARCHAR(100), nullable=False, comment="模型")
+    prompt_tokens = Column(Integer, nullable=False, comment="输入token数")
+    completion_tokens = Column(Integer, nullable=False, comment="输出token数")
+    latency_ms = Column(Integer, nullable=False, comment="调用耗时（毫秒）")
+    error = Column(VARCHAR(100), comment="失败时的错误类型，成功为null")
+    created_at = Column(DateTime, nullable=False, comment="调用开始时间（UTC）")
+
+
+class UsageRollupColumns:
+    """按时间段汇总的用量，(bucket, app_id, user_id, provider, model) 唯一，写入时累加"""
+    # 主键以 (app_id, bucket) 开头，按应用查询时间范围直接使用主键
+    app_id = Column(VARCHAR(255), primary_key=True, comment="AI应用ID")
+    bucket = Column(DateTime, primary_key=True, comment="时间段起点（UTC）")
+    # 主键列不能为null，没有用户时为空字符串
+    user_id = Column(VARCHAR(255), primary_key=True, comment="调用用户ID，没有用户时为空字符串")
+    provider = Column(VARCHAR(100), primary_key=True, comment="大模型提供商")
+    model = Column(VARCHAR(100), primary_key=True, comment="模型")
+    calls = Column(BigInteger, nullable=False, comment="调用次数")
+    errors = Column(BigInteger, nullable=False, comment="失败次数")
+    prompt_tokens = Column(BigInteger, nullable=False, comment="输入token数")
+    completion_tokens = Column(BigInteger, nullable=False, comment="输出token数")
+    latency_ms_sum = Column(BigInteger, nullable=False, comment="调用耗时之和（毫秒），除以调用次数即平均耗时")
+    latency_ms_max = Column(Integer, nullable=False, comment="最大调用耗时（毫秒）")
+
+
+class LLMUsageHourly(UsageRollupColumns, Base):
+    """大模型用量小时汇总"""
+    __tablename__ = "llm_usage_hourly"
+
+
+class LLMUsageDaily(UsageRollupColumns, Base):
+    """大模型用量日汇总"""
+    __tablename__ = "llm_usage_daily"
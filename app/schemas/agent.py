@@ -44,4 +44,4 @@ class AgentOut(BaseModel):
         return v if v is not None else []
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        from_attributes = True 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import datetime
 
 # MCP配置Schema
@@ -17,7 +17,7 @@ class AgentConfig(BaseModel):
 
 # 大模型配置Schema
 class LLMConfig(BaseModel):
-    provider: str  # openai, azure, etc.
+    provider: str  # openai, simulator（大模型模拟器）, etc.
     model: str     # gpt-3.5-turbo, etc.
     temperature: float = 0.7
     max_tokens: int = 4000
@@ -68,12 +68,26 @@ class AIAppUpdate(BaseModel):
     llm_config: Optional[List[LLMConfig]] = Field(None, description="大模型配置")
     system_prompt: Optional[str] = Field(None, description="系统提示词")
 
+# 列表配置修改操作Schema
+class ListPatchOp(BaseModel):
+    op: Literal["add", "remove", "move"] = Field(..., description="操作：add-添加，remove-删除，move-移动")
+    field: Literal["agent_list", "mcp_list", "llm_config"] = Field(..., description="修改的列表字段")
+    value: Optional[Dict[str, Any]] = Field(None, description="add 时添加的条目")
+    id: Optional[str] = Field(None, description="remove/move 时按条目ID定位：agent_id、mcp_id，llm_config 按 model")
+    index: Optional[int] = Field(None, ge=0, description="add/move 时的目标位置，默认末尾；remove 未指定 id 时按位置删除")
+
+# 修改AI应用列表配置Schema
+class AIAppPatch(BaseModel):
+    ops: List[ListPatchOp] = Field(..., min_length=1, max_length=100, description="按顺序执行的修改操作")
+
 # AI应用响应Schema
 class AIAppResponse(AIAppBase):
     id: str
     access_url: Optional[str] = Field(None, description="独立访问URL")
     app_type: str
     user_id: Optional[str]
+    published_version: Optional[int] = Field(None, description="当前发布的版本号，null表示未发布")
+    version: Optional[int] = Field(None, description="配置版本号，每次修改递增；响应头 ETag 即该值，更新时可通过 If-Match 校验；发布版本的配置快照中为null")
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -92,4 +106,82 @@ class GenerateSystemPromptRequest(BaseModel):
     app_name: str
     app_description: Optional[str] = None
     agent_list: Optional[List[AgentConfig]] = None
-    mcp_list: Optional[List[MCPConfig]] = None 
\ No newline at end of file
+    mcp_list: Optional[List[MCPConfig]] = None
+    locale: Optional[str] = Field(None, description="提示词语言，如 zh、en，默认 PROMPT_DEFAULT_LOCALE")
+
+# 变更历史Schema
+class ChangeHistoryItem(BaseModel):
+    id: int
+    field: str
+    old_value: Optional[str] = None
+    new_value: Optional[str] = None
+    changed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# 变更历史列表响应Schema
+class ChangeHistoryListResponse(BaseModel):
+    items: List[ChangeHistoryItem]
+    total: int
+    page: int
+    size: int
+
+# 发布请求Schema
+class PublishRequest(BaseModel):
+    note: Optional[str] = Field(None, max_length=500, description="发布说明")
+
+# 回滚请求Schema
+class RollbackRequest(BaseModel):
+    version: int = Field(..., ge=1, description="回滚到的版本号")
+
+# 版本信息Schema
+class AIAppVersionInfo(BaseModel):
+    app_id: str
+    version: int
+    config_hash: str = Field(..., description="完整配置的SHA-256")
+    note: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# 版本详情Schema
+class AIAppVersionDetail(AIAppVersionInfo):
+    config: AIAppResponse
+
+# 版本列表响应Schema
+class AIAppVersionListResponse(BaseModel):
+    versions: List[AIAppVersionInfo]
+    published_version: Optional[int] = Field(None, description="当前发布的版本号")
+    total: int
+    page: int
+    size: int
+
+# Agent路由请求Schema
+class RouteRequest(BaseModel):
+    message: str = Field(..., min_length=1, description="用户消息")
+    top_k: int = Field(3, ge=1, le=20, description="返回的Agent数量")
+
+# Agent路由结果Schema
+class RouteHit(BaseModel):
+    agent_id: str
+    name: Optional[str] = None
+    score: float = Field(..., description="余弦相似度")
+
+# Agent路由响应Schema
+class RouteResponse(BaseModel):
+    agents: List[RouteHit]
+
+# 渲染系统提示词请求Schema
+class RenderPromptRequest(BaseModel):
+    variables: Dict[str, Any] = Field(default_factory=dict, description="模板变量，如 {\"user\": {\"name\": \"张三\"}}")
+    locale: Optional[str] = Field(None, description="语言，如 zh、en-US，模板中没有时使用默认语言")
+    published: bool = Field(False, description="渲染当前发布版本的提示词，默认渲染草稿")
+
+# 渲染系统提示词响应Schema
+class RenderPromptResponse(BaseModel):
+    system_prompt: str
+    locale: Optional[str] = Field(None, description="实际使用的语言")
+    template_hash: str = Field(..., description="模板源码的SHA-256")
+    version: int = Field(..., description="渲染的配置版本：草稿为 version，发布版本为 published_version")
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+# 创建会话请求Schema
+class ConversationCreate(BaseModel):
+    user_id: Optional[str] = Field(None, description="用户ID")
+    title: Optional[str] = Field(None, max_length=255, description="会话标题")
+
+# 会话响应Schema
+class ConversationOut(BaseModel):
+    id: str
+    app_id: str
+    user_id: Optional[str] = None
+    title: Optional[str] = None
+    message_count: int = Field(..., description="累计消息数")
+    token_count: int = Field(..., description="累计token数（估算）")
+    summarized_until: int = Field(..., description="序号不大于该值的消息已压缩进摘要")
+    created_at: Optional[datetime] = None
+    last_active_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# 会话列表响应Schema
+class ConversationListResponse(BaseModel):
+    conversations: List[ConversationOut]
+    total: int
+    page: int
+    size: int
+
+# 消息Schema
+class MessageIn(BaseModel):
+    role: str = Field(..., pattern="^(system|user|assistant|tool)$", description="角色：system/user/assistant/tool")
+    content: str = Field(..., description="消息内容")
+
+# 追加消息请求Schema
+class AppendMessagesRequest(BaseModel):
+    messages: List[MessageIn] = Field(..., min_length=1, max_length=100, description="按顺序追加的消息")
+
+# 消息响应Schema
+class MessageOut(BaseModel):
+    seq: int
+    role: str
+    content: str
+    token_count: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# 消息窗口响应Schema
+class MessageWindowResponse(BaseModel):
+    conversation_id: str
+    summary: Optional[str] = Field(None, description="已压缩的较早消息的摘要")
+    messages: List[MessageOut]
+    message_count: int
+    token_count: int
@@ -0,0 +1,29 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class JobCreate(BaseModel):
+    type: str = Field(..., description="任务类型")
+    payload: Dict[str, Any] = Field(default_factory=dict, description="任务参数")
+    max_attempts: Optional[int] = Field(None, ge=1, le=20, description="最多执行次数")
+
+class JobResponse(BaseModel):
+    id: str
+    type: str
+    status: str
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class JobListResponse(BaseModel):
+    jobs: List[JobResponse]
+    total: int
+    page: int
+    size: int
@@ -36,4 +36,4 @@ class MCPOut(BaseModel):
         return v if v is not None else []
 
     class Config:
-        orm_mode = True
+        from_attributes = True
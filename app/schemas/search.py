@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+# 单条检索结果Schema
+class SearchHit(BaseModel):
+    entity_type: str = Field(..., description="实体类型：ai_app/agent/mcp")
+    id: str
+    name: str
+    description: str = Field("", description="描述摘要（MCP为 provider/model）")
+    score: float = Field(..., description="相关度得分")
+
+# 检索响应Schema
+class SearchResponse(BaseModel):
+    results: List[SearchHit]
+    total: int
+    page: int
+    size: int
+    backend: str = Field(..., description="检索后端：mysql-FULLTEXT索引，memory-内存倒排索引")
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from datetime import datetime
+
+# AI应用统计Schema
+class AIAppStats(BaseModel):
+    total: int
+    by_type: Dict[str, int] = Field(..., description="按应用类型统计")
+    active: int
+    inactive: int
+    users: int = Field(..., description="拥有应用的用户数")
+    per_user: Dict[str, int] = Field(..., description="应用数最多的前N个用户")
+
+# Agent统计Schema
+class AgentStats(BaseModel):
+    total: int
+    mcps: int = Field(..., description="被Agent关联的MCP数")
+    per_mcp: Dict[str, int] = Field(..., description="关联Agent最多的前N个MCP")
+
+# MCP统计Schema
+class MCPStats(BaseModel):
+    total: int
+    by_provider: Dict[str, int] = Field(..., description="按提供商统计")
+    by_model: Dict[str, Dict[str, int]] = Field(..., description="按提供商、模型统计")
+
+# 目录统计响应Schema
+class StatsResponse(BaseModel):
+    ai_apps: AIAppStats
+    agents: AgentStats
+    mcps: MCPStats
+    version: int = Field(..., description="统计版本，每次变更递增")
+    updated_at: Optional[datetime] = None
+    reconciled_at: Optional[datetime] = Field(None, description="最近一次全量重算时间")
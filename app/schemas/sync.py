@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+# 单条变更Schema
+class ChangeItem(BaseModel):
+    seq: int = Field(..., description="变更序号")
+    entity_type: str = Field(..., description="实体类型：ai_app/agent/mcp")
+    entity_id: str
+    op: str = Field(..., description="操作：create/update/delete，实体已删除时为delete")
+    data: Optional[Dict[str, Any]] = Field(None, description="实体的最新数据，删除时为null")
+
+# 增量同步响应Schema
+class ChangeListResponse(BaseModel):
+    changes: List[ChangeItem]
+    next_cursor: int = Field(..., description="下次请求的since参数")
+    has_more: bool = Field(..., description="是否还有已稳定的变更，为true时应立即继续拉取")
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+# 用量指标Schema
+class UsageMetrics(BaseModel):
+    calls: int = Field(..., description="调用次数")
+    errors: int = Field(..., description="失败次数")
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    avg_latency_ms: float = Field(..., description="平均耗时（毫秒）")
+    max_latency_ms: int = Field(..., description="最大耗时（毫秒）")
+
+# 单个时间段的用量Schema
+class UsageItem(UsageMetrics):
+    bucket: datetime = Field(..., description="时间段起点（UTC）")
+    provider: Optional[str] = Field(None, description="按 provider 分组时的提供商")
+    model: Optional[str] = Field(None, description="按 model 分组时的模型")
+    user_id: Optional[str] = Field(None, description="按 user_id 分组时的用户")
+
+# 用量响应Schema
+class UsageResponse(BaseModel):
+    app_id: str
+    granularity: str = Field(..., description="时间粒度：hour/day")
+    start: datetime
+    end: datetime
+    group_by: Optional[str] = None
+    items: List[UsageItem]
+    total: UsageMetrics
@@ -0,0 +1,225 @@
+"""
+基于向量的Agent路由
+
+为每个启用的Agent把名称、描述和系统提示词向量化一次，向量存放在进程内的
+NumPy矩阵中。路由时只对应用 agent_list 中的候选Agent做一次批量矩阵乘法，
+取相似度最高的 top-k，不需要额外调用大模型。
+
+- 首次路由时从数据库构建索引，之后根据Agent变更事件标记待更新，
+  下次路由前批量重新向量化（文本未变化的Agent不会重新向量化）
+- 向量化（可能是网络调用）不持有索引锁，完成后在锁内更新索引；
+  其他线程正在更新时，路由直接使用当前索引，不等待
+- 停用或删除的Agent从索引中移除
+"""
+
+import hashlib
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.embedding import Embedder, get_embedder
+
+# (agent_id, name, description, system_prompt, is_active)
+AgentRow = Tuple[str, str, Optional[str], Optional[str], bool]
+
+
+def agent_text(name: str, description: Optional[str], system_prompt: Optional[str]) -> str:
+    # 名称重复一次，提高名称在向量中的权重
+    return "\n".join(part for part in (name, name, description, system_prompt) if part)
+
+
+class VectorIndex:
+    """按ID增删的向量矩阵，删除时用最后一行填补空位"""
+
+    def __init__(self, capacity: int = 64):
+        self._capacity = capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._hashes: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def text_hash(self, item_id: str) -> Optional[str]:
+        return self._hashes.get(item_id)
+
+    def upsert(self, item_ids: List[str], vectors: np.ndarray, hashes: List[str]) -> None:
+        if self._matrix is None:
+            self._matrix = np.zeros((max(self._capacity, len(item_ids)), vectors.shape[1]), dtype=np.float32)
+        for item_id, vector, text_hash in zip(item_ids, vectors, hashes):
+            row = self._rows.get(item_id)
+            if row is None:
+                row = len(self._ids)
+                if row == self._matrix.shape[0]:
+                    # 容量翻倍，追加的均摊代价为O(1)
+                    grown = np.zeros((row * 2, self._matrix.shape[1]), dtype=np.float32)
+                    grown[:row] = self._matrix
+                    self._matrix = grown
+                self._ids.append(item_id)
+                self._rows[item_id] = row
+            self._matrix[row] = vector
+            self._hashes[item_id] = text_hash
+
+    def remove(self, item_id: str) -> None:
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        self._hashes.pop(item_id, None)
+        last = len(self._ids) - 1
+        if row != last:
+            moved = self._ids[last]
+            self._ids[row] = moved
+            self._rows[moved] = row
+            self._matrix[row] = self._matrix[last]
+        self._ids.pop()
+
+    def search(self, queries: np.ndarray, candidates: Optional[Iterable[str]], k: int) -> List[List[Tuple[str, float]]]:
+        """对每个查询向量返回候选中相似度最高的 k 个 (id, 相似度)"""
+        if candidates is None:
+            rows = np.arange(len(self._ids))
+        else:
+            rows = np.fromiter(
+                (self._rows[c] for c in dict.fromkeys(candidates) if c in self._rows), dtype=np.int64
+            )
+        if len(rows) == 0 or self._matrix is None:
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self._matrix[rows].T
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for query_scores, query_top in zip(scores, top):
+            ordered = query_top[np.argsort(-query_scores[query_top], kind="stable")]
+            results.append([(self._ids[rows[i]], float(query_scores[i])) for i in ordered])
+        return results
+
+
+def _load_agents(agent_ids: Optional[Iterable[str]] = None) -> List[AgentRow]:
+    """从数据库读取Agent，agent_ids 为 None 时读取全部"""
+    from app.db.session import get_session_factory
+    from app.models.agent import Agent
+
+    db = get_session_factory()()
+    try:
+        query = db.query(Agent.id, Agent.name, Agent.description, Agent.system_prompt, Agent.is_active)
+        if agent_ids is not None:
+            query = query.filter(Agent.id.in_(list(agent_ids)))
+        return [tuple(row) for row in query.yield_per(1000)]
+    finally:
+        db.close()
+
+
+class AgentRouter:
+    """应用内的Agent路由"""
+
+    def __init__(
+        self,
+        embedder: Optional[Embedder] = None,
+        loader: Callable[[Optional[Iterable[str]]], List[AgentRow]] = _load_agents,
+    ):
+        self._embedder = embedder
+        self._loader = loader
+        self.index = VectorIndex()
+        self._names: Dict[str, str] = {}
+        self._stale: Set[str] = set()
+        self._built = False
+        # 保护索引的读写，只在内存操作期间持有
+        self._lock = threading.RLock()
+        # 同一时间只有一个线程构建或更新索引
+        self._refresh_lock = threading.Lock()
+        self.embedded = 0
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def ensure_index(self) -> None:
+        if self._built:
+            return
+        with self._refresh_lock:
+            if self._built:
+                return
+            self._apply(self._loader(None))
+            self._built = True
+
+    def on_change(self, event) -> None:
+        """实体变更事件回调：标记待重新向量化的Agent"""
+        if event.entity_type != "agent" or not self._built:
+            return
+        with self._lock:
+            self._stale.add(event.entity_id)
+
+    def refresh(self) -> None:
+        """重新读取并向量化已变更的Agent，其他线程正在更新时直接返回"""
+        if not self._stale or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            with self._lock:
+                stale, self._stale = self._stale, set()
+            try:
+                rows = self._loader(stale)
+                self._apply(rows, deleted=stale - {row[0] for row in rows})
+            except Exception:
+                # 下次路由时重试
+                with self._lock:
+                    self._stale |= stale
+                raise
+        finally:
+            self._refresh_lock.release()
+
+    def route(
+        self,
+        messages: List[str],
+        candidates: Optional[List[str]] = None,
+        top_k: int = 3,
+    ) -> List[List[Dict[str, object]]]:
+        """为每条消息从候选Agent中选出最相关的 top_k 个，candidates 为 None 时在全部Agent中选择"""
+        self.ensure_index()
+        self.refresh()
+        queries = self.embedder.embed(messages)
+        with self._lock:
+            results = self.index.search(queries, candidates, top_k)
+            return [
+                [{"agent_id": agent_id, "name": self._names.get(agent_id), "score": score} for agent_id, score in hits]
+                for hits in results
+            ]
+
+    def _apply(self, rows: List[AgentRow], deleted: Iterable[str] = ()) -> None:
+        """持有 _refresh_lock 时调用：锁外向量化，再在锁内更新索引"""
+        removed = set(deleted)
+        names: Dict[str, str] = {}
+        pending_ids, pending_texts, pending_hashes = [], [], []
+        for agent_id, name, description, system_prompt, is_active in rows:
+            if not is_active:
+                removed.add(agent_id)
+                continue
+            text = agent_text(name, description, system_prompt)
+            text_hash = hashlib.sha1(text.encode()).hexdigest()
+            names[agent_id] = name
+            # 只有持有 _refresh_lock 的线程修改索引，这里读取不需要加锁
+            if self.index.text_hash(agent_id) == text_hash:
+                continue
+            pending_ids.append(agent_id)
+            pending_texts.append(text)
+            pending_hashes.append(text_hash)
+        vectors = [self.embedder.embed(pending_texts[start:start + 256]) for start in range(0, len(pending_ids), 256)]
+        with self._lock:
+            for agent_id in removed:
+                self._remove(agent_id)
+            self._names.update(names)
+            for start, batch in zip(range(0, len(pending_ids), 256), vectors):
+                self.index.upsert(pending_ids[start:start + 256], batch, pending_hashes[start:start + 256])
+                self.embedded += len(batch)
+
+    def _remove(self, agent_id: str) -> None:
+        self.index.remove(agent_id)
+        self._names.pop(agent_id, None)
+
+
+agent_router = AgentRouter()
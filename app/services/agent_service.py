@@ -1,14 +1,29 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.agent import Agent
-from app.schemas.agent import AgentCreate, AgentUpdate
+from app.models.mcp import MCP
+from app.schemas.agent import AgentCreate, AgentUpdate, AgentOut
+from app.core.cache import response_cache
+from app.core.events import publish_event, record_change
+from app.core.tracing import traced
+from app.services.history_service import diff_fields, history_buffer
+from app.services.pagination import paginate
+from app.services.search_service import prompt_excerpt
+from app.services.stats_service import stat_fields
+from app.services.streaming import stream_query
 import json
 
+# 可排序字段，均有 (字段, id) 复合索引
+AGENT_SORT_COLUMNS = {"id": Agent.id, "name": Agent.name}
+
+@traced
 def create_agent(db: Session, data: AgentCreate):
     db_agent = Agent(
         id=data.id,
         name=data.name,
         description=data.description,
         system_prompt=data.system_prompt,
+        prompt_excerpt=prompt_excerpt(data.system_prompt),
         temperature=data.temperature,
         max_tokens=data.max_tokens,
         is_active=data.is_active,
@@ -16,39 +31,107 @@ def create_agent(db: Session, data: AgentCreate):
         tools=json.dumps(data.tools)
     )
     db.add(db_agent)
+    event = record_change(db, "agent", db_agent.id, "create", stats=stat_fields("agent", db_agent))
     db.commit()
     db.refresh(db_agent)
+    publish_event(event)
     return db_agent
 
-def get_agents(db: Session):
-    return db.query(Agent).all()
+def filter_agents(
+    query,
+    is_active: Optional[bool] = None,
+    mcp_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+):
+    """按条件过滤Agent查询，provider/model 通过关联的MCP过滤"""
+    if is_active is not None:
+        query = query.filter(Agent.is_active == is_active)
+    if mcp_id:
+        query = query.filter(Agent.mcp_id == mcp_id)
+    if provider or model:
+        query = query.join(MCP, MCP.id == Agent.mcp_id)
+        if provider:
+            query = query.filter(MCP.provider == provider)
+        if model:
+            query = query.filter(MCP.model == model)
+    return query
+
+@traced
+def get_agents(
+    db: Session,
+    is_active: Optional[bool] = None,
+    mcp_id: Optional[str] = None,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+):
+    """分页获取Agent列表，返回 (当前页, 下一页游标)"""
+    query = filter_agents(db.query(Agent), is_active, mcp_id, provider, model)
+    return paginate(query, AGENT_SORT_COLUMNS, Agent.id, sort, order, limit, offset, cursor)
+
+@traced
+def count_agents(db: Session, **filters) -> int:
+    return filter_agents(db.query(Agent), **filters).count()
+
+def stream_agents(fmt: str = "json", **filters):
+    """流式导出全部Agent（按id排序），逐块返回JSON数组或NDJSON字节"""
+    def query_factory(db: Session):
+        return filter_agents(db.query(Agent), **filters).order_by(Agent.id)
 
+    return stream_query(query_factory, lambda agent: AgentOut.model_validate(agent).model_dump_json().encode(), fmt)
+
+@traced
 def get_agent_by_id(db: Session, agent_id: str):
     return db.query(Agent).filter(Agent.id == agent_id).first()
 
+@traced
+def get_agent_out(db: Session, agent_id: str):
+    """获取单个Agent的响应数据，结果缓存直到该Agent变更"""
+    def load():
+        agent = get_agent_by_id(db, agent_id)
+        return AgentOut.model_validate(agent) if agent else None
+
+    return response_cache.get_or_load(("agent", agent_id), load, tags=[("agent", agent_id)])
+
+@traced
 def update_agent(db: Session, agent_id: str, data: AgentUpdate):
     db_agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if not db_agent:
         return None
     
     update_data = data.dict(exclude_unset=True)
+    if "tools" in update_data:
+        update_data["tools"] = json.dumps(update_data["tools"])
+    before = {field: getattr(db_agent, field) for field in update_data}
     for field, value in update_data.items():
-        if field == "tools":
-            setattr(db_agent, field, json.dumps(value))
-        else:
-            setattr(db_agent, field, value)
+        setattr(db_agent, field, value)
+    if "system_prompt" in update_data:
+        db_agent.prompt_excerpt = prompt_excerpt(update_data["system_prompt"])
     
+    event = record_change(db, "agent", agent_id, "update", stats=stat_fields("agent", db_agent))
     db.commit()
     db.refresh(db_agent)
+    history_buffer.record("agent", agent_id, diff_fields(before, update_data))
+    publish_event(event)
     return db_agent
 
+@traced
 def delete_agent(db: Session, agent_id: str):
     db_agent = db.query(Agent).filter(Agent.id == agent_id).first()
     if not db_agent:
         return None
     db.delete(db_agent)
+    # 删除记录即增量同步中的墓碑
+    event = record_change(db, "agent", agent_id, "delete")
     db.commit()
+    publish_event(event)
     return True
 
-def get_agents_by_mcp(db: Session, mcp_id: str):
-    return db.query(Agent).filter(Agent.mcp_id == mcp_id).all() 
\ No newline at end of file
+@traced
+def get_agents_by_mcp(db: Session, mcp_id: str, **page):
+    return get_agents(db, mcp_id=mcp_id, **page) 
\ No newline at end of file
@@ -1,27 +1,99 @@
 import json
 import uuid
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
+from app.core.cache import response_cache
+from app.core.events import publish_event, record_change
+from app.core.template import compile_template
+from app.core.tracing import traced
 from app.models.ai_app import AIApp
 from app.models.agent import Agent
 from app.models.mcp import MCP
+from app.services import agent_service, mcp_service, prompt_service
+from app.services.history_service import diff_fields, history_buffer
+from app.services.pagination import paginate
+from app.services.reference_service import check_reference_list, check_references
+from app.services.search_service import prompt_excerpt
+from app.services.stats_service import stat_fields
 from app.schemas.ai_app import (
     AIAppCreate, 
     AIAppUpdate, 
     AIAppResponse, 
     GenerateSystemPromptRequest,
     AgentConfig,
+    ListPatchOp,
     MCPConfig,
     LLMConfig
 )
 
+# 未指定期望版本时，被并发修改后重新读取并重试的次数
+UPDATE_RETRIES = 5
+
+# 列表字段的条目Schema和定位条目用的键
+LIST_ENTRY_MODELS = {"agent_list": AgentConfig, "mcp_list": MCPConfig, "llm_config": LLMConfig}
+LIST_ENTRY_KEYS = {"agent_list": "agent_id", "mcp_list": "mcp_id", "llm_config": "model"}
+
+
+class VersionConflict(Exception):
+    """AI应用已被修改，与期望的版本不一致"""
+
+    def __init__(self, current_version: Optional[int]):
+        self.current_version = current_version
+        super().__init__(f"AI应用已被修改，当前版本: {current_version}")
+
+
+class PatchError(ValueError):
+    """列表修改操作无法在当前配置上执行"""
+
+    def __init__(self, index: int, message: str):
+        self.index = index
+        super().__init__(f"ops[{index}]: {message}")
+
+
+def apply_list_op(items: List[Dict[str, Any]], op: ListPatchOp, entry: Optional[Dict[str, Any]], index: int) -> None:
+    """在列表上执行一个修改操作，index 为操作在请求中的序号，用于错误信息"""
+    key = LIST_ENTRY_KEYS[op.field]
+    position = None
+    if op.op != "add" and op.id is not None:
+        position = next((i for i, item in enumerate(items) if item.get(key) == op.id), None)
+        if position is None:
+            raise PatchError(index, f"{op.field} 中不存在 {key}={op.id}")
+
+    if op.op == "add":
+        if any(item.get(key) == entry[key] for item in items):
+            raise PatchError(index, f"{op.field} 中已存在 {key}={entry[key]}")
+        target = len(items) if op.index is None else op.index
+        if target > len(items):
+            raise PatchError(index, f"位置超出范围: {target}")
+        items.insert(target, entry)
+    elif op.op == "remove":
+        if position is None:
+            if op.index is None or op.index >= len(items):
+                raise PatchError(index, "remove 操作需要指定 id 或有效的 index")
+            position = op.index
+        del items[position]
+    else:
+        item = items.pop(position)
+        target = len(items) if op.index is None else op.index
+        if target > len(items):
+            raise PatchError(index, f"位置超出范围: {target}")
+        items.insert(target, item)
+
+
 class AIAppService:
     
     @staticmethod
+    @traced
     def create_ai_app(db: Session, ai_app_data: AIAppCreate) -> AIAppResponse:
-        """创建AI应用"""
+        """创建AI应用，引用的Agent/MCP不存在时抛出 DanglingReferences，系统提示词模板有误时抛出 TemplateSyntaxError"""
+        check_references(db, ai_app_data.main_agent_id, ai_app_data.agent_list, ai_app_data.mcp_list)
+        if ai_app_data.system_prompt:
+            compile_template(ai_app_data.system_prompt)
+        
         # 生成唯一ID
         app_id = str(uuid.uuid4())
         
@@ -31,15 +103,15 @@ class AIAppService:
         # 处理JSON字段
         agent_list_json = None
         if ai_app_data.agent_list:
-            agent_list_json = json.dumps([agent.dict() for agent in ai_app_data.agent_list])
+            agent_list_json = AIAppService._dump_json_list(ai_app_data.agent_list)
         
         mcp_list_json = None
         if ai_app_data.mcp_list:
-            mcp_list_json = json.dumps([mcp.dict() for mcp in ai_app_data.mcp_list])
+            mcp_list_json = AIAppService._dump_json_list(ai_app_data.mcp_list)
         
         llm_config_json = None
         if ai_app_data.llm_config:
-            llm_config_json = json.dumps([llm.dict() for llm in ai_app_data.llm_config])
+            llm_config_json = AIAppService._dump_json_list(ai_app_data.llm_config)
         
         # 创建AI应用
         db_ai_app = AIApp(
@@ -56,25 +128,46 @@ class AIAppService:
             mcp_list=mcp_list_json,
             llm_config=llm_config_json,
             system_prompt=ai_app_data.system_prompt,
+            prompt_excerpt=prompt_excerpt(ai_app_data.system_prompt),
             app_type=ai_app_data.app_type,
             user_id=ai_app_data.user_id
         )
         
         db.add(db_ai_app)
+        event = record_change(
+            db, "ai_app", app_id, "create", db_ai_app.identifier, db_ai_app.user_id, stat_fields("ai_app", db_ai_app)
+        )
         db.commit()
         db.refresh(db_ai_app)
+        publish_event(event)
         
         return AIAppService._convert_to_response(db_ai_app)
     
     @staticmethod
+    @traced
     def get_ai_app(db: Session, app_id: str) -> Optional[AIAppResponse]:
-        """获取单个AI应用"""
-        db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
-        if not db_ai_app:
-            return None
-        return AIAppService._convert_to_response(db_ai_app)
+        """获取单个AI应用，结果缓存直到该应用变更"""
+        def load():
+            db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
+            if not db_ai_app:
+                return None
+            return AIAppService._convert_to_response(db_ai_app)
+        
+        return response_cache.get_or_load(("ai_app", app_id), load, tags=[("ai_app", app_id)])
+    
+    @staticmethod
+    @traced
+    def get_ai_app_by_identifier(db: Session, identifier: str) -> Optional[AIAppResponse]:
+        """按标识符获取AI应用，标识符到ID的映射随应用变更失效"""
+        def load():
+            row = db.query(AIApp.id).filter(AIApp.identifier == identifier).first()
+            return row.id if row else None
+
+        app_id = response_cache.get_or_load(("ai_app_identifier", identifier), load, tags=[("ai_app", "*")])
+        return AIAppService.get_ai_app(db, app_id) if app_id else None
     
     @staticmethod
+    @traced
     def get_ai_apps(
         db: Session, 
         app_type: Optional[str] = None,
@@ -106,38 +199,154 @@ class AIAppService:
         }
     
     @staticmethod
-    def update_ai_app(db: Session, app_id: str, ai_app_data: AIAppUpdate) -> Optional[AIAppResponse]:
-        """更新AI应用"""
-        db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
-        if not db_ai_app:
-            return None
-        
+    @traced
+    def update_ai_app(
+        db: Session,
+        app_id: str,
+        ai_app_data: AIAppUpdate,
+        expected_version: Optional[int] = None
+    ) -> Optional[AIAppResponse]:
+        """
+        更新AI应用，引用的Agent/MCP不存在时抛出 DanglingReferences，系统提示词模板有误时抛出
+        TemplateSyntaxError，指定 expected_version 且与当前版本不一致时抛出 VersionConflict
+        """
         # 更新字段
         update_data = ai_app_data.dict(exclude_unset=True)
         
+        # 只校验本次更新的引用
+        check_references(
+            db,
+            update_data.get("main_agent_id"),
+            ai_app_data.agent_list if "agent_list" in update_data else None,
+            ai_app_data.mcp_list if "mcp_list" in update_data else None,
+        )
+        if update_data.get("system_prompt"):
+            compile_template(update_data["system_prompt"])
+        
         # 处理JSON字段
         if "agent_list" in update_data:
-            update_data["agent_list"] = json.dumps([agent.dict() for agent in update_data["agent_list"]])
+            update_data["agent_list"] = AIAppService._dump_json_list(ai_app_data.agent_list)
         
         if "mcp_list" in update_data:
-            update_data["mcp_list"] = json.dumps([mcp.dict() for mcp in update_data["mcp_list"]])
+            update_data["mcp_list"] = AIAppService._dump_json_list(ai_app_data.mcp_list)
         
         if "llm_config" in update_data:
-            update_data["llm_config"] = json.dumps([llm.dict() for llm in update_data["llm_config"]])
+            update_data["llm_config"] = AIAppService._dump_json_list(ai_app_data.llm_config)
         
         # 更新独立访问URL
         if "identifier" in update_data:
             update_data["access_url"] = f"/app/{update_data['identifier']}"
         
-        for field, value in update_data.items():
-            setattr(db_ai_app, field, value)
+        return AIAppService._conditional_update(db, app_id, lambda db_ai_app: update_data, expected_version)
+    
+    @staticmethod
+    @traced
+    def patch_ai_app(
+        db: Session,
+        app_id: str,
+        ops: List[ListPatchOp],
+        expected_version: Optional[int] = None
+    ) -> Optional[AIAppResponse]:
+        """
+        在服务端对 agent_list/mcp_list/llm_config 执行单条目的添加、删除、移动，只写入被修改的列；
+        操作无法执行时抛出 PatchError，添加的条目引用不存在的Agent/MCP时抛出 DanglingReferences
+        """
+        entries = []
+        references = []  # [(位置, 实体类型, ID)]
+        for i, op in enumerate(ops):
+            entry = None
+            if op.op == "add":
+                if op.value is None:
+                    raise PatchError(i, "add 操作缺少 value")
+                try:
+                    entry = LIST_ENTRY_MODELS[op.field](**op.value).dict()
+                except ValidationError as e:
+                    raise PatchError(i, f"条目格式错误: {e.errors()[0]['msg']}")
+                if op.field == "agent_list":
+                    references.append((("ops", i, "value", "agent_id"), "agent", entry["agent_id"]))
+                elif op.field == "mcp_list":
+                    references.append((("ops", i, "value", "mcp_id"), "mcp", entry["mcp_id"]))
+            elif op.op == "move" and op.id is None:
+                raise PatchError(i, "move 操作需要指定 id")
+            entries.append(entry)
+        check_reference_list(db, references)
         
-        db.commit()
-        db.refresh(db_ai_app)
+        def changes(db_ai_app: AIApp) -> Dict[str, Any]:
+            # 每次重试都基于最新读取的列表重新执行
+            lists: Dict[str, List[Dict[str, Any]]] = {}
+            for i, (op, entry) in enumerate(zip(ops, entries)):
+                if op.field not in lists:
+                    lists[op.field] = json.loads(getattr(db_ai_app, op.field) or "[]")
+                apply_list_op(lists[op.field], op, entry, i)
+            return {field: json.dumps(items) for field, items in lists.items()}
         
-        return AIAppService._convert_to_response(db_ai_app)
+        return AIAppService._conditional_update(db, app_id, changes, expected_version)
+    
+    @staticmethod
+    @traced
+    def _conditional_update(
+        db: Session,
+        app_id: str,
+        changes: Callable[[AIApp], Dict[str, Any]],
+        expected_version: Optional[int]
+    ) -> Optional[AIAppResponse]:
+        """
+        读取-修改-条件写入：UPDATE ... WHERE version = 读取时的版本，不持有行锁。
+        指定 expected_version（If-Match）时版本不一致抛出 VersionConflict；
+        未指定时被并发修改则重新读取并重试，changes 每次基于最新读取的行计算修改；
+        没有实际修改时直接返回当前配置，不递增版本、不记录变更
+        """
+        for _ in range(UPDATE_RETRIES):
+            db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
+            if not db_ai_app:
+                return None
+            if expected_version is not None and db_ai_app.version != expected_version:
+                raise VersionConflict(db_ai_app.version)
+            update_data = {
+                field: value for field, value in changes(db_ai_app).items() if getattr(db_ai_app, field) != value
+            }
+            if not update_data:
+                return AIAppService._convert_to_response(db_ai_app)
+            
+            # 响应由读取的行和本次修改构造，对象脱离会话，提交后不需要 refresh
+            db.expunge(db_ai_app)
+            updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
+            values = {**update_data, "version": AIApp.version + 1, "updated_at": updated_at}
+            if "system_prompt" in update_data:
+                values["prompt_excerpt"] = prompt_excerpt(update_data["system_prompt"])
+            written = (
+                db.query(AIApp)
+                .filter(AIApp.id == app_id, AIApp.version == db_ai_app.version)
+                .update(values, synchronize_session=False)
+            )
+            if not written:
+                db.rollback()
+                current = db.query(AIApp.version).filter(AIApp.id == app_id).scalar()
+                if current is None:
+                    return None
+                if expected_version is not None:
+                    raise VersionConflict(current)
+                continue
+            
+            before = {field: getattr(db_ai_app, field) for field in update_data}
+            for field, value in update_data.items():
+                setattr(db_ai_app, field, value)
+            db_ai_app.version += 1
+            db_ai_app.updated_at = updated_at
+            
+            event = record_change(
+                db, "ai_app", app_id, "update", db_ai_app.identifier, db_ai_app.user_id,
+                stat_fields("ai_app", db_ai_app),
+            )
+            db.commit()
+            history_buffer.record("ai_app", app_id, diff_fields(before, update_data))
+            publish_event(event)
+            return AIAppService._convert_to_response(db_ai_app)
+        
+        raise VersionConflict(db.query(AIApp.version).filter(AIApp.id == app_id).scalar())
     
     @staticmethod
+    @traced
     def delete_ai_app(db: Session, app_id: str) -> bool:
         """删除AI应用"""
         db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
@@ -145,66 +354,90 @@ class AIAppService:
             return False
         
         db.delete(db_ai_app)
+        # 删除记录即增量同步中的墓碑
+        event = record_change(db, "ai_app", app_id, "delete", db_ai_app.identifier, db_ai_app.user_id)
         db.commit()
+        publish_event(event)
         return True
     
     @staticmethod
+    @traced
     def generate_system_prompt(request: GenerateSystemPromptRequest) -> str:
-        """自动生成系统提示词"""
-        prompt_parts = []
-        
-        # 基础信息
-        prompt_parts.append(f"你是一个名为'{request.app_name}'的AI应用。")
-        
-        if request.app_description:
-            prompt_parts.append(f"应用描述：{request.app_description}")
-        
-        # Agent信息
-        if request.agent_list:
-            agent_names = [agent.name for agent in request.agent_list]
-            prompt_parts.append(f"可用的Agent：{', '.join(agent_names)}")
-        
-        # MCP信息
-        if request.mcp_list:
-            mcp_names = [mcp.name for mcp in request.mcp_list]
-            prompt_parts.append(f"可用的MCP工具：{', '.join(mcp_names)}")
+        """自动生成系统提示词，按 request.locale 选择语言"""
+        return prompt_service.generate_system_prompt(
+            request.app_name, request.app_description, request.agent_list, request.mcp_list, request.locale
+        )
+    
+    @staticmethod
+    @traced
+    def get_available_agents(
+        db: Session,
+        mcp_id: Optional[str] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        **page
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        分页获取可用的Agent列表，只查询需要的列，返回 (当前页, 下一页游标)
         
-        # 系统行为指导
-        prompt_parts.append("""
-请根据用户的需求，合理调度和使用可用的Agent和MCP工具来完成任务。
-确保回答准确、有用，并充分利用可用的工具资源。
-""")
+        不带游标的页面缓存到Agent或MCP变更为止（按提供商/模型过滤依赖MCP）
+        """
+        def load():
+            query = agent_service.filter_agents(
+                db.query(Agent.id, Agent.name, Agent.description),
+                is_active=True, mcp_id=mcp_id, provider=provider, model=model
+            )
+            agents, next_cursor = paginate(query, agent_service.AGENT_SORT_COLUMNS, Agent.id, **page)
+            return [
+                {
+                    "id": agent.id,
+                    "name": agent.name,
+                    "description": agent.description
+                }
+                for agent in agents
+            ], next_cursor
         
-        return "\n".join(prompt_parts)
+        if page.get("cursor"):
+            return load()
+        key = ("available_agents", mcp_id, provider, model, *sorted(page.items()))
+        return response_cache.get_or_load(key, load, tags=[("agent", "*"), ("mcp", "*")])
     
     @staticmethod
-    def get_available_agents(db: Session) -> List[Dict[str, Any]]:
-        """获取可用的Agent列表"""
-        agents = db.query(Agent).filter(Agent.is_active == True).all()
-        return [
-            {
-                "id": agent.id,
-                "name": agent.name,
-                "description": agent.description
-            }
-            for agent in agents
-        ]
+    @traced
+    def get_available_mcps(
+        db: Session,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        **page
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """分页获取可用的MCP列表，只查询需要的列，返回 (当前页, 下一页游标)；不带游标的页面缓存到MCP变更为止"""
+        def load():
+            query = mcp_service.filter_mcps(db.query(MCP.id, MCP.name, MCP.provider, MCP.model), provider, model)
+            mcps, next_cursor = paginate(query, mcp_service.MCP_SORT_COLUMNS, MCP.id, **page)
+            return [
+                {
+                    "id": mcp.id,
+                    "name": mcp.name,
+                    "provider": mcp.provider,
+                    "model": mcp.model
+                }
+                for mcp in mcps
+            ], next_cursor
+        
+        if page.get("cursor"):
+            return load()
+        key = ("available_mcps", provider, model, *sorted(page.items()))
+        return response_cache.get_or_load(key, load, tags=[("mcp", "*")])
     
     @staticmethod
-    def get_available_mcps(db: Session) -> List[Dict[str, Any]]:
-        """获取可用的MCP列表"""
-        mcps = db.query(MCP).all()
-        return [
-            {
-                "id": mcp.id,
-                "name": mcp.name,
-                "provider": mcp.provider,
-                "model": mcp.model
-            }
-            for mcp in mcps
-        ]
+    def _dump_json_list(items) -> Optional[str]:
+        """将Schema列表序列化为JSON字符串，用于写入TEXT字段"""
+        if items is None:
+            return None
+        return json.dumps([item.dict() for item in items])
     
     @staticmethod
+    @traced
     def _convert_to_response(db_ai_app: AIApp) -> AIAppResponse:
         """将数据库模型转换为响应Schema"""
         # 解析JSON字段
@@ -248,6 +481,8 @@ class AIAppService:
             system_prompt=db_ai_app.system_prompt,
             app_type=db_ai_app.app_type,
             user_id=db_ai_app.user_id,
+            published_version=db_ai_app.published_version,
+            version=db_ai_app.version,
             created_at=db_ai_app.created_at,
             updated_at=db_ai_app.updated_at
         ) 
\ No newline at end of file
@@ -0,0 +1,210 @@
+"""
+AI应用发布版本
+
+发布时把应用当前配置快照为不可变版本，ai_app.published_version 指向当前
+发布的版本。回滚把目标版本的内容复制为新版本并发布，版本号始终递增，
+版本列表即完整的发布记录。
+
+- 大字段（system_prompt、agent_list、mcp_list、llm_config）按内容的SHA-256
+  存入 content_blob，内容相同的版本和应用共用同一行，版本行只保存哈希
+- 版本一经写入不再修改，按 (app_id, version) 读取的结果在进程内永久缓存，
+  HTTP层也可以用 immutable 的 Cache-Control 和基于 config_hash 的 ETag
+- 配置与最新版本完全相同时重复发布、回滚不会产生新版本
+"""
+
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache, response_cache
+from app.core.events import publish_event, record_change
+from app.models.ai_app import AIApp
+from app.models.app_version import AIAppVersion, ContentBlob
+from app.services.ai_app import AIAppService
+from app.services.stats_service import stat_fields
+
+# 进入 content_blob 的字段，其余小字段内联在版本行的 base_config 中
+BLOB_FIELDS = ("system_prompt", "agent_list", "mcp_list", "llm_config")
+BASE_FIELDS = (
+    "id", "name", "identifier", "icon", "description", "is_active", "dashboard_url",
+    "access_url", "main_agent_id", "app_type", "user_id", "created_at",
+)
+
+# 版本不可变，缓存项永不过期，只受容量限制
+version_cache = TTLCache(maxsize=1000, ttl=float("inf"))
+
+
+class VersionNotFound(LookupError):
+    """应用或版本不存在"""
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def put_blobs(db: Session, contents: List[Optional[str]]) -> List[Optional[str]]:
+    """写入内容并返回对应的哈希，已存在的内容不重复写入；None 对应 None"""
+    hashes = [None if content is None else content_hash(content) for content in contents]
+    pending = {h: content for h, content in zip(hashes, contents) if h is not None}
+    if pending:
+        existing = {
+            row.hash for row in db.query(ContentBlob.hash).filter(ContentBlob.hash.in_(list(pending)))
+        }
+        for h, content in pending.items():
+            if h not in existing:
+                db.add(ContentBlob(hash=h, content=content, size=len(content.encode("utf-8"))))
+    return hashes
+
+
+def get_blobs(db: Session, hashes: List[Optional[str]]) -> Dict[str, str]:
+    wanted = [h for h in hashes if h]
+    if not wanted:
+        return {}
+    return dict(db.query(ContentBlob.hash, ContentBlob.content).filter(ContentBlob.hash.in_(wanted)).all())
+
+
+def _config_hash(base_config: str, blob_hashes: List[Optional[str]]) -> str:
+    return content_hash(json.dumps([base_config, blob_hashes], separators=(",", ":")))
+
+
+def publish(db: Session, app_id: str, note: Optional[str] = None) -> AIAppVersion:
+    """快照应用当前配置为新版本并发布，返回发布的版本"""
+    db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
+    if not db_ai_app:
+        raise VersionNotFound("AI应用不存在")
+
+    base_config = json.dumps(
+        {field: getattr(db_ai_app, field) for field in BASE_FIELDS},
+        ensure_ascii=False, sort_keys=True, default=str,
+    )
+    blob_hashes = put_blobs(db, [getattr(db_ai_app, field) for field in BLOB_FIELDS])
+    config_hash = _config_hash(base_config, blob_hashes)
+
+    return _publish(db, db_ai_app, config_hash, base_config, dict(zip(BLOB_FIELDS, blob_hashes)), note)
+
+
+def rollback(db: Session, app_id: str, version: int) -> AIAppVersion:
+    """把已有版本的内容复制为新版本并发布，返回发布的版本"""
+    db_version = _get_version_row(db, app_id, version)
+    if db_version is None:
+        raise VersionNotFound("版本不存在")
+    db_ai_app = db.query(AIApp).filter(AIApp.id == app_id).first()
+    if not db_ai_app:
+        raise VersionNotFound("AI应用不存在")
+    # 内容哈希直接沿用，不重复写入 content_blob
+    blob_hashes = {field: getattr(db_version, f"{field}_hash") for field in BLOB_FIELDS}
+    return _publish(
+        db, db_ai_app, db_version.config_hash, db_version.base_config, blob_hashes, f"回滚到版本 {version}"
+    )
+
+
+def _publish(
+    db: Session,
+    db_ai_app: AIApp,
+    config_hash: str,
+    base_config: str,
+    blob_hashes: Dict[str, Optional[str]],
+    note: Optional[str],
+) -> AIAppVersion:
+    """配置与最新版本不同时写入新版本，然后把发布指针指向最新版本"""
+    latest = (
+        db.query(AIAppVersion)
+        .filter(AIAppVersion.app_id == db_ai_app.id)
+        .order_by(AIAppVersion.version.desc())
+        .first()
+    )
+    if latest is not None and latest.config_hash == config_hash:
+        # 配置没有变化，直接发布最新版本
+        version = latest
+    else:
+        version = AIAppVersion(
+            app_id=db_ai_app.id,
+            version=(latest.version if latest else 0) + 1,
+            config_hash=config_hash,
+            base_config=base_config,
+            note=note,
+            **{f"{field}_hash": h for field, h in blob_hashes.items()},
+        )
+        db.add(version)
+    db_ai_app.published_version = version.version
+    event = record_change(
+        db, "ai_app", db_ai_app.id, "update", db_ai_app.identifier, db_ai_app.user_id, stat_fields("ai_app", db_ai_app)
+    )
+    db.commit()
+    publish_event(event)
+    return version
+
+
+def list_versions(db: Session, app_id: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+    """分页获取版本列表，按版本号倒序"""
+    query = db.query(AIAppVersion).filter(AIAppVersion.app_id == app_id)
+    total = query.count()
+    versions = query.order_by(AIAppVersion.version.desc()).offset(skip).limit(limit).all()
+    return {
+        "versions": versions,
+        "published_version": get_published_version(db, app_id),
+        "total": total,
+        "page": skip // limit + 1,
+        "size": limit
+    }
+
+
+def get_version(db: Session, app_id: str, version: int) -> Optional[Dict[str, Any]]:
+    """读取某个版本的完整配置，结果永久缓存"""
+    def load():
+        db_version = _get_version_row(db, app_id, version)
+        if db_version is None:
+            return None
+        return _resolve(db, db_version)
+
+    return version_cache.get_or_load((app_id, version), load)
+
+
+def get_published_version(db: Session, app_id: str) -> Optional[int]:
+    """当前发布的版本号，缓存直到应用变更"""
+    def load():
+        row = db.query(AIApp.published_version).filter(AIApp.id == app_id).first()
+        # 未发布时缓存 0，避免每次都查库
+        return None if row is None else (row.published_version or 0)
+
+    version = response_cache.get_or_load(
+        ("ai_app_published", app_id), load, tags=[("ai_app", app_id)]
+    )
+    return version or None
+
+
+def get_published(db: Session, app_id: str) -> Optional[Dict[str, Any]]:
+    version = get_published_version(db, app_id)
+    if version is None:
+        return None
+    return get_version(db, app_id, version)
+
+
+def _get_version_row(db: Session, app_id: str, version: int) -> Optional[AIAppVersion]:
+    return db.query(AIAppVersion).filter(
+        AIAppVersion.app_id == app_id,
+        AIAppVersion.version == version
+    ).first()
+
+
+def _resolve(db: Session, db_version: AIAppVersion) -> Dict[str, Any]:
+    """还原版本的完整配置"""
+    hashes = [getattr(db_version, f"{field}_hash") for field in BLOB_FIELDS]
+    blobs = get_blobs(db, hashes)
+    app = AIApp(**json.loads(db_version.base_config))
+    for field, h in zip(BLOB_FIELDS, hashes):
+        setattr(app, field, blobs.get(h) if h else None)
+    app.published_version = db_version.version
+    # 版本内容的更新时间即快照时间
+    app.updated_at = db_version.created_at
+    return {
+        "app_id": db_version.app_id,
+        "version": db_version.version,
+        "config_hash": db_version.config_hash,
+        "note": db_version.note,
+        "created_at": db_version.created_at,
+        "config": AIAppService._convert_to_response(app),
+    }
+
@@ -0,0 +1,394 @@
+"""
+目录快照
+
+多worker部署时每个worker各自缓存（或查询MySQL）AI应用、Agent、MCP的配置，内存占用和数据库负载随
+worker数成倍增加。启用 SNAPSHOT_ENABLED 后：
+
+- 构建：持有 SNAPSHOT_DIR/builder.lock 文件锁的一个worker每 SNAPSHOT_BUILD_INTERVAL 秒把全部实体的
+  响应JSON写入一个带哈希索引的二进制文件，写完后原子地替换 CURRENT 指针；没有新变更时跳过
+- 读取：各worker只读 mmap 当前快照，按ID（AI应用还可以按标识符）查找哈希索引，直接返回文件中响应JSON的
+  memoryview，不复制、不反序列化；同一台机器上的worker共享页缓存中的同一份数据
+- 切换：各worker每 SNAPSHOT_POLL_INTERVAL 秒检查 CURRENT，版本变化时映射新文件并替换引用，
+  正在读取旧快照的请求不受影响（旧文件删除后映射仍然有效）
+- 一致性：收到实体变更事件后，该实体在晚于事件构建的快照生效前不从快照读取，回退到原有的缓存/数据库路径
+
+文件格式（小端）：
+
+    头部      magic(8) 格式版本(u32) 段数(u32) 变更序号(u64) 构建开始时间ns(u64)
+    段目录    每段: 名称(32) 条目数(u32) 槽数(u32) 槽表偏移(u64) 条目表偏移(u64)
+    数据区    键和值（响应JSON）
+    条目表    每条: 键偏移(u64) 键长(u32) 值偏移(u64) 值长(u32) 标记(u32，AI应用为配置版本号)
+    槽表      每槽: 键的CRC32(u32) 条目序号+1(u32)，0 表示空槽，线性探测
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.config import settings
+from app.models.agent import Agent
+from app.models.ai_app import AIApp
+from app.models.entity_change import EntityChangeLog
+from app.models.mcp import MCP
+from app.schemas.agent import AgentOut
+from app.schemas.mcp import MCPOut
+from app.services.ai_app import AIAppService
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LLMCAT\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQ")
+SECTION = struct.Struct("<32sIIQQ")
+ENTRY = struct.Struct("<QIQII")
+SLOT = struct.Struct("<II")
+
+# AI应用按ID存响应JSON，按标识符存ID
+SECTIONS = ("ai_app", "ai_app.identifier", "agent", "mcp")
+
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "builder.lock"
+
+# 没有新变更时最多跳过的构建周期数，之后仍然重建一次（覆盖提交顺序与变更序号不一致的写入）
+MAX_SKIPPED_BUILDS = 10
+
+
+class SnapshotFormatError(ValueError):
+    """快照文件损坏或格式版本不兼容"""
+
+
+class SnapshotWriter:
+    """顺序写入快照文件：先写数据区，最后写条目表、槽表和头部"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._offset = HEADER.size + SECTION.size * len(SECTIONS)
+        self._file.seek(self._offset)
+        # 段名 -> [(键偏移, 键长, 值偏移, 值长, 标记, CRC32)]
+        self._entries: Dict[str, List[Tuple[int, int, int, int, int, int]]] = {name: [] for name in SECTIONS}
+
+    def add(self, section: str, key: str, value: bytes, tag: int = 0) -> None:
+        key_bytes = key.encode("utf-8")
+        key_offset = self._write(key_bytes)
+        value_offset = self._write(value)
+        self._entries[section].append(
+            (key_offset, len(key_bytes), value_offset, len(value), tag, zlib.crc32(key_bytes))
+        )
+
+    def finish(self, seq: int, started_ns: int) -> None:
+        directory = []
+        for name in SECTIONS:
+            entries = self._entries[name]
+            self._align()
+            entries_offset = self._offset
+            self._write(b"".join(ENTRY.pack(*entry[:5]) for entry in entries))
+
+            slots = 8
+            while slots < len(entries) * 2:
+                slots *= 2
+            mask = slots - 1
+            table = bytearray(slots * SLOT.size)
+            occupied = bytearray(slots)
+            for index, entry in enumerate(entries):
+                slot = entry[5] & mask
+                while occupied[slot]:
+                    slot = (slot + 1) & mask
+                occupied[slot] = 1
+                SLOT.pack_into(table, slot * SLOT.size, entry[5], index + 1)
+            self._align()
+            slots_offset = self._offset
+            self._write(bytes(table))
+            directory.append(SECTION.pack(name.encode(), len(entries), slots, slots_offset, entries_offset))
+
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(SECTIONS), seq, started_ns))
+        self._file.write(b"".join(directory))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _write(self, data: bytes) -> int:
+        offset = self._offset
+        self._file.write(data)
+        self._offset += len(data)
+        return offset
+
+    def _align(self) -> None:
+        padding = -self._offset % 8
+        if padding:
+            self._write(bytes(padding))
+
+
+class Snapshot:
+    """只读映射的一个快照文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        if len(self._mmap) < HEADER.size:
+            raise SnapshotFormatError(f"快照文件不完整: {path}")
+        magic, format_version, section_count, self.seq, self.started_ns = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise SnapshotFormatError(f"不支持的快照格式: {path}")
+        # 段名 -> (槽掩码, 槽表偏移, 条目表偏移)
+        self._sections: Dict[str, Tuple[int, int, int]] = {}
+        self.counts: Dict[str, int] = {}
+        for i in range(section_count):
+            name, count, slots, slots_offset, entries_offset = SECTION.unpack_from(
+                self._mmap, HEADER.size + i * SECTION.size
+            )
+            name = name.rstrip(b"\x00").decode()
+            self._sections[name] = (slots - 1, slots_offset, entries_offset)
+            self.counts[name] = count
+
+    @property
+    def version(self) -> str:
+        return f"{self.seq}-{self.started_ns}"
+
+    def lookup(self, section: str, key: str) -> Optional[Tuple[memoryview, int]]:
+        """按键查找，返回 (值的memoryview, 标记)，不存在时返回 None"""
+        mask, slots_offset, entries_offset = self._sections[section]
+        key_bytes = key.encode("utf-8")
+        crc = zlib.crc32(key_bytes)
+        slot = crc & mask
+        data = self._mmap
+        while True:
+            slot_crc, index = SLOT.unpack_from(data, slots_offset + slot * SLOT.size)
+            if not index:
+                return None
+            if slot_crc == crc:
+                key_offset, key_length, value_offset, value_length, tag = ENTRY.unpack_from(
+                    data, entries_offset + (index - 1) * ENTRY.size
+                )
+                if data[key_offset:key_offset + key_length] == key_bytes:
+                    return self._view[value_offset:value_offset + value_length], tag
+            slot = (slot + 1) & mask
+
+
+class CatalogSnapshot:
+    """快照的构建、切换与按ID读取"""
+
+    def __init__(
+        self,
+        directory: str = "data/catalog_snapshot",
+        build_interval: float = 30.0,
+        poll_interval: float = 1.0,
+        keep: int = 3,
+        session_factory=None,
+    ):
+        self.directory = directory
+        self.build_interval = build_interval
+        self.poll_interval = poll_interval
+        self.keep = keep
+        self.session_factory = session_factory
+        self.current: Optional[Snapshot] = None
+        # 收到变更事件的实体 -> 收到事件的时间ns，构建开始时间晚于它的快照才包含这次变更
+        self._dirty: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._skipped_builds = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.builds = 0
+
+    # ---------- 读取 ----------
+
+    def get(self, entity_type: str, entity_id: str) -> Optional[Tuple[memoryview, int]]:
+        """从快照读取实体的响应JSON和标记；快照未加载、实体不存在或快照之后有变更时返回 None"""
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        if self._dirty:
+            changed_at = self._dirty.get((entity_type, entity_id))
+            if changed_at is not None and changed_at >= snapshot.started_ns:
+                return None
+        return snapshot.lookup(entity_type, entity_id)
+
+    def get_ai_app_by_identifier(self, identifier: str) -> Optional[Tuple[memoryview, int]]:
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        found = snapshot.lookup("ai_app.identifier", identifier)
+        if found is None:
+            return None
+        return self.get("ai_app", bytes(found[0]).decode("utf-8"))
+
+    def on_change(self, event) -> None:
+        """实体变更事件回调：记录变更时间，在包含这次变更的快照生效前不从快照读取"""
+        if event.entity_type in ("ai_app", "agent", "mcp"):
+            with self._lock:
+                self._dirty[(event.entity_type, event.entity_id)] = time.time_ns()
+
+    def refresh(self) -> bool:
+        """CURRENT 指向新的快照时映射并切换，返回是否切换"""
+        try:
+            with open(os.path.join(self.directory, POINTER_FILE), encoding="utf-8") as f:
+                name = f.read().strip()
+        except FileNotFoundError:
+            return False
+        path = os.path.join(self.directory, name)
+        current = self.current
+        if current is not None and current.path == path:
+            return False
+        snapshot = Snapshot(path)
+        if current is not None and snapshot.started_ns <= current.started_ns:
+            return False
+        with self._lock:
+            self.current = snapshot
+            self._dirty = {key: changed_at for key, changed_at in self._dirty.items() if changed_at >= snapshot.started_ns}
+        logger.info("已切换到目录快照 %s", snapshot.version)
+        return True
+
+    # ---------- 构建 ----------
+
+    def build(self) -> str:
+        """全量构建一个快照并原子地切换 CURRENT，返回快照文件路径"""
+        with self._build_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            # 先取时间再开始读取：之后收到的变更事件都不会被认为已包含在这个快照中
+            started_ns = time.time_ns()
+            name = f"catalog-{started_ns}.snap"
+            path = os.path.join(self.directory, name)
+            writer = SnapshotWriter(path + ".tmp")
+            db = self._session()
+            try:
+                seq = db.query(func.max(EntityChangeLog.id)).scalar() or 0
+                for app in db.query(AIApp).yield_per(500):
+                    body = AIAppService._convert_to_response(app).model_dump_json().encode("utf-8")
+                    writer.add("ai_app", app.id, body, app.version or 0)
+                    writer.add("ai_app.identifier", app.identifier, app.id.encode("utf-8"))
+                for agent in db.query(Agent).yield_per(1000):
+                    writer.add("agent", agent.id, AgentOut.model_validate(agent).model_dump_json().encode("utf-8"))
+                for mcp in db.query(MCP).yield_per(1000):
+                    writer.add("mcp", mcp.id, MCPOut.model_validate(mcp).model_dump_json().encode("utf-8"))
+                writer.finish(seq, started_ns)
+            except BaseException:
+                writer.abort()
+                raise
+            finally:
+                db.close()
+
+            os.replace(path + ".tmp", path)
+            pointer = os.path.join(self.directory, POINTER_FILE)
+            with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+                f.write(name)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer + ".tmp", pointer)
+            self.builds += 1
+            self._cleanup()
+            return path
+
+    def maybe_build(self) -> Optional[str]:
+        """持有构建锁且有新变更时构建，返回快照文件路径，跳过时返回 None"""
+        if not self._acquire_builder_lock():
+            return None
+        current = self.current
+        if current is not None and self._skipped_builds < MAX_SKIPPED_BUILDS:
+            db = self._session()
+            try:
+                seq = db.query(func.max(EntityChangeLog.id)).scalar() or 0
+            finally:
+                db.close()
+            if seq == current.seq:
+                self._skipped_builds += 1
+                return None
+        self._skipped_builds = 0
+        return self.build()
+
+    def _acquire_builder_lock(self) -> bool:
+        """同一台机器上只有一个worker构建快照；持有者退出后由其他worker接替"""
+        if self._lock_fd is not None:
+            return True
+        import fcntl
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def _release_builder_lock(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _cleanup(self) -> None:
+        """只保留最近 keep 个快照文件；已映射旧文件的worker在切换前仍可读取"""
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("catalog-") and name.endswith(".snap"))
+        for name in names[:-self.keep]:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    # ---------- 后台线程 ----------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("加载目录快照失败")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._release_builder_lock()
+
+    def _run(self) -> None:
+        next_build = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_build:
+                next_build = time.monotonic() + self.build_interval
+                try:
+                    self.maybe_build()
+                except Exception:
+                    logger.exception("构建目录快照失败")
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("加载目录快照失败")
+            self._stop.wait(self.poll_interval)
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.db.session import get_session_factory
+            return get_session_factory()()
+        return self.session_factory()
+
+
+catalog_snapshot = CatalogSnapshot(
+    directory=settings.SNAPSHOT_DIR,
+    build_interval=settings.SNAPSHOT_BUILD_INTERVAL,
+    poll_interval=settings.SNAPSHOT_POLL_INTERVAL,
+    keep=settings.SNAPSHOT_KEEP,
+)
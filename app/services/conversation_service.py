@@ -0,0 +1,286 @@
+"""
+会话存储
+
+- 追加消息：一条条件UPDATE累加会话计数器（同时锁住会话行，为并发追加分配连续序号），
+  再批量INSERT消息，耗时与会话长度无关
+- 读取窗口：最近N条消息走 (conversation_id, seq) 索引，最近K个token走
+  (conversation_id, token_offset) 索引，只读取窗口内的消息
+- 压缩：未压缩消息超过 KEEP + BATCH 条时，后台线程把较早的消息折叠进会话摘要并删除，
+  只保留最近 KEEP 条；摘要生成器可替换（默认为不依赖大模型的抽取式摘要）
+- 清理：后台线程定期删除超过 TTL 未活跃的会话
+"""
+
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.conversation import Conversation, ConversationMessage
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("system", "user", "assistant", "tool")
+
+# 摘要生成器：(已有摘要, [(角色, 内容)], token上限) -> 新摘要
+Summarizer = Callable[[Optional[str], List[Tuple[str, str]], int], str]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算token数：中日韩字符按1个token，其余按4个字符1个token"""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def extractive_summary(previous: Optional[str], messages: List[Tuple[str, str]], max_tokens: int) -> str:
+    """默认摘要：每条消息保留开头一段，超过token上限时丢弃最早的内容"""
+    lines = previous.split("\n") if previous else []
+    for role, content in messages:
+        text = " ".join(content.split())
+        lines.append(f"{role}: {text[:80]}{'…' if len(text) > 80 else ''}")
+    total = 0
+    kept = []
+    for line in reversed(lines):
+        total += estimate_tokens(line) + 1
+        if total > max_tokens:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+def create_conversation(db: Session, app_id: str, user_id: Optional[str] = None, title: Optional[str] = None) -> Conversation:
+    conversation = Conversation(
+        id=str(uuid.uuid4()),
+        app_id=app_id,
+        user_id=user_id,
+        title=title,
+        message_count=0,
+        token_count=0,
+        summarized_until=0,
+        last_active_at=_now(),
+    )
+    db.add(conversation)
+    db.commit()
+    return conversation
+
+
+def get_conversation(db: Session, conversation_id: str) -> Optional[Conversation]:
+    return db.query(Conversation).filter(Conversation.id == conversation_id).first()
+
+
+def list_conversations(
+    db: Session,
+    app_id: str,
+    user_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """按最后活跃时间倒序分页获取会话"""
+    query = db.query(Conversation).filter(Conversation.app_id == app_id)
+    if user_id is not None:
+        query = query.filter(Conversation.user_id == user_id)
+    total = query.count()
+    conversations = query.order_by(Conversation.last_active_at.desc()).offset(skip).limit(limit).all()
+    return {
+        "conversations": conversations,
+        "total": total,
+        "page": skip // limit + 1,
+        "size": limit
+    }
+
+
+def delete_conversation(db: Session, conversation_id: str) -> bool:
+    db.query(ConversationMessage).filter(
+        ConversationMessage.conversation_id == conversation_id
+    ).delete(synchronize_session=False)
+    deleted = db.query(Conversation).filter(Conversation.id == conversation_id).delete(synchronize_session=False)
+    db.commit()
+    return bool(deleted)
+
+
+def append_messages(db: Session, conversation_id: str, messages: List[Tuple[str, str]]) -> Optional[List[ConversationMessage]]:
+    """追加消息，返回写入的消息；会话不存在时返回 None"""
+    tokens = [estimate_tokens(content) for _, content in messages]
+    now = _now()
+    updated = db.query(Conversation).filter(Conversation.id == conversation_id).update({
+        Conversation.message_count: Conversation.message_count + len(messages),
+        Conversation.token_count: Conversation.token_count + sum(tokens),
+        Conversation.last_active_at: now,
+    }, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        return None
+
+    counters = db.query(
+        Conversation.message_count, Conversation.token_count, Conversation.summarized_until
+    ).filter(Conversation.id == conversation_id).one()
+    seq = counters.message_count - len(messages)
+    offset = counters.token_count - sum(tokens)
+    rows = []
+    for (role, content), count in zip(messages, tokens):
+        seq += 1
+        rows.append(ConversationMessage(
+            conversation_id=conversation_id,
+            seq=seq,
+            role=role,
+            content=content,
+            token_count=count,
+            token_offset=offset,
+            created_at=now,
+        ))
+        offset += count
+    db.add_all(rows)
+    db.commit()
+
+    if counters.message_count - counters.summarized_until > settings.CONVERSATION_KEEP_MESSAGES + settings.CONVERSATION_COMPACT_BATCH:
+        conversation_maintainer.schedule(conversation_id)
+    return rows
+
+
+def get_window(
+    db: Session,
+    conversation: Conversation,
+    last: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> List[ConversationMessage]:
+    """读取最近 last 条消息，或完整落在最近 max_tokens 个token内的消息，按序号升序返回"""
+    query = db.query(ConversationMessage).filter(ConversationMessage.conversation_id == conversation.id)
+    if max_tokens is not None:
+        query = query.filter(ConversationMessage.token_offset >= conversation.token_count - max_tokens)
+    if last is not None:
+        query = query.order_by(ConversationMessage.seq.desc()).limit(last)
+        return list(reversed(query.all()))
+    return query.order_by(ConversationMessage.seq).all()
+
+
+def compact(db: Session, conversation_id: str, summarizer: Summarizer = extractive_summary, keep: Optional[int] = None) -> int:
+    """把最近 keep 条之前的消息折叠进摘要并删除，返回压缩的消息数"""
+    keep = settings.CONVERSATION_KEEP_MESSAGES if keep is None else keep
+    conversation = get_conversation(db, conversation_id)
+    if conversation is None:
+        return 0
+    start = conversation.summarized_until
+    until = conversation.message_count - keep
+    if until <= start:
+        return 0
+
+    messages = db.query(ConversationMessage.role, ConversationMessage.content).filter(
+        ConversationMessage.conversation_id == conversation_id,
+        ConversationMessage.seq > start,
+        ConversationMessage.seq <= until
+    ).order_by(ConversationMessage.seq).all()
+    summary = summarizer(conversation.summary, [(m.role, m.content) for m in messages], settings.CONVERSATION_SUMMARY_MAX_TOKENS)
+
+    # summarized_until 未被其他压缩任务修改时才写入
+    updated = db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        Conversation.summarized_until == start
+    ).update({Conversation.summary: summary, Conversation.summarized_until: until}, synchronize_session=False)
+    if not updated:
+        db.rollback()
+        return 0
+    db.query(ConversationMessage).filter(
+        ConversationMessage.conversation_id == conversation_id,
+        ConversationMessage.seq <= until
+    ).delete(synchronize_session=False)
+    db.commit()
+    return len(messages)
+
+
+def purge_expired(db: Session, ttl_seconds: Optional[int] = None, batch_size: int = 500) -> int:
+    """删除超过 TTL 未活跃的会话及其消息，返回删除的会话数"""
+    ttl_seconds = settings.CONVERSATION_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cutoff = _now() - timedelta(seconds=ttl_seconds)
+    total = 0
+    while True:
+        ids = [row.id for row in db.query(Conversation.id).filter(
+            Conversation.last_active_at < cutoff
+        ).limit(batch_size)]
+        if not ids:
+            return total
+        db.query(ConversationMessage).filter(
+            ConversationMessage.conversation_id.in_(ids)
+        ).delete(synchronize_session=False)
+        db.query(Conversation).filter(Conversation.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        total += len(ids)
+
+
+class ConversationMaintainer:
+    """后台压缩长会话并清理过期会话"""
+
+    def __init__(self, interval: float = 60.0, summarizer: Summarizer = extractive_summary):
+        self.interval = interval
+        self.summarizer = summarizer
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, conversation_id: str) -> None:
+        """登记需要压缩的会话，由后台线程处理"""
+        with self._lock:
+            self._pending.add(conversation_id)
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="conversation-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_once(self, purge: bool = True) -> Tuple[int, int]:
+        """压缩已登记的会话并清理过期会话，返回 (压缩的消息数, 清理的会话数)"""
+        from app.db.session import get_session_factory
+
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        compacted = purged = 0
+        db = get_session_factory()()
+        try:
+            for conversation_id in pending:
+                try:
+                    compacted += compact(db, conversation_id, self.summarizer)
+                except Exception:
+                    db.rollback()
+                    logger.exception("压缩会话失败: %s", conversation_id)
+            if purge:
+                purged = purge_expired(db)
+        finally:
+            db.close()
+        return compacted, purged
+
+    def _run(self) -> None:
+        next_purge = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            now = time.monotonic()
+            try:
+                self.run_once(purge=now >= next_purge)
+            except Exception:
+                logger.exception("会话维护失败")
+            if now >= next_purge:
+                next_purge = now + self.interval
+
+
+conversation_maintainer = ConversationMaintainer(interval=settings.CONVERSATION_MAINTENANCE_INTERVAL)
@@ -0,0 +1,110 @@
+"""
+文本向量化
+
+Embedder 把一批文本转换为 L2 归一化的 float32 矩阵 (n, dim)，点积即余弦相似度。
+
+- hashing: 本地确定性向量化（特征哈希），不依赖外部服务，适合测试和离线环境
+- openai: 调用 OpenAI 兼容的 /embeddings 接口
+
+通过 EMBEDDING_PROVIDER 选择，也可以用 register_embedder 注册其他实现。
+"""
+
+import hashlib
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.config import settings
+from app.core.tracing import client_span, inject
+from app.services.search_service import tokenize
+
+
+class Embedder:
+    """向量化接口"""
+
+    dim: int
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder(Embedder):
+    """
+    特征哈希：分词（英文单词、中文二元组）后把每个词哈希到 dim 维中的一维并带正负号。
+    使用 blake2b 而不是内置 hash，结果跨进程稳定
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._cache: Dict[str, tuple] = {}
+
+    def _bucket(self, token: str) -> tuple:
+        bucket = self._cache.get(token)
+        if bucket is None:
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            bucket = (digest % self.dim, 1.0 if (digest >> 63) & 1 else -1.0)
+            if len(self._cache) < 100_000:
+                self._cache[token] = bucket
+        return bucket
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, value in enumerate(texts):
+            for token in tokenize(value):
+                index, sign = self._bucket(token)
+                vectors[row, index] += sign
+        return normalize(vectors)
+
+
+class OpenAIEmbedder(Embedder):
+    """OpenAI 兼容的 /embeddings 接口，一次请求向量化一批文本"""
+
+    def __init__(self, api_base: str, api_key: str, model: str, dim: int, timeout: float = 30.0):
+        self.api_base = api_base.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.dim = dim
+        self.timeout = timeout
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        import requests
+
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        url = f"{self.api_base}/embeddings"
+        with client_span("POST /embeddings", {"http.method": "POST", "http.url": url, "embedding.inputs": len(texts)}) as span:
+            response = requests.post(
+                url,
+                headers=inject({"Authorization": f"Bearer {self.api_key}"}),
+                json={"model": self.model, "input": texts},
+                timeout=self.timeout,
+            )
+            span.set_attribute("http.status_code", response.status_code)
+            response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return normalize(np.asarray([item["embedding"] for item in data], dtype=np.float32))
+
+
+_PROVIDERS: Dict[str, Callable[[], Embedder]] = {
+    "hashing": lambda: HashingEmbedder(settings.EMBEDDING_DIM),
+    "openai": lambda: OpenAIEmbedder(
+        settings.EMBEDDING_API_BASE, settings.EMBEDDING_API_KEY, settings.EMBEDDING_MODEL, settings.EMBEDDING_DIM
+    ),
+}
+
+
+def register_embedder(name: str, factory: Callable[[], Embedder]) -> None:
+    _PROVIDERS[name] = factory
+
+
+def get_embedder(name: str = None) -> Embedder:
+    name = name or settings.EMBEDDING_PROVIDER
+    if name not in _PROVIDERS:
+        raise ValueError(f"未知的向量化提供商: {name}，可选: {', '.join(_PROVIDERS)}")
+    return _PROVIDERS[name]()
@@ -0,0 +1,214 @@
+"""
+实体变更事件推送（SSE / WebSocket）
+
+EventBroker 订阅变更事件总线，把事件分发给本worker的推送订阅者：
+
+- 总线回调可能来自任意线程，统一通过 call_soon_threadsafe 切换到事件循环中分发
+- 每个订阅者只有一个有界队列和一个 asyncio.Event，空闲连接不占用线程，
+  单个worker可以维持数千个空闲订阅者
+- 队列写满说明客户端消费太慢，直接断开该订阅者（发送 dropped 事件），
+  客户端带 Last-Event-ID 重连后从 entity_change 补发
+- 断点续传补发的事件超过 EVENTS_REPLAY_LIMIT 时发送 reset 事件，
+  客户端应改用 GET /changes 重新同步
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.core.events import ChangeEvent, row_to_event
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class EventFilter:
+    entity_types: Optional[Tuple[str, ...]] = None
+    identifier: Optional[str] = None
+    user_id: Optional[str] = None
+
+    def matches(self, event: ChangeEvent) -> bool:
+        if self.entity_types is not None and event.entity_type not in self.entity_types:
+            return False
+        if self.identifier is not None and event.identifier != self.identifier:
+            return False
+        if self.user_id is not None and event.user_id != self.user_id:
+            return False
+        return True
+
+
+class Subscriber:
+    """单个推送连接"""
+
+    __slots__ = ("filter", "queue", "wake", "dropped", "closed")
+
+    def __init__(self, event_filter: EventFilter, buffer_size: int):
+        self.filter = event_filter
+        self.queue: "deque[ChangeEvent]" = deque(maxlen=buffer_size)
+        self.wake = asyncio.Event()
+        self.dropped = False
+        self.closed = False
+
+    def push(self, event: ChangeEvent) -> None:
+        if self.dropped or self.closed:
+            return
+        if len(self.queue) == self.queue.maxlen:
+            # 慢消费者：丢弃缓冲并断开，避免占用内存或拖慢分发
+            self.dropped = True
+            self.queue.clear()
+        else:
+            self.queue.append(event)
+        self.wake.set()
+
+
+class EventBroker:
+    """把变更事件总线上的事件分发给推送订阅者"""
+
+    def __init__(self, buffer_size: int = 256, heartbeat: float = 15.0, replay_limit: int = 1000):
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.replay_limit = replay_limit
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def on_change(self, event: ChangeEvent) -> None:
+        """事件总线回调，可以在任意线程中调用"""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._fanout, event)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    def subscribe(self, event_filter: EventFilter) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(event_filter, self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def close(self) -> None:
+        """关闭全部订阅者，服务退出时调用，让推送连接尽快结束"""
+        for subscriber in list(self._subscribers):
+            subscriber.closed = True
+            subscriber.wake.set()
+        self._subscribers.clear()
+
+    def _fanout(self, event: ChangeEvent) -> None:
+        for subscriber in list(self._subscribers):
+            if subscriber.filter.matches(event):
+                subscriber.push(event)
+                if subscriber.dropped:
+                    self.dropped += 1
+                    self._subscribers.discard(subscriber)
+
+    async def listen(
+        self,
+        event_filter: EventFilter,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[ChangeEvent]]]:
+        """
+        产出 (类型, 事件)：change / ping / dropped / reset。
+        先订阅再补发，补发期间到达的实时事件按序号去重。
+        """
+        subscriber = self.subscribe(event_filter)
+        loop = asyncio.get_running_loop()
+        try:
+            last_seq = last_event_id
+            if last_event_id is not None:
+                replay = await run_in_threadpool(_load_replay, event_filter, last_event_id, self.replay_limit)
+                if replay is None:
+                    yield "reset", None
+                    return
+                for event in replay:
+                    last_seq = event.seq
+                    yield "change", event
+
+            while True:
+                if not subscriber.queue and not subscriber.dropped and not subscriber.closed:
+                    subscriber.wake.clear()
+                    # 用定时回调唤醒实现心跳，不为每个连接额外创建等待任务
+                    timer = loop.call_later(self.heartbeat, subscriber.wake.set)
+                    try:
+                        await subscriber.wake.wait()
+                    finally:
+                        timer.cancel()
+                    if not subscriber.queue and not subscriber.dropped and not subscriber.closed:
+                        yield "ping", None
+                        continue
+                if subscriber.closed:
+                    return
+                if subscriber.dropped:
+                    yield "dropped", None
+                    return
+                while subscriber.queue:
+                    event = subscriber.queue.popleft()
+                    if last_seq is not None and event.seq is not None and event.seq <= last_seq:
+                        continue
+                    yield "change", event
+        finally:
+            self.unsubscribe(subscriber)
+
+
+def _load_replay(event_filter: EventFilter, last_event_id: int, limit: int) -> Optional[List[ChangeEvent]]:
+    """从 entity_change 读取需要补发的事件，超过 limit 条时返回 None"""
+    from app.db.session import get_session_factory
+    from app.models.entity_change import EntityChangeLog
+
+    db = get_session_factory()()
+    try:
+        query = db.query(EntityChangeLog).filter(EntityChangeLog.id > last_event_id)
+        if event_filter.entity_types is not None:
+            query = query.filter(EntityChangeLog.entity_type.in_(event_filter.entity_types))
+        if event_filter.identifier is not None:
+            query = query.filter(EntityChangeLog.identifier == event_filter.identifier)
+        if event_filter.user_id is not None:
+            query = query.filter(EntityChangeLog.user_id == event_filter.user_id)
+        rows = query.order_by(EntityChangeLog.id).limit(limit + 1).all()
+    finally:
+        db.close()
+    if len(rows) > limit:
+        return None
+    return [row_to_event(row) for row in rows]
+
+
+def event_payload(event: ChangeEvent) -> dict:
+    return {
+        "seq": event.seq,
+        "entity_type": event.entity_type,
+        "entity_id": event.entity_id,
+        "op": event.op,
+        "identifier": event.identifier,
+        "user_id": event.user_id,
+    }
+
+
+def format_sse(kind: str, event: Optional[ChangeEvent]) -> str:
+    if kind == "ping":
+        return ": ping\n\n"
+    if event is None:
+        return f"event: {kind}\ndata: {{}}\n\n"
+    data = json.dumps(event_payload(event), ensure_ascii=False, separators=(",", ":"))
+    lines = f"id: {event.seq}\n" if event.seq is not None else ""
+    return f"{lines}event: {kind}\ndata: {data}\n\n"
+
+
+event_broker = EventBroker(
+    buffer_size=settings.EVENTS_BUFFER_SIZE,
+    heartbeat=settings.EVENTS_HEARTBEAT_SECONDS,
+    replay_limit=settings.EVENTS_REPLAY_LIMIT,
+)
@@ -0,0 +1,235 @@
+"""
+健康检查与启动预热
+
+- /healthz（存活）：进程能处理请求即返回200，不访问数据库，数据库故障时不应重启worker
+- /readyz（就绪）：连接池能取得连接、数据库结构版本与代码一致、启动预热已完成时返回200，
+  否则返回503，负载均衡据此决定是否转发流量；进程退出时先变为未就绪
+
+启动预热在后台线程中执行，依次：同时建立 pool_size 个数据库连接、加载最近会话最活跃的平台应用
+及其发布版本、加载 available/* 列表首页、构建内存检索索引、Agent路由向量和目录统计。单个步骤失败只记录日志，
+不阻止worker就绪。
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, text
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def check_database(engine=None) -> Dict[str, Any]:
+    """从连接池取得连接并执行一次查询"""
+    from app.db.session import get_engine
+
+    engine = engine or get_engine()
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return {
+        "ok": True,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+        "pool": engine.pool.status(),
+    }
+
+
+def check_schema(engine=None) -> Dict[str, Any]:
+    """数据库结构版本与代码中的最新迁移一致"""
+    from app.db.schema import SchemaVersionError, check_schema_version
+
+    if settings.SKIP_SCHEMA_CHECK:
+        return {"ok": True, "skipped": True}
+    try:
+        return {"ok": True, "revision": check_schema_version(engine)}
+    except SchemaVersionError as e:
+        return {"ok": False, "error": str(e)}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+
+def hot_platform_apps(db, limit: int, window: timedelta = timedelta(days=1)) -> List[str]:
+    """最近会话最活跃的平台应用ID；活跃会话不足时按ID补足"""
+    from app.models.ai_app import AIApp
+    from app.models.conversation import Conversation
+
+    since = datetime.now(timezone.utc).replace(tzinfo=None) - window
+    activity = (
+        db.query(Conversation.app_id, func.count().label("n"))
+        .filter(Conversation.last_active_at >= since)
+        .group_by(Conversation.app_id)
+        .subquery()
+    )
+    rows = (
+        db.query(AIApp.id)
+        .outerjoin(activity, activity.c.app_id == AIApp.id)
+        .filter(AIApp.app_type == "platform", AIApp.is_active == True)  # noqa: E712
+        .order_by(func.coalesce(activity.c.n, 0).desc(), AIApp.id)
+        .limit(limit)
+    )
+    return [row.id for row in rows]
+
+
+class Warmup:
+    """启动预热：在后台线程中执行，完成后 /readyz 才返回就绪"""
+
+    def __init__(self, hot_apps: int = 50, engine=None, session_factory=None, steps: Optional[List[str]] = None):
+        self.hot_apps = hot_apps
+        # 只执行部分步骤（测试使用），默认全部执行
+        self.only = steps
+        # 默认使用应用的数据库引擎和会话工厂
+        self.engine = engine
+        self.session_factory = session_factory
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def start(self) -> None:
+        if self._thread is not None or self.done:
+            return
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def skip(self) -> None:
+        """不预热，直接就绪"""
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def run(self) -> None:
+        self.started_at = time.monotonic()
+        try:
+            for name, step in self._steps():
+                start = time.perf_counter()
+                try:
+                    result = step()
+                    self.steps[name] = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1), **(result or {})}
+                except Exception as e:
+                    logger.exception("启动预热步骤 %s 失败", name)
+                    self.steps[name] = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.finished_at = time.monotonic()
+            self._done.set()
+            logger.info("启动预热完成，耗时 %.2fs", self.finished_at - self.started_at)
+
+    def status(self) -> Dict[str, Any]:
+        state = "done" if self.done else ("running" if self.started_at is not None else "pending")
+        status = {"ok": self.done, "state": state, "steps": self.steps}
+        if self.finished_at is not None:
+            status["seconds"] = round(self.finished_at - self.started_at, 3)
+        return status
+
+    def _steps(self) -> List[Tuple[str, Callable[[], Optional[Dict[str, Any]]]]]:
+        steps = [
+            ("connections", self._open_connections),
+            ("hot_apps", self._load_hot_apps),
+            ("available_lists", self._load_available_lists),
+            ("indexes", self._build_indexes),
+            ("stats", self._build_stats),
+        ]
+        return [(name, step) for name, step in steps if self.only is None or name in self.only]
+
+    def _get_engine(self):
+        from app.db.session import get_engine
+
+        return self.engine or get_engine()
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.db.session import get_session_factory
+            return get_session_factory()()
+        return self.session_factory()
+
+    def _open_connections(self) -> Dict[str, Any]:
+        """同时取得 pool_size 个连接，使连接池中的连接都已建立"""
+        engine = self._get_engine()
+        size = getattr(engine.pool, "size", lambda: 1)()
+        connections = []
+        try:
+            for _ in range(size):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+        return {"connections": len(connections)}
+
+    def _load_hot_apps(self) -> Dict[str, Any]:
+        from app.services import app_version_service
+        from app.services.ai_app import AIAppService
+
+        db = self._session()
+        try:
+            app_ids = hot_platform_apps(db, self.hot_apps)
+            for app_id in app_ids:
+                AIAppService.get_ai_app(db, app_id)
+                app_version_service.get_published(db, app_id)
+        finally:
+            db.close()
+        return {"apps": len(app_ids)}
+
+    def _load_available_lists(self) -> None:
+        from app.services.ai_app import AIAppService
+
+        # 与不带分页参数的请求相同的缓存键
+        page = {"sort": "id", "order": "asc", "limit": None, "offset": 0, "cursor": None}
+        db = self._session()
+        try:
+            AIAppService.get_available_agents(db, **page)
+            AIAppService.get_available_mcps(db, **page)
+        finally:
+            db.close()
+
+    def _build_indexes(self) -> None:
+        from app.services.agent_router import agent_router
+        from app.services.search_service import search_service
+
+        db = self._session()
+        try:
+            if search_service.backend_for(db) == "memory":
+                search_service.ensure_index(db)
+        finally:
+            db.close()
+        agent_router.ensure_index()
+
+    def _build_stats(self) -> None:
+        from app.services.stats_service import stats_service
+
+        stats_service.ensure_built()
+
+
+class Readiness:
+    """就绪状态：各项检查都通过且未进入退出流程"""
+
+    def __init__(self, warmup: Warmup, engine=None):
+        self.warmup = warmup
+        self.engine = engine
+        self.draining = False
+
+    def check(self) -> Tuple[bool, Dict[str, Any]]:
+        checks = {
+            "database": check_database(self.engine),
+            "schema": check_schema(self.engine),
+            "warmup": self.warmup.status(),
+        }
+        ready = not self.draining and all(check["ok"] for check in checks.values())
+        return ready, {"status": "ready" if ready else ("draining" if self.draining else "not_ready"), "checks": checks}
+
+
+warmup = Warmup(hot_apps=settings.WARMUP_HOT_APPS)
+readiness = Readiness(warmup)
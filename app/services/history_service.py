@@ -0,0 +1,203 @@
+"""
+变更历史
+
+服务层在更新提交后计算字段级差异，交给 HistoryBuffer 异步批量写入
+change_history 表，不增加更新请求的写延迟：
+
+- 缓冲区满 batch_size 条或距上次写入超过 flush_interval 秒时写入一批
+- 队列有界（max_queue 条），入队不阻塞调用方（更新请求可能在事件循环中）；
+  写入线程跟不上导致队列写满时丢弃新记录并计数（dropped），内存占用有上限，
+  已入队的记录按入队顺序写入
+- 进程崩溃时丢失尚未写入的记录：正常负载下是一个 flush_interval 内的记录，
+  最多为队列中的 max_queue 条加上正在写入的一批；正常退出时 stop() 会写完剩余记录
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.change_history import ChangeHistory
+
+logger = logging.getLogger(__name__)
+
+# 敏感字段只记录发生了变更，不记录取值
+MASKED_FIELDS = {"api_key"}
+MASK = "******"
+
+
+def _stringify(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def diff_fields(before: Dict[str, Any], after: Dict[str, Any]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """比较更新前后的字段值，返回 [(字段, 旧值, 新值)]，只包含实际变化的字段"""
+    changes = []
+    for field, new_value in after.items():
+        old_value = _stringify(before.get(field))
+        new_value = _stringify(new_value)
+        if old_value == new_value:
+            continue
+        if field in MASKED_FIELDS:
+            old_value, new_value = MASK, MASK
+        changes.append((field, old_value, new_value))
+    return changes
+
+
+class HistoryBuffer:
+    """变更历史的异步批量写入缓冲区"""
+
+    def __init__(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        engine=None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # 默认使用应用的数据库引擎
+        self.engine = engine
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def record(self, entity_type: str, entity_id: str, changes: List[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        """记录一次更新的字段差异"""
+        changed_at = datetime.now(timezone.utc)
+        rows = [
+            {
+                "entity_type": entity_type,
+                "entity_id": entity_id,
+                "field": field,
+                "old_value": old_value,
+                "new_value": new_value,
+                "changed_at": changed_at,
+            }
+            for field, old_value, new_value in changes
+        ]
+        if not rows:
+            return
+        if not self.running:
+            # 未启动后台线程（如脚本中直接调用服务层）时同步写入
+            self._write(rows)
+            return
+        for i, row in enumerate(rows):
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                # 写入线程跟不上：丢弃剩余记录，调用方不等待
+                self.dropped += len(rows) - i
+                logger.warning("变更历史队列已满，丢弃 %d 条记录（累计 %d 条）", len(rows) - i, self.dropped)
+                return
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="history-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余记录"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """同步写入队列中的全部记录，返回写入条数"""
+        total = 0
+        while True:
+            batch = self._drain(self.batch_size)
+            if not batch:
+                return total
+            self._write(batch)
+            total += len(batch)
+
+    def _run(self) -> None:
+        pending: List[Dict[str, Any]] = []
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.flush_interval
+            while len(pending) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0 or self._stop.is_set():
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=min(timeout, 0.1)))
+                except queue.Empty:
+                    continue
+                pending.extend(self._drain(self.batch_size - len(pending)))
+            if not pending:
+                continue
+            try:
+                self._write(pending)
+                pending = []
+            except Exception:
+                # 写入失败时保留这一批，下个周期重试；期间新记录在有界队列中等待
+                logger.exception("写入变更历史失败，%d 条记录将重试", len(pending))
+                self._stop.wait(self.flush_interval)
+        if pending:
+            try:
+                self._write(pending)
+            except Exception:
+                logger.exception("写入变更历史失败，丢弃 %d 条记录", len(pending))
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        from app.db.session import get_engine
+
+        with self._write_lock:
+            with (self.engine or get_engine()).begin() as connection:
+                connection.execute(ChangeHistory.__table__.insert(), rows)
+            self.written += len(rows)
+
+
+def get_history(db: Session, entity_type: str, entity_id: str, skip: int = 0, limit: int = 20) -> Dict[str, Any]:
+    """分页获取实体的变更历史，按时间倒序"""
+    query = db.query(ChangeHistory).filter(
+        ChangeHistory.entity_type == entity_type,
+        ChangeHistory.entity_id == entity_id
+    )
+    total = query.count()
+    items = query.order_by(ChangeHistory.id.desc()).offset(skip).limit(limit).all()
+    return {
+        "items": items,
+        "total": total,
+        "page": skip // limit + 1,
+        "size": limit
+    }
+
+
+history_buffer = HistoryBuffer(
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+    max_queue=settings.HISTORY_QUEUE_SIZE,
+)
@@ -0,0 +1,365 @@
+"""
+后台任务
+
+耗时的生成类或批量操作提交为任务后立即返回任务ID，由后台线程池执行：
+
+- 任务状态保存在 job 表：queued -> running -> succeeded / failed（或 cancelled）
+- 领取任务使用条件UPDATE（WHERE status='queued'），多个进程同时领取也只有一个成功
+- 执行失败时按指数退避推迟 run_after 后重新排队，超过 max_attempts 次后标记为 failed
+- 执行中的任务定期续租（locked_at）；进程退出或重启后，租约过期的任务重新排队，
+  因此处理函数需要是可重复执行的
+- 处理函数在事务之外执行，不占用数据库连接；需要访问数据库时自行打开会话
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+JobHandler = Callable[[Dict[str, Any]], Any]
+_handlers: Dict[str, JobHandler] = {}
+
+
+class UnknownJobType(ValueError):
+    """未注册的任务类型"""
+
+
+def job_handler(job_type: str):
+    """注册任务处理函数：接收 payload 字典，返回可JSON序列化的结果"""
+    def decorator(fn: JobHandler) -> JobHandler:
+        _handlers[job_type] = fn
+        return fn
+    return decorator
+
+
+def job_types() -> List[str]:
+    return sorted(_handlers)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def submit(db: Session, job_type: str, payload: Optional[Dict[str, Any]] = None, max_attempts: Optional[int] = None) -> Job:
+    """提交任务，返回排队中的任务"""
+    if job_type not in _handlers:
+        raise UnknownJobType(f"未知的任务类型: {job_type}，可选: {', '.join(job_types())}")
+    job = Job(
+        id=str(uuid.uuid4()),
+        type=job_type,
+        status="queued",
+        payload=json.dumps(payload or {}, ensure_ascii=False),
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=_now(),
+    )
+    db.add(job)
+    db.commit()
+    job_worker.notify()
+    return job
+
+
+def get_job(db: Session, job_id: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.id == job_id).first()
+
+
+def list_jobs(
+    db: Session,
+    status: Optional[str] = None,
+    job_type: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20
+) -> Dict[str, Any]:
+    query = db.query(Job)
+    if status:
+        query = query.filter(Job.status == status)
+    if job_type:
+        query = query.filter(Job.type == job_type)
+    total = query.count()
+    jobs = query.order_by(Job.created_at.desc(), Job.id).offset(skip).limit(limit).all()
+    return {
+        "jobs": jobs,
+        "total": total,
+        "page": skip // limit + 1,
+        "size": limit
+    }
+
+
+def cancel(db: Session, job_id: str) -> bool:
+    """取消排队中的任务，已开始执行的任务不能取消"""
+    updated = db.query(Job).filter(Job.id == job_id, Job.status == "queued").update(
+        {Job.status: "cancelled", Job.finished_at: _now()}, synchronize_session=False
+    )
+    db.commit()
+    return bool(updated)
+
+
+def backoff_delay(attempts: int, base: float, maximum: float) -> float:
+    """第 attempts 次失败后的重试等待时间：指数退避，附加最多10%的随机抖动"""
+    delay = min(maximum, base * (2 ** (attempts - 1)))
+    return delay * (1 + random.random() * 0.1)
+
+
+class JobWorker:
+    """任务执行线程池"""
+
+    def __init__(
+        self,
+        workers: int = 4,
+        poll_interval: float = 1.0,
+        lease_seconds: float = 60.0,
+        backoff: float = 2.0,
+        backoff_max: float = 300.0,
+        session_factory=None,
+    ):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        # 默认使用应用的会话工厂
+        self.session_factory = session_factory
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Condition()
+        self._running: Set[str] = set()
+        self._running_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def notify(self) -> None:
+        """唤醒一个空闲线程领取新任务"""
+        with self._wake:
+            self._wake.notify()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._maintain, name="job-lease", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止领取新任务，等待执行中的任务结束"""
+        self._stop.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_pending(self, limit: Optional[int] = None) -> int:
+        """在当前线程中执行已到期的任务（脚本和测试使用），返回执行的任务数"""
+        count = 0
+        while limit is None or count < limit:
+            job = self._claim()
+            if job is None:
+                return count
+            self._execute(job)
+            count += 1
+        return count
+
+    def recover_expired(self) -> int:
+        """租约过期的执行中任务重新排队，返回数量"""
+        db = self._session()
+        try:
+            updated = db.query(Job).filter(
+                Job.status == "running",
+                Job.locked_at < _now() - timedelta(seconds=self.lease_seconds)
+            ).update({
+                Job.status: "queued",
+                Job.locked_by: None,
+                Job.error: "worker租约过期，重新排队",
+            }, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if updated:
+            logger.warning("%d 个任务的租约已过期，重新排队", updated)
+            with self._wake:
+                self._wake.notify_all()
+        return updated
+
+    def _session(self) -> Session:
+        if self.session_factory is None:
+            from app.db.session import get_session_factory
+            return get_session_factory()()
+        return self.session_factory()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = self._claim()
+            except Exception:
+                logger.exception("领取任务失败")
+                job = None
+            if job is None:
+                with self._wake:
+                    self._wake.wait(self.poll_interval)
+                continue
+            try:
+                self._execute(job)
+            except Exception:
+                # 写入结果失败（如数据库短暂不可用）时线程继续运行，任务在租约过期后重新排队
+                logger.exception("任务 %s 结果写入失败", job["id"])
+
+    def _maintain(self) -> None:
+        """续租执行中的任务，回收其他worker过期的租约"""
+        # 启动时立即回收一次，重启前未完成的任务不必等待一个维护周期
+        interval = self.lease_seconds / 3
+        while True:
+            try:
+                self._renew()
+                self.recover_expired()
+            except Exception:
+                logger.exception("任务租约维护失败")
+            if self._stop.wait(interval):
+                return
+
+    def _renew(self) -> None:
+        with self._running_lock:
+            running = list(self._running)
+        if not running:
+            return
+        db = self._session()
+        try:
+            db.query(Job).filter(Job.id.in_(running), Job.locked_by == self.worker_id).update(
+                {Job.locked_at: _now()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """领取一个到期的任务，返回任务数据；没有可执行的任务时返回 None"""
+        db = self._session()
+        try:
+            now = _now()
+            candidates = [row.id for row in db.query(Job.id).filter(
+                Job.status == "queued",
+                Job.run_after <= now
+            ).order_by(Job.run_after).limit(self.workers * 2)]
+            # 多个worker可能选中同一批任务，打乱顺序减少冲突
+            random.shuffle(candidates)
+            for job_id in candidates:
+                claimed = db.query(Job).filter(Job.id == job_id, Job.status == "queued").update({
+                    Job.status: "running",
+                    Job.locked_by: self.worker_id,
+                    Job.locked_at: now,
+                    Job.attempts: Job.attempts + 1,
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    row = db.query(Job.id, Job.type, Job.payload, Job.attempts, Job.max_attempts).filter(Job.id == job_id).one()
+                    with self._running_lock:
+                        self._running.add(job_id)
+                    return dict(row._mapping)
+            return None
+        finally:
+            db.close()
+
+    def _execute(self, job: Dict[str, Any]) -> None:
+        try:
+            handler = _handlers.get(job["type"])
+            if handler is None:
+                raise UnknownJobType(f"未知的任务类型: {job['type']}")
+            result = handler(json.loads(job["payload"] or "{}"))
+        except Exception as e:
+            logger.warning("任务 %s 第 %d 次执行失败: %s", job["id"], job["attempts"], e)
+            self._finish_failed(job, f"{type(e).__name__}: {e}")
+        else:
+            self._finish(job["id"], {
+                Job.status: "succeeded",
+                Job.result: json.dumps(result, ensure_ascii=False, default=str),
+                Job.error: None,
+                Job.finished_at: _now(),
+            })
+            self.completed += 1
+        finally:
+            with self._running_lock:
+                self._running.discard(job["id"])
+
+    def _finish_failed(self, job: Dict[str, Any], error: str) -> None:
+        if job["attempts"] >= job["max_attempts"]:
+            self._finish(job["id"], {Job.status: "failed", Job.error: error, Job.finished_at: _now()})
+            self.failed += 1
+            return
+        delay = backoff_delay(job["attempts"], self.backoff, self.backoff_max)
+        self._finish(job["id"], {
+            Job.status: "queued",
+            Job.error: error,
+            Job.run_after: _now() + timedelta(seconds=delay),
+        })
+
+    def _finish(self, job_id: str, values: Dict[Any, Any]) -> None:
+        db = self._session()
+        try:
+            # 只更新自己持有的任务，租约过期被其他worker接手后不覆盖其状态
+            db.query(Job).filter(
+                Job.id == job_id, Job.status == "running", Job.locked_by == self.worker_id
+            ).update({**values, Job.locked_by: None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+
+job_worker = JobWorker(
+    workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    backoff=settings.JOB_BACKOFF_SECONDS,
+    backoff_max=settings.JOB_BACKOFF_MAX,
+)
+
+
+@job_handler("generate_system_prompt")
+def _generate_system_prompt(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.schemas.ai_app import GenerateSystemPromptRequest
+    from app.services.ai_app import AIAppService
+
+    request = GenerateSystemPromptRequest.model_validate(payload)
+    return {"system_prompt": AIAppService.generate_system_prompt(request)}
+
+
+@job_handler("bulk_publish")
+def _bulk_publish(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """批量发布AI应用；配置未变化时发布是幂等的，任务重试不会产生重复版本"""
+    from app.db.session import get_session_factory
+    from app.services import app_version_service
+
+    published, errors = {}, {}
+    db = get_session_factory()()
+    try:
+        for app_id in payload.get("app_ids", []):
+            try:
+                version = app_version_service.publish(db, app_id, payload.get("note"))
+                published[app_id] = version.version
+            except app_version_service.VersionNotFound as e:
+                db.rollback()
+                errors[app_id] = str(e)
+    finally:
+        db.close()
+    return {"published": published, "errors": errors}
@@ -0,0 +1,257 @@
+"""
+大模型调用
+
+按 LLMConfig/MCP 的 provider 选择实现，请求和响应均为 OpenAI chat completions 格式：
+
+- openai: 调用 OpenAI 兼容的 /chat/completions 接口（LLM_OPENAI_API_BASE）
+- simulator: 进程内的大模型模拟器（见 llm_simulator），不访问外部服务，用于测试和压测
+
+chat/stream_chat 按顺序尝试多个配置（如AI应用的 llm_config）：限流、服务端错误、超时和连接失败时换下一个，
+流式调用只在产出第一个chunk之前切换。传入 app_id 时每次尝试都计入用量，已采样的请求中每次尝试记录一个 client span。
+也可以用 register_provider 注册其他实现。
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+from app.config import settings
+from app.core.tracing import client_span, inject
+from app.schemas.ai_app import LLMConfig
+from app.services.conversation_service import estimate_tokens
+from app.services.llm_simulator import LLMSimulator, SimulatorError, simulator
+from app.services.usage_service import usage_meter
+
+# 换下一个配置重试的HTTP状态码
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """调用失败；retryable 为 True 时可以换下一个配置重试"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ChatProvider:
+    """chat completions 接口"""
+
+    def complete(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def stream(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Iterator[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+def build_request(config: LLMConfig, messages: List[Dict[str, Any]], stream: bool = False) -> Dict[str, Any]:
+    body = {
+        "model": config.model,
+        "messages": messages,
+        "temperature": config.temperature,
+        "max_tokens": config.max_tokens,
+    }
+    if stream:
+        body["stream"] = True
+        body["stream_options"] = {"include_usage": True}
+    return body
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数，无法解析时返回 None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(0.0, seconds) if math.isfinite(seconds) else None
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+
+def http_error(response) -> LLMError:
+    """HTTP错误响应转换为 LLMError"""
+    return LLMError(
+        f"HTTP {response.status_code}: {response.text[:200]}", response.status_code,
+        response.status_code in RETRYABLE_STATUS, parse_retry_after(response.headers.get("Retry-After")),
+    )
+
+
+class OpenAIProvider(ChatProvider):
+    """OpenAI 兼容的 /chat/completions 接口"""
+
+    def __init__(self, api_base: str):
+        self.api_base = api_base.rstrip("/")
+
+    def _post(self, config: LLMConfig, body: Dict[str, Any], timeout: float):
+        import requests
+
+        headers = {"Authorization": f"Bearer {config.api_key}"} if config.api_key else {}
+        try:
+            response = requests.post(
+                f"{self.api_base}/chat/completions", headers=inject(headers), json=body,
+                timeout=timeout, stream=body.get("stream", False),
+            )
+        except requests.Timeout as e:
+            raise LLMError(f"请求超时: {e}", retryable=True)
+        except requests.ConnectionError as e:
+            raise LLMError(f"连接失败: {e}", retryable=True)
+        if response.status_code >= 400:
+            raise http_error(response)
+        return response
+
+    def complete(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        return self._post(config, build_request(config, messages), timeout).json()
+
+    def stream(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Iterator[Dict[str, Any]]:
+        import requests
+
+        response = self._post(config, build_request(config, messages, stream=True), timeout)
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                yield json.loads(data)
+        except requests.RequestException as e:
+            raise LLMError(f"读取流式响应失败: {e}", retryable=True)
+        finally:
+            response.close()
+
+
+class SimulatorProvider(ChatProvider):
+    """进程内的大模型模拟器"""
+
+    def __init__(self, llm_simulator: LLMSimulator):
+        self.simulator = llm_simulator
+
+    def complete(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Dict[str, Any]:
+        try:
+            return self.simulator.run(build_request(config, messages), timeout)
+        except SimulatorError as e:
+            raise _simulator_error(e)
+
+    def stream(self, config: LLMConfig, messages: List[Dict[str, Any]], timeout: float) -> Iterator[Dict[str, Any]]:
+        try:
+            yield from self.simulator.stream(build_request(config, messages, stream=True), timeout)
+        except SimulatorError as e:
+            raise _simulator_error(e)
+
+
+def _simulator_error(e: SimulatorError) -> LLMError:
+    return LLMError(f"HTTP {e.status}: {e.message}", e.status, e.status in RETRYABLE_STATUS, e.retry_after)
+
+
+_PROVIDERS: Dict[str, Callable[[], ChatProvider]] = {
+    "openai": lambda: OpenAIProvider(settings.LLM_OPENAI_API_BASE),
+    "simulator": lambda: SimulatorProvider(simulator),
+}
+
+
+def register_provider(name: str, factory: Callable[[], ChatProvider]) -> None:
+    _PROVIDERS[name] = factory
+
+
+def get_provider(name: str) -> ChatProvider:
+    if name not in _PROVIDERS:
+        raise ValueError(f"未知的大模型提供商: {name}，可选: {', '.join(_PROVIDERS)}")
+    return _PROVIDERS[name]()
+
+
+def _configs(configs: List[Union[LLMConfig, Dict[str, Any]]]) -> List[LLMConfig]:
+    configs = [config if isinstance(config, LLMConfig) else LLMConfig(**config) for config in configs]
+    if not configs:
+        raise ValueError("没有可用的大模型配置")
+    return configs
+
+
+def _track(config: LLMConfig, app_id: Optional[str], user_id: Optional[str]):
+    if app_id is None:
+        return _NoopUsage()
+    return usage_meter.track(app_id, config.provider, config.model, user_id)
+
+
+class _NoopUsage:
+    def __enter__(self) -> Dict[str, int]:
+        return {"prompt_tokens": 0, "completion_tokens": 0}
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+def _span_attributes(config: LLMConfig, stream: bool, attempt: int) -> Dict[str, Any]:
+    return {"llm.provider": config.provider, "llm.model": config.model, "llm.stream": stream, "llm.attempt": attempt}
+
+
+def chat(
+    configs: List[Union[LLMConfig, Dict[str, Any]]],
+    messages: List[Dict[str, Any]],
+    app_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """非流式调用，返回 chat.completion；全部配置都失败时抛出最后一个 LLMError"""
+    configs = _configs(configs)
+    timeout = timeout or settings.LLM_REQUEST_TIMEOUT
+    for attempt, config in enumerate(configs):
+        provider = get_provider(config.provider)
+        try:
+            with client_span("llm chat", _span_attributes(config, False, attempt)) as span, \
+                    _track(config, app_id, user_id) as usage:
+                response = provider.complete(config, messages, timeout)
+                usage.update({key: response.get("usage", {}).get(key, 0) for key in ("prompt_tokens", "completion_tokens")})
+                span.set_attribute("llm.completion_tokens", usage["completion_tokens"])
+            return response
+        except LLMError as e:
+            if not e.retryable or attempt == len(configs) - 1:
+                raise
+
+
+def stream_chat(
+    configs: List[Union[LLMConfig, Dict[str, Any]]],
+    messages: List[Dict[str, Any]],
+    app_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """流式调用，逐个产出 chat.completion.chunk；产出第一个chunk之后的失败不再切换配置"""
+    configs = _configs(configs)
+    timeout = timeout or settings.LLM_REQUEST_TIMEOUT
+    for attempt, config in enumerate(configs):
+        provider = get_provider(config.provider)
+        started = False
+        start = time.perf_counter()
+        try:
+            with client_span("llm stream", _span_attributes(config, True, attempt)) as span, \
+                    _track(config, app_id, user_id) as usage:
+                for chunk in provider.stream(config, messages, timeout):
+                    if not started:
+                        started = True
+                        span.set_attribute("llm.ttft_ms", round((time.perf_counter() - start) * 1000, 3))
+                    if chunk.get("usage"):
+                        usage.update({key: chunk["usage"].get(key, 0) for key in ("prompt_tokens", "completion_tokens")})
+                    elif chunk.get("choices") and chunk["choices"][0].get("delta", {}).get("content"):
+                        usage["completion_tokens"] += 1
+                    yield chunk
+                if not usage["prompt_tokens"]:
+                    usage["prompt_tokens"] = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+            return
+        except LLMError as e:
+            if started or not e.retryable or attempt == len(configs) - 1:
+                raise
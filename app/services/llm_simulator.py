@@ -0,0 +1,316 @@
+"""
+大模型模拟器
+
+OpenAI 兼容的 chat completions 模拟实现，用于压测和故障测试，不访问真实的大模型：
+
+- 延迟：首token延迟（TTFT）和token间延迟（ITL）按配置的分布采样，如 `fixed:0.05`、`uniform:0.1,0.3`、
+  `normal:0.02,0.005`、`lognormal:0.3,0.5`（中位数, sigma）、`exponential:0.2`（均值），单位为秒
+- 故障：按比例注入服务端错误（500）、限流（429 + Retry-After）和超时（挂起 hang_seconds 秒），
+  也可以按每分钟请求数（rpm）限流
+- 确定性：输出内容只由请求（模型、消息、max_tokens）决定；延迟和故障由以 seed 初始化的随机数序列决定，
+  同样的调用顺序得到同样的结果
+
+模型名可以带参数覆盖默认配置，便于为不同的MCP/LLMConfig配置不同的故障：
+`gpt-4o?error_rate=0.2&ttft=fixed:0.5`。可用的参数见 PROFILE_FIELDS。
+
+同一次调用先用 plan() 决定结果和每个token的延迟，再由同步（run/stream）或异步（HTTP接口）的执行器
+按计划等待，两种方式的行为一致。
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from app.config import settings
+from app.services.conversation_service import estimate_tokens
+
+WORDS = (
+    "the", "model", "simulated", "response", "token", "stream", "latency", "request", "platform", "agent",
+    "answer", "context", "system", "user", "result", "data", "value", "query", "tool", "output",
+)
+
+
+class SimulatorError(Exception):
+    """模拟的失败响应，status 为对应的HTTP状态码"""
+
+    def __init__(self, status: int, code: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": {"message": self.message, "type": self.code, "code": self.code}}
+
+
+class Distribution:
+    """延迟分布，按 `名称:参数` 解析"""
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        name, _, params = spec.partition(":")
+        if not params:
+            name, params = "fixed", name
+        try:
+            args = [float(p) for p in params.split(",")]
+        except ValueError:
+            raise ValueError(f"无效的延迟分布: {spec}")
+        samplers: Dict[str, Tuple[int, Callable[[random.Random], float]]] = {
+            "fixed": (1, lambda rng: args[0]),
+            "uniform": (2, lambda rng: rng.uniform(args[0], args[1])),
+            "normal": (2, lambda rng: rng.gauss(args[0], args[1])),
+            "lognormal": (2, lambda rng: rng.lognormvariate(math.log(args[0]), args[1]) if args[0] > 0 else 0.0),
+            "exponential": (1, lambda rng: rng.expovariate(1 / args[0]) if args[0] > 0 else 0.0),
+        }
+        if name not in samplers or len(args) != samplers[name][0]:
+            raise ValueError(f"无效的延迟分布: {spec}，可选: fixed:s, uniform:a,b, normal:mean,std, lognormal:median,sigma, exponential:mean")
+        self._sample = samplers[name][1]
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self._sample(rng))
+
+
+# 模型名中可以覆盖的参数 -> 类型
+PROFILE_FIELDS: Dict[str, Callable[[str], Any]] = {
+    "ttft": Distribution,
+    "itl": Distribution,
+    "output_tokens": int,
+    "error_rate": float,
+    "timeout_rate": float,
+    "rate_limit_rate": float,
+    "rpm": int,
+    "hang_seconds": float,
+}
+
+
+class SimulatorProfile:
+    """一个模型的延迟和故障配置"""
+
+    def __init__(
+        self,
+        ttft: str = "lognormal:0.3,0.5",
+        itl: str = "normal:0.02,0.005",
+        output_tokens: int = 64,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        rpm: int = 0,
+        hang_seconds: float = 600.0,
+    ):
+        self.ttft = ttft if isinstance(ttft, Distribution) else Distribution(ttft)
+        self.itl = itl if isinstance(itl, Distribution) else Distribution(itl)
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.hang_seconds = hang_seconds
+
+    def override(self, params: Dict[str, str]) -> "SimulatorProfile":
+        values = dict(vars(self))
+        for key, value in params.items():
+            if key not in PROFILE_FIELDS:
+                raise ValueError(f"未知的模拟器参数: {key}，可选: {', '.join(PROFILE_FIELDS)}")
+            values[key] = PROFILE_FIELDS[key](value)
+        return SimulatorProfile(**values)
+
+
+def split_model(model: str) -> Tuple[str, Dict[str, str]]:
+    """`gpt-4o?error_rate=0.2` -> ("gpt-4o", {"error_rate": "0.2"})"""
+    name, _, query = model.partition("?")
+    return name, dict(parse_qsl(query, keep_blank_values=True))
+
+
+class SimulationPlan:
+    """一次调用的计划：失败时 error 不为空，delay 秒后失败；成功时按 delays 依次输出 tokens"""
+
+    def __init__(self, request_id: str, model: str, created: int):
+        self.request_id = request_id
+        self.model = model
+        self.created = created
+        self.error: Optional[SimulatorError] = None
+        self.delay = 0.0
+        self.tokens: List[str] = []
+        self.delays: List[float] = []
+        self.prompt_tokens = 0
+        self.finish_reason = "stop"
+
+    @property
+    def usage(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": len(self.tokens),
+            "total_tokens": self.prompt_tokens + len(self.tokens),
+        }
+
+    def completion(self) -> Dict[str, Any]:
+        return {
+            "id": self.request_id,
+            "object": "chat.completion",
+            "created": self.created,
+            "model": self.model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(self.tokens)},
+                "finish_reason": self.finish_reason,
+            }],
+            "usage": self.usage,
+        }
+
+    def chunk(self, delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: bool = False) -> Dict[str, Any]:
+        chunk = {
+            "id": self.request_id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            chunk["usage"] = self.usage
+        return chunk
+
+    def chunks(self) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """(等待秒数, chunk)：第一个chunk带角色和第一个token，最后一个chunk带 finish_reason 和 usage"""
+        for i, (delay, token) in enumerate(zip(self.delays, self.tokens)):
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            yield delay, self.chunk(delta)
+        yield 0.0, self.chunk({}, self.finish_reason, usage=True)
+
+
+class LLMSimulator:
+    """按配置模拟 chat completions；可在多个线程中共用"""
+
+    def __init__(self, profile: Optional[SimulatorProfile] = None, seed: int = 0, clock: Callable[[], float] = time.monotonic):
+        self.profile = profile or SimulatorProfile()
+        self.seed = seed
+        self.clock = clock
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, SimulatorProfile] = {}
+        # 模型 -> (可用请求数, 上次补充时间)，按 rpm 匀速补充
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self.calls = 0
+
+    def profile_for(self, model: str) -> SimulatorProfile:
+        profile = self._profiles.get(model)
+        if profile is None:
+            _, params = split_model(model)
+            profile = self.profile.override(params) if params else self.profile
+            self._profiles[model] = profile
+        return profile
+
+    def models(self) -> List[str]:
+        """调用过的模型名（不含参数）"""
+        return sorted({split_model(model)[0] for model in list(self._profiles)})
+
+    def plan(self, request: Dict[str, Any]) -> SimulationPlan:
+        """按请求体（OpenAI chat completions 格式）决定这次调用的结果，不等待"""
+        model = request.get("model") or "simulator"
+        messages = request.get("messages") or []
+        profile = self.profile_for(model)
+        plan = SimulationPlan(f"chatcmpl-{uuid.uuid4().hex[:24]}", model, int(time.time()))
+        plan.prompt_tokens = sum(estimate_tokens(str(m.get("content") or "")) for m in messages)
+
+        with self._lock:
+            self.calls += 1
+            rng = self._rng
+            retry_after = self._take_rate_limit(model, profile.rpm)
+            draw = rng.random()
+            ttft = profile.ttft.sample(rng)
+            max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+            count = profile.output_tokens if not max_tokens else min(profile.output_tokens, int(max_tokens))
+            delays = [ttft] + [profile.itl.sample(rng) for _ in range(max(count - 1, 0))]
+
+        if retry_after is not None:
+            plan.error = SimulatorError(429, "rate_limit_exceeded", "模拟限流：超过每分钟请求数", retry_after)
+            return plan
+        if draw < profile.rate_limit_rate:
+            plan.error = SimulatorError(429, "rate_limit_exceeded", "模拟限流", 1.0)
+            return plan
+        draw -= profile.rate_limit_rate
+        if draw < profile.error_rate:
+            plan.error = SimulatorError(500, "server_error", "模拟的服务端错误")
+            plan.delay = ttft
+            return plan
+        draw -= profile.error_rate
+        if draw < profile.timeout_rate:
+            plan.error = SimulatorError(504, "timeout", "模拟的超时")
+            plan.delay = profile.hang_seconds
+            return plan
+
+        plan.tokens = self._tokens(model, messages, count)
+        plan.delays = delays
+        if max_tokens and count == int(max_tokens) and count < profile.output_tokens:
+            plan.finish_reason = "length"
+        return plan
+
+    def run(self, request: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """同步执行一次非流式调用，失败时抛出 SimulatorError"""
+        plan = self.plan(request)
+        if plan.error is not None:
+            _wait(plan.delay, timeout)
+            raise plan.error
+        _wait(sum(plan.delays), timeout)
+        return plan.completion()
+
+    def stream(self, request: Dict[str, Any], timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """同步执行一次流式调用，逐个产出chunk；失败时在首token前抛出 SimulatorError"""
+        plan = self.plan(request)
+        if plan.error is not None:
+            _wait(plan.delay, timeout)
+            raise plan.error
+        for delay, chunk in plan.chunks():
+            _wait(delay, timeout)
+            yield chunk
+
+    def _take_rate_limit(self, model: str, rpm: int) -> Optional[float]:
+        """按 rpm 取一个请求配额，超过时返回需要等待的秒数"""
+        if rpm <= 0:
+            return None
+        now = self.clock()
+        available, updated = self._buckets.get(model, (float(rpm), now))
+        available = min(float(rpm), available + (now - updated) * rpm / 60.0)
+        if available < 1:
+            self._buckets[model] = (available, now)
+            return (1 - available) * 60.0 / rpm
+        self._buckets[model] = (available - 1, now)
+        return None
+
+    def _tokens(self, model: str, messages: List[Dict[str, Any]], count: int) -> List[str]:
+        """由请求内容决定的输出"""
+        name, _ = split_model(model)
+        key = json.dumps([self.seed, name, messages], ensure_ascii=False, sort_keys=True, default=str)
+        rng = random.Random(hashlib.sha256(key.encode("utf-8")).digest())
+        return [("" if i == 0 else " ") + rng.choice(WORDS) for i in range(count)]
+
+
+def _wait(seconds: float, timeout: Optional[float]) -> None:
+    """等待 seconds 秒；超过 timeout 时等到 timeout 后抛出超时"""
+    if timeout is not None and seconds > timeout:
+        time.sleep(timeout)
+        raise SimulatorError(504, "timeout", f"等待响应超过 {timeout} 秒")
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def default_profile() -> SimulatorProfile:
+    return SimulatorProfile(
+        ttft=settings.LLM_SIMULATOR_TTFT,
+        itl=settings.LLM_SIMULATOR_ITL,
+        output_tokens=settings.LLM_SIMULATOR_OUTPUT_TOKENS,
+        error_rate=settings.LLM_SIMULATOR_ERROR_RATE,
+        timeout_rate=settings.LLM_SIMULATOR_TIMEOUT_RATE,
+        rate_limit_rate=settings.LLM_SIMULATOR_RATE_LIMIT_RATE,
+        rpm=settings.LLM_SIMULATOR_RPM,
+        hang_seconds=settings.LLM_SIMULATOR_HANG_SECONDS,
+    )
+
+
+simulator = LLMSimulator(default_profile(), seed=settings.LLM_SIMULATOR_SEED)
@@ -1,8 +1,21 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from app.models.mcp import MCP
-from app.schemas.mcp import MCPCreate, MCPUpdate
+from app.schemas.mcp import MCPCreate, MCPUpdate, MCPOut
+from app.core.cache import response_cache
+from app.core.events import publish_event, record_change
+from app.core.tracing import traced
+from app.services.history_service import diff_fields, history_buffer
+from app.services.pagination import paginate
+from app.services.stats_service import stat_fields
+from app.services.streaming import stream_query
 import json
 
+# 可排序字段，均有 (字段, id) 复合索引（provider 为 ix_mcp_provider，
+# ix_mcp_provider_model 中间隔着 model，不能用于按 provider 排序和游标分页）
+MCP_SORT_COLUMNS = {"id": MCP.id, "name": MCP.name, "provider": MCP.provider, "model": MCP.model}
+
+@traced
 def create_mcp(db: Session, data: MCPCreate):
     db_mcp = MCP(
         id=data.id,
@@ -14,30 +27,80 @@ def create_mcp(db: Session, data: MCPCreate):
         tool_plugins=json.dumps(data.tool_plugins)
     )
     db.add(db_mcp)
+    event = record_change(db, "mcp", db_mcp.id, "create", stats=stat_fields("mcp", db_mcp))
     db.commit()
     db.refresh(db_mcp)
+    publish_event(event)
     return db_mcp
 
-def get_mcps(db: Session):
-    return db.query(MCP).all()
+def filter_mcps(query, provider: Optional[str] = None, model: Optional[str] = None):
+    if provider:
+        query = query.filter(MCP.provider == provider)
+    if model:
+        query = query.filter(MCP.model == model)
+    return query
+
+@traced
+def get_mcps(
+    db: Session,
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    sort: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+):
+    """分页获取MCP列表，返回 (当前页, 下一页游标)"""
+    query = filter_mcps(db.query(MCP), provider, model)
+    return paginate(query, MCP_SORT_COLUMNS, MCP.id, sort, order, limit, offset, cursor)
+
+@traced
+def count_mcps(db: Session, **filters) -> int:
+    return filter_mcps(db.query(MCP), **filters).count()
+
+def stream_mcps(fmt: str = "json", **filters):
+    """流式导出全部MCP（按id排序），不包含api_key"""
+    def query_factory(db: Session):
+        return filter_mcps(db.query(MCP), **filters).order_by(MCP.id)
+
+    return stream_query(query_factory, lambda mcp: MCPOut.model_validate(mcp).model_dump_json().encode(), fmt)
+
+@traced
+def get_mcp_out(db: Session, mcp_id: str):
+    """获取单个MCP的响应数据，结果缓存直到该MCP变更"""
+    def load():
+        mcp = db.query(MCP).filter(MCP.id == mcp_id).first()
+        return MCPOut.model_validate(mcp) if mcp else None
+
+    return response_cache.get_or_load(("mcp", mcp_id), load, tags=[("mcp", mcp_id)])
 
+@traced
 def update_mcp(db: Session, mcp_id: str, data: MCPUpdate):
     db_mcp = db.query(MCP).filter(MCP.id == mcp_id).first()
     if not db_mcp:
         return None
-    for field, value in data.dict(exclude_unset=True).items():
-        if field == "tool_plugins":
-            setattr(db_mcp, field, json.dumps(value))
-        else:
-            setattr(db_mcp, field, value)
+    update_data = data.dict(exclude_unset=True)
+    if "tool_plugins" in update_data:
+        update_data["tool_plugins"] = json.dumps(update_data["tool_plugins"])
+    before = {field: getattr(db_mcp, field) for field in update_data}
+    for field, value in update_data.items():
+        setattr(db_mcp, field, value)
+    event = record_change(db, "mcp", mcp_id, "update", stats=stat_fields("mcp", db_mcp))
     db.commit()
     db.refresh(db_mcp)
+    history_buffer.record("mcp", mcp_id, diff_fields(before, update_data))
+    publish_event(event)
     return db_mcp
 
+@traced
 def delete_mcp(db: Session, mcp_id: str):
     db_mcp = db.query(MCP).filter(MCP.id == mcp_id).first()
     if not db_mcp:
         return None
     db.delete(db_mcp)
+    # 删除记录即增量同步中的墓碑
+    event = record_change(db, "mcp", mcp_id, "delete")
     db.commit()
+    publish_event(event)
     return True
@@ -0,0 +1,98 @@
+"""
+列表分页工具
+
+支持两种分页方式：
+- offset: 传统的 offset/limit，适合跳页
+- cursor: 基于 (排序字段, id) 的键集分页，翻页代价与页码无关；
+  游标为不透明的base64字符串，由上一页响应给出
+
+不指定 limit 也不带游标时不分页，返回全部数据，与增加分页之前的列表接口一致。
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class InvalidPageRequest(ValueError):
+    """排序字段或游标不合法"""
+
+
+def encode_cursor(sort: str, order: str, values: List[Any]) -> str:
+    payload = json.dumps({"s": sort, "o": order, "v": values}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["v"]
+    except Exception:
+        raise InvalidPageRequest("无效的游标")
+    if payload.get("s") != sort or payload.get("o") != order:
+        raise InvalidPageRequest("游标与当前排序方式不一致")
+    return values
+
+
+def paginate(
+    query,
+    sort_columns: Dict[str, Any],
+    id_column,
+    sort: str = "id",
+    order: str = "asc",
+    limit: Optional[int] = None,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    对查询排序并取一页，返回 (当前页数据, 下一页游标)。
+    query 返回的每一行都需要能取到排序字段和 id（ORM对象或带同名列的Row）。
+    没有更多数据时下一页游标为 None；limit 为 None 时不带游标返回全部数据，带游标每页 DEFAULT_LIMIT 条。
+    """
+    if sort not in sort_columns:
+        raise InvalidPageRequest(f"不支持的排序字段: {sort}，可选: {', '.join(sort_columns)}")
+    if order not in ("asc", "desc"):
+        raise InvalidPageRequest("order 只能是 asc 或 desc")
+
+    sort_column = sort_columns[sort]
+    descending = order == "desc"
+    columns = [sort_column] if sort_column is id_column else [sort_column, id_column]
+
+    if cursor:
+        values = decode_cursor(cursor, sort, order)
+        if len(values) != len(columns):
+            raise InvalidPageRequest("无效的游标")
+        query = query.filter(_after(columns, values, descending))
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if offset and not cursor:
+        # offset 必须在 order_by 之后
+        query = query.offset(offset)
+    if limit is None and not cursor:
+        return query.all(), None
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, order, [getattr(last, column.key) for column in columns])
+    return rows, next_cursor
+
+
+def _after(columns, values, descending: bool):
+    """键集条件：(sort, id) 严格位于游标之后，展开为索引友好的 OR 形式"""
+    if len(columns) == 1:
+        return columns[0] < values[0] if descending else columns[0] > values[0]
+    sort_column, id_column = columns
+    sort_value, id_value = values
+    if descending:
+        return or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < id_value))
+    return or_(sort_column > sort_value, and_(sort_column == sort_value, id_column > id_value))
@@ -0,0 +1,166 @@
+"""
+系统提示词渲染
+
+AI应用的 system_prompt 是模板（语法见 app.core.template），同一个应用按调用方传入的变量和语言
+渲染出不同的提示词，不需要为每个用户保存一份应用。可用的变量：
+
+- 调用方传入的变量（如 user），与内置变量重名时以内置变量为准
+- app：应用的 id、name、identifier、description、app_type、user_id
+- agents：agent_list，每项有 agent_id、name、description
+- mcps：mcp_list，每项有 mcp_id、name、description（custom_description 优先）
+- locale：请求的语言
+
+内置片段（`{% include "..." %}`）：
+- agents、mcps：带描述的Agent/MCP列表
+- agent:<agent_id>、mcp:<mcp_id>：单个Agent/MCP的描述，原样插入
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from app.core.template import Template, compile_template, literal, normalize_locale
+from app.config import settings
+
+AGENTS_PARTIAL = """\
+{% if agents %}
+{% locale "zh" %}
+可用的Agent：
+{% for agent in agents %}
+- {{ agent.name }}{% if agent.description %}：{{ agent.description }}{% endif %}
+{% endfor %}
+{% endlocale %}
+{% locale "en" %}
+Available agents:
+{% for agent in agents %}
+- {{ agent.name }}{% if agent.description %}: {{ agent.description }}{% endif %}
+{% endfor %}
+{% endlocale %}
+{% endif %}
+"""
+
+MCPS_PARTIAL = """\
+{% if mcps %}
+{% locale "zh" %}
+可用的MCP工具：
+{% for mcp in mcps %}
+- {{ mcp.name }}{% if mcp.description %}：{{ mcp.description }}{% endif %}
+{% endfor %}
+{% endlocale %}
+{% locale "en" %}
+Available MCP tools:
+{% for mcp in mcps %}
+- {{ mcp.name }}{% if mcp.description %}: {{ mcp.description }}{% endif %}
+{% endfor %}
+{% endlocale %}
+{% endif %}
+"""
+
+BUILTIN_PARTIALS = {"agents": AGENTS_PARTIAL, "mcps": MCPS_PARTIAL}
+
+# 自动生成系统提示词使用的模板
+GENERATE_TEMPLATE = """\
+{% locale "zh" %}
+你是一个名为'{{ app.name }}'的AI应用。
+{% if app.description %}
+应用描述：{{ app.description }}
+{% endif %}
+{% if agents %}
+可用的Agent：{{ agents | map("name") | join(", ") }}
+{% endif %}
+{% if mcps %}
+可用的MCP工具：{{ mcps | map("name") | join(", ") }}
+{% endif %}
+
+请根据用户的需求，合理调度和使用可用的Agent和MCP工具来完成任务。
+确保回答准确、有用，并充分利用可用的工具资源。
+{% endlocale %}
+{% locale "en" %}
+You are an AI application named '{{ app.name }}'.
+{% if app.description %}
+Description: {{ app.description }}
+{% endif %}
+{% if agents %}
+Available agents: {{ agents | map("name") | join(", ") }}
+{% endif %}
+{% if mcps %}
+Available MCP tools: {{ mcps | map("name") | join(", ") }}
+{% endif %}
+
+Schedule and use the available agents and MCP tools as appropriate to complete the user's request.
+Make sure your answers are accurate and helpful, and make full use of the available tools.
+{% endlocale %}
+"""
+
+
+def _agents(agent_list: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"agent_id": agent.agent_id, "name": agent.name, "description": agent.description}
+        for agent in agent_list or []
+    ]
+
+
+def _mcps(mcp_list: Optional[List[Any]]) -> List[Dict[str, Any]]:
+    return [
+        {"mcp_id": mcp.mcp_id, "name": mcp.name, "description": mcp.custom_description or mcp.description}
+        for mcp in mcp_list or []
+    ]
+
+
+def app_context(config: Any, variables: Optional[Dict[str, Any]] = None, locale: Optional[str] = None) -> Dict[str, Any]:
+    """AI应用配置（AIAppResponse）对应的模板变量"""
+    context = dict(variables or {})
+    context.update(
+        app={
+            "id": config.id,
+            "name": config.name,
+            "identifier": config.identifier,
+            "description": config.description,
+            "app_type": config.app_type,
+            "user_id": config.user_id,
+        },
+        agents=_agents(config.agent_list),
+        mcps=_mcps(config.mcp_list),
+        locale=normalize_locale(locale or settings.PROMPT_DEFAULT_LOCALE),
+    )
+    return context
+
+
+def partial_resolver(context: Dict[str, Any]) -> Callable[[str], Union[str, Template, None]]:
+    """内置片段：agents、mcps 为模板，agent:<id>、mcp:<id> 为对应条目的描述"""
+    def resolve(name: str) -> Union[str, Template, None]:
+        if name in BUILTIN_PARTIALS:
+            return BUILTIN_PARTIALS[name]
+        kind, _, entity_id = name.partition(":")
+        if kind in ("agent", "mcp") and entity_id:
+            for entry in context[f"{kind}s"]:
+                if entry[f"{kind}_id"] == entity_id:
+                    return literal(entry["description"] or "")
+        return None
+
+    return resolve
+
+
+def render_app_prompt(config: Any, variables: Optional[Dict[str, Any]] = None, locale: Optional[str] = None) -> Dict[str, Any]:
+    """渲染AI应用的系统提示词，模板有误时抛出 TemplateError"""
+    template = compile_template(config.system_prompt or "")
+    context = app_context(config, variables, locale)
+    return {
+        "system_prompt": template.render(context, locale, partial_resolver(context)),
+        "locale": template.select_locale(locale),
+        "template_hash": template.digest,
+    }
+
+
+def generate_system_prompt(
+    app_name: str,
+    app_description: Optional[str] = None,
+    agent_list: Optional[List[Any]] = None,
+    mcp_list: Optional[List[Any]] = None,
+    locale: Optional[str] = None,
+) -> str:
+    """按应用信息生成系统提示词"""
+    context = {
+        "app": {"name": app_name, "description": app_description},
+        "agents": _agents(agent_list),
+        "mcps": _mcps(mcp_list),
+    }
+    return compile_template(GENERATE_TEMPLATE).render(context, locale)
@@ -0,0 +1,100 @@
+"""
+AI应用引用校验
+
+创建/更新AI应用（包括 PATCH 添加的列表条目）时检查 main_agent_id、agent_list[].agent_id、mcp_list[].mcp_id
+引用的实体是否存在：
+
+- 每类实体只执行一次 `WHERE id IN (...)` 查询，与引用数量无关
+- 查询结果（存在与不存在）缓存 REFERENCE_CACHE_TTL 秒，实体变更事件到达时立即失效；
+  多worker部署且使用 memory 事件总线时，其他worker的变更最多延迟一个TTL生效
+- 一次返回全部不存在的引用
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.core.cache import TTLCache
+from app.models.agent import Agent
+from app.models.mcp import MCP
+
+ENTITY_MODELS = {"agent": Agent, "mcp": MCP}
+ENTITY_NAMES = {"agent": "Agent", "mcp": "MCP"}
+
+# 单条 IN 查询的最大参数个数
+IN_BATCH_SIZE = 1000
+
+existence_cache = TTLCache(maxsize=settings.REFERENCE_CACHE_MAXSIZE, ttl=settings.REFERENCE_CACHE_TTL)
+
+
+class DanglingReferences(ValueError):
+    """AI应用引用了不存在的Agent/MCP"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} 个引用的实体不存在")
+
+
+def existing_ids(db: Session, entity_type: str, ids: Iterable[str]) -> Set[str]:
+    """返回 ids 中存在的实体ID，未缓存的ID合并为一次 IN 查询"""
+    found: Set[str] = set()
+    unknown = []
+    for entity_id in set(ids):
+        exists = existence_cache.get((entity_type, entity_id))
+        if exists is None:
+            unknown.append(entity_id)
+        elif exists:
+            found.add(entity_id)
+    if not unknown:
+        return found
+
+    model = ENTITY_MODELS[entity_type]
+    # 缓存项带实体标签，实体变更事件使其失效
+    loaded: Set[str] = set()
+    for i in range(0, len(unknown), IN_BATCH_SIZE):
+        batch = unknown[i:i + IN_BATCH_SIZE]
+        loaded.update(row.id for row in db.query(model.id).filter(model.id.in_(batch)))
+    for entity_id in unknown:
+        existence_cache.set((entity_type, entity_id), entity_id in loaded, tags=[(entity_type, entity_id)])
+    return found | loaded
+
+
+def check_references(
+    db: Session,
+    main_agent_id: Optional[str] = None,
+    agent_list: Optional[List[Any]] = None,
+    mcp_list: Optional[List[Any]] = None,
+) -> None:
+    """校验AI应用的引用，存在不存在的引用时抛出 DanglingReferences（包含全部错误）"""
+    references = []  # [(位置, 实体类型, ID)]
+    if main_agent_id:
+        references.append((("main_agent_id",), "agent", main_agent_id))
+    for i, agent in enumerate(agent_list or []):
+        references.append((("agent_list", i, "agent_id"), "agent", agent.agent_id))
+    for i, mcp in enumerate(mcp_list or []):
+        references.append((("mcp_list", i, "mcp_id"), "mcp", mcp.mcp_id))
+    check_reference_list(db, references)
+
+
+def check_reference_list(db: Session, references: List[Tuple[Sequence[Any], str, str]]) -> None:
+    """校验 [(请求体中的位置, 实体类型, ID)]，存在不存在的引用时抛出 DanglingReferences"""
+    if not references:
+        return
+
+    found = {
+        entity_type: existing_ids(db, entity_type, [ref_id for _, t, ref_id in references if t == entity_type])
+        for entity_type in {t for _, t, _ in references}
+    }
+    errors = [
+        {
+            "loc": ["body", *loc],
+            "msg": f"{ENTITY_NAMES[entity_type]}不存在: {ref_id}",
+            "type": "reference_not_found",
+            "input": ref_id,
+        }
+        for loc, entity_type, ref_id in references
+        if ref_id not in found[entity_type]
+    ]
+    if errors:
+        raise DanglingReferences(errors)
@@ -0,0 +1,315 @@
+"""
+全文检索服务
+
+跨 AI应用、Agent、MCP 三类实体检索并按相关度排序：
+- MySQL: 使用 FULLTEXT 索引（ngram 分词，支持中文），见迁移 0003；系统提示词压缩存储，
+  检索其明文前缀 prompt_excerpt（迁移 0014）
+- 其他数据库: 使用进程内倒排索引（BM25 排序），首次搜索时从数据库构建，
+  之后根据实体变更事件增量更新；构建期间发生变更的实体登记下来，
+  扫描完成后重新读取，构建前后提交的写入都不会遗漏
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.agent import Agent
+from app.models.ai_app import AIApp
+from app.models.mcp import MCP
+
+ENTITY_TYPES = ("ai_app", "agent", "mcp")
+
+# 名称命中的权重高于描述和提示词
+NAME_WEIGHT = 3
+DESCRIPTION_LENGTH = 200
+
+# 每类实体参与检索的字段，与 FULLTEXT 索引的列一致；
+# 系统提示词压缩存储，MySQL上检索其明文前缀 prompt_excerpt，内存倒排索引包含完整提示词
+FULLTEXT_COLUMNS = {
+    "ai_app": ("ai_app", "name, description, prompt_excerpt", "description"),
+    "agent": ("agent", "name, description, prompt_excerpt", "description"),
+    "mcp": ("mcp", "name, provider, model", "CONCAT(provider, '/', model)"),
+}
+
+_CJK = "㐀-䶿一-鿿豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|[a-z0-9_]+(?:[.\-][a-z0-9_]+)*")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+
+
+def prompt_excerpt(system_prompt: Optional[str]) -> Optional[str]:
+    """写入 prompt_excerpt 列的系统提示词明文前缀"""
+    if system_prompt is None:
+        return None
+    return system_prompt[:settings.SEARCH_PROMPT_EXCERPT_LENGTH]
+
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """分词：英文/数字按单词切分，中文按二元组（与MySQL ngram_token_size=2一致）"""
+    if not value:
+        return []
+    tokens = []
+    for match in _TOKEN_RE.findall(value.lower()):
+        if _CJK_RE.match(match):
+            if len(match) == 1:
+                tokens.append(match)
+            else:
+                tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.append(match)
+    return tokens
+
+
+class InvertedIndex:
+    """进程内倒排索引，BM25排序"""
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = {}
+        self._doc_tokens: Dict[Tuple[str, str], Counter] = {}
+        self._doc_lengths: Dict[Tuple[str, str], int] = {}
+        self._doc_meta: Dict[Tuple[str, str], Dict[str, Optional[str]]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, entity_type: str, entity_id: str, name: str, fields: Iterable[Optional[str]], description: Optional[str] = None) -> None:
+        key = (entity_type, entity_id)
+        counts = Counter()
+        for token in tokenize(name):
+            counts[token] += NAME_WEIGHT
+        for field in fields:
+            counts.update(tokenize(field))
+
+        with self._lock:
+            self._remove(key)
+            for token, tf in counts.items():
+                self._postings.setdefault(token, {})[key] = tf
+            length = sum(counts.values())
+            self._doc_tokens[key] = counts
+            self._doc_lengths[key] = length
+            self._doc_meta[key] = {"name": name, "description": (description or "")[:DESCRIPTION_LENGTH]}
+            self._total_length += length
+
+    def remove(self, entity_type: str, entity_id: str) -> None:
+        with self._lock:
+            self._remove((entity_type, entity_id))
+
+    def search(self, query: str, types: Iterable[str] = ENTITY_TYPES, offset: int = 0, limit: int = 10) -> Tuple[List[Dict], int]:
+        """返回 (当前页结果, 命中总数)"""
+        query_tokens = set(tokenize(query))
+        types = set(types)
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not query_tokens or not doc_count:
+                return [], 0
+            k1, b = self.k1, self.b
+            length_factor = k1 * b / (self._total_length / doc_count)
+            base = k1 * (1 - b)
+            doc_lengths = self._doc_lengths
+            filter_types = types != set(ENTITY_TYPES)
+            scores: Dict[Tuple[str, str], float] = {}
+            for token in query_tokens:
+                postings = self._postings.get(token)
+                if not postings:
+                    continue
+                weight = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5)) * (k1 + 1)
+                for key, tf in postings.items():
+                    if filter_types and key[0] not in types:
+                        continue
+                    scores[key] = scores.get(key, 0.0) + weight * tf / (tf + base + length_factor * doc_lengths[key])
+
+            top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], item[0]))
+            hits = [
+                {"entity_type": key[0], "id": key[1], "score": round(score, 4), **self._doc_meta[key]}
+                for key, score in top[offset:]
+            ]
+        return hits, len(scores)
+
+    def _remove(self, key: Tuple[str, str]) -> None:
+        counts = self._doc_tokens.pop(key, None)
+        if counts is None:
+            return
+        for token in counts:
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[token]
+        self._total_length -= self._doc_lengths.pop(key)
+        self._doc_meta.pop(key, None)
+
+
+class SearchService:
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory
+        self.index = InvertedIndex()
+        self._built = False
+        self._build_lock = threading.Lock()
+        self._lock = threading.Lock()
+        # 构建期间发生变更的实体，构建完成前重新索引
+        self._touched: Optional[Set[Tuple[str, str]]] = None
+
+    def search(
+        self,
+        db: Session,
+        q: str,
+        types: Iterable[str] = ENTITY_TYPES,
+        skip: int = 0,
+        limit: int = 10,
+    ) -> Dict:
+        types = [t for t in ENTITY_TYPES if t in set(types)]
+        if self.backend_for(db) == "mysql":
+            hits, total = self._search_mysql(db, q, types, skip, limit)
+            backend = "mysql"
+        else:
+            self.ensure_index(db)
+            hits, total = self.index.search(q, types, skip, limit)
+            backend = "memory"
+        return {
+            "results": hits,
+            "total": total,
+            "page": skip // limit + 1,
+            "size": limit,
+            "backend": backend,
+        }
+
+    @staticmethod
+    def backend_for(db: Session) -> str:
+        if settings.SEARCH_BACKEND != "auto":
+            return settings.SEARCH_BACKEND
+        return "mysql" if db.bind.dialect.name == "mysql" else "memory"
+
+    # ---- MySQL FULLTEXT ----
+
+    @staticmethod
+    def _search_mysql(db: Session, q: str, types: List[str], skip: int, limit: int) -> Tuple[List[Dict], int]:
+        if not types or not q.strip():
+            return [], 0
+        selects = []
+        counts = []
+        for entity_type in types:
+            table, columns, description = FULLTEXT_COLUMNS[entity_type]
+            match = f"MATCH({columns}) AGAINST(:q IN NATURAL LANGUAGE MODE)"
+            selects.append(
+                f"SELECT '{entity_type}' AS entity_type, id, name, LEFT({description}, {DESCRIPTION_LENGTH}) AS description, "
+                f"{match} AS score FROM {table} WHERE {match}"
+            )
+            counts.append(f"SELECT COUNT(*) AS n FROM {table} WHERE {match}")
+
+        rows = db.execute(
+            text(" UNION ALL ".join(selects) + " ORDER BY score DESC, id LIMIT :limit OFFSET :skip"),
+            {"q": q, "limit": limit, "skip": skip},
+        ).mappings().all()
+        total = db.execute(text(f"SELECT SUM(n) FROM ({' UNION ALL '.join(counts)}) AS c"), {"q": q}).scalar() or 0
+
+        hits = [
+            {
+                "entity_type": row["entity_type"],
+                "id": row["id"],
+                "name": row["name"],
+                "description": row["description"] or "",
+                "score": round(float(row["score"]), 4),
+            }
+            for row in rows
+        ]
+        return hits, int(total)
+
+    # ---- 内存倒排索引 ----
+
+    def ensure_index(self, db: Session) -> None:
+        if self._built:
+            return
+        with self._build_lock:
+            if self._built:
+                return
+            with self._lock:
+                self._touched = set()
+            try:
+                # 只查询参与检索的列
+                for row in db.query(AIApp.id, AIApp.name, AIApp.description, AIApp.system_prompt).yield_per(1000):
+                    self._index_ai_app(row)
+                for row in db.query(Agent.id, Agent.name, Agent.description, Agent.system_prompt).yield_per(1000):
+                    self._index_agent(row)
+                for row in db.query(MCP.id, MCP.name, MCP.provider, MCP.model).yield_per(1000):
+                    self._index_mcp(row)
+                # 扫描期间提交的变更可能没有读到，重新读取登记的实体，直到其间不再有新的变更
+                while True:
+                    with self._lock:
+                        touched, self._touched = self._touched, set()
+                        if not touched:
+                            self._touched = None
+                            self._built = True
+                            return
+                    for entity_type, entity_id in touched:
+                        self._reindex(entity_type, entity_id)
+            except Exception:
+                with self._lock:
+                    self._touched = None
+                raise
+
+    def on_change(self, event) -> None:
+        """实体变更事件回调：增量更新倒排索引"""
+        if event.entity_type not in ENTITY_TYPES:
+            return
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    # 尚未构建时构建会读到这次变更；构建中则登记，扫描完成后重新读取
+                    if self._touched is not None:
+                        self._touched.add((event.entity_type, event.entity_id))
+                    return
+        if event.op == "delete":
+            self.index.remove(event.entity_type, event.entity_id)
+        else:
+            self._reindex(event.entity_type, event.entity_id)
+
+    def _reindex(self, entity_type: str, entity_id: str) -> None:
+        """从数据库重新读取实体并更新索引，实体不存在时移出索引"""
+        db = self._session()
+        try:
+            if entity_type == "ai_app":
+                row = db.query(AIApp.id, AIApp.name, AIApp.description, AIApp.system_prompt).filter(AIApp.id == entity_id).first()
+                indexer = self._index_ai_app
+            elif entity_type == "agent":
+                row = db.query(Agent.id, Agent.name, Agent.description, Agent.system_prompt).filter(Agent.id == entity_id).first()
+                indexer = self._index_agent
+            else:
+                row = db.query(MCP.id, MCP.name, MCP.provider, MCP.model).filter(MCP.id == entity_id).first()
+                indexer = self._index_mcp
+        finally:
+            db.close()
+
+        if row is None:
+            self.index.remove(entity_type, entity_id)
+        else:
+            indexer(row)
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.db.session import get_session_factory
+            return get_session_factory()()
+        return self.session_factory()
+
+    def _index_ai_app(self, row) -> None:
+        self.index.add("ai_app", row.id, row.name, (row.description, row.system_prompt), row.description)
+
+    def _index_agent(self, row) -> None:
+        self.index.add("agent", row.id, row.name, (row.description, row.system_prompt), row.description)
+
+    def _index_mcp(self, row) -> None:
+        self.index.add("mcp", row.id, row.name, (row.provider, row.model), f"{row.provider}/{row.model}")
+
+
+search_service = SearchService()
@@ -0,0 +1,280 @@
+"""
+目录统计
+
+按应用类型/启用状态统计AI应用数、每个用户的应用数、每个MCP关联的Agent数、按提供商/模型统计MCP数。
+
+- 首次读取（或启动预热）时全量加载一次，之后订阅实体变更事件增量维护：
+  每个实体只记录参与统计的几个字段，服务层写入时把变更后的这几个字段随事件发出
+  （stat_fields），收到事件时减去旧值、加上新值，不访问数据库；
+  同一实体的事件乱序到达时只应用版本更新的一个
+- 读取直接返回内存中的快照，快照在两次写入之间复用，不访问数据库
+- 后台线程每 STATS_RECONCILE_INTERVAL 秒全量重算一次，修正事件丢失（如多worker部署时
+  事件总线轮询失败）、事件未携带统计字段造成的偏差，偏差记录到日志
+"""
+
+import heapq
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Optional, Set, Tuple
+
+from app.config import settings
+from app.models.agent import Agent
+from app.models.ai_app import AIApp
+from app.models.mcp import MCP
+
+logger = logging.getLogger(__name__)
+
+ENTITY_TYPES = ("ai_app", "agent", "mcp")
+
+# 各实体参与统计的列
+STAT_COLUMNS = {
+    "ai_app": (AIApp, (AIApp.app_type, AIApp.is_active, AIApp.user_id)),
+    "agent": (Agent, (Agent.mcp_id,)),
+    "mcp": (MCP, (MCP.provider, MCP.model)),
+}
+
+# app_type 等列为空时的统计键
+UNKNOWN = "unknown"
+
+
+def stat_fields(entity_type: str, entity) -> Tuple:
+    """实体参与统计的字段，服务层写入时随变更事件发出"""
+    _, columns = STAT_COLUMNS[entity_type]
+    return tuple(getattr(entity, column.key) for column in columns)
+
+
+def _inc(counter: Counter, key: Hashable, delta: int) -> None:
+    count = counter[key] + delta
+    if count:
+        counter[key] = count
+    else:
+        del counter[key]
+
+
+def _top(counter: Counter, n: int) -> Dict[str, int]:
+    """数量最多的前n项，数量相同时按键排序"""
+    return dict(heapq.nsmallest(n, counter.items(), key=lambda item: (-item[1], item[0])))
+
+
+class CatalogStats:
+    """各实体的统计字段及由其汇总出的计数"""
+
+    def __init__(self):
+        # 实体类型 -> {实体ID: 统计字段元组}
+        self.keys: Dict[str, Dict[str, Tuple]] = {entity_type: {} for entity_type in ENTITY_TYPES}
+        self.apps_by_type: Counter = Counter()
+        self.apps_by_active: Counter = Counter()
+        self.apps_per_user: Counter = Counter()
+        self.agents_per_mcp: Counter = Counter()
+        self.mcps_by_provider: Counter = Counter()
+        self.mcps_by_model: Counter = Counter()
+
+    def set(self, entity_type: str, entity_id: str, key: Optional[Tuple]) -> None:
+        """设置实体的统计字段，key 为 None 表示实体已删除"""
+        keys = self.keys[entity_type]
+        old = keys.get(entity_id)
+        if old == key:
+            return
+        if old is not None:
+            self._count(entity_type, old, -1)
+        if key is None:
+            del keys[entity_id]
+        else:
+            keys[entity_id] = key
+            self._count(entity_type, key, 1)
+
+    def _count(self, entity_type: str, key: Tuple, delta: int) -> None:
+        if entity_type == "ai_app":
+            app_type, is_active, user_id = key
+            _inc(self.apps_by_type, app_type or UNKNOWN, delta)
+            _inc(self.apps_by_active, bool(is_active), delta)
+            if user_id is not None:
+                _inc(self.apps_per_user, user_id, delta)
+        elif entity_type == "agent":
+            _inc(self.agents_per_mcp, key[0], delta)
+        else:
+            provider, model = key
+            _inc(self.mcps_by_provider, provider, delta)
+            _inc(self.mcps_by_model, (provider, model), delta)
+
+    def counters(self) -> Dict[str, Counter]:
+        return {
+            "apps_by_type": self.apps_by_type,
+            "apps_by_active": self.apps_by_active,
+            "apps_per_user": self.apps_per_user,
+            "agents_per_mcp": self.agents_per_mcp,
+            "mcps_by_provider": self.mcps_by_provider,
+            "mcps_by_model": self.mcps_by_model,
+        }
+
+    def drift(self, other: "CatalogStats") -> int:
+        """与另一份统计不一致的计数项数"""
+        drift = 0
+        for name, counter in self.counters().items():
+            other_counter = other.counters()[name]
+            drift += sum(1 for key in counter.keys() | other_counter.keys() if counter[key] != other_counter[key])
+        return drift
+
+    def render(self, top_n: int) -> Dict[str, Any]:
+        by_model: Dict[str, Dict[str, int]] = {}
+        for (provider, model), count in sorted(self.mcps_by_model.items()):
+            by_model.setdefault(provider, {})[model] = count
+        return {
+            "ai_apps": {
+                "total": len(self.keys["ai_app"]),
+                "by_type": dict(sorted(self.apps_by_type.items())),
+                "active": self.apps_by_active[True],
+                "inactive": self.apps_by_active[False],
+                "users": len(self.apps_per_user),
+                "per_user": _top(self.apps_per_user, top_n),
+            },
+            "agents": {
+                "total": len(self.keys["agent"]),
+                "mcps": len(self.agents_per_mcp),
+                "per_mcp": _top(self.agents_per_mcp, top_n),
+            },
+            "mcps": {
+                "total": len(self.keys["mcp"]),
+                "by_provider": dict(sorted(self.mcps_by_provider.items())),
+                "by_model": by_model,
+            },
+        }
+
+
+class StatsService:
+    """增量维护的目录统计"""
+
+    def __init__(self, interval: float = 600.0, top_n: int = 100, session_factory=None):
+        self.interval = interval
+        self.top_n = top_n
+        self.session_factory = session_factory
+        self.stats = CatalogStats()
+        self.version = 0
+        self.updated_at: Optional[datetime] = None
+        self.reconciled_at: Optional[datetime] = None
+        self._built = False
+        # (实体类型, 实体ID) -> 最后应用的事件版本
+        self._versions: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.RLock()
+        # 全量重算期间发生变更的实体，重算结果中以增量维护的值为准
+        self._touched: Optional[Set[Tuple[str, str]]] = None
+        self._snapshot: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前统计，两次写入之间返回同一个快照"""
+        self.ensure_built()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == self.version:
+            return snapshot[1]
+        with self._lock:
+            body = self.stats.render(self.top_n)
+            body.update(version=self.version, updated_at=self.updated_at, reconciled_at=self.reconciled_at)
+            self._snapshot = (self.version, body)
+            return body
+
+    def ensure_built(self) -> None:
+        if not self._built:
+            with self._reconcile_lock:
+                if not self._built:
+                    self.reconcile()
+
+    def on_change(self, event) -> None:
+        """实体变更事件回调：按事件携带的统计字段更新计数"""
+        if event.entity_type not in ENTITY_TYPES:
+            return
+        if event.op != "delete" and event.stats is None:
+            # 未携带统计字段的事件（如旧版本写入的记录）由定期全量重算修正
+            return
+        key = None if event.op == "delete" else tuple(event.stats)
+        entity = (event.entity_type, event.entity_id)
+        with self._lock:
+            # 尚未加载且不在加载中时，加载时会读到这次变更
+            if not self._built and self._touched is None:
+                return
+            # 并发写入的事件可能乱序分发，较旧的事件不覆盖较新的
+            if self._versions.get(entity, 0) > event.version:
+                return
+            self._versions[entity] = event.version
+            self.stats.set(event.entity_type, event.entity_id, key)
+            if self._touched is not None:
+                self._touched.add(entity)
+            self._updated()
+
+    def reconcile(self) -> int:
+        """全量重算统计，返回与增量维护结果不一致的计数项数"""
+        with self._reconcile_lock:
+            return self._reconcile()
+
+    def _reconcile(self) -> int:
+        with self._lock:
+            self._touched = set()
+        try:
+            # 全量加载不持有锁，期间的变更事件照常处理并登记
+            fresh = self._load_all()
+        except Exception:
+            with self._lock:
+                self._touched = None
+            raise
+        with self._lock:
+            current = self.stats
+            for entity_type, entity_id in self._touched:
+                fresh.set(entity_type, entity_id, current.keys[entity_type].get(entity_id))
+            self._touched = None
+            drift = fresh.drift(current) if self._built else 0
+            self.stats = fresh
+            self._built = True
+            self.reconciled_at = datetime.now(timezone.utc)
+            self._updated()
+        if drift:
+            logger.warning("目录统计与全量重算结果不一致，已修正 %d 项", drift)
+        return drift
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.reconcile()
+            except Exception:
+                logger.exception("目录统计重算失败")
+
+    def _updated(self) -> None:
+        self.version += 1
+        self.updated_at = datetime.now(timezone.utc)
+
+    def _session(self):
+        if self.session_factory is None:
+            from app.db.session import get_session_factory
+            return get_session_factory()()
+        return self.session_factory()
+
+    def _load_all(self) -> CatalogStats:
+        stats = CatalogStats()
+        db = self._session()
+        try:
+            for entity_type, (model, columns) in STAT_COLUMNS.items():
+                # 只查询参与统计的列
+                for row in db.query(model.id, *columns).yield_per(1000):
+                    stats.set(entity_type, row[0], tuple(row[1:]))
+        finally:
+            db.close()
+        return stats
+
+
+stats_service = StatsService(interval=settings.STATS_RECONCILE_INTERVAL, top_n=settings.STATS_TOP_N)
@@ -0,0 +1,112 @@
+"""
+增量同步
+
+下游网关先取当前游标并全量导出一次，之后用 GET /changes?since=<游标> 拉取
+此后创建、更新和删除的实体。游标即 entity_change 的自增序号：
+
+- 变更记录与实体写入在同一事务中提交，不会漏掉已提交的写入
+- 同一页中同一实体的多次变更只返回最后一次，数据为读取时的最新状态
+- 实体已被删除时返回墓碑（op=delete，data=null）
+- 只返回写入超过 CHANGES_SETTLE_SECONDS 的记录：并发事务中较小的序号可能晚于
+  较大的序号提交，等待一段时间再返回，避免游标越过尚未提交的记录
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.agent import Agent
+from app.models.ai_app import AIApp
+from app.models.entity_change import EntityChangeLog
+from app.models.mcp import MCP
+from app.schemas.agent import AgentOut
+from app.schemas.mcp import MCPOut
+from app.services.ai_app import AIAppService
+
+ENTITY_TYPES = ["ai_app", "agent", "mcp"]
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 5000
+
+# 实体类型 -> (模型, 转换为响应数据)
+_LOADERS = {
+    "ai_app": (AIApp, lambda row: AIAppService._convert_to_response(row).model_dump(mode="json")),
+    "agent": (Agent, lambda row: AgentOut.model_validate(row).model_dump(mode="json")),
+    "mcp": (MCP, lambda row: MCPOut.model_validate(row).model_dump(mode="json")),
+}
+
+
+def _settled_before() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=settings.CHANGES_SETTLE_SECONDS)
+
+
+def get_cursor(db: Session) -> int:
+    """当前游标：最新的已稳定变更序号"""
+    return db.query(func.max(EntityChangeLog.id)).filter(
+        EntityChangeLog.created_at <= _settled_before()
+    ).scalar() or 0
+
+
+def get_changes(
+    db: Session,
+    since: int,
+    entity_types: Optional[List[str]] = None,
+    limit: int = DEFAULT_LIMIT,
+) -> Dict[str, Any]:
+    """返回序号大于 since 的一页变更和下一页游标"""
+    limit = max(1, min(limit, MAX_LIMIT))
+    query = db.query(EntityChangeLog).filter(EntityChangeLog.id > since)
+    if entity_types and set(entity_types) != set(ENTITY_TYPES):
+        query = query.filter(EntityChangeLog.entity_type.in_(entity_types))
+    rows = query.order_by(EntityChangeLog.id).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    settled_before = _settled_before()
+    for i, row in enumerate(rows):
+        if row.created_at is not None and row.created_at > settled_before:
+            # 之后的记录还未稳定，下次再返回
+            rows = rows[:i]
+            has_more = False
+            break
+
+    # 同一实体只保留最后一次变更
+    latest: Dict[tuple, EntityChangeLog] = {}
+    for row in rows:
+        latest.pop((row.entity_type, row.entity_id), None)
+        latest[(row.entity_type, row.entity_id)] = row
+
+    data = _load_entities(db, latest.keys())
+    changes = []
+    for key, row in latest.items():
+        entity = data.get(key)
+        changes.append({
+            "seq": row.id,
+            "entity_type": row.entity_type,
+            "entity_id": row.entity_id,
+            "op": "delete" if entity is None else row.op,
+            "data": entity,
+        })
+    return {
+        "changes": changes,
+        "next_cursor": rows[-1].id if rows else since,
+        "has_more": has_more,
+    }
+
+
+def _load_entities(db: Session, keys) -> Dict[tuple, Dict[str, Any]]:
+    """按实体类型批量读取当前数据，不存在的实体不出现在结果中"""
+    ids_by_type: Dict[str, List[str]] = {}
+    for entity_type, entity_id in keys:
+        ids_by_type.setdefault(entity_type, []).append(entity_id)
+
+    result = {}
+    for entity_type, ids in ids_by_type.items():
+        if entity_type not in _LOADERS:
+            continue
+        model, convert = _LOADERS[entity_type]
+        for row in db.query(model).filter(model.id.in_(ids)):
+            result[(entity_type, row.id)] = convert(row)
+    return result
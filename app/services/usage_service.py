@@ -0,0 +1,355 @@
+"""
+大模型用量计量
+
+调用大模型的代码通过 usage_meter.track()/record() 登记每次调用的token数、耗时和错误。
+登记只追加到进程内的环形缓冲区，不访问数据库，不增加调用延迟：
+
+- 后台线程每 USAGE_FLUSH_INTERVAL 秒（或缓冲区积累到 USAGE_BATCH_SIZE 条时）取出记录，在一个事务中
+  批量写入明细表 llm_usage，并按小时、天累加到 llm_usage_hourly、llm_usage_daily
+  （INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE，多个worker累加同一时间段不会冲突）
+- 缓冲区写满时丢弃最早的记录并计数（dropped），计量永远不阻塞调用方；写入失败时这一批记录下个周期重试
+- 进程崩溃最多丢失一个 USAGE_FLUSH_INTERVAL 内的记录；正常退出时 stop() 会写完剩余记录
+- 明细保留 USAGE_RETENTION_DAYS 天，汇总表长期保留；GET /ai-apps/{id}/usage 只读取汇总表
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.usage import LLMUsage, LLMUsageDaily, LLMUsageHourly
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_MODELS = {"hour": LLMUsageHourly, "day": LLMUsageDaily}
+KEY_COLUMNS = ("app_id", "bucket", "user_id", "provider", "model")
+SUM_COLUMNS = ("calls", "errors", "prompt_tokens", "completion_tokens", "latency_ms_sum")
+
+# 查询接口的分组维度与默认/最大时间范围
+GROUP_BY_COLUMNS = ("provider", "model", "user_id")
+DEFAULT_RANGE = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+MAX_RANGE = {"hour": timedelta(days=31), "day": timedelta(days=366)}
+
+# 缓冲区中的一条记录：(app_id, user_id, provider, model, 输入token, 输出token, 耗时毫秒, 错误类型, 开始时间戳)
+UsageEvent = Tuple[str, Optional[str], str, str, int, int, int, Optional[str], float]
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    """时间所在时间段的起点"""
+    if granularity == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+def rollup(rows: List[Dict[str, Any]], granularity: str) -> List[Dict[str, Any]]:
+    """把明细按 (应用, 时间段, 用户, 提供商, 模型) 汇总，按主键排序（多worker写入时加锁顺序一致）"""
+    totals: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        key = (row["app_id"], truncate(row["created_at"], granularity), row["user_id"] or "", row["provider"], row["model"])
+        total = totals.get(key)
+        if total is None:
+            total = totals[key] = dict(zip(KEY_COLUMNS, key), latency_ms_max=0, **{c: 0 for c in SUM_COLUMNS})
+        total["calls"] += 1
+        total["errors"] += row["error"] is not None
+        total["prompt_tokens"] += row["prompt_tokens"]
+        total["completion_tokens"] += row["completion_tokens"]
+        total["latency_ms_sum"] += row["latency_ms"]
+        total["latency_ms_max"] = max(total["latency_ms_max"], row["latency_ms"])
+    return [totals[key] for key in sorted(totals)]
+
+
+def upsert_rollup(connection, table, rows: List[Dict[str, Any]]) -> None:
+    """累加到汇总表：主键不存在时插入，存在时各计数相加、最大耗时取较大值"""
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            latency_ms_max=func.greatest(table.c.latency_ms_max, stmt.inserted.latency_ms_max),
+            **{c: table.c[c] + stmt.inserted[c] for c in SUM_COLUMNS},
+        )
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            greatest = func.greatest
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            # sqlite 的多参数 max() 即取较大值
+            greatest = func.max
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={
+                "latency_ms_max": greatest(table.c.latency_ms_max, stmt.excluded.latency_ms_max),
+                **{c: table.c[c] + stmt.excluded[c] for c in SUM_COLUMNS},
+            },
+        )
+    connection.execute(stmt, rows)
+
+
+class UsageMeter:
+    """大模型用量的环形缓冲区与后台批量写入"""
+
+    def __init__(
+        self,
+        capacity: int = 100000,
+        batch_size: int = 5000,
+        flush_interval: float = 5.0,
+        retention_days: int = 7,
+        engine=None,
+    ):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        # 默认使用应用的数据库引擎
+        self.engine = engine
+        # deque 的 append/popleft 是线程安全的，写满时自动丢弃最早的记录
+        self._buffer: Deque[UsageEvent] = deque(maxlen=capacity)
+        # 取出后写入失败的一批，下个周期重试
+        self._pending: List[UsageEvent] = []
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        # 缓冲区写满丢弃的记录数，并发登记时为近似值
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def pending(self) -> int:
+        return len(self._buffer) + len(self._pending)
+
+    def record(
+        self,
+        app_id: str,
+        provider: str,
+        model: str,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        latency_ms: float = 0.0,
+        error: Optional[str] = None,
+        user_id: Optional[str] = None,
+        started_at: Optional[float] = None,
+    ) -> None:
+        """登记一次调用，started_at 为调用开始的 time.time()，默认为当前时间"""
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            self.dropped += 1
+        buffer.append((
+            app_id, user_id, provider, model, int(prompt_tokens), int(completion_tokens),
+            int(round(latency_ms)), error, time.time() if started_at is None else started_at,
+        ))
+        if len(buffer) >= self.batch_size:
+            self._wake.set()
+
+    @contextmanager
+    def track(self, app_id: str, provider: str, model: str, user_id: Optional[str] = None) -> Iterator[Dict[str, int]]:
+        """
+        计量 with 块内的一次调用：调用方把响应中的token数填入产出的字典，
+        块内抛出异常时以异常类型记为失败
+        """
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        started_at = time.time()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield usage
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(
+                app_id, provider, model, usage["prompt_tokens"], usage["completion_tokens"],
+                (time.perf_counter() - start) * 1000, error, user_id, started_at,
+            )
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-meter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止后台线程并写入剩余记录"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("写入用量记录失败，丢弃 %d 条记录", self.pending())
+
+    def flush(self) -> int:
+        """同步写入缓冲区中的全部记录，返回写入条数"""
+        total = 0
+        with self._flush_lock:
+            while True:
+                if not self._pending:
+                    self._pending = self._drain(self.batch_size)
+                if not self._pending:
+                    return total
+                self._write(self._pending)
+                total += len(self._pending)
+                self._pending = []
+
+    def purge_expired(self) -> int:
+        """删除超过保留天数的明细，返回删除条数"""
+        from app.db.session import get_engine
+
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.retention_days)
+        table = LLMUsage.__table__
+        with (self.engine or get_engine()).begin() as connection:
+            return connection.execute(table.delete().where(table.c.created_at < cutoff)).rowcount
+
+    def _run(self) -> None:
+        next_purge = 0.0
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("写入用量记录失败，%d 条记录将重试", len(self._pending))
+            if time.monotonic() >= next_purge:
+                next_purge = time.monotonic() + 3600
+                try:
+                    self.purge_expired()
+                except Exception:
+                    logger.exception("清理过期用量明细失败")
+
+    def _drain(self, limit: int) -> List[UsageEvent]:
+        events = []
+        buffer = self._buffer
+        while len(events) < limit:
+            try:
+                events.append(buffer.popleft())
+            except IndexError:
+                break
+        return events
+
+    def _write(self, events: List[UsageEvent]) -> None:
+        from app.db.session import get_engine
+
+        rows = [
+            {
+                "app_id": app_id, "user_id": user_id, "provider": provider, "model": model,
+                "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "latency_ms": latency_ms, "error": error, "created_at": _utc(started_at),
+            }
+            for app_id, user_id, provider, model, prompt_tokens, completion_tokens, latency_ms, error, started_at in events
+        ]
+        with (self.engine or get_engine()).begin() as connection:
+            connection.execute(LLMUsage.__table__.insert(), rows)
+            for granularity, model in ROLLUP_MODELS.items():
+                upsert_rollup(connection, model.__table__, rollup(rows, granularity))
+        self.written += len(rows)
+
+
+def _metrics(calls: int, errors: int, prompt_tokens: int, completion_tokens: int, latency_sum: int, latency_max: int) -> Dict[str, Any]:
+    return {
+        "calls": calls,
+        "errors": errors,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "avg_latency_ms": round(latency_sum / calls, 1) if calls else 0.0,
+        "max_latency_ms": latency_max,
+    }
+
+
+def get_usage(
+    db: Session,
+    app_id: str,
+    granularity: str = "hour",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    从汇总表读取应用在 [start, end) 内按时间段（可再按提供商/模型/用户）分组的用量，时间为UTC；
+    默认截止到当前时间段结束，时间范围超过上限时抛出 ValueError
+    """
+    if granularity not in ROLLUP_MODELS:
+        raise ValueError(f"不支持的时间粒度: {granularity}")
+    if group_by is not None and group_by not in GROUP_BY_COLUMNS:
+        raise ValueError(f"不支持的分组维度: {group_by}")
+    # 带时区的时间转换为UTC
+    start, end = [
+        moment.astimezone(timezone.utc).replace(tzinfo=None) if moment is not None and moment.tzinfo else moment
+        for moment in (start, end)
+    ]
+    step = timedelta(days=1) if granularity == "day" else timedelta(hours=1)
+    if end is None:
+        end = truncate(datetime.now(timezone.utc).replace(tzinfo=None), granularity) + step
+    if start is None:
+        start = end - DEFAULT_RANGE[granularity]
+    start = truncate(start, granularity)
+    if start >= end:
+        raise ValueError("start 必须早于 end")
+    if end - start > MAX_RANGE[granularity]:
+        raise ValueError(f"时间范围不能超过 {MAX_RANGE[granularity].days} 天")
+
+    model = ROLLUP_MODELS[granularity]
+    dimensions = [getattr(model, group_by)] if group_by else []
+    rows = (
+        db.query(
+            model.bucket, *dimensions,
+            func.sum(model.calls), func.sum(model.errors), func.sum(model.prompt_tokens),
+            func.sum(model.completion_tokens), func.sum(model.latency_ms_sum), func.max(model.latency_ms_max),
+        )
+        .filter(model.app_id == app_id, model.bucket >= start, model.bucket < end)
+        .group_by(model.bucket, *dimensions)
+        .order_by(model.bucket, *dimensions)
+        .all()
+    )
+
+    items = []
+    totals = [0, 0, 0, 0, 0, 0]
+    for row in rows:
+        values = [int(value or 0) for value in row[len(dimensions) + 1:]]
+        item = {"bucket": row[0], **_metrics(*values)}
+        if group_by:
+            # 汇总表中没有用户时为空字符串
+            item[group_by] = row[1] or None
+        items.append(item)
+        for i, value in enumerate(values):
+            totals[i] = max(totals[i], value) if i == 5 else totals[i] + value
+    return {
+        "app_id": app_id,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "items": items,
+        "total": _metrics(*totals),
+    }
+
+
+usage_meter = UsageMeter(
+    capacity=settings.USAGE_BUFFER_SIZE,
+    batch_size=settings.USAGE_BATCH_SIZE,
+    flush_interval=settings.USAGE_FLUSH_INTERVAL,
+    retention_days=settings.USAGE_RETENTION_DAYS,
+)
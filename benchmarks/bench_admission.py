@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+准入控制基准测试
+
+- classify: 按路由规则分级的耗时
+- asgi_without_admission / asgi_with_admission: 经过路由的 GET /ai-apps/{id}，对比准入中间件的开销
+
+另外模拟数据库变慢：管理端列表（low）每次在线程池中阻塞 SLOW_LIST 秒，LOW_CLIENTS 个客户端持续请求列表，
+同时 RUNTIME_CLIENTS 个客户端持续请求 GET /ai-apps/{id}（runtime，线程池中阻塞 RUNTIME_QUERY 秒），
+输出不启用/启用准入控制时runtime请求的延迟分位数和low请求的拒绝数；过载结果不计入基线。
+
+运行: python -m benchmarks.bench_admission [--save-baseline]
+"""
+
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionController, AdmissionMiddleware
+from benchmarks.harness import BenchmarkSuite, asgi_request
+
+SLOW_LIST = 0.2
+RUNTIME_QUERY = 0.005
+LOW_CLIENTS = 100
+RUNTIME_CLIENTS = 10
+DURATION = 5.0
+
+suite = BenchmarkSuite("admission")
+loop = asyncio.new_event_loop()
+
+
+def create_app(admission: bool, slow: bool = False) -> FastAPI:
+    app = FastAPI()
+    if admission:
+        app.add_middleware(AdmissionMiddleware, controller=AdmissionController())
+
+    @app.get("/agent/")
+    def list_agents():
+        if slow:
+            time.sleep(SLOW_LIST)
+        return []
+
+    @app.get("/ai-apps/{app_id}")
+    def get_ai_app(app_id: str):
+        if slow:
+            time.sleep(RUNTIME_QUERY)
+        return {"id": app_id}
+
+    return app
+
+
+plain_app = create_app(admission=False)
+admission_app = create_app(admission=True)
+controller = AdmissionController()
+
+suite.add("classify", lambda: controller.classify("GET", "/ai-apps/app-00042"))
+suite.add("asgi_without_admission", lambda: asgi_request(plain_app, "GET", "/ai-apps/app-00042", loop=loop))
+suite.add("asgi_with_admission", lambda: asgi_request(admission_app, "GET", "/ai-apps/app-00042", loop=loop))
+
+
+async def overload(admission: bool) -> dict:
+    app = create_app(admission, slow=True)
+    transport = httpx.ASGITransport(app=app)
+    deadline = time.monotonic() + DURATION
+    runtime_latency = []
+    low_status = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def low_client():
+            while time.monotonic() < deadline:
+                response = await client.get("/agent/")
+                low_status[response.status_code] = low_status.get(response.status_code, 0) + 1
+                if response.status_code == 503:
+                    await asyncio.sleep(float(response.headers["retry-after"]) / 10)
+
+        async def runtime_client():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                response = await client.get("/ai-apps/app-00042")
+                assert response.status_code == 200
+                runtime_latency.append(time.perf_counter() - start)
+
+        await asyncio.gather(
+            *(low_client() for _ in range(LOW_CLIENTS)),
+            *(runtime_client() for _ in range(RUNTIME_CLIENTS)),
+        )
+
+    runtime_latency.sort()
+    return {
+        "runtime_requests": len(runtime_latency),
+        "runtime_p50_ms": statistics.median(runtime_latency) * 1000,
+        "runtime_p99_ms": runtime_latency[int(len(runtime_latency) * 0.99)] * 1000,
+        "low_ok": low_status.get(200, 0),
+        "low_shed": low_status.get(503, 0),
+    }
+
+
+def report_overload() -> None:
+    print(f"--- 列表请求阻塞 {SLOW_LIST * 1000:.0f}ms，{LOW_CLIENTS} 个列表客户端 + {RUNTIME_CLIENTS} 个运行时客户端，{DURATION:.0f}s ---")
+    for admission in (False, True):
+        result = asyncio.run(overload(admission))
+        print(
+            f"{'启用准入控制' if admission else '不启用准入控制':<10} "
+            f"runtime {result['runtime_requests']:>6} 次  p50 {result['runtime_p50_ms']:>8.1f}ms  p99 {result['runtime_p99_ms']:>8.1f}ms  "
+            f"low 成功 {result['low_ok']:>5}  拒绝 {result['low_shed']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    report_overload()
+    suite.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+AI应用列表配置更新延迟基准测试
+
+在临时sqlite库中为三种规模（见 fixtures.PROFILES）各准备一个应用，对比向 agent_list 添加一个Agent：
+- put_full_list: 客户端提交完整的 agent_list（PUT），服务端重写整个列表
+- patch_add_remove: 服务端添加一个条目再删除（PATCH，两次更新，只写入 agent_list 列）
+
+运行: python -m benchmarks.bench_app_update [--save-baseline]
+"""
+
+import os
+import tempfile
+import time
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_app_update_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models import change_history, entity_change  # noqa: E402,F401
+from app.models.agent import Agent  # noqa: E402
+from app.models.mcp import MCP  # noqa: E402
+from app.schemas.ai_app import AgentConfig, AIAppUpdate, ListPatchOp  # noqa: E402
+from app.services.ai_app import AIAppService  # noqa: E402
+from app.services.history_service import history_buffer  # noqa: E402
+from benchmarks.fixtures import PROFILES, agent_configs, make_ai_app_create  # noqa: E402
+from benchmarks.harness import BenchmarkSuite  # noqa: E402
+
+suite = BenchmarkSuite("app_update")
+apps = {}
+EXTRA_AGENT = {"agent_id": "agent-extra", "name": "新增Agent"}
+
+
+def seed() -> None:
+    init_db()
+    agent_count = max(spec["agents"] for spec in PROFILES.values()) + 1
+    with get_engine().begin() as connection:
+        connection.execute(MCP.__table__.insert(), [{"id": "mcp-0000", "name": "工具", "provider": "openai", "model": "gpt-4o", "api_key": "sk-bench"}])
+        connection.execute(Agent.__table__.insert(), [
+            {"id": config["agent_id"], "name": config["name"], "system_prompt": "你是一个助手", "mcp_id": "mcp-0000"}
+            for config in agent_configs(agent_count - 1) + [EXTRA_AGENT]
+        ])
+    db = get_session_factory()()
+    try:
+        for profile in PROFILES:
+            data = make_ai_app_create(profile)
+            # 只保留Agent列表，MCP引用不在本测试范围内
+            data.mcp_list = None
+            apps[profile] = AIAppService.create_ai_app(db, data).id
+    finally:
+        db.close()
+
+
+def put_full_list(profile: str) -> None:
+    agent_list = [AgentConfig(**config) for config in agent_configs(PROFILES[profile]["agents"])]
+    db = get_session_factory()()
+    try:
+        AIAppService.update_ai_app(db, apps[profile], AIAppUpdate(agent_list=agent_list + [AgentConfig(**EXTRA_AGENT)]))
+        AIAppService.update_ai_app(db, apps[profile], AIAppUpdate(agent_list=agent_list))
+    finally:
+        db.close()
+
+
+def patch_add_remove(profile: str) -> None:
+    db = get_session_factory()()
+    try:
+        AIAppService.patch_ai_app(db, apps[profile], [ListPatchOp(op="add", field="agent_list", value=EXTRA_AGENT)])
+        AIAppService.patch_ai_app(db, apps[profile], [ListPatchOp(op="remove", field="agent_list", id=EXTRA_AGENT["agent_id"])])
+    finally:
+        db.close()
+
+
+for _profile in PROFILES:
+    suite.add(f"put_full_list[{_profile}]", lambda profile=_profile: put_full_list(profile))
+    suite.add(f"patch_add_remove[{_profile}]", lambda profile=_profile: patch_add_remove(profile))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    # 变更历史在后台批量写入，与服务运行时一致
+    history_buffer.start()
+    print(f"准备数据: {time.perf_counter() - start:.1f}s")
+    try:
+        suite.main()
+    finally:
+        history_buffer.stop()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+目录快照基准测试
+
+在临时sqlite库中准备 5k 个AI应用、3k 个Agent和 500 个MCP，对比每个worker各自缓存（response_cache）与
+所有worker共享只读映射的目录快照：
+- cache_get_ai_app / snapshot_get_ai_app: 缓存命中后序列化为JSON / 快照中按ID查找响应JSON
+- cache_get_by_identifier / snapshot_get_by_identifier: 按标识符查找
+- cache_get_agent / snapshot_get_agent: Agent按ID查找
+- asgi_get_ai_app_cache / asgi_get_ai_app_snapshot: 经过路由的 GET /ai-apps/{id}
+- build: 全量构建一个快照文件
+
+另外同时启动 WORKERS 个worker进程，分别把全部实体载入本进程缓存或映射快照并读取每个实体，
+输出每个进程的RSS和PSS（同一份页缓存在共享它的进程间平摊）；内存不计入基线。
+
+运行: python -m benchmarks.bench_catalog_snapshot [--save-baseline]
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# 必须在导入 app 之前设置数据库
+_bench_dir = tempfile.mkdtemp(prefix="bench_catalog_snapshot_")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_bench_dir, 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.api import ai_app  # noqa: E402
+from app.db.schema import PROJECT_ROOT  # noqa: E402
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models.agent import Agent  # noqa: E402
+from app.models.ai_app import AIApp  # noqa: E402
+from app.models.mcp import MCP  # noqa: E402
+from app.services import agent_service  # noqa: E402
+from app.services.ai_app import AIAppService  # noqa: E402
+from app.services.catalog_snapshot import catalog_snapshot  # noqa: E402
+from benchmarks.harness import BenchmarkSuite, asgi_request  # noqa: E402
+
+APP_COUNT = 5_000
+AGENT_COUNT = 3_000
+MCP_COUNT = 500
+WORKERS = 4
+
+catalog_snapshot.directory = os.path.join(_bench_dir, "snapshot")
+
+# 在worker进程中载入全部实体后报告就绪，父进程读取内存后关闭stdin结束进程
+WORKER_SCRIPT = """
+import os, sys
+from app.services import agent_service, mcp_service
+from app.services.ai_app import AIAppService
+from app.services.catalog_snapshot import catalog_snapshot
+from app.db.session import get_session_factory
+
+catalog_snapshot.directory = os.environ["SNAPSHOT_DIR"]
+app_count, agent_count, mcp_count = map(int, sys.argv[2:5])
+mode = sys.argv[1]
+db = get_session_factory()()
+if mode == "cache":
+    for i in range(app_count):
+        AIAppService.get_ai_app(db, f"app-{i:05d}")
+    for i in range(agent_count):
+        agent_service.get_agent_out(db, f"agent-{i:05d}")
+    for i in range(mcp_count):
+        mcp_service.get_mcp_out(db, f"mcp-{i:05d}")
+elif mode == "snapshot":
+    catalog_snapshot.refresh()
+    for i in range(app_count):
+        bytes(catalog_snapshot.get("ai_app", f"app-{i:05d}")[0])
+    for i in range(agent_count):
+        bytes(catalog_snapshot.get("agent", f"agent-{i:05d}")[0])
+    for i in range(mcp_count):
+        bytes(catalog_snapshot.get("mcp", f"mcp-{i:05d}")[0])
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+suite = BenchmarkSuite("catalog_snapshot")
+loop = asyncio.new_event_loop()
+bench_app = FastAPI()
+bench_app.include_router(ai_app.router)
+db = get_session_factory()()
+
+
+def seed() -> None:
+    init_db()
+    with get_engine().begin() as connection:
+        connection.execute(MCP.__table__.insert(), [
+            {
+                "id": f"mcp-{i:05d}", "name": f"工具{i}", "description": "检索内部知识库" * 5,
+                "provider": "openai", "model": "gpt-4o", "api_key": "sk-bench",
+            }
+            for i in range(MCP_COUNT)
+        ])
+        connection.execute(Agent.__table__.insert(), [
+            {
+                "id": f"agent-{i:05d}", "name": f"Agent{i}", "description": "处理客户咨询" * 5,
+                "system_prompt": "你是一个客服助手，" * 20, "mcp_id": f"mcp-{i % MCP_COUNT:05d}",
+            }
+            for i in range(AGENT_COUNT)
+        ])
+        connection.execute(AIApp.__table__.insert(), [
+            {
+                "id": f"app-{i:05d}", "name": f"应用{i}", "identifier": f"ident-{i:05d}", "description": "智能助手" * 10,
+                "system_prompt": "你是一个名为{{ app.name }}的AI应用。" * 10,
+                "agent_list": json.dumps([{"agent_id": f"agent-{(i + j) % AGENT_COUNT:05d}", "name": f"Agent{j}"} for j in range(3)]),
+                "mcp_list": json.dumps([{"mcp_id": f"mcp-{(i + j) % MCP_COUNT:05d}", "name": f"工具{j}"} for j in range(2)]),
+                "version": 1,
+            }
+            for i in range(APP_COUNT)
+        ])
+
+
+def _with_snapshot(fn):
+    """只在调用期间使用快照，其余用例走原有缓存路径"""
+    snapshot = catalog_snapshot.current
+
+    def run():
+        catalog_snapshot.current = snapshot
+        try:
+            return fn()
+        finally:
+            catalog_snapshot.current = None
+
+    return run
+
+
+suite.add("cache_get_ai_app", lambda: AIAppService.get_ai_app(db, "app-00042").model_dump_json())
+suite.add("cache_get_by_identifier", lambda: AIAppService.get_ai_app_by_identifier(db, "ident-00042").model_dump_json())
+suite.add("cache_get_agent", lambda: agent_service.get_agent_out(db, "agent-00042").model_dump_json())
+suite.add("asgi_get_ai_app_cache", lambda: asgi_request(bench_app, "GET", "/ai-apps/app-00042", loop=loop))
+
+
+def _register_snapshot_cases() -> None:
+    suite.add("snapshot_get_ai_app", _with_snapshot(lambda: catalog_snapshot.get("ai_app", "app-00042")))
+    suite.add("snapshot_get_by_identifier", _with_snapshot(lambda: catalog_snapshot.get_ai_app_by_identifier("ident-00042")))
+    suite.add("snapshot_get_agent", _with_snapshot(lambda: catalog_snapshot.get("agent", "agent-00042")))
+    suite.add("asgi_get_ai_app_snapshot", _with_snapshot(lambda: asgi_request(bench_app, "GET", "/ai-apps/app-00042", loop=loop)))
+    suite.add("build", catalog_snapshot.build, repeat=3, min_time=0)
+
+
+def _memory(pid: int) -> dict:
+    """/proc/<pid>/smaps_rollup 中的 Rss 和 Pss（KB）"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0])
+    return values
+
+
+def report_memory() -> None:
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("当前系统不支持 /proc/<pid>/smaps_rollup，跳过内存对比")
+        return
+    environment = dict(os.environ, SNAPSHOT_DIR=catalog_snapshot.directory, PYTHONWARNINGS="ignore")
+    counts = [str(APP_COUNT), str(AGENT_COUNT), str(MCP_COUNT)]
+    print(f"--- {WORKERS} 个worker的内存（KB/进程） ---")
+    for mode in ("idle", "cache", "snapshot"):
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-c", WORKER_SCRIPT, mode, *counts],
+                cwd=PROJECT_ROOT, env=environment, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+            )
+            for _ in range(WORKERS)
+        ]
+        try:
+            for worker in workers:
+                assert worker.stdout.readline().strip() == "ready"
+            usage = [_memory(worker.pid) for worker in workers]
+        finally:
+            for worker in workers:
+                worker.communicate("")
+        rss = sum(u["Rss"] for u in usage) / WORKERS
+        pss = sum(u["Pss"] for u in usage) / WORKERS
+        print(f"{mode:<10} RSS {rss:>10.0f}  PSS {pss:>10.0f}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    catalog_snapshot.build()
+    catalog_snapshot.refresh()
+    print(f"准备数据: {time.perf_counter() - start:.1f}s，快照 {os.path.getsize(catalog_snapshot.current.path) / 1024:.0f} KB")
+    report_memory()
+    _register_snapshot_cases()
+    catalog_snapshot.current = None
+    suite.main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+会话存储追加与读取延迟基准测试
+
+在临时sqlite库中准备一个短会话（100条消息）和一个长会话（100k条消息），
+分别测量追加一轮对话、读取最近20条消息、读取最近2000个token的延迟。
+追加和读取都只依赖索引定位，长会话与短会话的延迟应基本相同。
+
+运行: python -m benchmarks.bench_conversation [--save-baseline]
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_conversation_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models.conversation import ConversationMessage  # noqa: E402
+from app.services import conversation_service  # noqa: E402
+from benchmarks.harness import BenchmarkSuite  # noqa: E402
+
+SESSION_SIZES = {"short": 100, "long": 100_000}
+USER_MESSAGE = "请帮我分析一下上个季度各地区的销售数据，找出增长最快的三个地区，并说明可能的原因。"
+ASSISTANT_MESSAGE = "好的，根据上个季度的数据，增长最快的三个地区分别是华东、华南和西南。" * 4
+
+suite = BenchmarkSuite("conversation")
+sessions = {}
+
+
+def seed() -> None:
+    init_db()
+    db = get_session_factory()()
+    try:
+        for label, size in SESSION_SIZES.items():
+            conversation = conversation_service.create_conversation(db, "bench-app", "bench-user")
+            sessions[label] = conversation.id
+            # 直接批量写入消息并设置计数器，避免逐条追加
+            rows = []
+            offset = 0
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            for seq in range(1, size + 1):
+                role, content = ("user", USER_MESSAGE) if seq % 2 else ("assistant", ASSISTANT_MESSAGE)
+                tokens = conversation_service.estimate_tokens(content)
+                rows.append({
+                    "conversation_id": conversation.id, "seq": seq, "role": role, "content": content,
+                    "token_count": tokens, "token_offset": offset, "created_at": now,
+                })
+                offset += tokens
+            with get_engine().begin() as connection:
+                for i in range(0, len(rows), 5000):
+                    connection.execute(ConversationMessage.__table__.insert(), rows[i:i + 5000])
+            conversation.message_count = size
+            conversation.token_count = offset
+            db.commit()
+    finally:
+        db.close()
+
+
+def append_turn(label: str) -> None:
+    db = get_session_factory()()
+    try:
+        conversation_service.append_messages(
+            db, sessions[label], [("user", USER_MESSAGE), ("assistant", ASSISTANT_MESSAGE)]
+        )
+    finally:
+        db.close()
+
+
+def read_window(label: str, **window) -> None:
+    db = get_session_factory()()
+    try:
+        conversation = conversation_service.get_conversation(db, sessions[label])
+        conversation_service.get_window(db, conversation, **window)
+    finally:
+        db.close()
+
+
+for _label in SESSION_SIZES:
+    suite.add(f"append_turn[{_label}]", lambda label=_label: append_turn(label))
+    suite.add(f"last_20[{_label}]", lambda label=_label: read_window(label, last=20))
+    suite.add(f"last_2000_tokens[{_label}]", lambda label=_label: read_window(label, max_tokens=2000))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    print(f"准备会话: {time.perf_counter() - start:.1f}s")
+    suite.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+大模型模拟器基准测试
+
+不访问外部服务，延迟均设为0，衡量模拟器和调用链路本身的开销：
+- plan: 决定一次调用的结果（采样延迟、生成确定性输出）
+- run / stream: 进程内的非流式和流式调用（64个token）
+- chat_failover: 第一个配置返回500、切换到第二个配置的非流式调用
+- asgi_chat / asgi_stream: 经过路由的 POST /simulator/v1/chat/completions
+
+另外输出两项不计入基线的结果：
+- 延迟精度：CONCURRENCY 个并发的流式调用（首token 50ms，token间 5ms），实测TTFT和ITL的分位数，
+  分别用线程调用进程内模拟器、用协程调用HTTP接口
+- 故障切换：主配置注入30%错误和10%限流时，两个配置的流式调用的成功率和平均尝试次数
+
+运行: python -m benchmarks.bench_llm_simulator [--save-baseline]
+"""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from fastapi import FastAPI
+
+from app.api import simulator as simulator_api
+from app.services import llm_client
+from app.services.llm_simulator import LLMSimulator, SimulatorProfile
+from benchmarks.harness import BenchmarkSuite, asgi_request
+
+CONCURRENCY = 200
+TTFT = 0.05
+ITL = 0.005
+TOKENS = 20
+FAILOVER_CALLS = 2_000
+
+suite = BenchmarkSuite("llm_simulator")
+loop = asyncio.new_event_loop()
+
+MESSAGES = [{"role": "system", "content": "你是一个智能助手"}, {"role": "user", "content": "介绍一下这个平台" * 10}]
+ZERO = "?ttft=fixed:0&itl=fixed:0"
+simulator = LLMSimulator(SimulatorProfile(ttft="fixed:0", itl="fixed:0", output_tokens=64))
+llm_client.register_provider("bench-simulator", lambda: llm_client.SimulatorProvider(simulator))
+
+app = FastAPI()
+app.include_router(simulator_api.router)
+body = json.dumps({"model": "gpt-4o" + ZERO, "messages": MESSAGES}).encode()
+stream_body = json.dumps({"model": "gpt-4o" + ZERO, "messages": MESSAGES, "stream": True}).encode()
+json_headers = [(b"content-type", b"application/json")]
+
+failover_configs = [
+    {"provider": "bench-simulator", "model": "primary?error_rate=1&ttft=fixed:0"},
+    {"provider": "bench-simulator", "model": "backup"},
+]
+
+suite.add("plan", lambda: simulator.plan({"model": "gpt-4o", "messages": MESSAGES}))
+suite.add("run", lambda: simulator.run({"model": "gpt-4o", "messages": MESSAGES}))
+suite.add("stream", lambda: list(simulator.stream({"model": "gpt-4o", "messages": MESSAGES})))
+suite.add("chat_failover", lambda: llm_client.chat(failover_configs, MESSAGES))
+suite.add("asgi_chat", lambda: asgi_request(app, "POST", "/simulator/v1/chat/completions", body, json_headers, loop=loop))
+suite.add("asgi_stream", lambda: asgi_request(app, "POST", "/simulator/v1/chat/completions", stream_body, json_headers, loop=loop))
+
+
+def _percentiles(values) -> str:
+    values = sorted(values)
+    return f"p50 {statistics.median(values) * 1000:>6.1f}ms  p99 {values[int(len(values) * 0.99)] * 1000:>6.1f}ms"
+
+
+def latency_threads():
+    """每个线程一个进程内的流式调用，返回 (TTFT列表, ITL列表)"""
+    request = {"model": f"gpt-4o?ttft=fixed:{TTFT}&itl=fixed:{ITL}&output_tokens={TOKENS}", "messages": MESSAGES}
+    ttfts, itls = [], []
+    lock = threading.Lock()
+
+    def worker():
+        last = time.perf_counter()
+        arrivals = []
+        for chunk in simulator.stream(request):
+            if chunk["choices"][0]["delta"].get("content"):
+                now = time.perf_counter()
+                arrivals.append(now - last)
+                last = now
+        with lock:
+            ttfts.append(arrivals[0])
+            itls.extend(arrivals[1:])
+
+    threads = [threading.Thread(target=worker) for _ in range(CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ttfts, itls
+
+
+async def _stream_arrivals(request: bytes):
+    """直接调用ASGI应用，记录每个含token的SSE事件到达的间隔（httpx 的 ASGITransport 会缓冲整个响应体）"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/simulator/v1/chat/completions", "raw_path": b"/simulator/v1/chat/completions", "query_string": b"",
+        "root_path": "", "headers": [(b"content-type", b"application/json")], "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    received = False
+    done = asyncio.Event()
+    last = time.perf_counter()
+    arrivals = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": request, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal last
+        if message["type"] == "http.response.body":
+            if b'"content"' in message.get("body", b""):
+                now = time.perf_counter()
+                arrivals.append(now - last)
+                last = now
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return arrivals
+
+
+async def latency_http():
+    """每个协程一个HTTP流式调用，返回 (TTFT列表, ITL列表)"""
+    request = json.dumps({
+        "model": f"gpt-4o?ttft=fixed:{TTFT}&itl=fixed:{ITL}&output_tokens={TOKENS}", "messages": MESSAGES, "stream": True,
+    }).encode()
+    results = await asyncio.gather(*(_stream_arrivals(request) for _ in range(CONCURRENCY)))
+    return [arrivals[0] for arrivals in results], [itl for arrivals in results for itl in arrivals[1:]]
+
+
+def report_latency() -> None:
+    print(f"--- {CONCURRENCY} 个并发流式调用，配置 TTFT {TTFT * 1000:.0f}ms、ITL {ITL * 1000:.0f}ms、{TOKENS} 个token ---")
+    for label, (ttfts, itls) in (("进程内（线程）", latency_threads()), ("HTTP（协程）", asyncio.run(latency_http()))):
+        print(f"{label:<10} TTFT {_percentiles(ttfts)}   ITL {_percentiles(itls)}")
+
+
+def report_failover() -> None:
+    flaky = LLMSimulator(SimulatorProfile(ttft="fixed:0", itl="fixed:0", output_tokens=8), seed=42)
+    llm_client.register_provider("bench-flaky", lambda: llm_client.SimulatorProvider(flaky))
+    configs = [
+        {"provider": "bench-flaky", "model": "primary?error_rate=0.3&rate_limit_rate=0.1"},
+        {"provider": "bench-flaky", "model": "backup"},
+    ]
+    single, ok = 0, 0
+    for _ in range(FAILOVER_CALLS):
+        try:
+            list(llm_client.stream_chat(configs[:1], MESSAGES))
+            single += 1
+        except llm_client.LLMError:
+            pass
+    calls = flaky.calls
+    for _ in range(FAILOVER_CALLS):
+        list(llm_client.stream_chat(configs, MESSAGES))
+        ok += 1
+    print(f"--- 主配置注入30%错误和10%限流，{FAILOVER_CALLS} 次流式调用 ---")
+    print(f"只用主配置    成功率 {single / FAILOVER_CALLS:>6.1%}")
+    print(f"切换到备用配置 成功率 {ok / FAILOVER_CALLS:>6.1%}  平均尝试 {(flaky.calls - calls) / FAILOVER_CALLS:.2f} 次")
+
+
+if __name__ == "__main__":
+    report_latency()
+    report_failover()
+    suite.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+系统提示词模板渲染基准测试
+
+生成 TEMPLATE_COUNT 个互不相同的模板（变量、条件、循环、片段、中英文 locale 块，按 typical 规模的
+Agent/MCP列表渲染），轮流渲染，对比：
+- compile: 编译一个模板（不经过缓存）
+- compile_and_render_uncached: 每次请求都重新编译再渲染（不缓存时的开销）
+- render_cached: compile_template（源码哈希 + 缓存查找）后渲染，即服务运行时的路径
+- render_compiled: 只执行编译好的函数
+- render_app_prompt: 完整的服务调用，包括构造变量和内置片段
+
+运行: python -m benchmarks.bench_prompt_template [--save-baseline]
+"""
+
+import itertools
+
+from app.core.template import _compile, _digest, compile_template
+from app.schemas.ai_app import AgentConfig, AIAppResponse, MCPConfig
+from app.services.prompt_service import app_context, partial_resolver, render_app_prompt
+from benchmarks.fixtures import PROFILES, agent_configs, mcp_configs
+from benchmarks.harness import BenchmarkSuite
+
+suite = BenchmarkSuite("prompt_template")
+
+TEMPLATE_COUNT = 5000
+
+TEMPLATE = """\
+{# 模板 #{n} #}
+{% locale "zh" %}
+你是{{ app.name }}的第{n}号助手，正在为{{ user.name | default("访客") }}服务。
+{% if user.vip %}
+该用户是VIP，请优先处理。
+{% elif user.name %}
+该用户已登录。
+{% else %}
+请引导用户登录。
+{% endif %}
+{% for tag in user.tags %}
+- 关注：{{ tag }}{% if loop.last %}。{% endif %}
+{% endfor %}
+{% include "agents" %}
+{% include "mcps" %}
+规则{n}：回答要准确、简洁，必要时调用工具。
+{% endlocale %}
+{% locale "en" %}
+You are assistant #{n} of {{ app.name }}, serving {{ user.name | default("guest") }}.
+{% if user.vip %}
+This user is a VIP.
+{% endif %}
+{% include "agents" %}
+Rule {n}: be accurate and concise.
+{% endlocale %}
+"""
+
+spec = PROFILES["typical"]
+sources = [TEMPLATE.replace("{n}", str(n)) for n in range(TEMPLATE_COUNT)]
+configs = [
+    AIAppResponse(
+        id=f"app-{n}", name=f"应用{n}", identifier=f"app-{n}", app_type="user", user_id="u1",
+        agent_list=[AgentConfig(**config) for config in agent_configs(spec["agents"])],
+        mcp_list=[MCPConfig(**config) for config in mcp_configs(spec["mcps"])],
+        system_prompt=source, created_at="2026-01-01T00:00:00",
+    )
+    for n, source in enumerate(sources)
+]
+VARIABLES = {"user": {"name": "张三", "vip": False, "tags": ["数据分析", "报表"]}}
+context = app_context(configs[0], VARIABLES)
+include = partial_resolver(context)
+compiled = [compile_template(source) for source in sources]
+
+_sources = itertools.cycle(sources)
+_compiled = itertools.cycle(compiled)
+_configs = itertools.cycle(configs)
+
+
+@suite.case("compile")
+def compile_one() -> None:
+    source = next(_sources)
+    _compile(source, _digest(source))
+
+
+@suite.case("compile_and_render_uncached")
+def compile_and_render_uncached() -> None:
+    source = next(_sources)
+    _compile(source, _digest(source)).render(context, "zh-CN", include)
+
+
+@suite.case(f"render_cached[{TEMPLATE_COUNT}]")
+def render_cached() -> None:
+    compile_template(next(_sources)).render(context, "zh-CN", include)
+
+
+@suite.case(f"render_compiled[{TEMPLATE_COUNT}]")
+def render_compiled() -> None:
+    next(_compiled).render(context, "zh-CN", include)
+
+
+@suite.case(f"render_app_prompt[{TEMPLATE_COUNT}]")
+def render_app() -> None:
+    render_app_prompt(next(_configs), VARIABLES, "zh-CN")
+
+
+if __name__ == "__main__":
+    print(render_app_prompt(configs[0], VARIABLES, "zh-CN")["system_prompt"])
+    suite.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+AI应用引用校验基准测试
+
+在临时sqlite库中准备 10k 个Agent和 1k 个MCP，分别测量校验 10/100/1000 个Agent引用
+（另带同等数量的一半MCP引用）的延迟：
+- naive: 逐个引用查询一次（校验前的做法）
+- cold: 批量 IN 查询，存在性缓存为空
+- warm: 存在性缓存全部命中，不访问数据库
+
+运行: python -m benchmarks.bench_references [--save-baseline]
+"""
+
+import os
+import tempfile
+import time
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_references_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models.agent import Agent  # noqa: E402
+from app.models.mcp import MCP  # noqa: E402
+from app.schemas.ai_app import AgentConfig, MCPConfig  # noqa: E402
+from app.services.reference_service import check_references, existence_cache  # noqa: E402
+from benchmarks.harness import BenchmarkSuite  # noqa: E402
+
+AGENT_COUNT = 10_000
+MCP_COUNT = 1_000
+REFERENCE_SIZES = (10, 100, 1000)
+
+suite = BenchmarkSuite("references")
+
+
+def seed() -> None:
+    init_db()
+    with get_engine().begin() as connection:
+        connection.execute(MCP.__table__.insert(), [
+            {"id": f"mcp-{i:05d}", "name": f"工具{i}", "provider": "openai", "model": "gpt-4o", "api_key": "sk-bench"}
+            for i in range(MCP_COUNT)
+        ])
+        connection.execute(Agent.__table__.insert(), [
+            {"id": f"agent-{i:05d}", "name": f"Agent{i}", "system_prompt": "你是一个助手", "mcp_id": f"mcp-{i % MCP_COUNT:05d}"}
+            for i in range(AGENT_COUNT)
+        ])
+
+
+def references(n: int):
+    # 引用分散在整个ID范围内
+    step = AGENT_COUNT // n
+    agent_list = [AgentConfig(agent_id=f"agent-{i * step:05d}", name=f"Agent{i}") for i in range(n)]
+    mcp_list = [MCPConfig(mcp_id=f"mcp-{i * 2 % MCP_COUNT:05d}", name=f"工具{i}", description="") for i in range(n // 2)]
+    return agent_list, mcp_list
+
+
+def naive(agent_list, mcp_list) -> None:
+    db = get_session_factory()()
+    try:
+        for agent in agent_list:
+            assert db.query(Agent.id).filter(Agent.id == agent.agent_id).first() is not None
+        for mcp in mcp_list:
+            assert db.query(MCP.id).filter(MCP.id == mcp.mcp_id).first() is not None
+    finally:
+        db.close()
+
+
+def batched(agent_list, mcp_list, cold: bool) -> None:
+    if cold:
+        existence_cache.clear()
+    db = get_session_factory()()
+    try:
+        check_references(db, agent_list=agent_list, mcp_list=mcp_list)
+    finally:
+        db.close()
+
+
+for _n in REFERENCE_SIZES:
+    _refs = references(_n)
+    suite.add(f"naive[{_n}]", lambda refs=_refs: naive(*refs))
+    suite.add(f"cold[{_n}]", lambda refs=_refs: batched(*refs, cold=True))
+    suite.add(f"warm[{_n}]", lambda refs=_refs: batched(*refs, cold=False))
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    print(f"准备数据: {time.perf_counter() - start:.1f}s")
+    suite.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+响应压缩基准测试
+
+用 /ai-apps/、/agent/、/mcp/ 列表接口的典型响应（JSON），比较各压缩算法和级别的
+压缩率、压缩耗时（CPU）与节省的带宽；并测量经过中间件的完整请求：
+首次压缩（未命中压缩缓存）与相同响应复用压缩结果的耗时。
+
+运行: python -m benchmarks.bench_response_compression [--save-baseline]
+"""
+
+import asyncio
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+
+from app.core.response_compression import CompressionMiddleware, available_encodings
+from app.schemas.agent import AgentOut
+from app.schemas.mcp import MCPOut
+from app.services.ai_app import AIAppService
+from benchmarks.fixtures import make_agent_row, make_ai_app_row, tool_configs
+from benchmarks.harness import BenchmarkSuite, asgi_request
+
+# 各算法参与比较的级别，第二个为默认级别
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 11), "zstd": (1, 3, 10)}
+DEFAULT_LEVELS = {encoding: levels[1] for encoding, levels in LEVELS.items()}
+
+suite = BenchmarkSuite("response_compression")
+
+
+def _payloads():
+    apps = [AIAppService._convert_to_response(make_ai_app_row("typical", i)) for i in range(20)]
+    agents = [AgentOut.model_validate(make_agent_row("typical", i), from_attributes=True) for i in range(100)]
+    mcps = [
+        MCPOut(id=f"mcp-{i:04d}", name=f"工具{i}", provider="openai", model="gpt-4o", temperature="0.7",
+               tool_plugins=[tool["name"] for tool in tool_configs(5)])
+        for i in range(100)
+    ]
+    return {
+        "ai_apps": json.dumps(
+            {"items": [json.loads(app.model_dump_json()) for app in apps], "total": 20, "page": 1, "size": 20},
+            ensure_ascii=False,
+        ).encode(),
+        "agents": ("[" + ",".join(agent.model_dump_json() for agent in agents) + "]").encode(),
+        "mcps": ("[" + ",".join(mcp.model_dump_json() for mcp in mcps) + "]").encode(),
+    }
+
+
+def report(payloads) -> None:
+    encodings = available_encodings()
+    print(f"{'payload':<10}{'codec':<10}{'原始':>10}{'压缩后':>10}{'压缩比':>8}{'压缩耗时':>12}{'吞吐':>12}")
+    for name, body in payloads.items():
+        for encoding, levels in LEVELS.items():
+            if encoding not in encodings:
+                print(f"{name:<10}{encoding:<10}  未安装，跳过")
+                continue
+            for level in levels:
+                compressed = encodings[encoding](body, level)
+                rounds = 20
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    encodings[encoding](body, level)
+                elapsed = (time.perf_counter() - start) / rounds
+                print(
+                    f"{name:<10}{encoding + '-' + str(level):<10}{len(body) / 1024:>8.1f}KB{len(compressed) / 1024:>8.1f}KB"
+                    f"{len(body) / len(compressed):>8.1f}{elapsed * 1e6:>10.0f}us{len(body) / elapsed / 1e6:>8.0f}MB/s"
+                )
+
+
+def _build_app(body: bytes, cache_size: int) -> CompressionMiddleware:
+    bench_app = FastAPI()
+
+    @bench_app.get("/list")
+    async def get_list():
+        # 每次返回新的bytes对象，与真实请求一样需要重新计算哈希
+        return Response(bytes(bytearray(body)), media_type="application/json")
+
+    return CompressionMiddleware(bench_app, levels=DEFAULT_LEVELS, cache_size=cache_size)
+
+
+loop = asyncio.new_event_loop()
+payloads = _payloads()
+
+for _name, _body in payloads.items():
+    for _encoding in available_encodings():
+        suite.add(
+            f"compress[{_name}][{_encoding}-{DEFAULT_LEVELS[_encoding]}]",
+            lambda body=_body, encoding=_encoding: available_encodings()[encoding](body, DEFAULT_LEVELS[encoding]),
+        )
+    # 未命中压缩缓存（每次压缩）与复用压缩结果
+    for _encoding in ("gzip", "br"):
+        for _label, _cache_size in (("miss", 0), ("hit", 16)):
+            suite.add(
+                f"middleware_{_label}[{_name}][{_encoding}]",
+                lambda a=_build_app(_body, _cache_size), encoding=_encoding: asgi_request(
+                    a, "GET", "/list", headers=[(b"accept-encoding", encoding.encode())], loop=loop
+                ),
+            )
+    suite.add(
+        f"middleware[{_name}][zstd]",
+        lambda a=_build_app(_body, 16): asgi_request(a, "GET", "/list", headers=[(b"accept-encoding", b"zstd")], loop=loop),
+    )
+    suite.add(
+        f"middleware_identity[{_name}]",
+        lambda a=_build_app(_body, 0): asgi_request(a, "GET", "/list", loop=loop),
+    )
+
+
+if __name__ == "__main__":
+    report(payloads)
+    suite.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+全文检索延迟基准测试（内存倒排索引）
+
+向索引中写入一个大规模的随机目录（默认每类实体 10000 条，中英文混合），
+测量常见词、罕见词、多词和英文查询的延迟，以及单条实体重建索引的耗时。
+
+运行: python -m benchmarks.bench_search [--save-baseline]
+"""
+
+import random
+import time
+
+from app.services.search_service import InvertedIndex
+from benchmarks.harness import BenchmarkSuite
+
+DOCS_PER_TYPE = 10000
+
+# 有实际含义的常用词，查询用例从中选取
+WORDS = [
+    "数据", "分析", "客服", "助手", "报表", "翻译", "写作", "代码", "审查", "搜索", "知识库", "问答",
+    "财务", "法律", "合同", "医疗", "教育", "营销", "文案", "图片", "生成", "摘要", "会议", "纪要",
+    "销售", "预测", "风险", "控制", "运维", "监控", "告警", "日志", "安全", "审计", "招聘", "简历",
+]
+ENGLISH = ["openai", "azure", "gpt-4o", "claude", "qwen", "deepseek", "embedding", "rerank", "sql", "python"]
+VOCABULARY_SIZE = 5000
+
+suite = BenchmarkSuite("search")
+
+
+def _vocabulary(rng: random.Random):
+    """随机生成的中文词表，词频按 Zipf 分布，常用词排在前面"""
+    words = list(WORDS)
+    while len(words) < VOCABULARY_SIZE:
+        words.append(chr(rng.randint(0x4E00, 0x9FA5)) + chr(rng.randint(0x4E00, 0x9FA5)))
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+
+def _sentence(rng: random.Random, vocabulary, n: int) -> str:
+    words, weights = vocabulary
+    text = "，".join(rng.choices(words, weights, k=n))
+    return text + " " + " ".join(rng.choices(ENGLISH, k=2))
+
+
+def build_catalog(docs_per_type: int = DOCS_PER_TYPE, seed: int = 42) -> InvertedIndex:
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng)
+    index = InvertedIndex()
+    for i in range(docs_per_type):
+        for entity_type in ("ai_app", "agent"):
+            description = _sentence(rng, vocabulary, 8)
+            index.add(
+                entity_type, f"{entity_type}-{i}", _sentence(rng, vocabulary, 2),
+                (description, _sentence(rng, vocabulary, 50)), description,
+            )
+        index.add("mcp", f"mcp-{i}", _sentence(rng, vocabulary, 2), tuple(rng.choices(ENGLISH, k=2)), None)
+    return index
+
+
+start = time.perf_counter()
+catalog = build_catalog()
+print(f"索引构建: {len(catalog)} 条实体, {time.perf_counter() - start:.1f}s")
+
+suite.add("query_common_term", lambda: catalog.search("数据分析"))
+suite.add("query_rare_term", lambda: catalog.search("简历招聘"))
+suite.add("query_multi_term", lambda: catalog.search("财务报表风险预测助手"))
+suite.add("query_english", lambda: catalog.search("deepseek embedding"))
+suite.add("query_filtered_type", lambda: catalog.search("数据分析", types=["mcp"]))
+suite.add("query_deep_page", lambda: catalog.search("数据分析", offset=500, limit=20))
+
+_rng = random.Random(7)
+_vocabulary_for_updates = _vocabulary(random.Random(42))
+suite.add(
+    "reindex_single_doc",
+    lambda: catalog.add(
+        "agent", "agent-0", _sentence(_rng, _vocabulary_for_updates, 2),
+        (_sentence(_rng, _vocabulary_for_updates, 8), _sentence(_rng, _vocabulary_for_updates, 50)),
+    ),
+)
+
+
+if __name__ == "__main__":
+    suite.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+序列化与校验热点路径基准测试
+
+覆盖：
+- AIAppService._convert_to_response（JSON字段解析 + 构造响应Schema）
+- AgentOut.parse_tools 校验器（ORM对象 -> AgentOut）
+- create_ai_app/update_ai_app 中嵌套模型的 json.dumps
+- FastAPI 响应校验与序列化（response_model）
+
+运行: python -m benchmarks.bench_serialization [--save-baseline]
+"""
+
+import asyncio
+from typing import List
+
+from fastapi import FastAPI
+
+from app.schemas.agent import AgentOut
+from app.schemas.ai_app import AIAppResponse
+from app.services.ai_app import AIAppService
+from benchmarks.fixtures import PROFILES, make_agent_row, make_ai_app_create, make_ai_app_row
+from benchmarks.harness import BenchmarkSuite, asgi_request
+
+# 列表接口中一次返回的Agent数量
+AGENT_LIST_SIZES = {"small": 10, "typical": 100, "pathological": 500}
+
+suite = BenchmarkSuite("serialization")
+
+
+def _validate_orm(model, obj):
+    """兼容 pydantic v1/v2 的 ORM 校验入口（与FastAPI响应校验一致）"""
+    validate = getattr(model, "model_validate", None)
+    if validate is not None:
+        return validate(obj, from_attributes=True)
+    return model.from_orm(obj)
+
+
+def _build_app(app_row, agent_rows) -> FastAPI:
+    """构造只包含响应校验路径的应用，数据直接返回，不访问数据库"""
+    bench_app = FastAPI()
+    app_response = AIAppService._convert_to_response(app_row)
+
+    @bench_app.get("/ai-app", response_model=AIAppResponse)
+    async def get_ai_app():
+        return app_response
+
+    @bench_app.get("/agents", response_model=List[AgentOut])
+    def list_agents():
+        return agent_rows
+
+    return bench_app
+
+
+loop = asyncio.new_event_loop()
+
+for profile in PROFILES:
+    app_row = make_ai_app_row(profile)
+    agent_row = make_agent_row(profile)
+    agent_rows = [make_agent_row(profile, i) for i in range(AGENT_LIST_SIZES[profile])]
+    create_data = make_ai_app_create(profile)
+    bench_app = _build_app(app_row, agent_rows)
+
+    suite.add(f"convert_to_response[{profile}]", lambda row=app_row: AIAppService._convert_to_response(row))
+    suite.add(f"agent_out_parse_tools[{profile}]", lambda row=agent_row: _validate_orm(AgentOut, row))
+    suite.add(
+        f"dump_json_lists[{profile}]",
+        lambda data=create_data: (
+            AIAppService._dump_json_list(data.agent_list),
+            AIAppService._dump_json_list(data.mcp_list),
+            AIAppService._dump_json_list(data.llm_config),
+        ),
+    )
+    suite.add(
+        f"response_validation_ai_app[{profile}]",
+        lambda a=bench_app: asgi_request(a, "GET", "/ai-app", loop=loop),
+    )
+    suite.add(
+        f"response_validation_agent_list[{profile}]",
+        lambda a=bench_app: asgi_request(a, "GET", "/agents", loop=loop),
+    )
+
+
+if __name__ == "__main__":
+    suite.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+worker冷启动耗时基准测试
+
+每次都在新的Python进程中导入 app.main 并执行startup钩子，模拟一个worker的冷启动：
+- import_app: 只导入应用（不创建数据库引擎）
+- boot_skip_schema_check: 导入 + startup（--skip-schema-check 模式）
+- boot_with_schema_check: 导入 + startup（对已迁移的sqlite库做一次版本检查）
+
+运行: python -m benchmarks.bench_startup [--save-baseline]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.harness import BenchmarkSuite
+from app.db.schema import PROJECT_ROOT
+
+IMPORT_SCRIPT = "import app.main"
+BOOT_SCRIPT = """
+from app.main import app
+for handler in app.router.on_startup:
+    handler()
+"""
+
+suite = BenchmarkSuite("startup")
+
+_db_dir = tempfile.mkdtemp(prefix="bench_startup_")
+_db_url = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+
+
+def _run(script: str, **env) -> None:
+    environment = dict(os.environ, DB_URL=_db_url, SQL_ECHO="false", PYTHONWARNINGS="ignore", **env)
+    subprocess.run([sys.executable, "-c", script], cwd=PROJECT_ROOT, env=environment, check=True, capture_output=True)
+
+
+def _migrate() -> None:
+    _run("from init_db import create_tables; assert create_tables()")
+
+
+_migrate()
+
+suite.add("import_app", lambda: _run(IMPORT_SCRIPT), min_time=0)
+suite.add("boot_skip_schema_check", lambda: _run(BOOT_SCRIPT, SKIP_SCHEMA_CHECK="true"), min_time=0)
+suite.add("boot_with_schema_check", lambda: _run(BOOT_SCRIPT), min_time=0)
+
+
+if __name__ == "__main__":
+    suite.main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+目录统计读取延迟基准测试
+
+在临时sqlite库中准备 100k 个AI应用（10k 个用户）、10k 个Agent和 1k 个MCP，对比：
+- group_by: 每次读取都用 GROUP BY 全量计算
+- snapshot: 读取增量维护的快照（两次写入之间）
+- snapshot_after_write: 一次写入后的首次读取（重新生成快照）
+- get_stats: 经过路由、响应校验和序列化的 GET /stats
+- reconcile: 后台全量重算一次的耗时
+
+运行: python -m benchmarks.bench_stats [--save-baseline]
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_stats_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+from sqlalchemy import func  # noqa: E402
+
+from app.api import stats  # noqa: E402
+from app.core.events import ChangeEvent  # noqa: E402
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models.agent import Agent  # noqa: E402
+from app.models.ai_app import AIApp  # noqa: E402
+from app.models.mcp import MCP  # noqa: E402
+from app.services.stats_service import stats_service  # noqa: E402
+from benchmarks.harness import BenchmarkSuite, asgi_request  # noqa: E402
+
+APP_COUNT = 100_000
+USER_COUNT = 10_000
+AGENT_COUNT = 10_000
+MCP_COUNT = 1_000
+
+suite = BenchmarkSuite("stats")
+loop = asyncio.new_event_loop()
+bench_app = FastAPI()
+bench_app.include_router(stats.router)
+
+
+def seed() -> None:
+    init_db()
+    with get_engine().begin() as connection:
+        connection.execute(MCP.__table__.insert(), [
+            {"id": f"mcp-{i:05d}", "name": f"工具{i}", "provider": f"provider-{i % 5}", "model": f"model-{i % 20}", "api_key": "sk-bench"}
+            for i in range(MCP_COUNT)
+        ])
+        connection.execute(Agent.__table__.insert(), [
+            {"id": f"agent-{i:05d}", "name": f"Agent{i}", "system_prompt": "你是一个助手", "mcp_id": f"mcp-{i % MCP_COUNT:05d}"}
+            for i in range(AGENT_COUNT)
+        ])
+        rows = [
+            {
+                "id": f"app-{i:06d}", "name": f"应用{i}", "identifier": f"app-{i:06d}", "is_active": i % 7 != 0,
+                "app_type": "platform" if i % 10 == 0 else "user",
+                "user_id": None if i % 10 == 0 else f"user-{i % USER_COUNT:05d}",
+            }
+            for i in range(APP_COUNT)
+        ]
+        for i in range(0, len(rows), 10000):
+            connection.execute(AIApp.__table__.insert(), rows[i:i + 10000])
+
+
+def group_by() -> None:
+    db = get_session_factory()()
+    try:
+        db.query(AIApp.app_type, func.count()).group_by(AIApp.app_type).all()
+        db.query(AIApp.is_active, func.count()).group_by(AIApp.is_active).all()
+        db.query(AIApp.user_id, func.count()).group_by(AIApp.user_id).order_by(func.count().desc()).limit(100).all()
+        db.query(Agent.mcp_id, func.count()).group_by(Agent.mcp_id).order_by(func.count().desc()).limit(100).all()
+        db.query(MCP.provider, MCP.model, func.count()).group_by(MCP.provider, MCP.model).all()
+    finally:
+        db.close()
+
+
+def snapshot_after_write() -> None:
+    # 模拟一次应用更新事件（按主键读取一行）后重新生成快照
+    stats_service.on_change(ChangeEvent("ai_app", "app-000001", "update", 0))
+    stats_service.snapshot()
+
+
+suite.add("group_by", group_by)
+suite.add("snapshot", stats_service.snapshot)
+suite.add("snapshot_after_write", snapshot_after_write)
+suite.add("get_stats", lambda: asgi_request(bench_app, "GET", "/stats", loop=loop))
+suite.add("reconcile", stats_service.reconcile, repeat=3)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    stats_service.ensure_built()
+    print(f"准备数据: {time.perf_counter() - start:.1f}s")
+    suite.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+流式导出内存与首字节时间基准测试
+
+在临时sqlite库中写入 100k 个Agent，对比：
+- list: 与 GET /agent/ 相同的方式，一次性构建全部 AgentOut 再序列化
+- stream: GET /agent/export 使用的流式导出
+
+分别在 10k 和 100k 行下测量峰值内存（tracemalloc）。流式导出的峰值内存
+在 100k 行时超过 10k 行的 1.5 倍即视为失败；首字节时间记录到基线中。
+
+运行: python -m benchmarks.bench_streaming [--save-baseline]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_streaming_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from app.db.session import get_engine, get_session_factory, init_db  # noqa: E402
+from app.models.agent import Agent  # noqa: E402
+from app.models.mcp import MCP  # noqa: E402
+from app.schemas.agent import AgentOut  # noqa: E402
+from app.services import agent_service  # noqa: E402
+from benchmarks.fixtures import SYSTEM_PROMPT, tool_configs  # noqa: E402
+from benchmarks.harness import BenchmarkSuite  # noqa: E402
+
+TOTAL_ROWS = 100_000
+SMALL_ROWS = 10_000
+# 前 SMALL_ROWS 行关联到该MCP，用于测量小规模导出
+SMALL_MCP_ID = "mcp-small"
+LARGE_MCP_ID = "mcp-large"
+MAX_GROWTH = 1.5
+
+suite = BenchmarkSuite("streaming")
+
+
+def seed() -> None:
+    init_db()
+    engine = get_engine()
+    tools = json.dumps(tool_configs(3))
+    with engine.begin() as connection:
+        connection.execute(MCP.__table__.insert(), [
+            {"id": mcp_id, "name": mcp_id, "provider": "openai", "model": "gpt-4o", "api_key": "k", "tool_plugins": "[]"}
+            for mcp_id in (SMALL_MCP_ID, LARGE_MCP_ID)
+        ])
+        batch = []
+        for i in range(TOTAL_ROWS):
+            batch.append({
+                "id": f"agent-{i:06d}",
+                "name": f"智能助手{i}",
+                "description": "数据分析助手",
+                "system_prompt": SYSTEM_PROMPT[:500],
+                "temperature": "0.7",
+                "max_tokens": "4000",
+                "is_active": True,
+                "mcp_id": SMALL_MCP_ID if i < SMALL_ROWS else LARGE_MCP_ID,
+                "tools": tools,
+            })
+            if len(batch) == 5000:
+                connection.execute(Agent.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Agent.__table__.insert(), batch)
+
+
+def export_list(mcp_id=None) -> int:
+    """模拟 GET /agent/ 不分页时的行为：全部加载后再序列化"""
+    db = get_session_factory()()
+    try:
+        query = agent_service.filter_agents(db.query(Agent), mcp_id=mcp_id).order_by(Agent.id)
+        body = json.dumps([AgentOut.model_validate(agent).model_dump(mode="json") for agent in query.all()])
+        return len(body)
+    finally:
+        db.close()
+
+
+def export_stream(mcp_id=None) -> int:
+    return sum(len(chunk) for chunk in agent_service.stream_agents("json", mcp_id=mcp_id))
+
+
+def first_chunk(mcp_id=None) -> None:
+    stream = agent_service.stream_agents("json", mcp_id=mcp_id)
+    next(stream)
+    stream.close()
+
+
+def peak_memory(fn, *args) -> int:
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def check_memory() -> bool:
+    print("=== 峰值内存 ===")
+    peaks = {}
+    for mode, fn in (("list", export_list), ("stream", export_stream)):
+        for label, mcp_id in (("10k", SMALL_MCP_ID), ("100k", None)):
+            peaks[(mode, label)] = peak_memory(fn, mcp_id)
+            print(f"{mode:<8} {label:>5} 行: {peaks[(mode, label)] / 1024 / 1024:8.1f} MB")
+
+    growth = peaks[("stream", "100k")] / peaks[("stream", "10k")]
+    if growth > MAX_GROWTH:
+        print(f"❌ 流式导出峰值内存随行数增长 x{growth:.2f}（上限 x{MAX_GROWTH}）")
+        return False
+    print(f"✅ 流式导出峰值内存基本恒定（100k/10k = x{growth:.2f}）")
+    return True
+
+
+suite.add("stream_ttfb[10k]", lambda: first_chunk(SMALL_MCP_ID), min_time=0)
+suite.add("stream_ttfb[100k]", lambda: first_chunk(None), min_time=0)
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    seed()
+    print(f"写入 {TOTAL_ROWS} 行: {time.perf_counter() - start:.1f}s")
+    memory_ok = check_memory()
+    exit_code = suite.run()
+    sys.exit(exit_code or (0 if memory_ok else 1))
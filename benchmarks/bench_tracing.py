@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+追踪开销基准测试
+
+在临时sqlite库中准备 1k 个AI应用，对比：
+- plain_call / traced_call: 普通函数调用与请求之外的 @traced 函数调用
+- asgi_get_ai_app_*: 经过路由的 GET /ai-apps/{id}，不启用追踪 / 启用但未采样 / 全部采样
+- asgi_list_ai_apps_*: GET /ai-apps/（每页100条，每条一个 _convert_to_response span）
+
+运行前输出一次全部采样的列表请求的span树（总耗时 / 自身耗时）。
+
+运行: python -m benchmarks.bench_tracing [--save-baseline]
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_tracing_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.api import ai_app  # noqa: E402
+from app.core import tracing  # noqa: E402
+from app.db.session import get_engine, init_db  # noqa: E402
+from app.models.ai_app import AIApp  # noqa: E402
+from benchmarks.harness import BenchmarkSuite, asgi_request  # noqa: E402
+
+APP_COUNT = 1_000
+
+suite = BenchmarkSuite("tracing")
+loop = asyncio.new_event_loop()
+
+
+class _MemoryExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans = spans
+
+    def close(self):
+        pass
+
+
+def seed() -> None:
+    init_db()
+    with get_engine().begin() as connection:
+        connection.execute(AIApp.__table__.insert(), [
+            {
+                "id": f"app-{i:05d}", "name": f"应用{i}", "identifier": f"ident-{i:05d}", "description": "智能助手" * 10,
+                "agent_list": json.dumps([{"agent_id": f"agent-{j}", "name": f"Agent{j}"} for j in range(3)]),
+                "app_type": "platform", "version": 1,
+            }
+            for i in range(APP_COUNT)
+        ])
+
+
+def create_app(sample_ratio=None):
+    """sample_ratio 为 None 时不启用追踪中间件"""
+    app = FastAPI()
+    app.include_router(ai_app.router)
+    if sample_ratio is not None:
+        app.add_middleware(_FlushingTracingMiddleware, tracer=tracing.Tracer(tracing.BatchSpanProcessor(_MemoryExporter()), sample_ratio))
+    return app
+
+
+class _FlushingTracingMiddleware(tracing.TracingMiddleware):
+    """每个请求结束后立即导出，避免队列积压影响计时"""
+
+    async def __call__(self, scope, receive, send):
+        await super().__call__(scope, receive, send)
+        self.tracer.processor.flush()
+
+
+def plain():
+    return None
+
+
+traced = tracing.traced(plain, name="plain")
+plain_app, unsampled_app, sampled_app = create_app(), create_app(0.0), create_app(1.0)
+
+suite.add("plain_call", plain)
+suite.add("traced_call", traced)
+for label, bench_app in (("plain", plain_app), ("unsampled", unsampled_app), ("sampled", sampled_app)):
+    suite.add(f"asgi_get_ai_app_{label}", lambda bench_app=bench_app: asgi_request(bench_app, "GET", "/ai-apps/app-00042", loop=loop))
+    # 列表不缓存，每次都查询数据库并转换100条
+    suite.add(f"asgi_list_ai_apps_{label}", lambda bench_app=bench_app: asgi_request(bench_app, "GET", "/ai-apps/?size=100", loop=loop))
+
+
+def print_sample_trace() -> None:
+    exporter = _MemoryExporter()
+    tracer = tracing.Tracer(tracing.BatchSpanProcessor(exporter), 1.0)
+    app = FastAPI()
+    app.include_router(ai_app.router)
+    app.add_middleware(tracing.TracingMiddleware, tracer=tracer)
+    # 第一次请求包含路由和响应模型的初始化，只输出第二次请求
+    for _ in range(2):
+        asgi_request(app, "GET", "/ai-apps/?size=100", loop=loop)
+        tracer.processor.flush()
+    lines, converts = [], 0
+    for line in tracing.format_trace(exporter.spans):
+        if line.endswith("_convert_to_response"):
+            converts += 1
+            if converts > 3:
+                continue
+        lines.append(line)
+    print(f"--- GET /ai-apps/?size=100 的span树（总耗时 / 自身耗时，省略{converts - 3}个 _convert_to_response） ---")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    seed()
+    tracing.instrument_sqlalchemy(tracing.tracer)
+    print_sample_trace()
+    suite.main()
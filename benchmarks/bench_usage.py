@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+大模型用量计量开销基准测试
+
+在临时sqlite库中对比一次（模拟的）大模型调用在不同计量方式下的耗时：
+- record: 登记一条用量记录（只写入内存环形缓冲区）
+- call_bare: 不计量
+- call_metered: 通过 usage_meter.track() 计量，后台线程批量写入
+- call_sync_insert: 每次调用后同步 INSERT 一条明细（对照）
+
+之后运行一次压测：多个线程持续调用（每次等待 STRESS_CALL_SECONDS 模拟响应时间）并计量，
+同时后台线程写入，输出计量开销的 p50/p99、写入条数和丢弃条数，确认写入期间不阻塞调用方。
+
+运行: python -m benchmarks.bench_usage [--save-baseline]
+"""
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+# 必须在导入 app 之前设置数据库
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='bench_usage_'), 'bench.db')}"
+os.environ["SQL_ECHO"] = "false"
+
+from app.db.session import get_engine, init_db  # noqa: E402
+from app.models.usage import LLMUsage  # noqa: E402
+from app.services.usage_service import UsageMeter  # noqa: E402
+from benchmarks.harness import BenchmarkSuite  # noqa: E402
+
+suite = BenchmarkSuite("usage")
+meter = UsageMeter(batch_size=5000, flush_interval=1.0)
+
+STRESS_THREADS = 32
+STRESS_SECONDS = 3.0
+# 压测中每次调用等待的时间，模拟等待大模型响应
+STRESS_CALL_SECONDS = 0.001
+
+
+def fake_completion() -> dict:
+    """模拟一次大模型调用：解析响应体并读取token数"""
+    return {"prompt_tokens": sum(range(200)) % 997, "completion_tokens": 42}
+
+
+@suite.case("record")
+def record() -> None:
+    meter.record("app-1", "openai", "gpt-4o", 120, 42, 350.0, user_id="u1")
+
+
+@suite.case("call_bare")
+def call_bare() -> None:
+    fake_completion()
+
+
+@suite.case("call_metered")
+def call_metered() -> None:
+    with meter.track("app-1", "openai", "gpt-4o", user_id="u1") as usage:
+        usage.update(fake_completion())
+
+
+@suite.case("call_sync_insert")
+def call_sync_insert() -> None:
+    started_at = time.time()
+    usage = fake_completion()
+    with get_engine().begin() as connection:
+        connection.execute(LLMUsage.__table__.insert(), [{
+            "app_id": "app-1", "user_id": "u1", "provider": "openai", "model": "gpt-4o",
+            "prompt_tokens": usage["prompt_tokens"], "completion_tokens": usage["completion_tokens"],
+            "latency_ms": 0, "created_at": datetime.fromtimestamp(started_at, timezone.utc).replace(tzinfo=None),
+        }])
+
+
+def stress() -> None:
+    """多线程持续计量，后台线程同时写入"""
+    stress_meter = UsageMeter(batch_size=5000, flush_interval=0.5)
+    stress_meter.start()
+    stop = threading.Event()
+    samples = [[] for _ in range(STRESS_THREADS)]
+
+    def worker(out):
+        perf_counter = time.perf_counter
+        while not stop.is_set():
+            with stress_meter.track("app-1", "openai", "gpt-4o", user_id="u1") as usage:
+                time.sleep(STRESS_CALL_SECONDS)
+                start = perf_counter()
+                usage["prompt_tokens"], usage["completion_tokens"] = 120, 42
+            # 计量开销：响应返回之后到 with 块退出（登记完成）的耗时
+            out.append(perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(out,)) for out in samples]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(STRESS_SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stress_meter.stop()
+
+    latencies = sorted(sample for out in samples for sample in out)
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99)] * 1e6
+    print(
+        f"压测: {STRESS_THREADS} 线程 {elapsed:.1f}s 登记 {len(latencies)} 次调用，"
+        f"计量开销 p50 {p50:.1f} us / p99 {p99:.1f} us / max {latencies[-1] * 1e6:.0f} us，"
+        f"写入 {stress_meter.written} 条，丢弃 {stress_meter.dropped} 条"
+    )
+
+
+if __name__ == "__main__":
+    init_db()
+    stress()
+    # 基准用例期间后台线程照常写入
+    meter.start()
+    try:
+        suite.main()
+    finally:
+        meter.stop()
@@ -0,0 +1,114 @@
+"""
+基准测试数据构造
+
+按三种规模生成配置：
+- small: 最简单的应用，1个Agent/MCP
+- typical: 常见规模，几个Agent/MCP
+- pathological: 极端规模，数百个Agent/MCP
+"""
+
+import json
+from datetime import datetime, timezone
+
+from app.models.agent import Agent
+from app.models.ai_app import AIApp
+from app.schemas.ai_app import AIAppCreate
+
+PROFILES = {
+    "small": {"agents": 1, "mcps": 1, "llms": 1, "tools": 1},
+    "typical": {"agents": 8, "mcps": 4, "llms": 2, "tools": 5},
+    "pathological": {"agents": 300, "mcps": 200, "llms": 20, "tools": 60},
+}
+
+SYSTEM_PROMPT = "你是一个有用的AI助手，可以帮助用户解决各种问题。请根据用户的需求合理调度可用的工具。" * 20
+
+
+def agent_configs(n: int):
+    return [
+        {"agent_id": f"agent-{i:04d}", "name": f"数据分析Agent{i}", "description": f"专门处理第{i}类数据分析任务"}
+        for i in range(n)
+    ]
+
+
+def mcp_configs(n: int):
+    return [
+        {
+            "mcp_id": f"mcp-{i:04d}",
+            "name": f"工具{i}",
+            "description": f"第{i}个MCP工具",
+            "custom_description": f"针对业务场景优化后的第{i}个工具描述" if i % 2 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def llm_configs(n: int):
+    return [
+        {"provider": "openai", "model": f"gpt-4o-{i}", "temperature": 0.7, "max_tokens": 4000, "api_key": None}
+        for i in range(n)
+    ]
+
+
+def tool_configs(n: int):
+    return [
+        {
+            "name": f"tool_{i}",
+            "description": f"第{i}个工具",
+            "enabled": True,
+            "parameters": {"type": "object", "properties": {"query": {"type": "string"}}},
+        }
+        for i in range(n)
+    ]
+
+
+def make_ai_app_row(profile: str, index: int = 0) -> AIApp:
+    """构造一个未持久化的 AIApp ORM 对象，字段内容与数据库中存储的一致"""
+    spec = PROFILES[profile]
+    return AIApp(
+        id=f"app-{profile}-{index}",
+        name=f"智能客服助手{index}",
+        identifier=f"smart-customer-service-{profile}-{index}",
+        icon="https://example.com/icon.png",
+        description="一个智能客服助手，能够回答用户问题并提供帮助",
+        is_active=True,
+        dashboard_url="https://dashboard.example.com",
+        access_url=f"/app/smart-customer-service-{profile}-{index}",
+        main_agent_id=None,
+        agent_list=json.dumps(agent_configs(spec["agents"])),
+        mcp_list=json.dumps(mcp_configs(spec["mcps"])),
+        llm_config=json.dumps(llm_configs(spec["llms"])),
+        system_prompt=SYSTEM_PROMPT,
+        app_type="platform",
+        user_id=None,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        updated_at=None,
+    )
+
+
+def make_agent_row(profile: str, index: int = 0) -> Agent:
+    """构造一个未持久化的 Agent ORM 对象"""
+    spec = PROFILES[profile]
+    return Agent(
+        id=f"agent-{profile}-{index}",
+        name=f"智能助手{index}",
+        description="第一个智能助手",
+        system_prompt=SYSTEM_PROMPT,
+        temperature="0.7",
+        max_tokens="4000",
+        is_active=True,
+        mcp_id="test-001",
+        tools=json.dumps(tool_configs(spec["tools"])),
+    )
+
+
+def make_ai_app_create(profile: str) -> AIAppCreate:
+    spec = PROFILES[profile]
+    return AIAppCreate(
+        name="智能客服助手",
+        identifier=f"smart-customer-service-{profile}",
+        description="一个智能客服助手，能够回答用户问题并提供帮助",
+        agent_list=agent_configs(spec["agents"]),
+        mcp_list=mcp_configs(spec["mcps"]),
+        llm_config=llm_configs(spec["llms"]),
+        system_prompt=SYSTEM_PROMPT,
+    )
@@ -0,0 +1,187 @@
+"""
+基准测试公共工具
+
+- 计时：自动确定每轮调用次数，多轮重复后取中位数
+- 基线：结果记录在 benchmarks/baseline.json 中，超出容差即视为性能回退，
+  进程以非零状态码退出，便于在CI中直接使用
+
+用法（以序列化基准为例）：
+
+    python -m benchmarks.bench_serialization                  # 与基线比较
+    python -m benchmarks.bench_serialization --save-baseline  # 更新基线
+    python -m benchmarks.bench_serialization -k pathological  # 只运行部分用例
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# 默认容差：比基线慢30%以上视为回退
+DEFAULT_TOLERANCE = 0.30
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    """测量 fn 的单次调用耗时（微秒），返回中位数/最小值/最大值"""
+    # 自动确定每轮调用次数，使每轮耗时不少于 min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+
+    return {
+        "median_us": statistics.median(samples),
+        "min_us": min(samples),
+        "max_us": max(samples),
+        "number": number,
+    }
+
+
+def asgi_request(
+    app,
+    method: str,
+    path: str,
+    body: Optional[bytes] = None,
+    headers: Optional[List[Tuple[bytes, bytes]]] = None,
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    """不经过网络直接调用ASGI应用，返回 (状态码, 响应头, 响应体)"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": headers or [],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    request_body = body or b""
+    received = False
+    status = 0
+    response_headers: List[Tuple[bytes, bytes]] = []
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": request_body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = list(message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    if loop is None:
+        asyncio.run(app(scope, receive, send))
+    else:
+        loop.run_until_complete(app(scope, receive, send))
+    return status, response_headers, b"".join(chunks)
+
+
+class BenchmarkSuite:
+    """一组基准用例，结果按 suite 名称记录在基线文件中"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cases: List[Tuple[str, Callable[[], Any], Dict[str, Any]]] = []
+
+    def add(self, case_name: str, fn: Callable[[], Any], **options) -> None:
+        self.cases.append((case_name, fn, options))
+
+    def case(self, case_name: str, **options):
+        """装饰器形式注册用例"""
+        def decorator(fn):
+            self.add(case_name, fn, **options)
+            return fn
+        return decorator
+
+    def run(self, argv: Optional[List[str]] = None) -> int:
+        parser = argparse.ArgumentParser(description=f"基准测试: {self.name}")
+        parser.add_argument("--save-baseline", action="store_true", help="将本次结果写入基线文件")
+        parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件路径")
+        parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的相对回退比例")
+        parser.add_argument("-k", dest="keyword", default=None, help="只运行名称包含该关键字的用例")
+        parser.add_argument("--repeat", type=int, default=5, help="重复轮数")
+        args = parser.parse_args(argv)
+
+        baseline = _load_baseline(args.baseline)
+        suite_baseline = baseline.get(self.name, {})
+        results: Dict[str, Dict[str, float]] = {}
+        regressions = []
+
+        print(f"=== {self.name} ===")
+        for case_name, fn, options in self.cases:
+            if args.keyword and args.keyword not in case_name:
+                continue
+            result = measure(fn, repeat=options.get("repeat", args.repeat), min_time=options.get("min_time", 0.2))
+            results[case_name] = result
+
+            line = f"{case_name:<60} {result['median_us']:>12.1f} us"
+            reference = suite_baseline.get(case_name)
+            if reference:
+                ratio = result["median_us"] / reference["median_us"]
+                line += f"  (基线 {reference['median_us']:.1f} us, x{ratio:.2f})"
+                if ratio > 1 + args.tolerance:
+                    line += "  ❌ 回退"
+                    regressions.append(case_name)
+            print(line)
+
+        if args.save_baseline:
+            suite_baseline.update({
+                name: {"median_us": round(r["median_us"], 3)} for name, r in results.items()
+            })
+            baseline[self.name] = suite_baseline
+            _save_baseline(args.baseline, baseline)
+            print(f"✅ 基线已写入 {args.baseline}")
+            return 0
+
+        if regressions:
+            print(f"❌ {len(regressions)} 个用例超出基线 {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+        print("✅ 未发现性能回退")
+        return 0
+
+    def main(self) -> None:
+        sys.exit(self.run())
+
+
+def _load_baseline(path: str) -> Dict[str, Dict[str, Dict[str, float]]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_baseline(path: str, data: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
@@ -0,0 +1,84 @@
+"""
+测试公共设施
+
+- temp_database: 创建临时sqlite数据库并建表，服务层使用的全局状态（变更历史写入的引擎、
+  引用存在性缓存、响应缓存、应用版本缓存）切换到新数据库
+- use_database: 应用默认的数据库引擎和会话工厂（get_engine/get_session_factory）指向临时数据库，
+  用于在请求会话之外自行创建会话的代码（如流式导出）
+- 每个测试结束后恢复测试中修改过的进程级全局状态（默认数据库、变更历史引擎、压缩配置、
+  settings、事件总线订阅者、各缓存），释放并删除测试创建的临时数据库
+
+测试文件直接用 python 运行时同样调用 temp_database，只是不做恢复。
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+
+# 本测试创建的 (引擎, 临时目录)
+_databases = []
+
+
+def temp_database(prefix: str, tables=None, **engine_options):
+    """创建临时sqlite数据库，tables 为空时建全部表，返回引擎"""
+    from app.core.cache import response_cache
+    from app.db.session import Base
+    from app.models import agent, ai_app, app_version, change_history, conversation, entity_change, job, mcp, usage  # noqa: F401
+    from app.services.app_version_service import version_cache
+    from app.services.history_service import history_buffer
+    from app.services.reference_service import existence_cache
+
+    directory = tempfile.mkdtemp(prefix=prefix)
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'test.db')}", **engine_options)
+    Base.metadata.create_all(engine, tables=tables)
+    _databases.append((engine, directory))
+    # 更新时的变更历史同步写入临时数据库；缓存中是之前数据库的数据
+    history_buffer.engine = engine
+    existence_cache.clear()
+    response_cache.clear()
+    version_cache.clear()
+    return engine
+
+
+def use_database(engine) -> None:
+    """应用默认的数据库引擎和会话工厂指向 engine"""
+    from sqlalchemy.orm import sessionmaker
+    from app.db import session
+
+    session._engine = engine
+    session._session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture(autouse=True)
+def restore_globals():
+    """测试结束后恢复进程级全局状态"""
+    from app.config import settings
+    from app.core.cache import response_cache
+    from app.core.events import get_bus
+    from app.db import compression, session
+    from app.services.app_version_service import version_cache
+    from app.services.history_service import history_buffer
+    from app.services.reference_service import existence_cache
+
+    default_database = (session._engine, session._session_factory)
+    history_engine = history_buffer.engine
+    codec = compression._codec
+    options = dict(vars(settings))
+    subscribers = list(get_bus()._subscribers)
+    yield
+    session._engine, session._session_factory = default_database
+    history_buffer.engine = history_engine
+    compression.set_codec(codec)
+    for name, value in options.items():
+        if getattr(settings, name) != value:
+            setattr(settings, name, value)
+    get_bus()._subscribers[:] = subscribers
+    for cache in (existence_cache, response_cache, version_cache):
+        cache.clear()
+    while _databases:
+        engine, directory = _databases.pop()
+        engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
@@ -1,20 +1,34 @@
 #!/usr/bin/env python3
 """
 数据库初始化脚本
-用于创建MySQL数据库和表结构
+通过 alembic 迁移创建/升级MySQL表结构
 """
 
-from app.config import settings
-from app.db.session import init_db, engine
-from app.models.mcp import Base
-from app.models.agent import Agent
-from app.models.ai_app import AIApp
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from app.db.session import get_engine
+from app.db.schema import PROJECT_ROOT, get_current_revision
+
+# 迁移引入之前由 create_all 建好的表对应的版本
+INITIAL_REVISION = "0001"
+
+def get_alembic_config() -> Config:
+    return Config(os.path.join(PROJECT_ROOT, "alembic.ini"))
 
 def create_tables():
-    """创建表结构"""
+    """创建/升级表结构"""
     try:
-        # 创建所有表
-        Base.metadata.create_all(bind=engine)
+        config = get_alembic_config()
+        engine = get_engine()
+        # 旧版本用 create_all 建好的库没有 alembic_version 表，先标记为初始版本
+        if get_current_revision(engine) is None and inspect(engine).has_table("ai_app"):
+            print("检测到已有表结构，标记为初始版本")
+            command.stamp(config, INITIAL_REVISION)
+        command.upgrade(config, "head")
         print("表结构创建成功")
         return True
     except Exception as e:
@@ -35,4 +49,4 @@ def main():
     print("数据库初始化完成！")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
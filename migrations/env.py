@@ -0,0 +1,51 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.db.session import Base, get_database_url
+# 导入所有模型，使其注册到 Base.metadata
+from app.models import agent, ai_app, app_version, change_history, conversation, entity_change, job, mcp, usage  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # 全文检索索引（ft_前缀）只在MySQL上创建，其他数据库不参与比较
+    if type_ == "index" and name and name.startswith("ft_"):
+        return context.get_context().dialect.name == "mysql"
+    return True
+
+
+def run_migrations_offline():
+    """生成SQL脚本，不连接数据库"""
+    context.configure(
+        url=get_database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = config.attributes.get("connection")
+    if connectable is None:
+        connectable = create_engine(get_database_url(), poolclass=pool.NullPool)
+
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
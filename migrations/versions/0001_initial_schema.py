@@ -0,0 +1,69 @@
+"""初始表结构：mcp、agent、ai_app
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "mcp",
+        sa.Column("id", sa.VARCHAR(255), primary_key=True),
+        sa.Column("name", sa.VARCHAR(255), nullable=False),
+        sa.Column("provider", sa.VARCHAR(100), nullable=False),
+        sa.Column("model", sa.VARCHAR(100), nullable=False),
+        sa.Column("temperature", sa.VARCHAR(10)),
+        sa.Column("api_key", sa.Text, nullable=False),
+        sa.Column("tool_plugins", sa.Text),
+    )
+    op.create_index("ix_mcp_id", "mcp", ["id"])
+
+    op.create_table(
+        "agent",
+        sa.Column("id", sa.VARCHAR(255), primary_key=True),
+        sa.Column("name", sa.VARCHAR(255), nullable=False),
+        sa.Column("description", sa.Text),
+        sa.Column("system_prompt", sa.Text, nullable=False),
+        sa.Column("temperature", sa.VARCHAR(10)),
+        sa.Column("max_tokens", sa.VARCHAR(10)),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("mcp_id", sa.VARCHAR(255), nullable=False),
+        sa.Column("tools", sa.Text),
+    )
+    op.create_index("ix_agent_id", "agent", ["id"])
+
+    op.create_table(
+        "ai_app",
+        sa.Column("id", sa.VARCHAR(255), primary_key=True),
+        sa.Column("name", sa.VARCHAR(255), nullable=False, comment="应用名称"),
+        sa.Column("identifier", sa.VARCHAR(255), nullable=False, unique=True, comment="应用标识符"),
+        sa.Column("icon", sa.VARCHAR(500), comment="应用图标URL"),
+        sa.Column("description", sa.Text, comment="应用描述"),
+        sa.Column("is_active", sa.Boolean, comment="启用状态"),
+        sa.Column("dashboard_url", sa.VARCHAR(500), comment="默认Dashboard地址"),
+        sa.Column("access_url", sa.VARCHAR(500), comment="独立访问URL"),
+        sa.Column("main_agent_id", sa.VARCHAR(255), comment="主Agent ID，null表示使用默认Agent"),
+        sa.Column("agent_list", sa.Text, comment="Agent列表，JSON格式存储"),
+        sa.Column("mcp_list", sa.Text, comment="MCP列表，JSON格式存储"),
+        sa.Column("llm_config", sa.Text, comment="大模型配置，JSON格式存储"),
+        sa.Column("system_prompt", sa.Text, comment="系统提示词"),
+        sa.Column("app_type", sa.VARCHAR(50), comment="应用类型：platform-平台应用，user-我的应用"),
+        sa.Column("user_id", sa.VARCHAR(255), comment="创建用户ID，平台应用为null"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_ai_app_id", "ai_app", ["id"])
+
+
+def downgrade():
+    op.drop_table("ai_app")
+    op.drop_table("agent")
+    op.drop_table("mcp")
@@ -0,0 +1,30 @@
+"""实体变更记录表 entity_change
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "entity_change",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("entity_type", sa.VARCHAR(50), nullable=False, comment="实体类型：ai_app/agent/mcp"),
+        sa.Column("entity_id", sa.VARCHAR(255), nullable=False, comment="实体ID"),
+        sa.Column("op", sa.VARCHAR(20), nullable=False, comment="操作：create/update/delete"),
+        sa.Column("version", sa.BigInteger, nullable=False, comment="变更版本"),
+        sa.Column("origin", sa.VARCHAR(64), comment="发布变更的worker标识"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    op.drop_table("entity_change")
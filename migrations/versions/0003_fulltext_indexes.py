@@ -0,0 +1,34 @@
+"""全文检索索引（MySQL FULLTEXT + ngram分词）
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+FULLTEXT_INDEXES = [
+    ("ft_ai_app_text", "ai_app", ["name", "description", "system_prompt"]),
+    ("ft_agent_text", "agent", ["name", "description", "system_prompt"]),
+    ("ft_mcp_text", "mcp", ["name", "provider", "model"]),
+]
+
+
+def upgrade():
+    # 其他数据库没有FULLTEXT索引，搜索使用内存倒排索引
+    if op.get_bind().dialect.name != "mysql":
+        return
+    for name, table, columns in FULLTEXT_INDEXES:
+        op.create_index(name, table, columns, mysql_prefix="FULLTEXT", mysql_with_parser="ngram")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "mysql":
+        return
+    for name, table, _ in FULLTEXT_INDEXES:
+        op.drop_index(name, table_name=table)
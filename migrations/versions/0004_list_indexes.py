@@ -0,0 +1,32 @@
+"""Agent/MCP 列表过滤、排序与游标分页索引
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_agent_mcp_id", "agent", ["mcp_id", "id"]),
+    ("ix_agent_is_active", "agent", ["is_active", "id"]),
+    ("ix_agent_name", "agent", ["name", "id"]),
+    ("ix_mcp_provider_model", "mcp", ["provider", "model", "id"]),
+    ("ix_mcp_model", "mcp", ["model", "id"]),
+    ("ix_mcp_name", "mcp", ["name", "id"]),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
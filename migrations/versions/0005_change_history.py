@@ -0,0 +1,31 @@
+"""字段级变更历史表 change_history
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "change_history",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("entity_type", sa.VARCHAR(50), nullable=False, comment="实体类型：ai_app/agent/mcp"),
+        sa.Column("entity_id", sa.VARCHAR(255), nullable=False, comment="实体ID"),
+        sa.Column("field", sa.VARCHAR(100), nullable=False, comment="变更字段"),
+        sa.Column("old_value", sa.Text, comment="变更前的值"),
+        sa.Column("new_value", sa.Text, comment="变更后的值"),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False, comment="变更时间（写入缓冲区的时间）"),
+    )
+    op.create_index("ix_change_history_entity", "change_history", ["entity_type", "entity_id", "id"])
+
+
+def downgrade():
+    op.drop_table("change_history")
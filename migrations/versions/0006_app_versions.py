@@ -0,0 +1,46 @@
+"""AI应用发布版本与内容寻址存储：content_blob、ai_app_version、ai_app.published_version
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "content_blob",
+        sa.Column("hash", sa.VARCHAR(64), primary_key=True, comment="内容的SHA-256"),
+        sa.Column("content", sa.Text().with_variant(mysql.LONGTEXT, "mysql"), nullable=False),
+        sa.Column("size", sa.Integer, nullable=False, comment="内容字节数"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "ai_app_version",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("app_id", sa.VARCHAR(255), nullable=False, comment="AI应用ID"),
+        sa.Column("version", sa.Integer, nullable=False, comment="版本号，从1开始递增"),
+        sa.Column("config_hash", sa.VARCHAR(64), nullable=False, comment="完整配置的SHA-256，用作ETag"),
+        sa.Column("base_config", sa.Text, nullable=False, comment="基础配置（名称、标识符等小字段），JSON格式"),
+        sa.Column("system_prompt_hash", sa.VARCHAR(64), comment="系统提示词内容哈希"),
+        sa.Column("agent_list_hash", sa.VARCHAR(64), comment="Agent列表内容哈希"),
+        sa.Column("mcp_list_hash", sa.VARCHAR(64), comment="MCP列表内容哈希"),
+        sa.Column("llm_config_hash", sa.VARCHAR(64), comment="大模型配置内容哈希"),
+        sa.Column("note", sa.VARCHAR(500), comment="发布说明"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("app_id", "version", name="uq_ai_app_version"),
+    )
+    op.add_column("ai_app", sa.Column("published_version", sa.Integer, comment="当前发布的版本号，null表示未发布"))
+
+
+def downgrade():
+    op.drop_column("ai_app", "published_version")
+    op.drop_table("ai_app_version")
+    op.drop_table("content_blob")
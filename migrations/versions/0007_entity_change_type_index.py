@@ -0,0 +1,20 @@
+"""增量同步按实体类型过滤的索引 entity_change(entity_type, id)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_entity_change_type", "entity_change", ["entity_type", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_entity_change_type", table_name="entity_change")
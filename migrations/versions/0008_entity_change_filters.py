@@ -0,0 +1,23 @@
+"""entity_change 增加 identifier、user_id，用于事件推送过滤
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("entity_change", sa.Column("identifier", sa.VARCHAR(255), comment="AI应用标识符，用于事件推送过滤"))
+    op.add_column("entity_change", sa.Column("user_id", sa.VARCHAR(255), comment="AI应用所属用户ID，用于事件推送过滤"))
+
+
+def downgrade():
+    op.drop_column("entity_change", "user_id")
+    op.drop_column("entity_change", "identifier")
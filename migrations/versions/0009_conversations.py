@@ -0,0 +1,50 @@
+"""会话存储：conversation、conversation_message
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "conversation",
+        sa.Column("id", sa.VARCHAR(64), primary_key=True),
+        sa.Column("app_id", sa.VARCHAR(255), nullable=False, comment="AI应用ID"),
+        sa.Column("user_id", sa.VARCHAR(255), comment="用户ID"),
+        sa.Column("title", sa.VARCHAR(255), comment="会话标题"),
+        sa.Column("message_count", sa.Integer, nullable=False, comment="累计消息数，即最后一条消息的序号"),
+        sa.Column("token_count", sa.BigInteger, nullable=False, comment="累计token数"),
+        sa.Column("summary", sa.Text, comment="已压缩消息的摘要"),
+        sa.Column("summarized_until", sa.Integer, nullable=False, comment="序号不大于该值的消息已压缩进摘要"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_active_at", sa.DateTime(timezone=True), nullable=False, comment="最后追加消息的时间"),
+    )
+    op.create_index("ix_conversation_app_user", "conversation", ["app_id", "user_id", "last_active_at"])
+    op.create_index("ix_conversation_last_active", "conversation", ["last_active_at"])
+    op.create_table(
+        "conversation_message",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("conversation_id", sa.VARCHAR(64), nullable=False, comment="会话ID"),
+        sa.Column("seq", sa.Integer, nullable=False, comment="会话内序号，从1开始"),
+        sa.Column("role", sa.VARCHAR(20), nullable=False, comment="角色：system/user/assistant/tool"),
+        sa.Column("content", sa.Text().with_variant(mysql.LONGTEXT, "mysql"), nullable=False, comment="消息内容"),
+        sa.Column("token_count", sa.Integer, nullable=False, comment="估算的token数"),
+        sa.Column("token_offset", sa.BigInteger, nullable=False, comment="该消息之前的累计token数"),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_conversation_message_seq", "conversation_message", ["conversation_id", "seq"], unique=True)
+    op.create_index("ix_conversation_message_tokens", "conversation_message", ["conversation_id", "token_offset"])
+
+
+def downgrade():
+    op.drop_table("conversation_message")
+    op.drop_table("conversation")
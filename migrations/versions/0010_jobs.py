@@ -0,0 +1,38 @@
+"""后台任务表 job
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job",
+        sa.Column("id", sa.VARCHAR(64), primary_key=True),
+        sa.Column("type", sa.VARCHAR(100), nullable=False, comment="任务类型"),
+        sa.Column("status", sa.VARCHAR(20), nullable=False, comment="状态：queued/running/succeeded/failed/cancelled"),
+        sa.Column("payload", sa.Text, comment="任务参数，JSON格式"),
+        sa.Column("result", sa.Text, comment="任务结果，JSON格式"),
+        sa.Column("error", sa.Text, comment="最近一次失败的错误信息"),
+        sa.Column("attempts", sa.Integer, nullable=False, comment="已执行次数"),
+        sa.Column("max_attempts", sa.Integer, nullable=False, comment="最多执行次数"),
+        sa.Column("run_after", sa.DateTime, nullable=False, comment="最早执行时间，失败重试时按退避时间推迟"),
+        sa.Column("locked_by", sa.VARCHAR(64), comment="执行该任务的worker"),
+        sa.Column("locked_at", sa.DateTime, comment="租约续期时间，超时未续期视为worker已退出"),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime, comment="完成时间"),
+    )
+    op.create_index("ix_job_status_run_after", "job", ["status", "run_after"])
+    op.create_index("ix_job_status_locked_at", "job", ["status", "locked_at"])
+
+
+def downgrade():
+    op.drop_table("job")
@@ -0,0 +1,74 @@
+"""大文本列压缩：agent.system_prompt/tools，ai_app.system_prompt/agent_list/llm_config 改为二进制
+
+已有数据按UTF-8原样保留，读取时直接返回，下次写入或执行
+`python -m app.db.compression recompress` 时压缩。
+MySQL FULLTEXT 索引不支持二进制列，ai_app/agent 的全文索引去掉 system_prompt。
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+from app.db.compression import Codec, CompressedText, set_codec, get_codec
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "agent": [("system_prompt", False), ("tools", True)],
+    "ai_app": [("system_prompt", True), ("agent_list", True), ("llm_config", True)],
+}
+FULLTEXT_INDEXES = [
+    ("ft_ai_app_text", "ai_app"),
+    ("ft_agent_text", "agent"),
+]
+
+
+def _binary():
+    return sa.LargeBinary().with_variant(mysql.LONGBLOB(), "mysql")
+
+
+def upgrade():
+    is_mysql = op.get_bind().dialect.name == "mysql"
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.drop_index(name, table_name=table)
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column, nullable in columns:
+                batch.alter_column(column, type_=_binary(), existing_type=sa.Text(), existing_nullable=nullable)
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.create_index(name, table, ["name", "description"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram")
+
+
+def downgrade():
+    bind = op.get_bind()
+    is_mysql = bind.dialect.name == "mysql"
+    # 先把压缩的值解压为原文
+    codec = get_codec()
+    set_codec(Codec("none"))
+    try:
+        for table, columns in COLUMNS.items():
+            t = sa.table(table, sa.column("id", sa.VARCHAR(255)), *[sa.column(c, CompressedText()) for c, _ in columns])
+            for row in bind.execute(sa.select(t)).mappings().all():
+                bind.execute(t.update().where(t.c.id == row["id"]).values({c: row[c] for c, _ in columns}))
+    finally:
+        set_codec(codec)
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.drop_index(name, table_name=table)
+    for table, columns in COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            for column, nullable in columns:
+                batch.alter_column(column, type_=sa.Text(), existing_type=_binary(), existing_nullable=nullable)
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.create_index(
+                name, table, ["name", "description", "system_prompt"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+            )
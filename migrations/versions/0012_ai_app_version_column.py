@@ -0,0 +1,25 @@
+"""AI应用乐观并发控制：ai_app.version
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 已有记录从版本1开始
+    op.add_column("ai_app", sa.Column(
+        "version", sa.Integer, nullable=False, server_default="1",
+        comment="配置版本号，每次修改递增，用作ETag",
+    ))
+
+
+def downgrade():
+    op.drop_column("ai_app", "version")
@@ -0,0 +1,56 @@
+"""大模型用量计量：llm_usage、llm_usage_hourly、llm_usage_daily
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0013"
+down_revision = "0012"
+branch_labels = None
+depends_on = None
+
+
+def _rollup_columns():
+    return [
+        sa.Column("app_id", sa.VARCHAR(255), primary_key=True, comment="AI应用ID"),
+        sa.Column("bucket", sa.DateTime, primary_key=True, comment="时间段起点（UTC）"),
+        sa.Column("user_id", sa.VARCHAR(255), primary_key=True, comment="调用用户ID，没有用户时为空字符串"),
+        sa.Column("provider", sa.VARCHAR(100), primary_key=True, comment="大模型提供商"),
+        sa.Column("model", sa.VARCHAR(100), primary_key=True, comment="模型"),
+        sa.Column("calls", sa.BigInteger, nullable=False, comment="调用次数"),
+        sa.Column("errors", sa.BigInteger, nullable=False, comment="失败次数"),
+        sa.Column("prompt_tokens", sa.BigInteger, nullable=False, comment="输入token数"),
+        sa.Column("completion_tokens", sa.BigInteger, nullable=False, comment="输出token数"),
+        sa.Column("latency_ms_sum", sa.BigInteger, nullable=False, comment="调用耗时之和（毫秒），除以调用次数即平均耗时"),
+        sa.Column("latency_ms_max", sa.Integer, nullable=False, comment="最大调用耗时（毫秒）"),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "llm_usage",
+        sa.Column("id", sa.BigInteger().with_variant(sa.Integer, "sqlite"), primary_key=True, autoincrement=True),
+        sa.Column("app_id", sa.VARCHAR(255), nullable=False, comment="AI应用ID"),
+        sa.Column("user_id", sa.VARCHAR(255), comment="调用用户ID"),
+        sa.Column("provider", sa.VARCHAR(100), nullable=False, comment="大模型提供商"),
+        sa.Column("model", sa.VARCHAR(100), nullable=False, comment="模型"),
+        sa.Column("prompt_tokens", sa.Integer, nullable=False, comment="输入token数"),
+        sa.Column("completion_tokens", sa.Integer, nullable=False, comment="输出token数"),
+        sa.Column("latency_ms", sa.Integer, nullable=False, comment="调用耗时（毫秒）"),
+        sa.Column("error", sa.VARCHAR(100), comment="失败时的错误类型，成功为null"),
+        sa.Column("created_at", sa.DateTime, nullable=False, comment="调用开始时间（UTC）"),
+    )
+    op.create_index("ix_llm_usage_app_created", "llm_usage", ["app_id", "created_at"])
+    op.create_index("ix_llm_usage_created", "llm_usage", ["created_at"])
+    # 主键以 (app_id, bucket) 开头，按应用查询时间范围直接使用主键
+    op.create_table("llm_usage_hourly", *_rollup_columns())
+    op.create_table("llm_usage_daily", *_rollup_columns())
+
+
+def downgrade():
+    op.drop_table("llm_usage_daily")
+    op.drop_table("llm_usage_hourly")
+    op.drop_table("llm_usage")
@@ -0,0 +1,61 @@
+"""系统提示词明文前缀：ai_app/agent 增加 prompt_excerpt 并加入全文索引
+
+0011 压缩 system_prompt 后 MySQL FULLTEXT 索引只包含 name、description，/search 在MySQL上不再匹配系统提示词。
+prompt_excerpt 保存系统提示词的前 SEARCH_PROMPT_EXCERPT_LENGTH 个字符（明文），由服务层在写入提示词时维护。
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import settings
+from app.db.compression import CompressedText
+
+revision = "0014"
+down_revision = "0013"
+branch_labels = None
+depends_on = None
+
+FULLTEXT_INDEXES = [
+    ("ft_ai_app_text", "ai_app"),
+    ("ft_agent_text", "agent"),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_mysql = bind.dialect.name == "mysql"
+    for _, table in FULLTEXT_INDEXES:
+        op.add_column(table, sa.Column("prompt_excerpt", sa.Text(), nullable=True, comment="系统提示词的明文前缀，用于全文检索"))
+
+    # 回填：读取（可能已压缩的）系统提示词，写入明文前缀
+    for _, table in FULLTEXT_INDEXES:
+        t = sa.table(table, sa.column("id", sa.VARCHAR(255)), sa.column("system_prompt", CompressedText()), sa.column("prompt_excerpt", sa.Text()))
+        for row in bind.execute(sa.select(t.c.id, t.c.system_prompt)).all():
+            if row.system_prompt is not None:
+                bind.execute(
+                    t.update().where(t.c.id == row.id)
+                    .values(prompt_excerpt=row.system_prompt[:settings.SEARCH_PROMPT_EXCERPT_LENGTH])
+                )
+
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.drop_index(name, table_name=table)
+            op.create_index(
+                name, table, ["name", "description", "prompt_excerpt"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram"
+            )
+
+
+def downgrade():
+    is_mysql = op.get_bind().dialect.name == "mysql"
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.drop_index(name, table_name=table)
+    for _, table in FULLTEXT_INDEXES:
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("prompt_excerpt")
+    if is_mysql:
+        for name, table in FULLTEXT_INDEXES:
+            op.create_index(name, table, ["name", "description"], mysql_prefix="FULLTEXT", mysql_with_parser="ngram")
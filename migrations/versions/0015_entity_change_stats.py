@@ -0,0 +1,21 @@
+"""entity_change 增加 stats，变更事件携带参与目录统计的字段
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0015"
+down_revision = "0014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("entity_change", sa.Column("stats", sa.Text(), comment="参与目录统计的字段（JSON数组），删除时为空"))
+
+
+def downgrade():
+    op.drop_column("entity_change", "stats")
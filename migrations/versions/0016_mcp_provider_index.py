@@ -0,0 +1,23 @@
+"""MCP 按提供商排序和游标分页的 (provider, id) 索引
+
+ix_mcp_provider_model 中 provider 和 id 之间隔着 model，
+ORDER BY provider, id 和游标条件 (provider, id) > (...) 无法使用
+
+Revision ID: 0016
+Revises: 0015
+Create Date: 2026-10-19
+"""
+from alembic import op
+
+revision = "0016"
+down_revision = "0015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_mcp_provider", "mcp", ["provider", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_mcp_provider", table_name="mcp")
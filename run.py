@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+服务启动脚本
+
+    python run.py --workers 4
+    python run.py --skip-schema-check   # 跳过启动时的数据库版本检查
+"""
+
+import argparse
+import os
+
+def main():
+    parser = argparse.ArgumentParser(description="启动LLM平台后端服务")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--reload", action="store_true")
+    parser.add_argument("--skip-schema-check", action="store_true", help="跳过启动时的数据库版本检查")
+    args = parser.parse_args()
+
+    if args.skip_schema_check:
+        # 通过环境变量传给各个worker进程
+        os.environ["SKIP_SCHEMA_CHECK"] = "true"
+
+    import uvicorn
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, reload=args.reload)
+
+if __name__ == "__main__":
+    main()
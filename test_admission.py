@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+准入控制测试
+
+- 内置规则和配置规则的路由分级，格式错误的规则被拒绝
+- 排队深度、平均延迟和进行中请求数超过阈值时按优先级拒绝，健康检查从不拒绝
+- 被拒绝的请求返回503和 Retry-After，延迟窗口过去后恢复准入
+- 线程池被慢请求占满时拒绝low请求，runtime请求不受影响
+- 流式长连接发出响应头后不占用进行中请求数，runtime请求仍被准入
+
+不需要启动服务器。
+"""
+
+import threading
+import time
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _client(controller):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.core.admission import AdmissionMiddleware
+
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "ok"}
+
+    @app.get("/agent/")
+    def list_agents():
+        return []
+
+    @app.get("/ai-apps/{app_id}")
+    def get_ai_app(app_id: str):
+        return {"id": app_id}
+
+    @app.get("/jobs")
+    def list_jobs():
+        return []
+
+    return TestClient(app)
+
+
+def test_classify():
+    """内置规则和配置规则的路由分级"""
+    from app.core.admission import AdmissionController
+
+    controller = AdmissionController(rules=["GET /jobs=low", "post /ai-apps/{app_id}/publish=runtime"])
+    cases = {
+        ("GET", "/healthz"): "critical",
+        ("GET", "/agent/"): "low",
+        ("GET", "/agent/export"): "low",
+        ("GET", "/agent/a1"): "runtime",
+        ("GET", "/ai-apps/"): "low",
+        ("GET", "/ai-apps/platform"): "low",
+        ("GET", "/ai-apps/available/agents"): "low",
+        ("POST", "/ai-apps/generate-system-prompt"): "low",
+        ("POST", "/ai-apps/generate-system-prompt/jobs"): "low",
+        ("GET", "/ai-apps/app-1"): "runtime",
+        ("GET", "/ai-apps/by-identifier/assistant"): "runtime",
+        ("GET", "/ai-apps/app-1/published"): "runtime",
+        ("POST", "/conversations/c1/messages"): "runtime",
+        ("PUT", "/ai-apps/app-1"): "normal",
+        ("GET", "/ai-apps/app-1/history"): "normal",
+        ("GET", "/jobs"): "low",
+        ("POST", "/ai-apps/app-1/publish"): "runtime",
+        ("POST", "/simulator/v1/chat/completions"): "critical",
+    }
+    for (method, path), priority in cases.items():
+        assert controller.classify(method, path) == priority, (method, path)
+
+    for rule in ("GET /jobs", "GET jobs=low", "GET /jobs=urgent"):
+        try:
+            AdmissionController(rules=[rule])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{rule} 应当被拒绝")
+
+
+def test_check():
+    """排队深度、平均延迟和进行中请求数超过阈值时按优先级拒绝"""
+    from app.core.admission import AdmissionController
+
+    clock = _Clock()
+    controller = AdmissionController(max_queue={"low": 4, "normal": 16}, max_in_flight=10, clock=clock)
+    assert controller.check("low", 3) is None
+    assert controller.check("low", 4) == "queue"
+    assert controller.check("normal", 4) is None
+    assert controller.check("runtime", 1000) is None
+
+    controller.latency.add(1.5)
+    assert controller.check("low", 0) == "latency"
+    assert controller.check("normal", 0) is None
+
+    controller.in_flight = 10
+    assert controller.check("runtime", 0) == "in_flight"
+    assert controller.check("critical", 1000) is None
+
+
+def test_middleware():
+    """被拒绝的请求返回503和 Retry-After，延迟窗口过去后恢复准入"""
+    from app.core.admission import AdmissionController
+
+    clock = _Clock()
+    controller = AdmissionController(window=5, retry_after=3, clock=clock)
+    client = _client(controller)
+    assert client.get("/agent/").status_code == 200
+
+    # 最近窗口内的平均响应时间超过low的阈值
+    controller.latency.add(2.0)
+    response = client.get("/agent/")
+    assert response.status_code == 503 and response.headers["retry-after"] == "3"
+    assert response.json() == {"detail": "服务繁忙，请稍后重试"}
+    assert client.get("/ai-apps/app-1").status_code == 200
+    assert client.get("/jobs").status_code == 200
+    assert client.get("/healthz").status_code == 200
+    assert controller.shed["low"] == 1 and controller.in_flight == 0
+
+    clock.now += 6
+    assert client.get("/agent/").status_code == 200
+    assert controller.stats()["admitted"]["low"] == 2
+
+
+def test_queue_shedding():
+    """线程池被慢请求占满时拒绝low请求，runtime请求不受影响"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.core.admission import AdmissionController, AdmissionMiddleware
+
+    controller = AdmissionController(max_queue={"low": 1})
+    release = threading.Event()
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/agent/")
+    def list_agents():
+        release.wait(10)
+        return []
+
+    @app.get("/ai-apps/{app_id}")
+    async def get_ai_app(app_id: str):
+        return {"id": app_id}
+
+    with TestClient(app) as client:
+        limiter = client.portal.call(_default_limiter)
+        limiter.total_tokens = 2
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get("/agent/").status_code)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+            time.sleep(0.2)
+        try:
+            # 两个请求占用线程池，第三个在排队，之后的low请求被拒绝
+            assert client.get("/agent/").status_code == 503
+            assert client.get("/ai-apps/app-1").status_code == 200
+        finally:
+            release.set()
+            for thread in threads:
+                thread.join()
+        assert sorted(results) == [200, 200, 200]
+        assert client.get("/agent/").status_code == 200
+
+
+def test_streaming_slots():
+    """流式长连接发出响应头后不占用进行中请求数，runtime请求仍被准入"""
+    import asyncio
+
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+
+    from app.core.admission import AdmissionController, AdmissionMiddleware
+
+    connections = 20
+    controller = AdmissionController(max_in_flight=5)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    async def run():
+        close = asyncio.Event()
+
+        @app.get("/events")
+        async def events():
+            async def stream():
+                yield "event: ready\n\n"
+                await close.wait()
+            return StreamingResponse(stream(), media_type="text/event-stream")
+
+        @app.get("/ai-apps/{app_id}")
+        async def get_ai_app(app_id: str):
+            return {"id": app_id}
+
+        # 订阅者依次连接，每个连接发出响应头后保持打开
+        subscribers = []
+        for i in range(connections):
+            subscribers.append(asyncio.ensure_future(_asgi_get(app, "/events")))
+            while controller.responding <= i:
+                assert not subscribers[-1].done(), f"第{i + 1}个订阅者被拒绝"
+                await asyncio.sleep(0.001)
+        assert controller.in_flight == 0
+        statuses = [await _asgi_get(app, "/ai-apps/app-1") for _ in range(10)]
+        close.set()
+        return statuses, await asyncio.gather(*subscribers)
+
+    statuses, subscriber_statuses = asyncio.run(run())
+    assert statuses == [200] * 10 and subscriber_statuses == [200] * connections
+    assert controller.in_flight == 0 and controller.responding == 0 and controller.shed["runtime"] == 0
+
+
+async def _asgi_get(app, path):
+    """直接调用ASGI应用（TestClient 会等待整个响应体），返回状态码"""
+    import asyncio
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80),
+    }
+    done = asyncio.Event()
+    status = []
+
+    async def receive():
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            done.set()
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _default_limiter():
+    from anyio import to_thread
+
+    return to_thread.current_default_thread_limiter()
+
+
+def main():
+    """主测试函数"""
+    print("开始测试准入控制...")
+    for test in (test_classify, test_check, test_middleware, test_queue_shedding, test_streaming_slots):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
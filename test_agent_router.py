@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Agent路由测试
+
+- 本地向量化结果确定、已归一化
+- 在候选Agent中按相似度取 top-k
+- Agent变更后重新向量化，文本未变化时不重新向量化
+- 停用/删除的Agent移出索引
+- 重新向量化期间其他路由请求不等待，使用当前索引
+
+不需要启动服务器和数据库，Agent数据由内存中的 loader 提供。
+"""
+
+AGENTS = {
+    "finance": ("财务分析助手", "分析财务报表、利润和现金流", "你是财务分析专家"),
+    "translate": ("翻译助手", "中英文互译 translate documents", "you translate text"),
+    "code": ("代码审查", "review python code and find bugs", "you are a code reviewer"),
+    "hr": ("招聘助手", "筛选简历，安排面试", "你负责招聘"),
+}
+
+
+class FakeAgents:
+    def __init__(self):
+        self.rows = {agent_id: (agent_id, *fields, True) for agent_id, fields in AGENTS.items()}
+
+    def load(self, agent_ids=None):
+        ids = self.rows.keys() if agent_ids is None else agent_ids
+        return [self.rows[agent_id] for agent_id in ids if agent_id in self.rows]
+
+
+def _router():
+    from app.services.agent_router import AgentRouter
+    from app.services.embedding import HashingEmbedder
+
+    agents = FakeAgents()
+    return AgentRouter(HashingEmbedder(dim=256), loader=agents.load), agents
+
+
+def _change(agent_id, op="update"):
+    from app.core.events import ChangeEvent
+
+    return ChangeEvent("agent", agent_id, op, 0)
+
+
+def test_hashing_embedder():
+    """本地向量化结果确定且已归一化"""
+    import numpy as np
+    from app.services.embedding import HashingEmbedder
+
+    first = HashingEmbedder(dim=64).embed(["财务报表分析", "review code", ""])
+    second = HashingEmbedder(dim=64).embed(["财务报表分析", "review code", ""])
+    assert first.shape == (3, 64) and first.dtype == np.float32
+    assert np.array_equal(first, second)
+    assert abs(float(np.linalg.norm(first[0])) - 1) < 1e-6
+    assert not first[2].any()
+
+
+def test_route_top_k():
+    """按相似度在候选Agent中取 top-k，一次处理多条消息"""
+    router, _ = _router()
+    results = router.route(["帮我看一下财务报表的利润", "review my python code", "帮我筛选简历"], top_k=2)
+    assert [hits[0]["agent_id"] for hits in results] == ["finance", "code", "hr"]
+    assert all(len(hits) == 2 for hits in results)
+    assert results[0][0]["score"] >= results[0][1]["score"]
+
+    # 只在候选中选择，未知的候选忽略
+    hits = router.route(["帮我看一下财务报表的利润"], candidates=["code", "hr", "missing"], top_k=5)[0]
+    assert sorted(hit["agent_id"] for hit in hits) == ["code", "hr"]
+
+
+def test_reembed_on_change():
+    """Agent变更后重新向量化，文本未变化时跳过"""
+    router, agents = _router()
+    router.route(["合同"], top_k=1)
+    assert router.embedded == len(AGENTS)
+
+    agents.rows["hr"] = ("hr", "法律顾问", "合同审核", "审核合同条款", True)
+    router.on_change(_change("hr"))
+    assert router.route(["审核这份合同"], top_k=1)[0][0]["agent_id"] == "hr"
+    assert router.embedded == len(AGENTS) + 1
+
+    router.on_change(_change("finance"))
+    router.route(["合同"], top_k=1)
+    assert router.embedded == len(AGENTS) + 1
+
+
+def test_remove_inactive_and_deleted():
+    """停用和删除的Agent不再参与路由"""
+    router, agents = _router()
+    router.route(["x"])
+
+    agents.rows["code"] = agents.rows["code"][:4] + (False,)
+    router.on_change(_change("code"))
+    del agents.rows["hr"]
+    router.on_change(_change("hr", "delete"))
+
+    hits = router.route(["review my python code 筛选简历"], top_k=10)[0]
+    assert sorted(hit["agent_id"] for hit in hits) == ["finance", "translate"]
+    assert len(router.index) == 2
+
+
+def test_refresh_does_not_block_route():
+    """重新向量化期间其他路由请求不等待，使用当前索引"""
+    import threading
+    from app.services.embedding import HashingEmbedder
+
+    class SlowEmbedder(HashingEmbedder):
+        def __init__(self):
+            super().__init__(dim=256)
+            self.started = threading.Event()
+            self.release = threading.Event()
+            self.block = False
+
+        def embed(self, texts):
+            # 只阻塞Agent文本的向量化，查询照常
+            if self.block and texts and texts[0].startswith("法律顾问"):
+                self.started.set()
+                assert self.release.wait(10)
+            return super().embed(texts)
+
+    from app.services.agent_router import AgentRouter
+
+    agents = FakeAgents()
+    embedder = SlowEmbedder()
+    router = AgentRouter(embedder, loader=agents.load)
+    router.route(["合同"], top_k=1)
+
+    embedder.block = True
+    agents.rows["hr"] = ("hr", "法律顾问", "合同审核", "审核合同条款", True)
+    router.on_change(_change("hr"))
+    refresher = threading.Thread(target=router.route, args=(["审核这份合同"],))
+    refresher.start()
+    assert embedder.started.wait(10)
+    # 更新尚未完成，使用旧索引
+    assert router.route(["帮我筛选简历"], top_k=1)[0][0]["agent_id"] == "hr"
+    assert router.index.text_hash("hr") is not None and router.embedded == len(AGENTS)
+    embedder.release.set()
+    refresher.join()
+    assert router.embedded == len(AGENTS) + 1
+    assert router.route(["审核这份合同"], top_k=1)[0][0]["agent_id"] == "hr"
+
+
+def main():
+    """主测试函数"""
+    print("开始测试Agent路由...")
+    for test in (test_hashing_embedder, test_route_top_k, test_reembed_on_change, test_remove_inactive_and_deleted,
+                 test_refresh_does_not_block_route):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
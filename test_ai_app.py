@@ -110,6 +110,46 @@ def test_update_ai_app(app_id: str):
     else:
         print("❌ 更新AI应用失败")
 
+def test_publish_and_rollback(app_id: str):
+    """测试发布与回滚"""
+    print(f"=== 测试发布与回滚 (ID: {app_id}) ===")
+    
+    first = requests.post(f"{BASE_URL}/ai-apps/{app_id}/publish", json={"note": "首次发布"})
+    print(f"发布状态码: {first.status_code}, 响应: {first.text}")
+    if first.status_code != 200:
+        print("❌ 发布AI应用失败")
+        return
+    
+    # 配置未变化时重复发布不产生新版本
+    again = requests.post(f"{BASE_URL}/ai-apps/{app_id}/publish")
+    if again.json()["version"] != first.json()["version"]:
+        print("❌ 配置未变化时产生了新版本")
+        return
+    
+    requests.put(f"{BASE_URL}/ai-apps/{app_id}", json={"description": "第二个版本"})
+    second = requests.post(f"{BASE_URL}/ai-apps/{app_id}/publish").json()
+    
+    published = requests.get(f"{BASE_URL}/ai-apps/{app_id}/published")
+    print(f"发布版本: {published.json()['version']}, ETag: {published.headers.get('ETag')}")
+    not_modified = requests.get(
+        f"{BASE_URL}/ai-apps/{app_id}/published",
+        headers={"If-None-Match": published.headers.get("ETag", "")}
+    )
+    if published.json()["version"] != second["version"] or not_modified.status_code != 304:
+        print("❌ 获取发布版本失败")
+        return
+    
+    response = requests.post(f"{BASE_URL}/ai-apps/{app_id}/rollback", json={"version": first.json()["version"]})
+    published = requests.get(f"{BASE_URL}/ai-apps/{app_id}/published").json()
+    # 回滚产生新版本，内容与第一个版本相同
+    if response.status_code == 200 and published["version"] == second["version"] + 1 \
+            and published["config_hash"] == first.json()["config_hash"]:
+        print("✅ 发布与回滚成功")
+        print(f"版本列表: {requests.get(f'{BASE_URL}/ai-apps/{app_id}/versions').text}")
+    else:
+        print("❌ 回滚AI应用失败")
+    print()
+
 def test_generate_system_prompt():
     """测试自动生成系统提示词"""
     print("=== 测试自动生成系统提示词 ===")
@@ -234,6 +274,9 @@ def main():
             # 测试更新AI应用
             test_update_ai_app(app_id)
             
+            # 测试发布与回滚
+            test_publish_and_rollback(app_id)
+            
             # 测试自动生成系统提示词
             test_generate_system_prompt()
             
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+AI应用发布版本测试
+
+- 配置未变化时重复发布不产生新版本，内容相同的大字段只存一份
+- 回滚把目标版本的内容复制为新版本并发布
+- 版本内容永久缓存，再次读取不查库
+- /published 接口的响应通过 response_model 校验，支持 If-None-Match
+- 发布版本的配置快照不带配置版本号（version 为null）
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_session():
+    from conftest import temp_database
+
+    engine = temp_database("test_app_version_")
+    return sessionmaker(bind=engine)(), engine
+
+
+def _create_app(db, identifier="app-1", system_prompt="你是一个数据分析助手。" * 100):
+    from app.schemas.ai_app import AIAppCreate
+    from app.services.ai_app import AIAppService
+
+    return AIAppService.create_ai_app(db, AIAppCreate(name="应用", identifier=identifier, system_prompt=system_prompt))
+
+
+def _update(db, app_id, **fields):
+    from app.schemas.ai_app import AIAppUpdate
+    from app.services.ai_app import AIAppService
+
+    AIAppService.update_ai_app(db, app_id, AIAppUpdate(**fields))
+
+
+def test_publish_idempotent():
+    """配置未变化时重复发布不产生新版本，内容相同的大字段只存一份"""
+    from app.models.app_version import AIAppVersion, ContentBlob
+    from app.services import app_version_service
+
+    db, _ = _create_session()
+    app = _create_app(db)
+    first = app_version_service.publish(db, app.id, "首次发布")
+    again = app_version_service.publish(db, app.id)
+    assert first.version == again.version == 1 and again.note == "首次发布"
+    assert db.query(AIAppVersion).count() == 1
+
+    _update(db, app.id, description="第二个版本")
+    second = app_version_service.publish(db, app.id)
+    assert second.version == 2 and second.config_hash != first.config_hash
+    # 系统提示词没有变化，两个版本共用同一行
+    assert second.system_prompt_hash == first.system_prompt_hash
+    assert db.query(ContentBlob).count() == 1
+
+    # 另一个应用使用相同的系统提示词
+    other = _create_app(db, "app-2")
+    app_version_service.publish(db, other.id)
+    assert db.query(ContentBlob).count() == 1
+
+    try:
+        app_version_service.publish(db, "app-404")
+    except app_version_service.VersionNotFound:
+        pass
+    else:
+        raise AssertionError("没有抛出 VersionNotFound")
+
+
+def test_rollback():
+    """回滚把目标版本的内容复制为新版本并发布"""
+    from app.services import app_version_service
+
+    db, _ = _create_session()
+    app = _create_app(db)
+    first = app_version_service.publish(db, app.id)
+    _update(db, app.id, description="第二个版本")
+    app_version_service.publish(db, app.id)
+
+    rolled = app_version_service.rollback(db, app.id, first.version)
+    assert rolled.version == 3 and rolled.config_hash == first.config_hash
+    assert rolled.note == "回滚到版本 1"
+    assert app_version_service.get_published_version(db, app.id) == 3
+    published = app_version_service.get_published(db, app.id)
+    assert published["version"] == 3 and published["config"].description is None
+    assert published["config"].published_version == 3
+
+    # 目标版本与最新版本内容相同时不产生新版本
+    assert app_version_service.rollback(db, app.id, first.version).version == 3
+    listing = app_version_service.list_versions(db, app.id)
+    assert listing["total"] == 3 and listing["published_version"] == 3
+    assert [v.version for v in listing["versions"]] == [3, 2, 1]
+
+    try:
+        app_version_service.rollback(db, app.id, 99)
+    except app_version_service.VersionNotFound:
+        pass
+    else:
+        raise AssertionError("没有抛出 VersionNotFound")
+
+
+def test_version_cache():
+    """版本内容永久缓存，再次读取不查库"""
+    from app.services import app_version_service
+
+    db, engine = _create_session()
+    app = _create_app(db)
+    version = app_version_service.publish(db, app.id).version
+    detail = app_version_service.get_version(db, app.id, version)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert app_version_service.get_version(db, app.id, version) is detail
+    assert statements == []
+
+    # 发布版本号随应用变更失效，版本内容仍从缓存读取
+    _update(db, app.id, description="第二个版本")
+    app_version_service.publish(db, app.id)
+    statements.clear()
+    assert app_version_service.get_version(db, app.id, version) is detail
+    assert statements == []
+    assert app_version_service.get_published(db, app.id)["version"] == version + 1
+    assert app_version_service.get_version(db, app.id, 99) is None
+
+
+def test_published_response():
+    """/published 接口的响应通过 response_model 校验，支持 If-None-Match"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import ai_app
+    from app.core.cache import response_cache
+    from app.core.events import get_bus
+    from app.db.session import get_db
+    from app.services import app_version_service
+
+    db, _ = _create_session()
+    app = _create_app(db)
+    api = FastAPI()
+    api.include_router(ai_app.router)
+    api.dependency_overrides[get_db] = lambda: db
+    client = TestClient(api)
+
+    # 未发布的结果被缓存，发布后随变更事件失效
+    assert client.get(f"/ai-apps/{app.id}/published").status_code == 404
+    get_bus().subscribe(response_cache.on_change)
+    try:
+        version = app_version_service.publish(db, app.id)
+    finally:
+        get_bus().unsubscribe(response_cache.on_change)
+    response = client.get(f"/ai-apps/{app.id}/published")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["version"] == version.version and body["config"]["identifier"] == "app-1"
+    assert body["config"]["system_prompt"] == app.system_prompt and body["config"]["version"] is None
+    assert response.headers["content-location"] == f"/ai-apps/{app.id}/versions/{version.version}"
+
+    cached = client.get(f"/ai-apps/{app.id}/published", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+    response = client.get(f"/ai-apps/{app.id}/versions/{version.version}")
+    assert response.status_code == 200 and "immutable" in response.headers["cache-control"]
+
+
+def test_snapshot_version():
+    """发布版本的配置快照不带配置版本号（version 为null）"""
+    from app.schemas.ai_app import AIAppVersionDetail
+    from app.services import app_version_service
+
+    db, _ = _create_session()
+    app = _create_app(db)
+    _update(db, app.id, description="第二个版本")
+    version = app_version_service.publish(db, app.id)
+    # 从存储的快照构造，不经过缓存
+    app_version_service.version_cache.clear()
+    detail = AIAppVersionDetail(**app_version_service.get_version(db, app.id, version.version))
+    assert detail.config.version is None and detail.config.published_version == version.version
+    assert detail.config.description == "第二个版本"
+
+
+def main():
+    """主测试函数"""
+    print("开始测试AI应用发布版本...")
+    for test in (test_publish_idempotent, test_rollback, test_version_cache, test_published_response, test_snapshot_version):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+目录快照测试
+
+- 构建后按ID、按标识符读取的响应JSON与服务层响应一致，不存在的键返回 None
+- 大量键时哈希索引（线性探测）仍能查到每一个键
+- 切换到新快照后，旧快照的 memoryview 仍然可读
+- 实体变更后在新快照生效前回退到原有路径
+- 同一目录只有一个构建者；没有新变更时跳过构建；只保留最近 keep 个快照文件
+- 损坏的快照文件抛出 SnapshotFormatError
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import json
+import os
+import tempfile
+
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_snapshot(**kwargs):
+    from app.core.events import get_bus
+    from app.services.catalog_snapshot import CatalogSnapshot
+    from conftest import temp_database
+
+    engine = temp_database("test_catalog_snapshot_")
+    directory = os.path.dirname(engine.url.database)
+    factory = sessionmaker(bind=engine)
+    snapshot = CatalogSnapshot(directory=os.path.join(directory, "snapshot"), session_factory=factory, **kwargs)
+    get_bus().subscribe(snapshot.on_change)
+    return snapshot, factory()
+
+
+def _close(snapshot):
+    from app.core.events import get_bus
+
+    get_bus().unsubscribe(snapshot.on_change)
+    snapshot.stop()
+
+
+def _seed(db):
+    from app.schemas.agent import AgentCreate
+    from app.schemas.ai_app import AIAppCreate
+    from app.schemas.mcp import MCPCreate
+    from app.services import agent_service, mcp_service
+    from app.services.ai_app import AIAppService
+
+    mcp_service.create_mcp(db, MCPCreate(id="m1", name="检索工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    agent_service.create_agent(db, AgentCreate(id="a1", name="客服", system_prompt="你是一个客服", mcp_id="m1"))
+    return AIAppService.create_ai_app(db, AIAppCreate(name="智能助手", identifier="assistant"))
+
+
+def test_lookup():
+    """构建后按ID、按标识符读取的响应JSON与服务层响应一致"""
+    from app.services import agent_service, mcp_service
+    from app.services.ai_app import AIAppService
+
+    snapshot, db = _create_snapshot()
+    try:
+        app = _seed(db)
+        assert snapshot.get("ai_app", app.id) is None
+        snapshot.build()
+        assert snapshot.refresh()
+        assert snapshot.current.counts == {"ai_app": 1, "ai_app.identifier": 1, "agent": 1, "mcp": 1}
+
+        body, tag = snapshot.get("ai_app", app.id)
+        assert tag == 1
+        assert json.loads(bytes(body)) == json.loads(AIAppService.get_ai_app(db, app.id).model_dump_json())
+        assert bytes(snapshot.get_ai_app_by_identifier("assistant")[0]) == bytes(body)
+        agent = agent_service.get_agent_out(db, "a1")
+        assert json.loads(bytes(snapshot.get("agent", "a1")[0])) == json.loads(agent.model_dump_json())
+        mcp = mcp_service.get_mcp_out(db, "m1")
+        assert json.loads(bytes(snapshot.get("mcp", "m1")[0])) == json.loads(mcp.model_dump_json())
+
+        assert snapshot.get("ai_app", "missing") is None
+        assert snapshot.get("agent", app.id) is None
+        assert snapshot.get_ai_app_by_identifier("missing") is None
+    finally:
+        _close(snapshot)
+
+
+def test_many_keys():
+    """大量键时哈希索引仍能查到每一个键"""
+    from app.services.catalog_snapshot import Snapshot, SnapshotWriter
+
+    path = os.path.join(tempfile.mkdtemp(prefix="test_catalog_snapshot_"), "many.snap")
+    writer = SnapshotWriter(path)
+    for i in range(5000):
+        writer.add("agent", f"agent-{i}", f'{{"id":"agent-{i}"}}'.encode(), i)
+    writer.finish(seq=7, started_ns=1)
+
+    snapshot = Snapshot(path)
+    assert snapshot.seq == 7 and snapshot.counts["agent"] == 5000 and snapshot.counts["mcp"] == 0
+    for i in range(5000):
+        body, tag = snapshot.lookup("agent", f"agent-{i}")
+        assert bytes(body) == f'{{"id":"agent-{i}"}}'.encode() and tag == i
+    assert snapshot.lookup("agent", "agent-5000") is None
+    assert snapshot.lookup("mcp", "agent-1") is None
+
+
+def test_swap_and_dirty():
+    """切换后旧快照仍可读；实体变更后在新快照生效前回退到原有路径"""
+    from app.schemas.ai_app import AIAppUpdate
+    from app.services.ai_app import AIAppService
+
+    snapshot, db = _create_snapshot(keep=1)
+    try:
+        app = _seed(db)
+        snapshot.build()
+        snapshot.refresh()
+        old_body, _ = snapshot.get("ai_app", app.id)
+
+        AIAppService.update_ai_app(db, app.id, AIAppUpdate.construct(name="新名称"))
+        # 快照构建早于这次变更，不能再从快照读取
+        assert snapshot.get("ai_app", app.id) is None
+        assert snapshot.get("agent", "a1") is not None
+
+        snapshot.build()
+        assert snapshot.refresh()
+        body, tag = snapshot.get("ai_app", app.id)
+        assert json.loads(bytes(body))["name"] == "新名称" and tag == 2
+        # 旧文件已被清理，但之前取得的 memoryview 仍然有效
+        assert json.loads(bytes(old_body))["name"] == "智能助手"
+        assert len([name for name in os.listdir(snapshot.directory) if name.endswith(".snap")]) == 1
+    finally:
+        _close(snapshot)
+
+
+def test_builder():
+    """同一目录只有一个构建者，没有新变更时跳过构建"""
+    from app.services.catalog_snapshot import CatalogSnapshot
+
+    snapshot, db = _create_snapshot()
+    try:
+        _seed(db)
+        assert snapshot.maybe_build() is not None
+        snapshot.refresh()
+        # 没有新变更
+        assert snapshot.maybe_build() is None and snapshot.builds == 1
+
+        other = CatalogSnapshot(directory=snapshot.directory, session_factory=snapshot.session_factory)
+        assert other.maybe_build() is None and other.builds == 0
+        # 原构建者退出后由其他worker接替
+        snapshot.stop()
+        assert other.maybe_build() is not None and other.builds == 1
+        other.stop()
+    finally:
+        _close(snapshot)
+
+
+def test_corrupt_file():
+    """损坏的快照文件抛出 SnapshotFormatError"""
+    from app.services.catalog_snapshot import Snapshot, SnapshotFormatError
+
+    directory = tempfile.mkdtemp(prefix="test_catalog_snapshot_")
+    for name, data in (("short.snap", b"LLMCAT"), ("magic.snap", b"\x00" * 256)):
+        path = os.path.join(directory, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        try:
+            Snapshot(path)
+        except SnapshotFormatError:
+            pass
+        else:
+            raise AssertionError(f"{name} 应当被拒绝")
+
+
+def main():
+    """主测试函数"""
+    print("开始测试目录快照...")
+    for test in (test_lookup, test_many_keys, test_swap_and_dirty, test_builder, test_corrupt_file):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
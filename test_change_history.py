@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+变更历史测试
+
+- 字段级差异计算（敏感字段脱敏）
+- 缓冲区按批量大小/时间间隔写入
+- 队列有界：写满时调用方不阻塞，丢弃新记录并计数，已入队的记录按顺序写入
+- stop() 写完剩余记录
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import time
+
+from sqlalchemy import func, select
+
+
+def _create_engine():
+    from app.models.change_history import ChangeHistory
+    from conftest import temp_database
+
+    return temp_database("test_history_", tables=[ChangeHistory.__table__])
+
+
+def _count(engine) -> int:
+    from app.models.change_history import ChangeHistory
+
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(ChangeHistory.__table__)).scalar()
+
+
+def _changes(n: int):
+    return [(f"field_{i}", "old", "new") for i in range(n)]
+
+
+def test_diff_fields():
+    """只记录实际变化的字段，api_key 脱敏"""
+    from app.services.history_service import MASK, diff_fields
+
+    before = {"name": "a", "description": None, "is_active": True, "api_key": "sk-old"}
+    after = {"name": "a", "description": "d", "is_active": False, "api_key": "sk-new"}
+    assert diff_fields(before, after) == [
+        ("description", None, "d"),
+        ("is_active", "true", "false"),
+        ("api_key", MASK, MASK),
+    ]
+
+
+def test_flush_on_batch_size():
+    """达到批量大小时立即写入，不等待时间间隔"""
+    from app.services.history_service import HistoryBuffer
+
+    engine = _create_engine()
+    buffer = HistoryBuffer(batch_size=50, flush_interval=60, engine=engine)
+    buffer.start()
+    try:
+        buffer.record("ai_app", "app-1", _changes(120))
+        deadline = time.monotonic() + 5
+        while _count(engine) < 100 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert _count(engine) >= 100
+    finally:
+        buffer.stop()
+    assert _count(engine) == 120
+
+
+def test_flush_on_interval():
+    """不足一批时按时间间隔写入"""
+    from app.services.history_service import HistoryBuffer
+
+    engine = _create_engine()
+    buffer = HistoryBuffer(batch_size=1000, flush_interval=0.2, engine=engine)
+    buffer.start()
+    try:
+        buffer.record("ai_app", "app-1", _changes(3))
+        assert _count(engine) == 0
+        time.sleep(0.6)
+        assert _count(engine) == 3
+    finally:
+        buffer.stop()
+
+
+def test_backpressure():
+    """队列写满时调用方不阻塞，丢弃新记录并计数，已入队的记录按顺序写入"""
+    from app.models.change_history import ChangeHistory
+    from app.services.history_service import HistoryBuffer
+
+    engine = _create_engine()
+    buffer = HistoryBuffer(batch_size=10, flush_interval=0.05, max_queue=5, engine=engine)
+    # 模拟写入线程卡住：持有写锁，后台线程取出一批后无法写入
+    buffer._write_lock.acquire()
+    buffer.start()
+    start = time.perf_counter()
+    for i in range(4):
+        buffer.record("ai_app", f"app-{i}", _changes(10))
+    assert time.perf_counter() - start < 0.1, "队列已满时调用方不应等待"
+    # 队列中最多 max_queue 条，写入线程手中最多一批
+    assert buffer.pending() == 5
+    assert 40 - 5 - 10 <= buffer.dropped < 40
+    buffer._write_lock.release()
+    buffer.stop()
+    assert _count(engine) == 40 - buffer.dropped
+
+    table = ChangeHistory.__table__
+    with engine.connect() as connection:
+        written = connection.execute(select(table.c.entity_id, table.c.field).order_by(table.c.id)).all()
+    # 写入的记录保持记录时的先后顺序
+    recorded = iter((f"app-{i}", field) for i in range(4) for field, _, _ in _changes(10))
+    assert all(tuple(row) in recorded for row in written)
+
+
+def test_stop_flushes_pending():
+    """正常退出时写入缓冲区中剩余的记录"""
+    from app.services.history_service import HistoryBuffer
+
+    engine = _create_engine()
+    buffer = HistoryBuffer(batch_size=1000, flush_interval=60, engine=engine)
+    buffer.start()
+    buffer.record("agent", "agent-1", _changes(7))
+    buffer.stop()
+    assert _count(engine) == 7
+
+
+def main():
+    """主测试函数"""
+    print("开始测试变更历史...")
+    for test in (test_diff_fields, test_flush_on_batch_size, test_flush_on_interval, test_backpressure, test_stop_flushes_pending):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+大文本列压缩测试
+
+- 超过阈值的值压缩存储，读取时透明解压
+- 未压缩的旧数据可以直接读取，recompress 后压缩存储
+- zstd字典：按帧头中的字典ID选择字典，缺少字典时报错
+- 写入系统提示词时维护明文前缀 prompt_excerpt（MySQL全文检索使用）
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import os
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+PROMPT = "你是一个数据分析助手，请根据工具返回的数据回答用户的问题，不要编造数字。\n" * 200
+
+
+def _session():
+    from app.models.agent import Agent
+    from app.models.ai_app import AIApp
+    from conftest import temp_database
+
+    engine = temp_database("test_compression_", tables=[Agent.__table__, AIApp.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def _codecs():
+    from app.db.compression import Codec, zstandard
+
+    codecs = [Codec("zlib", min_size=512)]
+    if zstandard is not None:
+        codecs.append(Codec("zstd", min_size=512))
+    return codecs
+
+
+def test_codec_threshold():
+    """超过阈值的值压缩，短值和不可压缩的值原样存储"""
+    from app.db.compression import MAGIC
+
+    for codec in _codecs():
+        stored = codec.compress(PROMPT)
+        assert stored.startswith(MAGIC) and len(stored) < len(PROMPT.encode()) / 5
+        assert codec.decompress(stored) == PROMPT
+        assert codec.compress("短提示词") == "短提示词".encode()
+        noise = os.urandom(2048).hex()[:2048]
+        assert codec.decompress(codec.compress(noise)) == noise
+        # 不同算法写入的数据都可以读取
+        for other in _codecs():
+            assert other.decompress(stored) == PROMPT
+
+
+def test_orm_transparent():
+    """ORM读写透明，数据库中存储压缩后的二进制"""
+    from app.db.compression import MAGIC, get_codec, set_codec
+    from app.models.agent import Agent
+
+    previous = get_codec()
+    for codec in _codecs():
+        set_codec(codec)
+        try:
+            db = _session()
+            db.add(Agent(id="a1", name="分析", system_prompt=PROMPT, mcp_id="m1", tools='[{"name": "sql"}]'))
+            db.commit()
+            db.expire_all()
+            agent = db.query(Agent).filter(Agent.id == "a1").one()
+            assert agent.system_prompt == PROMPT and agent.tools == '[{"name": "sql"}]'
+            stored, tools = db.execute(text("SELECT system_prompt, tools FROM agent")).one()
+            assert stored.startswith(MAGIC) and len(stored) < len(PROMPT.encode())
+            assert tools == b'[{"name": "sql"}]'
+        finally:
+            set_codec(previous)
+
+
+def test_legacy_rows():
+    """列改为二进制之前写入的文本可以直接读取，recompress 后压缩存储"""
+    from app.db.compression import MAGIC, get_codec, recompress, set_codec
+    from app.models.agent import Agent
+
+    previous = get_codec()
+    set_codec(_codecs()[0])
+    try:
+        db = _session()
+        db.execute(
+            text("INSERT INTO agent (id, name, system_prompt, mcp_id) VALUES ('a1', '旧数据', :prompt, 'm1')"),
+            {"prompt": PROMPT},
+        )
+        db.commit()
+        assert db.query(Agent).filter(Agent.id == "a1").one().system_prompt == PROMPT
+
+        assert recompress(db.connection()) == 1
+        db.commit()
+        db.expire_all()
+        stored = db.execute(text("SELECT system_prompt FROM agent")).scalar()
+        assert stored.startswith(MAGIC)
+        assert db.query(Agent).filter(Agent.id == "a1").one().system_prompt == PROMPT
+    finally:
+        set_codec(previous)
+
+
+def test_zstd_dictionary():
+    """按帧头中的字典ID选择字典，缺少字典时报错"""
+    from app.db.compression import Codec, train_dict, zstandard
+
+    if zstandard is None:
+        print("   未安装zstandard，跳过")
+        return
+    samples = [f"第{i}个Agent：{PROMPT[:300]}工具{i * 7}".encode() for i in range(500)]
+    old = train_dict(samples, size=4096)
+    new = train_dict(samples[::-1] + [b"new"], size=8192)
+
+    writer = Codec("zstd", min_size=64)
+    writer.add_dict(old)
+    stored = writer.compress(PROMPT[:400])
+    assert len(stored) < len(Codec("zstd", min_size=64).compress(PROMPT[:400]))
+
+    # 重新训练字典后保留旧字典即可读取旧数据
+    reader = Codec("zstd", min_size=64)
+    reader.add_dict(new)
+    reader.add_dict(old)
+    assert reader.decompress(stored) == PROMPT[:400]
+    assert reader.decompress(reader.compress(PROMPT[:400])) == PROMPT[:400]
+
+    try:
+        Codec("zstd", min_size=64).decompress(stored)
+        assert False, "缺少字典时应当报错"
+    except RuntimeError:
+        pass
+
+
+def test_prompt_excerpt():
+    """写入系统提示词时维护明文前缀 prompt_excerpt"""
+    from app.config import settings
+    from app.models.agent import Agent
+    from app.models.ai_app import AIApp
+    from app.schemas.agent import AgentCreate, AgentUpdate
+    from app.schemas.ai_app import AIAppCreate, AIAppUpdate
+    from app.services import agent_service
+    from app.services.ai_app import AIAppService
+    from app.services.history_service import history_buffer
+    from conftest import temp_database
+
+    db = sessionmaker(bind=temp_database("test_compression_"))()
+
+    app = AIAppService.create_ai_app(db, AIAppCreate(name="应用", identifier="excerpt", system_prompt=PROMPT))
+    agent = agent_service.create_agent(db, AgentCreate(id="agent-excerpt", name="Agent", system_prompt=PROMPT, mcp_id="mcp-1"))
+    for model, entity_id in ((AIApp, app.id), (Agent, agent.id)):
+        excerpt = db.query(model.prompt_excerpt).filter(model.id == entity_id).scalar()
+        assert excerpt == PROMPT[:settings.SEARCH_PROMPT_EXCERPT_LENGTH]
+
+    AIAppService.update_ai_app(db, app.id, AIAppUpdate(system_prompt="天气助手"))
+    AIAppService.update_ai_app(db, app.id, AIAppUpdate(description="只修改描述"))
+    agent_service.update_agent(db, agent.id, AgentUpdate.construct(system_prompt="天气助手"))
+    db.expire_all()
+    assert db.query(AIApp.prompt_excerpt).filter(AIApp.id == app.id).scalar() == "天气助手"
+    assert db.query(Agent.prompt_excerpt).filter(Agent.id == agent.id).scalar() == "天气助手"
+    # 变更历史只记录用户修改的字段
+    history_buffer.flush()
+    fields = {row[0] for row in db.execute(text("SELECT field FROM change_history"))}
+    assert "system_prompt" in fields and "prompt_excerpt" not in fields
+
+
+def main():
+    """主测试函数"""
+    print("开始测试大文本列压缩...")
+    for test in (test_codec_threshold, test_orm_transparent, test_legacy_rows, test_zstd_dictionary, test_prompt_excerpt):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
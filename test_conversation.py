@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+会话存储测试
+
+- 追加消息分配连续序号并累加计数器
+- 按最近N条 / 最近K个token读取窗口
+- 压缩较早的消息进摘要
+- 清理过期会话
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+from datetime import timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_session():
+    from app.models.conversation import Conversation, ConversationMessage
+    from conftest import temp_database
+
+    engine = temp_database("test_conversation_", tables=[Conversation.__table__, ConversationMessage.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def _turns(n: int):
+    """n轮对话，每条消息16个字符，估算为4个token"""
+    messages = []
+    for i in range(n):
+        messages.append(("user", f"question {i:07d}"))
+        messages.append(("assistant", f"answer {i:09d}"))
+    return messages
+
+
+def test_append_assigns_sequence():
+    """追加消息分配连续序号，会话不存在时返回None"""
+    from app.services import conversation_service
+
+    db = _create_session()
+    conversation = conversation_service.create_conversation(db, "app-1", "user-1")
+    conversation_service.append_messages(db, conversation.id, _turns(2))
+    rows = conversation_service.append_messages(db, conversation.id, [("user", "你好")])
+    assert [row.seq for row in rows] == [5]
+    db.refresh(conversation)
+    assert conversation.message_count == 5
+    assert conversation.token_count == 4 * 4 + 2
+    assert conversation_service.append_messages(db, "missing", [("user", "x")]) is None
+
+
+def test_windows():
+    """按最近N条和最近K个token读取窗口"""
+    from app.services import conversation_service
+
+    db = _create_session()
+    conversation = conversation_service.create_conversation(db, "app-1")
+    conversation_service.append_messages(db, conversation.id, _turns(50))
+    db.refresh(conversation)
+
+    assert [m.seq for m in conversation_service.get_window(db, conversation, last=3)] == [98, 99, 100]
+    # 每条消息4个token，最近10个token只能完整容纳2条
+    assert [m.seq for m in conversation_service.get_window(db, conversation, max_tokens=10)] == [99, 100]
+    assert [m.seq for m in conversation_service.get_window(db, conversation, last=1, max_tokens=10)] == [100]
+
+
+def test_compact():
+    """较早的消息压缩进摘要，只保留最近的消息"""
+    from app.services import conversation_service
+
+    db = _create_session()
+    conversation = conversation_service.create_conversation(db, "app-1")
+    conversation_service.append_messages(db, conversation.id, _turns(10))
+
+    assert conversation_service.compact(db, conversation.id, keep=4) == 16
+    assert conversation_service.compact(db, conversation.id, keep=4) == 0
+    db.refresh(conversation)
+    assert conversation.summarized_until == 16
+    assert "question 0000000" in conversation.summary and "answer 000000007" in conversation.summary
+    assert [m.seq for m in conversation_service.get_window(db, conversation, last=100)] == [17, 18, 19, 20]
+
+    # 压缩后继续追加，序号和token窗口不受影响
+    conversation_service.append_messages(db, conversation.id, [("user", "question 0000010")])
+    db.refresh(conversation)
+    assert [m.seq for m in conversation_service.get_window(db, conversation, max_tokens=8)] == [20, 21]
+
+
+def test_summary_token_limit():
+    """摘要超过token上限时丢弃最早的内容"""
+    from app.services.conversation_service import estimate_tokens, extractive_summary
+
+    summary = extractive_summary(None, _turns(100), max_tokens=50)
+    assert estimate_tokens(summary) <= 50
+    assert "answer 000000099" in summary and "question 0000000" not in summary
+
+
+def test_purge_expired():
+    """清理超过TTL未活跃的会话及其消息"""
+    from app.models.conversation import ConversationMessage
+    from app.services import conversation_service
+
+    db = _create_session()
+    stale = conversation_service.create_conversation(db, "app-1")
+    fresh = conversation_service.create_conversation(db, "app-1")
+    conversation_service.append_messages(db, stale.id, _turns(3))
+    conversation_service.append_messages(db, fresh.id, _turns(3))
+    db.refresh(stale)
+    stale.last_active_at = stale.last_active_at - timedelta(days=30)
+    db.commit()
+
+    stale_id, fresh_id = stale.id, fresh.id
+
+    assert conversation_service.purge_expired(db, ttl_seconds=24 * 3600) == 1
+    assert conversation_service.get_conversation(db, stale_id) is None
+    assert conversation_service.get_conversation(db, fresh_id) is not None
+    assert db.query(ConversationMessage).filter(ConversationMessage.conversation_id == stale_id).count() == 0
+
+
+def main():
+    """主测试函数"""
+    print("开始测试会话存储...")
+    for test in (test_append_assigns_sequence, test_windows, test_compact, test_summary_token_limit, test_purge_expired):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+变更事件推送测试
+
+- 按实体类型、应用标识符、用户过滤
+- 其他线程发布的事件切换到事件循环中分发
+- 慢消费者超过缓冲上限后被断开
+- 无事件时发送心跳
+- 大量空闲订阅者的内存占用
+
+不需要启动服务器和数据库。
+"""
+
+import asyncio
+import threading
+import time
+import tracemalloc
+
+IDLE_SUBSCRIBERS = 5000
+# 每个空闲订阅者（含连接协程本身）的内存上限（字节）
+MAX_BYTES_PER_SUBSCRIBER = 8192
+
+
+def _event(seq, entity_type="ai_app", identifier=None, user_id=None):
+    from app.core.events import ChangeEvent
+
+    return ChangeEvent(entity_type, f"{entity_type}-{seq}", "update", time.time_ns(), seq=seq, identifier=identifier, user_id=user_id)
+
+
+async def _subscribed(broker, n):
+    """等待 n 个订阅者完成订阅"""
+    while len(broker) < n:
+        await asyncio.sleep(0.001)
+
+
+async def _collect(broker, event_filter, n, timeout=2.0):
+    received = []
+
+    async def consume():
+        async for kind, event in broker.listen(event_filter):
+            received.append((kind, event.seq if event else None))
+            if len(received) >= n:
+                return
+
+    await asyncio.wait_for(consume(), timeout)
+    return received
+
+
+def test_filters():
+    """按实体类型、应用标识符、用户过滤"""
+    from app.services.event_stream import EventBroker, EventFilter
+
+    async def run():
+        broker = EventBroker()
+        by_app = asyncio.ensure_future(_collect(broker, EventFilter(identifier="app-a"), 2))
+        by_user = asyncio.ensure_future(_collect(broker, EventFilter(user_id="u1"), 1))
+        by_type = asyncio.ensure_future(_collect(broker, EventFilter(entity_types=("mcp",)), 1))
+        await _subscribed(broker, 3)
+        for event in (
+            _event(1, identifier="app-a"),
+            _event(2, identifier="app-b", user_id="u1"),
+            _event(3, "mcp"),
+            _event(4, identifier="app-a"),
+        ):
+            broker.on_change(event)
+        return await by_app, await by_user, await by_type
+
+    by_app, by_user, by_type = asyncio.run(run())
+    assert by_app == [("change", 1), ("change", 4)]
+    assert by_user == [("change", 2)]
+    assert by_type == [("change", 3)]
+
+
+def test_publish_from_other_thread():
+    """其他线程（如数据库总线轮询线程）发布的事件能送达"""
+    from app.services.event_stream import EventBroker, EventFilter
+
+    async def run():
+        broker = EventBroker()
+        task = asyncio.ensure_future(_collect(broker, EventFilter(), 1))
+        await _subscribed(broker, 1)
+        threading.Thread(target=broker.on_change, args=(_event(7),)).start()
+        return await task
+
+    assert asyncio.run(run()) == [("change", 7)]
+
+
+def test_slow_consumer_dropped():
+    """缓冲写满的订阅者被断开，不影响其他订阅者"""
+    from app.services.event_stream import EventBroker, EventFilter
+
+    async def run():
+        broker = EventBroker(buffer_size=3)
+        slow = broker.subscribe(EventFilter())
+        fast = asyncio.ensure_future(_collect(broker, EventFilter(), 5))
+        await _subscribed(broker, 2)
+        for seq in range(1, 6):
+            broker.on_change(_event(seq))
+            await asyncio.sleep(0)
+        return slow, await fast, broker
+
+    slow, fast, broker = asyncio.run(run())
+    assert slow.dropped and len(slow.queue) == 0
+    assert fast == [("change", seq) for seq in range(1, 6)]
+    assert broker.dropped == 1 and len(broker) == 0
+
+
+def test_heartbeat():
+    """无事件时按心跳间隔发送 ping"""
+    from app.services.event_stream import EventBroker, EventFilter
+
+    async def run():
+        broker = EventBroker(heartbeat=0.05)
+        return await _collect(broker, EventFilter(), 2)
+
+    assert asyncio.run(run()) == [("ping", None), ("ping", None)]
+
+
+def test_idle_subscribers_memory():
+    """大量空闲订阅者占用的内存很小"""
+    from app.services.event_stream import EventBroker, EventFilter
+
+    async def consume(broker):
+        async for _ in broker.listen(EventFilter(entity_types=("agent",))):
+            pass
+
+    async def run():
+        broker = EventBroker(heartbeat=60)
+        tracemalloc.start()
+        tasks = [asyncio.ensure_future(consume(broker)) for _ in range(IDLE_SUBSCRIBERS)]
+        await _subscribed(broker, IDLE_SUBSCRIBERS)
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(broker) == IDLE_SUBSCRIBERS
+        broker.close()
+        await asyncio.gather(*tasks)
+        return used
+
+    per_subscriber = asyncio.run(run()) / IDLE_SUBSCRIBERS
+    assert per_subscriber < MAX_BYTES_PER_SUBSCRIBER, per_subscriber
+
+
+def main():
+    """主测试函数"""
+    print("开始测试变更事件推送...")
+    for test in (test_filters, test_publish_from_other_thread, test_slow_consumer_dropped, test_heartbeat, test_idle_subscribers_memory):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+流式导出测试
+
+- JSON数组可以整体解析，空表输出 []，超过一个输出块（64KB）时拼接正确
+- NDJSON 每行一个JSON对象
+- 过滤条件生效，未知格式返回400
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+AGENT_COUNT = 300
+
+
+def _create_client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import agent, mcp
+    from conftest import temp_database, use_database
+
+    engine = temp_database("test_export_")
+    # 导出在生成器内部自行创建会话，使用应用默认的会话工厂
+    use_database(engine)
+    api = FastAPI()
+    for router in (agent.router, mcp.router):
+        api.include_router(router)
+    return TestClient(api), sessionmaker(bind=engine)()
+
+
+def _seed(db):
+    from app.models.agent import Agent
+    from app.models.mcp import MCP
+
+    db.add(MCP(id="mcp-1", name="工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    db.add(MCP(id="mcp-2", name="备用", provider="azure", model="gpt-4o-mini", api_key="sk-test"))
+    for i in range(AGENT_COUNT):
+        db.add(Agent(
+            id=f"agent-{i:03d}", name=f"Agent{i}", description="助手", system_prompt="你是一个数据分析助手。" * 30,
+            mcp_id="mcp-1" if i % 3 else "mcp-2", is_active=i % 2 == 0,
+        ))
+    db.commit()
+
+
+def test_json_array():
+    """JSON数组可以整体解析，空表输出 []，超过一个输出块时拼接正确"""
+    from app.services import agent_service
+    from app.services.streaming import CHUNK_SIZE
+
+    client, db = _create_client()
+    response = client.get("/agent/export")
+    assert response.status_code == 200 and response.headers["content-type"] == "application/json"
+    assert json.loads(response.content) == []
+    assert json.loads(client.get("/mcp/export").content) == []
+
+    _seed(db)
+    chunks = list(agent_service.stream_agents("json"))
+    assert len(chunks) > 1 and sum(map(len, chunks)) > CHUNK_SIZE
+    agents = json.loads(client.get("/agent/export").content)
+    assert [a["id"] for a in agents] == [f"agent-{i:03d}" for i in range(AGENT_COUNT)]
+    assert agents[0]["system_prompt"] == "你是一个数据分析助手。" * 30
+    mcps = json.loads(client.get("/mcp/export").content)
+    assert [m["id"] for m in mcps] == ["mcp-1", "mcp-2"]
+
+
+def test_ndjson():
+    """NDJSON 每行一个JSON对象"""
+    client, db = _create_client()
+    _seed(db)
+    response = client.get("/agent/export", params={"format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.content.decode().splitlines()
+    assert len(lines) == AGENT_COUNT
+    assert [json.loads(line)["id"] for line in lines] == [f"agent-{i:03d}" for i in range(AGENT_COUNT)]
+    lines = client.get("/mcp/export", params={"format": "ndjson"}).content.decode().splitlines()
+    assert [json.loads(line)["provider"] for line in lines] == ["openai", "azure"]
+
+
+def test_filters_and_format():
+    """过滤条件生效，未知格式返回400"""
+    client, db = _create_client()
+    _seed(db)
+
+    def agent_ids(**params):
+        return {a["id"] for a in json.loads(client.get("/agent/export", params=params).content)}
+
+    assert agent_ids(mcp_id="mcp-2") == {f"agent-{i:03d}" for i in range(0, AGENT_COUNT, 3)}
+    assert agent_ids(is_active="true") == {f"agent-{i:03d}" for i in range(0, AGENT_COUNT, 2)}
+    assert agent_ids(provider="azure", is_active="false") == {f"agent-{i:03d}" for i in range(3, AGENT_COUNT, 6)}
+    assert agent_ids(model="gpt-4") == set()
+    assert [m["id"] for m in json.loads(client.get("/mcp/export", params={"model": "gpt-4o-mini"}).content)] == ["mcp-2"]
+    assert json.loads(client.get("/mcp/export", params={"provider": "anthropic"}).content) == []
+
+    assert client.get("/agent/export", params={"format": "xml"}).status_code == 400
+    assert client.get("/mcp/export", params={"format": "xml"}).status_code == 400
+
+
+def main():
+    """主测试函数"""
+    print("开始测试流式导出...")
+    for test in (test_json_array, test_ndjson, test_filters_and_format):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
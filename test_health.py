@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+健康检查与启动预热测试
+
+- 预热建立 pool_size 个连接，加载最活跃的平台应用和 available 列表到缓存
+- 预热完成前、数据库结构不一致时、退出流程中都不就绪
+- 只有 alembic_version 表不存在时视为未初始化，其他数据库错误照常抛出
+- 预热缓存的列表在实体变更后失效
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+PAGE = {"sort": "id", "order": "asc", "limit": 50, "offset": 0, "cursor": None}
+
+
+def _create_engine():
+    from conftest import temp_database
+
+    return temp_database("test_health_")
+
+
+def _seed(db):
+    from app.models.ai_app import AIApp
+    from app.models.conversation import Conversation
+    from app.models.mcp import MCP
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for i in range(5):
+        db.add(AIApp(id=f"app-{i}", name=f"应用{i}", identifier=f"app-{i}", app_type="platform", is_active=True))
+    db.add(AIApp(id="user-app", name="我的应用", identifier="user-app", app_type="user", user_id="u1", is_active=True))
+    db.add(MCP(id="mcp-1", name="工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    # app-3 最活跃，app-1 次之；app-4 的会话已经不活跃
+    for app_id, n, age in (("app-3", 3, 0), ("app-1", 2, 0), ("app-4", 5, 7), ("user-app", 9, 0)):
+        for j in range(n):
+            db.add(Conversation(id=f"{app_id}-c{j}", app_id=app_id, last_active_at=now - timedelta(days=age)))
+    db.commit()
+
+
+def test_hot_apps_order():
+    """按最近会话数选择平台应用，不足时按ID补足"""
+    from app.services.health_service import hot_platform_apps
+
+    db = sessionmaker(bind=_create_engine())()
+    _seed(db)
+    assert hot_platform_apps(db, 3) == ["app-3", "app-1", "app-0"]
+    assert "user-app" not in hot_platform_apps(db, 10)
+
+
+def test_warmup_fills_caches():
+    """预热建立连接池中的连接，加载热门应用和 available 列表"""
+    from app.core.cache import response_cache
+    from app.services.health_service import Warmup
+
+    engine = _create_engine()
+    factory = sessionmaker(bind=engine)
+    _seed(factory())
+    response_cache.clear()
+
+    warmup = Warmup(hot_apps=2, engine=engine, session_factory=factory,
+                    steps=["connections", "hot_apps", "available_lists"])
+    assert not warmup.done and warmup.status()["state"] == "pending"
+    warmup.run()
+    status = warmup.status()
+    assert warmup.done and status["state"] == "done"
+    assert all(step["ok"] for step in status["steps"].values()), status
+    assert status["steps"]["connections"]["connections"] == engine.pool.size()
+    assert status["steps"]["hot_apps"]["apps"] == 2
+    assert response_cache.get(("ai_app", "app-3")) is not None
+    assert response_cache.get(("ai_app", "app-1")) is not None
+    assert response_cache.get(("ai_app", "app-0")) is None
+
+
+def test_available_list_invalidation():
+    """缓存的 available 列表在MCP变更后失效"""
+    from app.core.cache import response_cache
+    from app.core.events import ChangeEvent
+    from app.models.mcp import MCP
+    from app.services.ai_app import AIAppService
+
+    db = sessionmaker(bind=_create_engine())()
+    _seed(db)
+    response_cache.clear()
+
+    mcps, _ = AIAppService.get_available_mcps(db, **PAGE)
+    assert [m["id"] for m in mcps] == ["mcp-1"]
+    db.add(MCP(id="mcp-2", name="工具2", provider="openai", model="gpt-4o", api_key="sk-test"))
+    db.commit()
+    # 变更事件到达之前返回缓存
+    assert len(AIAppService.get_available_mcps(db, **PAGE)[0]) == 1
+    response_cache.on_change(ChangeEvent("mcp", "mcp-2", "create", 1))
+    assert len(AIAppService.get_available_mcps(db, **PAGE)[0]) == 2
+
+
+def test_readiness():
+    """预热完成前、数据库结构不一致时、退出流程中都不就绪"""
+    from app.config import settings
+    from app.services.health_service import Readiness, Warmup
+
+    engine = _create_engine()
+    warmup = Warmup(engine=engine, session_factory=sessionmaker(bind=engine), steps=[])
+    readiness = Readiness(warmup, engine)
+
+    skip_schema_check = settings.SKIP_SCHEMA_CHECK
+    try:
+        settings.SKIP_SCHEMA_CHECK = True
+        ready, body = readiness.check()
+        assert not ready and body["checks"]["database"]["ok"] and not body["checks"]["warmup"]["ok"]
+
+        warmup.run()
+        ready, body = readiness.check()
+        assert ready and body["status"] == "ready"
+
+        # create_all 建的库没有 alembic_version，版本检查失败
+        settings.SKIP_SCHEMA_CHECK = False
+        ready, body = readiness.check()
+        assert not ready and "未初始化" in body["checks"]["schema"]["error"]
+
+        settings.SKIP_SCHEMA_CHECK = True
+        readiness.draining = True
+        ready, body = readiness.check()
+        assert not ready and body["status"] == "draining"
+    finally:
+        settings.SKIP_SCHEMA_CHECK = skip_schema_check
+
+
+def test_schema_revision():
+    """只有 alembic_version 表不存在时视为未初始化，其他数据库错误照常抛出"""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.db.schema import get_current_revision
+
+    engine = _create_engine()
+    assert get_current_revision(engine) is None
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE alembic_version (revision VARCHAR(32))"))
+    try:
+        get_current_revision(engine)
+        assert False, "查询出错时不应当视为未初始化"
+    except OperationalError:
+        pass
+    with engine.begin() as connection:
+        connection.execute(text("ALTER TABLE alembic_version RENAME COLUMN revision TO version_num"))
+        connection.execute(text("INSERT INTO alembic_version VALUES ('0015')"))
+    assert get_current_revision(engine) == "0015"
+
+
+def main():
+    """主测试函数"""
+    print("开始测试健康检查与启动预热...")
+    for test in (test_hot_apps_order, test_warmup_fills_caches, test_available_list_invalidation, test_readiness,
+                 test_schema_revision):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+缓存失效广播测试
+
+- 内存总线：同一进程内发布即失效
+- 数据库总线：启动多个worker进程，一个worker发布变更，其余worker通过轮询
+  entity_change 表失效各自的本地缓存
+- 数据库总线：序号较小但提交较晚的变更不会被跳过，每条变更只分发一次
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import multiprocessing
+import os
+import time
+
+WORKER_COUNT = 3
+TIMEOUT = 10
+
+
+def _configure(db_url: str) -> None:
+    # 必须在导入 app 之前设置，子进程中的 settings 从环境变量读取
+    os.environ["DB_URL"] = db_url
+    os.environ["SQL_ECHO"] = "false"
+
+
+def _reader_worker(db_url, ready, results):
+    """模拟一个持有本地缓存的worker"""
+    _configure(db_url)
+    from app.core.cache import TTLCache
+    from app.core.events import DatabaseInvalidationBus
+
+    cache = TTLCache()
+    cache.set(("ai_app", "app-1"), "stale", tags=[("ai_app", "app-1")])
+    cache.set(("ai_app", "app-2"), "fresh", tags=[("ai_app", "app-2")])
+    cache.set(("agent", "available"), "list", tags=[("agent", "*")])
+
+    bus = DatabaseInvalidationBus(poll_interval=0.05)
+    bus.subscribe(cache.on_change)
+    bus.start()
+    ready.set()
+
+    deadline = time.monotonic() + TIMEOUT
+    while time.monotonic() < deadline and cache.get(("ai_app", "app-1")) is not None:
+        time.sleep(0.02)
+    bus.stop()
+
+    results.put({
+        "pid": os.getpid(),
+        "evicted": cache.get(("ai_app", "app-1")) is None,
+        "untouched": cache.get(("ai_app", "app-2")) == "fresh",
+        "other_type_untouched": cache.get(("agent", "available")) == "list",
+    })
+
+
+def _writer_worker(db_url):
+    """模拟处理 update_ai_app 请求的worker"""
+    _configure(db_url)
+    from app.core.events import ChangeEvent, DatabaseInvalidationBus
+
+    bus = DatabaseInvalidationBus()
+    bus.publish(ChangeEvent("ai_app", "app-1", "update", time.time_ns()))
+
+
+def _late_commit_worker(db_url, results):
+    """两个并发事务：序号较大的先提交，序号较小的稍后提交"""
+    _configure(db_url)
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.events import DatabaseInvalidationBus
+    from app.db.session import get_session_factory
+    from app.models.entity_change import EntityChangeLog
+
+    received = []
+    bus = DatabaseInvalidationBus(settle_seconds=60)
+    bus.subscribe(lambda event: received.append(event.entity_id))
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db = get_session_factory()()
+
+    def commit(row_id, entity_id):
+        db.add(EntityChangeLog(
+            id=row_id, entity_type="ai_app", entity_id=entity_id, op="update", version=row_id, created_at=now
+        ))
+        db.commit()
+
+    commit(2, "app-2")
+    first = bus.poll()
+    commit(1, "app-1")
+    second = bus.poll()
+    third = bus.poll()
+    unsettled_id = bus.last_seen_id
+    # 超过稳定时长后轮询位置前移，不再重复读取
+    bus.settle_seconds = 0
+    fourth = bus.poll()
+    db.close()
+    results.put({
+        "received": received,
+        "polls": [first, second, third, fourth],
+        "unsettled_id": unsettled_id,
+        "last_seen_id": bus.last_seen_id,
+    })
+
+
+def _create_database() -> str:
+    from app.models.entity_change import EntityChangeLog
+    from conftest import temp_database
+
+    engine = temp_database("test_invalidation_", tables=[EntityChangeLog.__table__])
+    engine.dispose()
+    return str(engine.url)
+
+
+def test_memory_bus():
+    """内存总线：发布后同进程缓存立即失效"""
+    from app.core.cache import TTLCache
+    from app.core.events import ChangeEvent, InvalidationBus
+
+    cache = TTLCache()
+    bus = InvalidationBus()
+    bus.subscribe(cache.on_change)
+    cache.set(("agent", "a1"), "cached", tags=[("agent", "a1")])
+    cache.set(("agent", "a2"), "cached", tags=[("agent", "a2")])
+    cache.set(("agent", "list"), "cached", tags=[("agent", "*")])
+
+    bus.publish(ChangeEvent("agent", "a1", "update", time.time_ns()))
+
+    assert cache.get(("agent", "a1")) is None
+    assert cache.get(("agent", "a2")) == "cached"
+    assert cache.get(("agent", "list")) is None
+
+
+def test_stale_load_not_cached():
+    """加载期间发生失效时，读到的旧数据不写入缓存"""
+    from app.core.cache import TTLCache
+
+    cache = TTLCache()
+
+    def loader():
+        cache.invalidate(("ai_app", "x"))
+        return "old"
+
+    assert cache.get_or_load(("ai_app", "x"), loader, tags=[("ai_app", "x")]) == "old"
+    assert cache.get(("ai_app", "x")) is None
+    assert cache.get_or_load(("ai_app", "x"), lambda: "new", tags=[("ai_app", "x")]) == "new"
+    assert cache.get(("ai_app", "x")) == "new"
+
+
+def test_database_bus_across_workers():
+    """数据库总线：一个worker发布变更，其他worker的缓存全部失效"""
+    db_url = _create_database()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    readers = []
+    ready_events = []
+    for _ in range(WORKER_COUNT):
+        ready = context.Event()
+        process = context.Process(target=_reader_worker, args=(db_url, ready, results))
+        process.start()
+        readers.append(process)
+        ready_events.append(ready)
+
+    for ready in ready_events:
+        assert ready.wait(TIMEOUT), "worker启动超时"
+
+    writer = context.Process(target=_writer_worker, args=(db_url,))
+    writer.start()
+    writer.join(TIMEOUT)
+    assert writer.exitcode == 0
+
+    reports = [results.get(timeout=TIMEOUT) for _ in readers]
+    for process in readers:
+        process.join(TIMEOUT)
+
+    assert len({report["pid"] for report in reports}) == WORKER_COUNT
+    for report in reports:
+        assert report["evicted"], report
+        assert report["untouched"], report
+        assert report["other_type_untouched"], report
+
+
+def test_database_bus_late_commit():
+    """数据库总线：序号较小但提交较晚的变更不会被跳过，每条变更只分发一次"""
+    db_url = _create_database()
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_late_commit_worker, args=(db_url, results))
+    process.start()
+    report = results.get(timeout=TIMEOUT)
+    process.join(TIMEOUT)
+
+    assert report["received"] == ["app-2", "app-1"], report
+    assert report["polls"] == [1, 1, 0, 0], report
+    assert report["unsettled_id"] == 0 and report["last_seen_id"] == 2, report
+
+
+def main():
+    """主测试函数"""
+    print("开始测试缓存失效广播...")
+    for test in (test_memory_bus, test_stale_load_not_cached, test_database_bus_across_workers, test_database_bus_late_commit):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
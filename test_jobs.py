@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+后台任务测试
+
+- 多线程worker执行数千个任务，每个任务恰好执行一次
+- 失败按退避时间重试，超过次数后标记为失败
+- worker退出后租约过期的任务被重新排队并由其他worker完成
+- 只能取消排队中的任务
+- 写入结果失败时执行线程继续运行，任务在租约过期后重新执行
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+
+def _session_factory():
+    from app.models.job import Job
+    from conftest import temp_database
+
+    engine = temp_database("test_jobs_", tables=[Job.__table__], connect_args={"timeout": 30})
+    return sessionmaker(bind=engine)
+
+
+def _worker(factory, **kwargs):
+    from app.services.job_service import JobWorker
+
+    options = {"workers": 4, "poll_interval": 0.05, "lease_seconds": 60, "backoff": 0.05, "backoff_max": 1}
+    options.update(kwargs)
+    return JobWorker(session_factory=factory, **options)
+
+
+def test_throughput():
+    """4个线程执行2000个任务，每个任务恰好执行一次"""
+    from app.models.job import Job
+    from app.services import job_service
+
+    executed = Counter()
+    lock = threading.Lock()
+
+    @job_service.job_handler("test_echo")
+    def echo(payload):
+        with lock:
+            executed[payload["n"]] += 1
+        return payload["n"]
+
+    factory = _session_factory()
+    db = factory()
+    total = 2000
+    for n in range(total):
+        job_service.submit(db, "test_echo", {"n": n})
+
+    worker = _worker(factory)
+    start = time.perf_counter()
+    worker.start()
+    try:
+        deadline = time.monotonic() + 120
+        while worker.completed < total and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+    elapsed = time.perf_counter() - start
+
+    assert worker.completed == total
+    assert len(executed) == total and set(executed.values()) == {1}
+    assert db.query(Job).filter(Job.status == "succeeded").count() == total
+    print(f"   {total} 个任务耗时 {elapsed:.2f}s（{total / elapsed:.0f} 个/秒）")
+
+
+def test_retry_with_backoff():
+    """失败按退避时间重试，超过次数后标记为失败"""
+    from app.services import job_service
+
+    calls = Counter()
+
+    @job_service.job_handler("test_flaky")
+    def flaky(payload):
+        calls[payload["key"]] += 1
+        if calls[payload["key"]] <= payload["failures"]:
+            raise RuntimeError("暂时失败")
+        return "ok"
+
+    factory = _session_factory()
+    db = factory()
+    recovers = job_service.submit(db, "test_flaky", {"key": "a", "failures": 2}, max_attempts=3)
+    exhausted = job_service.submit(db, "test_flaky", {"key": "b", "failures": 5}, max_attempts=2)
+
+    worker = _worker(factory, backoff=0.2)
+    assert worker.run_pending() == 2
+    db.expire_all()
+    # 第一次失败后推迟到退避时间之后，立即再领取不到
+    assert recovers.status == "queued" and recovers.attempts == 1
+    assert "暂时失败" in recovers.error
+    assert worker.run_pending() == 0
+
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        worker.run_pending()
+        db.expire_all()
+        if recovers.status in job_service.FINISHED_STATUSES and exhausted.status in job_service.FINISHED_STATUSES:
+            break
+        time.sleep(0.05)
+
+    assert recovers.status == "succeeded" and recovers.attempts == 3 and recovers.error is None
+    assert exhausted.status == "failed" and exhausted.attempts == 2
+    assert calls == {"a": 3, "b": 2}
+
+
+def test_backoff_delay():
+    """退避时间按失败次数翻倍，不超过上限"""
+    from app.services.job_service import backoff_delay
+
+    assert 2.0 <= backoff_delay(1, 2.0, 300) <= 2.2
+    assert 8.0 <= backoff_delay(3, 2.0, 300) <= 8.8
+    assert 300 <= backoff_delay(20, 2.0, 300) <= 330
+
+
+def test_lease_recovery():
+    """worker退出后租约过期的任务被重新排队并由其他worker完成"""
+    from app.models.job import Job
+    from app.services import job_service
+
+    @job_service.job_handler("test_noop")
+    def noop(payload):
+        return payload
+
+    factory = _session_factory()
+    db = factory()
+    job = job_service.submit(db, "test_noop", {"x": 1})
+
+    # 领取后不执行，模拟worker崩溃
+    crashed = _worker(factory, lease_seconds=1)
+    assert crashed._claim() is not None
+    db.expire_all()
+    assert job.status == "running" and job.locked_by == crashed.worker_id
+
+    survivor = _worker(factory, lease_seconds=1)
+    # 租约未过期时不回收
+    assert survivor.recover_expired() == 0
+    db.query(Job).filter(Job.id == job.id).update({Job.locked_at: Job.locked_at - timedelta(seconds=5)})
+    db.commit()
+    assert survivor.recover_expired() == 1
+    assert survivor.run_pending() == 1
+
+    # 崩溃的worker恢复后提交的结果不覆盖接手者的结果
+    crashed._finish(job.id, {Job.status: "failed", Job.error: "迟到的结果"})
+    db.expire_all()
+    assert job.status == "succeeded" and job.attempts == 2 and job.error is None
+
+
+def test_cancel():
+    """只能取消排队中的任务"""
+    from app.services import job_service
+
+    @job_service.job_handler("test_noop")
+    def noop(payload):
+        return payload
+
+    factory = _session_factory()
+    db = factory()
+    queued = job_service.submit(db, "test_noop")
+    done = job_service.submit(db, "test_noop")
+
+    assert job_service.cancel(db, queued.id)
+    assert _worker(factory).run_pending() == 1
+    assert not job_service.cancel(db, done.id)
+    db.expire_all()
+    assert queued.status == "cancelled" and queued.attempts == 0
+    assert done.status == "succeeded"
+
+    try:
+        job_service.submit(db, "no_such_type")
+        assert False, "未知的任务类型应当报错"
+    except job_service.UnknownJobType:
+        pass
+
+
+def test_finish_failure():
+    """写入结果失败时执行线程继续运行，任务在租约过期后重新执行"""
+    from app.models.job import Job
+    from app.services import job_service
+
+    @job_service.job_handler("test_noop")
+    def noop(payload):
+        return payload
+
+    factory = _session_factory()
+    db = factory()
+    worker = _worker(factory, workers=1, lease_seconds=1)
+    finish = worker._finish
+    failures = []
+
+    def flaky_finish(job_id, values):
+        if not failures:
+            failures.append(job_id)
+            raise RuntimeError("数据库连接断开")
+        finish(job_id, values)
+
+    worker._finish = flaky_finish
+    first = job_service.submit(db, "test_noop", {"n": 1})
+    worker.start()
+    try:
+        deadline = time.monotonic() + 10
+        while not failures and time.monotonic() < deadline:
+            time.sleep(0.05)
+        second = job_service.submit(db, "test_noop", {"n": 2})
+        while worker.completed < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert all(thread.is_alive() for thread in worker._threads)
+    finally:
+        worker.stop()
+
+    db.expire_all()
+    assert failures == [first.id] and worker.completed == 2
+    assert second.status == "succeeded"
+    assert first.status == "succeeded" and first.attempts == 2
+
+
+def main():
+    """主测试函数"""
+    print("开始测试后台任务...")
+    for test in (test_throughput, test_retry_with_backoff, test_backoff_delay, test_lease_recovery, test_cancel, test_finish_failure):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+大模型模拟器测试
+
+- 延迟分布的解析和采样，格式错误时报错
+- 输出只由请求决定，延迟和故障由种子决定；max_tokens 截断输出
+- 流式调用按首token延迟和token间延迟输出chunk，最后一个chunk带用量
+- 错误、限流、超时注入和按每分钟请求数限流
+- 可重试的错误换下一个配置，流式调用输出后不再切换
+- Retry-After 为秒数或HTTP日期，无法解析时忽略，不影响切换配置
+- OpenAI 兼容的HTTP接口：SSE流、错误响应和模型列表
+
+不需要启动服务器。
+"""
+
+import json
+import time
+
+
+def _request(model, content="你好", **kwargs):
+    return dict({"model": model, "messages": [{"role": "user", "content": content}]}, **kwargs)
+
+
+def test_distributions():
+    """延迟分布的解析和采样，格式错误时报错"""
+    import random
+
+    from app.services.llm_simulator import Distribution
+
+    rng = random.Random(1)
+    assert Distribution("0.25").sample(rng) == 0.25 and Distribution("fixed:0.1").sample(rng) == 0.1
+    assert all(0.1 <= Distribution("uniform:0.1,0.2").sample(rng) <= 0.2 for _ in range(100))
+    assert all(Distribution("normal:0.01,1").sample(rng) >= 0 for _ in range(100))
+    samples = sorted(Distribution("lognormal:0.3,0.5").sample(rng) for _ in range(2001))
+    assert 0.25 < samples[1000] < 0.35
+    assert 0.15 < sum(Distribution("exponential:0.2").sample(rng) for _ in range(2000)) / 2000 < 0.25
+    for spec in ("gamma:1,2", "uniform:0.1", "fixed:a"):
+        try:
+            Distribution(spec)
+        except ValueError:
+            continue
+        raise AssertionError(spec)
+
+
+def test_deterministic():
+    """输出只由请求决定，延迟和故障由种子决定；max_tokens 截断输出"""
+    from app.services.llm_simulator import LLMSimulator, SimulatorProfile
+
+    profile = SimulatorProfile(ttft="uniform:0,1", itl="uniform:0,1", output_tokens=16, error_rate=0.3)
+    first, second = LLMSimulator(profile, seed=7), LLMSimulator(profile, seed=7)
+    plans = [(first.plan(_request("gpt-4o", str(i))), second.plan(_request("gpt-4o", str(i)))) for i in range(20)]
+    assert all((a.error is None) == (b.error is None) and a.tokens == b.tokens and a.delays == b.delays for a, b in plans)
+    assert 0 < sum(a.error is not None for a, _ in plans) < 20
+
+    simulator = LLMSimulator(SimulatorProfile(ttft="fixed:0", itl="fixed:0", output_tokens=16))
+    content = simulator.run(_request("gpt-4o"))["choices"][0]["message"]["content"]
+    assert simulator.run(_request("gpt-4o"))["choices"][0]["message"]["content"] == content
+    # 模型名中的参数不影响输出
+    assert simulator.run(_request("gpt-4o?error_rate=0"))["choices"][0]["message"]["content"] == content
+    assert simulator.run(_request("gpt-4o", "再见"))["choices"][0]["message"]["content"] != content
+    assert LLMSimulator(simulator.profile, seed=1).run(_request("gpt-4o"))["choices"][0]["message"]["content"] != content
+
+    response = simulator.run(_request("gpt-4o", max_tokens=4))
+    assert response["object"] == "chat.completion" and response["model"] == "gpt-4o"
+    assert response["choices"][0]["finish_reason"] == "length"
+    assert response["usage"]["completion_tokens"] == 4 and response["usage"]["prompt_tokens"] > 0
+    assert content.startswith(response["choices"][0]["message"]["content"])
+
+
+def test_stream():
+    """流式调用按首token延迟和token间延迟输出chunk，最后一个chunk带用量"""
+    from app.services.llm_simulator import LLMSimulator
+
+    simulator = LLMSimulator()
+    start = time.perf_counter()
+    arrivals, chunks = [], []
+    for chunk in simulator.stream(_request("gpt-4o?ttft=fixed:0.1&itl=fixed:0.02&output_tokens=5")):
+        arrivals.append(time.perf_counter() - start)
+        chunks.append(chunk)
+    assert len(chunks) == 6
+    assert 0.1 <= arrivals[0] < 0.2
+    assert 0.18 <= arrivals[4] < 0.35
+    assert chunks[0]["choices"][0]["delta"]["role"] == "assistant"
+    assert all(chunk["object"] == "chat.completion.chunk" and chunk["id"] == chunks[0]["id"] for chunk in chunks)
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop" and chunks[-1]["usage"]["completion_tokens"] == 5
+    content = "".join(chunk["choices"][0]["delta"].get("content", "") for chunk in chunks)
+    assert content == simulator.run(_request("gpt-4o?ttft=fixed:0&itl=fixed:0&output_tokens=5"))["choices"][0]["message"]["content"]
+
+
+def test_injection():
+    """错误、限流、超时注入和按每分钟请求数限流"""
+    from app.services.llm_simulator import LLMSimulator, SimulatorError
+
+    now = [0.0]
+    simulator = LLMSimulator(clock=lambda: now[0])
+
+    def error(model, timeout=None):
+        try:
+            simulator.run(_request(model), timeout)
+        except SimulatorError as e:
+            return e
+        return None
+
+    assert error("a?error_rate=1&ttft=fixed:0").status == 500
+    limited = error("a?rate_limit_rate=1")
+    assert limited.status == 429 and limited.retry_after == 1.0
+    assert limited.to_dict()["error"]["type"] == "rate_limit_exceeded"
+
+    start = time.perf_counter()
+    timeout = error("a?timeout_rate=1&hang_seconds=30", timeout=0.05)
+    assert timeout.status == 504 and 0.05 <= time.perf_counter() - start < 1
+
+    model = "b?rpm=2&ttft=fixed:0&itl=fixed:0"
+    assert error(model) is None and error(model) is None
+    limited = error(model)
+    assert limited.status == 429 and limited.retry_after == 30.0
+    now[0] += 30
+    assert error(model) is None and error(model).status == 429
+    # 限流按模型名（含参数）分别计算
+    assert error("c?rpm=2&ttft=fixed:0&itl=fixed:0") is None
+
+
+def test_failover():
+    """可重试的错误换下一个配置，流式调用输出后不再切换"""
+    from app.services import llm_client
+    from app.services.llm_client import LLMError
+
+    failing = {"provider": "simulator", "model": "primary?error_rate=1&ttft=fixed:0"}
+    limited = {"provider": "simulator", "model": "primary?rate_limit_rate=1"}
+    healthy = {"provider": "simulator", "model": "backup?ttft=fixed:0&itl=fixed:0&output_tokens=8"}
+    messages = [{"role": "user", "content": "你好"}]
+
+    assert llm_client.chat([failing, limited, healthy], messages)["model"] == healthy["model"]
+    chunks = list(llm_client.stream_chat([limited, healthy], messages))
+    assert chunks[0]["model"] == healthy["model"] and chunks[-1]["usage"]["completion_tokens"] == 8
+
+    # 每次尝试都计入用量
+    from app.services.usage_service import usage_meter
+
+    pending = usage_meter.pending()
+    llm_client.chat([failing, healthy], messages, app_id="app-1")
+    assert usage_meter.pending() == pending + 2
+
+    try:
+        llm_client.chat([failing], messages)
+    except LLMError as e:
+        assert e.status == 500 and e.retryable
+    else:
+        raise AssertionError("没有抛出 LLMError")
+
+    try:
+        llm_client.chat([{"provider": "unknown", "model": "m"}, healthy], messages)
+    except ValueError as e:
+        assert "simulator" in str(e)
+    else:
+        raise AssertionError("没有抛出 ValueError")
+
+    class _Broken(llm_client.ChatProvider):
+        def stream(self, config, messages, timeout):
+            yield {"choices": [{"index": 0, "delta": {"content": "半"}, "finish_reason": None}]}
+            raise LLMError("连接中断", retryable=True)
+
+    llm_client.register_provider("broken", _Broken)
+    received = []
+    try:
+        for chunk in llm_client.stream_chat([{"provider": "broken", "model": "m"}, healthy], messages):
+            received.append(chunk)
+    except LLMError:
+        pass
+    else:
+        raise AssertionError("输出后切换了配置")
+    assert len(received) == 1
+
+
+def test_retry_after():
+    """Retry-After 为秒数或HTTP日期，无法解析时忽略，不影响切换配置"""
+    from datetime import datetime, timedelta, timezone
+    from email.utils import format_datetime
+
+    from app.services import llm_client
+    from app.services.llm_client import LLMError, http_error, parse_retry_after
+
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert parse_retry_after("120") == 120.0
+    assert 25 < parse_retry_after(later) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    for value in (None, "", "soon", "nan"):
+        assert parse_retry_after(value) is None, value
+
+    class _Response:
+        status_code = 429
+        text = "rate limited"
+        headers = {"Retry-After": later}
+
+    error = http_error(_Response())
+    assert error.status == 429 and error.retryable and 25 < error.retry_after <= 30
+
+    # OpenAI 兼容接口返回HTTP日期格式的 Retry-After 时仍然换下一个配置
+    class _RateLimited(llm_client.ChatProvider):
+        def complete(self, config, messages, timeout):
+            raise http_error(_Response())
+
+    llm_client.register_provider("rate-limited", _RateLimited)
+    healthy = {"provider": "simulator", "model": "backup?ttft=fixed:0&itl=fixed:0&output_tokens=2"}
+    messages = [{"role": "user", "content": "你好"}]
+    assert llm_client.chat([{"provider": "rate-limited", "model": "m"}, healthy], messages)["model"] == healthy["model"]
+    try:
+        llm_client.chat([{"provider": "rate-limited", "model": "m"}], messages)
+    except LLMError as e:
+        assert e.status == 429 and e.retry_after is not None
+    else:
+        raise AssertionError("没有抛出 LLMError")
+
+def test_http():
+    """OpenAI 兼容的HTTP接口：SSE流、错误响应和模型列表"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import simulator
+
+    app = FastAPI()
+    app.include_router(simulator.router)
+    client = TestClient(app)
+
+    model = "http-model?ttft=fixed:0&itl=fixed:0&output_tokens=3"
+    response = client.post("/simulator/v1/chat/completions", json=_request(model))
+    assert response.status_code == 200 and response.json()["usage"]["completion_tokens"] == 3
+
+    response = client.post("/simulator/v1/chat/completions", json=_request(model, stream=True))
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line[len("data: "):] for line in response.text.split("\n\n") if line]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert len(chunks) == 4 and chunks[-1]["usage"]["total_tokens"] > 3
+
+    response = client.post("/simulator/v1/chat/completions", json=_request("http-model?rate_limit_rate=1"))
+    assert response.status_code == 429 and response.headers["retry-after"] == "1"
+    assert response.json()["error"]["code"] == "rate_limit_exceeded"
+
+    assert "http-model" in [item["id"] for item in client.get("/simulator/v1/models").json()["data"]]
+
+
+def main():
+    """主测试函数"""
+    print("开始测试大模型模拟器...")
+    for test in (test_distributions, test_deterministic, test_stream, test_injection, test_failover, test_retry_after, test_http):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
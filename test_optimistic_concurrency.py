@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+AI应用乐观并发控制与列表修改测试
+
+- 列表条目的添加、删除、移动
+- 期望版本不一致时抛出 VersionConflict，不修改数据
+- 未指定期望版本时，读取后被并发修改会基于最新配置重试，两个编辑者的修改都保留
+- 更新只执行一次查询，提交后不再 refresh
+- 没有实际修改的更新不递增版本、不记录变更
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_session():
+    from app.models.agent import Agent
+    from app.models.mcp import MCP
+    from conftest import temp_database
+
+    engine = temp_database("test_optimistic_concurrency_")
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    db.add(MCP(id="mcp-1", name="工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    for i in range(5):
+        db.add(Agent(id=f"agent-{i}", name=f"Agent{i}", system_prompt="你是一个助手", mcp_id="mcp-1"))
+    db.commit()
+    return db, factory, engine
+
+
+def _create_app(db):
+    from app.schemas.ai_app import AIAppCreate
+    from app.services.ai_app import AIAppService
+
+    return AIAppService.create_ai_app(db, AIAppCreate(
+        name="应用", identifier="app-1",
+        agent_list=[{"agent_id": "agent-0", "name": "Agent0"}, {"agent_id": "agent-1", "name": "Agent1"}],
+    ))
+
+
+def _add(agent_id, **fields):
+    from app.schemas.ai_app import ListPatchOp
+
+    return ListPatchOp(op="add", field="agent_list", value={"agent_id": agent_id, "name": agent_id}, **fields)
+
+
+def test_list_ops():
+    """列表条目的添加、删除、移动，操作无法执行时报错"""
+    from app.schemas.ai_app import ListPatchOp
+    from app.services.ai_app import PatchError, apply_list_op
+
+    items = [{"agent_id": "a"}, {"agent_id": "b"}]
+    apply_list_op(items, _add("c"), {"agent_id": "c"}, 0)
+    apply_list_op(items, _add("d", index=0), {"agent_id": "d"}, 1)
+    assert [item["agent_id"] for item in items] == ["d", "a", "b", "c"]
+    apply_list_op(items, ListPatchOp(op="move", field="agent_list", id="d"), None, 2)
+    apply_list_op(items, ListPatchOp(op="move", field="agent_list", id="c", index=0), None, 3)
+    assert [item["agent_id"] for item in items] == ["c", "a", "b", "d"]
+    apply_list_op(items, ListPatchOp(op="remove", field="agent_list", id="a"), None, 4)
+    apply_list_op(items, ListPatchOp(op="remove", field="agent_list", index=0), None, 5)
+    assert [item["agent_id"] for item in items] == ["b", "d"]
+
+    for op, entry in (
+        (_add("b"), {"agent_id": "b"}),
+        (_add("x", index=5), {"agent_id": "x"}),
+        (ListPatchOp(op="remove", field="agent_list", id="x"), None),
+        (ListPatchOp(op="remove", field="agent_list", index=2), None),
+    ):
+        try:
+            apply_list_op(items, op, entry, 7)
+            assert False, f"应当报错: {op}"
+        except PatchError as e:
+            assert e.index == 7
+    assert [item["agent_id"] for item in items] == ["b", "d"]
+
+
+def test_version_conflict():
+    """期望版本不一致时抛出 VersionConflict，不修改数据"""
+    from app.schemas.ai_app import AIAppUpdate
+    from app.services.ai_app import AIAppService, VersionConflict
+
+    db, _, _ = _create_session()
+    app = _create_app(db)
+    assert app.version == 1
+    updated = AIAppService.update_ai_app(db, app.id, AIAppUpdate(name="新名称"), expected_version=1)
+    assert updated.version == 2 and updated.name == "新名称" and updated.updated_at is not None
+
+    for call in (
+        lambda: AIAppService.update_ai_app(db, app.id, AIAppUpdate(name="过期的修改"), expected_version=1),
+        lambda: AIAppService.patch_ai_app(db, app.id, [_add("agent-2")], expected_version=1),
+    ):
+        try:
+            call()
+            assert False, "版本不一致时应当报错"
+        except VersionConflict as e:
+            assert e.current_version == 2
+    current = AIAppService.get_ai_app(db, app.id)
+    assert current.name == "新名称" and current.version == 2 and len(current.agent_list) == 2
+    assert AIAppService.patch_ai_app(db, "missing", [_add("agent-2")]) is None
+
+
+def test_concurrent_adds():
+    """两个编辑者同时添加条目，被并发修改的一方基于最新配置重试，两个条目都保留"""
+    from app.services.ai_app import AIAppService
+
+    db, factory, _ = _create_session()
+    app = _create_app(db)
+
+    # 第一个编辑者读取之后、写入之前，第二个编辑者完成了修改
+    other = factory()
+    original = AIAppService._conditional_update
+    interleaved = []
+
+    def conditional_update(db, app_id, changes, expected_version):
+        def changes_then_interleave(db_ai_app):
+            update_data = changes(db_ai_app)
+            if not interleaved:
+                interleaved.append(True)
+                AIAppService.patch_ai_app(other, app_id, [_add("agent-3")])
+            return update_data
+        return original(db, app_id, changes_then_interleave, expected_version)
+
+    AIAppService._conditional_update = staticmethod(conditional_update)
+    try:
+        result = AIAppService.patch_ai_app(db, app.id, [_add("agent-2")])
+    finally:
+        AIAppService._conditional_update = staticmethod(original)
+
+    assert [agent.agent_id for agent in result.agent_list] == ["agent-0", "agent-1", "agent-3", "agent-2"]
+    assert result.version == 3
+
+
+def test_single_query():
+    """更新只读取一次，提交后不再 refresh，只写入被修改的列"""
+    from app.schemas.ai_app import AIAppUpdate
+    from app.services.ai_app import AIAppService
+
+    db, _, engine = _create_session()
+    app = _create_app(db)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    result = AIAppService.patch_ai_app(db, app.id, [_add("agent-2")])
+    assert [agent.agent_id for agent in result.agent_list] == ["agent-0", "agent-1", "agent-2"]
+    selects = [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+    # 读取应用；添加的Agent引用检查命中不了缓存时多一次
+    assert len([s for s in selects if "FROM ai_app" in s]) == 1, selects
+    update = next(s for s in statements if s.lstrip().startswith("UPDATE ai_app"))
+    assert "agent_list" in update and "mcp_list" not in update and "system_prompt" not in update
+
+    statements.clear()
+    result = AIAppService.update_ai_app(db, app.id, AIAppUpdate(description="描述"))
+    assert result.description == "描述" and result.version == 3
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 1
+    stored = AIAppService.get_ai_app(db, app.id)
+    assert stored.agent_list[2].agent_id == "agent-2"
+
+
+def test_noop_update():
+    """没有实际修改的更新不递增版本、不记录变更"""
+    from app.models.entity_change import EntityChangeLog
+    from app.schemas.ai_app import AIAppUpdate, ListPatchOp
+    from app.services.ai_app import AIAppService, VersionConflict
+
+    db, _, engine = _create_session()
+    app = _create_app(db)
+    changes = db.query(EntityChangeLog).count()
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    for result in (
+        AIAppService.update_ai_app(db, app.id, AIAppUpdate()),
+        AIAppService.update_ai_app(db, app.id, AIAppUpdate(name="应用", description=None), expected_version=1),
+        # 移动到原来的位置
+        AIAppService.patch_ai_app(db, app.id, [ListPatchOp(op="move", field="agent_list", id="agent-0", index=0)]),
+    ):
+        assert result.version == 1 and result.name == "应用"
+    assert not [s for s in statements if s.lstrip().upper().startswith(("UPDATE", "INSERT"))], statements
+    assert db.query(EntityChangeLog).count() == changes
+
+    # 期望版本仍然校验
+    try:
+        AIAppService.update_ai_app(db, app.id, AIAppUpdate(), expected_version=2)
+    except VersionConflict as e:
+        assert e.current_version == 1
+    else:
+        raise AssertionError("没有抛出 VersionConflict")
+    assert AIAppService.update_ai_app(db, app.id, AIAppUpdate(description="描述")).version == 2
+
+
+def main():
+    """主测试函数"""
+    print("开始测试AI应用乐观并发控制...")
+    for test in (test_list_ops, test_version_conflict, test_concurrent_adds, test_single_query, test_noop_update):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+列表分页测试
+
+- 不带分页参数时返回全部数据，没有 X-Next-Cursor（与分页之前的行为一致）
+- 指定 limit 时分页，按 X-Next-Cursor 翻页取完全部数据；只带游标时每页 DEFAULT_LIMIT 条
+- 排序、offset 和非法参数
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+
+from sqlalchemy.orm import sessionmaker
+
+AGENT_COUNT = 150
+
+
+def _create_client():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import agent, ai_app, mcp
+    from app.db.session import get_db
+    from app.models.agent import Agent
+    from app.models.mcp import MCP
+    from conftest import temp_database
+
+    engine = temp_database("test_pagination_")
+    db = sessionmaker(bind=engine)()
+    db.add(MCP(id="mcp-1", name="工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    db.add(MCP(id="mcp-2", name="备用", provider="azure", model="gpt-4o", api_key="sk-test"))
+    for i in range(AGENT_COUNT):
+        db.add(Agent(
+            id=f"agent-{i:03d}", name=f"Agent{i % 7}", description="助手", system_prompt="你是一个助手", mcp_id="mcp-1"
+        ))
+    db.commit()
+
+    api = FastAPI()
+    for router in (agent.router, mcp.router, ai_app.router):
+        api.include_router(router)
+    api.dependency_overrides[get_db] = lambda: db
+    return TestClient(api)
+
+
+def test_unbounded_default():
+    """不带分页参数时返回全部数据，没有 X-Next-Cursor"""
+    client = _create_client()
+    response = client.get("/agent/")
+    assert response.status_code == 200
+    assert len(response.json()) == AGENT_COUNT and "x-next-cursor" not in response.headers
+    assert len(client.get("/agent/mcp/mcp-1").json()) == AGENT_COUNT
+    assert [m["id"] for m in client.get("/mcp/").json()] == ["mcp-1", "mcp-2"]
+
+    body = client.get("/ai-apps/available/agents").json()
+    assert len(body["agents"]) == AGENT_COUNT and body["next_cursor"] is None
+
+
+def test_cursor_pages():
+    """指定 limit 时分页，按游标翻页取完全部数据；只带游标时每页 DEFAULT_LIMIT 条"""
+    from app.services.pagination import DEFAULT_LIMIT
+
+    client = _create_client()
+    seen, params = [], {"limit": 40, "sort": "name"}
+    while True:
+        response = client.get("/agent/", params=params)
+        page = response.json()
+        assert len(page) <= 40
+        seen.extend(agent["id"] for agent in page)
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+    assert len(seen) == len(set(seen)) == AGENT_COUNT
+
+    first = client.get("/agent/", params={"limit": 10})
+    rest = client.get("/agent/", params={"cursor": first.headers["x-next-cursor"]})
+    assert len(rest.json()) == DEFAULT_LIMIT and rest.json()[0]["id"] == "agent-010"
+
+    body = client.get("/ai-apps/available/agents", params={"limit": 100}).json()
+    assert len(body["agents"]) == 100 and body["next_cursor"]
+
+
+def test_offset_and_errors():
+    """offset 分页、总数和非法参数"""
+    client = _create_client()
+    response = client.get("/agent/", params={"offset": 140, "include_total": "true"})
+    assert [a["id"] for a in response.json()] == [f"agent-{i}" for i in range(140, 150)]
+    assert response.headers["x-total-count"] == str(AGENT_COUNT)
+    assert client.get("/mcp/", params={"sort": "provider", "order": "desc", "limit": 1}).json()[0]["id"] == "mcp-1"
+
+    assert client.get("/agent/", params={"sort": "mcp_id"}).status_code == 400
+    assert client.get("/agent/", params={"cursor": "invalid"}).status_code == 400
+    assert client.get("/agent/", params={"limit": 0}).status_code == 422
+
+
+def main():
+    """主测试函数"""
+    print("开始测试列表分页...")
+    for test in (test_unbounded_default, test_cursor_pages, test_offset_and_errors):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+系统提示词模板测试
+
+- 变量、过滤器、条件、循环、原样输出，单独占一行的标签不留下空行
+- 按请求的语言选择 locale 块，片段使用同一语言
+- 内置片段插入Agent/MCP描述，片段嵌套有上限
+- 编译结果按内容哈希缓存，语法错误带行号，不能访问下划线开头的属性
+- 创建/更新应用时校验模板，自动生成的中文提示词与原来一致
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import hashlib
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+TEMPLATE = """\
+{# 每个用户看到自己的名字 #}
+{% locale "zh" %}
+你好，{{ user.name | default("访客") }}！我是{{ app.name }}。
+{% if user.vip %}
+你是VIP用户。
+{% elif user.name %}
+你是注册用户。
+{% else %}
+请先登录。
+{% endif %}
+{% endlocale %}
+{% locale "en" %}
+Hello, {{ user.name | default("guest") }}! I am {{ app.name | upper }}.
+{% endlocale %}
+"""
+
+
+def _config(**fields):
+    from app.schemas.ai_app import AgentConfig, AIAppResponse, MCPConfig
+
+    fields.setdefault("system_prompt", TEMPLATE)
+    return AIAppResponse(
+        id="app-1", name="助手", identifier="assistant", description="通用助手", app_type="platform", user_id=None,
+        created_at=datetime.now(),
+        agent_list=[AgentConfig(agent_id="a1", name="检索", description="查找资料 {{ 不是模板 }}"), AgentConfig(agent_id="a2", name="写作")],
+        mcp_list=[MCPConfig(mcp_id="m1", name="搜索", description="默认描述", custom_description="联网搜索")],
+        **fields,
+    )
+
+
+def test_syntax():
+    """变量、过滤器、条件、循环和原样输出"""
+    from app.core.template import render
+
+    context = {"user": {"name": "张三", "tags": ["a", "b"]}, "items": [{"n": 1}, {"n": 2}, {"n": 3}], "empty": []}
+    assert render("{{ user.name }}|{{ user.missing }}|{{ user.tags.1 }}|{{ nobody.name }}", context) == "张三||b|"
+    assert render('{{ user.tags | join("、") | upper }} {{ items | map("n") | join }} {{ items | length }}', context) == "A、B 123 3"
+    assert render('{% if user.name == "张三" and not user.vip %}Y{% endif %}{% if "a" in user.tags %}A{% endif %}', context) == "YA"
+    assert render('{% if 2 not in items | map("n") %}X{% else %}Z{% endif %}', context) == "Z"
+
+    loop = "{% for item in items %}{{ loop.index }}/{{ loop.length }}:{{ item.n }}{% if not loop.last %},{% endif %}{% endfor %}"
+    assert render(loop, context) == "1/3:1,2/3:2,3/3:3"
+    assert render("{% for item in empty %}x{% else %}空{% endfor %}", context) == "空"
+    assert render("{% raw %}{{ user.name }}{% endraw %}{# 注释 #}", context) == "{{ user.name }}"
+
+    # 单独占一行的标签连同所在行一起去掉
+    lines = "列表：\n{% for item in items %}\n  - {{ item.n }}\n{% endfor %}\n结束\n"
+    assert render(lines, context) == "列表：\n  - 1\n  - 2\n  - 3\n结束\n"
+
+
+def test_locale():
+    """按请求的语言选择 locale 块"""
+    from app.core.template import compile_template, select_locale
+
+    template = compile_template(TEMPLATE)
+    assert template.locales == ("zh", "en")
+    context = {"app": {"name": "助手"}, "user": {"name": "Alice", "vip": True}}
+    assert template.render(context, "zh-CN") == "你好，Alice！我是助手。\n你是VIP用户。\n"
+    assert template.render(context, "en_US") == "Hello, Alice! I am 助手.\n"
+    assert template.render({"app": {"name": "助手"}}) == "你好，访客！我是助手。\n请先登录。\n"
+    # 模板中没有的语言使用默认语言，默认语言也没有时使用第一个声明的语言
+    assert template.select_locale("fr") == "zh"
+    assert select_locale("fr", ("en", "ja")) == "en"
+    assert select_locale("ja-JP", ("en", "ja")) == "ja"
+
+
+def test_includes():
+    """内置片段插入Agent/MCP描述，片段使用同一语言"""
+    from app.core.template import TemplateError, compile_template
+    from app.services.prompt_service import render_app_prompt
+
+    source = '{% include "agents" %}{% include "mcps" %}---\n{% include "agent:a1" %}|{% include "mcp:m1" %}'
+    result = render_app_prompt(_config(system_prompt=source))
+    assert result["system_prompt"] == (
+        "可用的Agent：\n- 检索：查找资料 {{ 不是模板 }}\n- 写作\n"
+        "可用的MCP工具：\n- 搜索：联网搜索\n"
+        "---\n查找资料 {{ 不是模板 }}|联网搜索"
+    )
+    english = render_app_prompt(_config(system_prompt='{% include "mcps" %}'), locale="en")["system_prompt"]
+    assert english == "Available MCP tools:\n- 搜索: 联网搜索\n"
+
+    # 内置变量优先于调用方的变量
+    assert render_app_prompt(_config(system_prompt="{{ app.name }}/{{ user }}"), {"app": "x", "user": "u"})["system_prompt"] == "助手/u"
+
+    # 循环变量在片段中可用
+    partials = {"line": "<{{ item }}>", "self": '{% include "self" %}'}
+    template = compile_template('{% for item in items %}{% include "line" %}{% endfor %}')
+    assert template.render({"items": [1, 2]}, include=partials.get) == "<1><2>"
+
+    for source in ('{% include "missing" %}', '{% include "self" %}'):
+        try:
+            compile_template(source).render({}, include=partials.get)
+            assert False, f"应当渲染失败: {source}"
+        except TemplateError:
+            pass
+
+
+def test_compile_cache_and_errors():
+    """编译结果按内容哈希缓存，语法错误带行号"""
+    from app.core.template import TemplateSyntaxError, compile_template, template_cache
+
+    template = compile_template("你好，{{ user.name }}")
+    assert compile_template("你好，{{ user.name }}") is template
+    assert template.digest == hashlib.sha256("你好，{{ user.name }}".encode()).hexdigest()
+    size = len(template_cache)
+    compile_template("再见，{{ user.name }}")
+    assert len(template_cache) == size + 1
+
+    errors = {
+        "第一行\n{% if user %}\n没有结束": "第2行: if 没有结束标签",
+        "{% endif %}": "第1行: endif 没有对应的 if",
+        "\n\n{{ user | unknown }}": "第3行: 未知的过滤器: unknown",
+        "{{ user.__class__ }}": "第1行: 不能访问下划线开头的属性: user.__class__",
+        "{{ loop.index }}": "第1行: loop 只能在 for 中使用",
+        "{% for x in %}{% endfor %}": "第1行: for 语法应为: for 变量 in 表达式",
+        "{% include agents %}": "第1行: include 的参数应为字符串字面量",
+        "{{ __import__('os') }}": "第1行: 不能访问下划线开头的属性: __import__",
+    }
+    for source, message in errors.items():
+        try:
+            compile_template(source)
+            assert False, f"应当编译失败: {source!r}"
+        except TemplateSyntaxError as e:
+            assert str(e) == message, str(e)
+
+
+def test_nesting_limits():
+    """块和表达式嵌套过深、超出Python编译器限制时报语法错误"""
+    from app.core.template import MAX_BLOCK_DEPTH, MAX_EXPRESSION_DEPTH, TemplateSyntaxError, compile_template
+
+    ok = "{% for x in items %}" * MAX_BLOCK_DEPTH + "{{ x }}" + "{% endfor %}" * MAX_BLOCK_DEPTH
+    assert compile_template(ok).render({"items": [[1]]}) is not None
+    assert compile_template("{{ " + "(" * MAX_EXPRESSION_DEPTH + "1" + ")" * MAX_EXPRESSION_DEPTH + " }}").render({}) == "1"
+
+    sources = {
+        "{% for x in items %}" * 21 + "{% endfor %}" * 21: f"第1行: 块嵌套超过 {MAX_BLOCK_DEPTH} 层",
+        "{% if a %}\n" * 10 + "{% locale 'zh' %}" * 10 + "{% endlocale %}" * 10 + "{% endif %}" * 10: f"第11行: 块嵌套超过 {MAX_BLOCK_DEPTH} 层",
+        "{{ " + "(" * 300 + "1" + ")" * 300 + " }}": f"第1行: 表达式嵌套超过 {MAX_EXPRESSION_DEPTH} 层",
+        "{{ " + "not " * 300 + "a }}": f"第1行: 表达式嵌套超过 {MAX_EXPRESSION_DEPTH} 层",
+        "{{ a" + " and a" * 300 + " }}": "第1行: 模板过于复杂，无法编译: SyntaxError",
+    }
+    for source, message in sources.items():
+        try:
+            compile_template(source)
+            assert False, f"应当编译失败: {source[:40]!r}"
+        except TemplateSyntaxError as e:
+            assert str(e) == message, str(e)
+
+
+def test_generate_system_prompt():
+    """自动生成的系统提示词按语言渲染，中文与原来的格式一致"""
+    from app.schemas.ai_app import AgentConfig, GenerateSystemPromptRequest, MCPConfig
+    from app.services.ai_app import AIAppService
+
+    request = GenerateSystemPromptRequest(
+        app_name="助手", app_description="描述",
+        agent_list=[AgentConfig(agent_id="a", name="A"), AgentConfig(agent_id="b", name="B")],
+        mcp_list=[MCPConfig(mcp_id="m", name="M", description="d")],
+    )
+    assert AIAppService.generate_system_prompt(request) == (
+        "你是一个名为'助手'的AI应用。\n应用描述：描述\n可用的Agent：A, B\n可用的MCP工具：M\n\n"
+        "请根据用户的需求，合理调度和使用可用的Agent和MCP工具来完成任务。\n确保回答准确、有用，并充分利用可用的工具资源。\n"
+    )
+    assert AIAppService.generate_system_prompt(GenerateSystemPromptRequest(app_name="助手")).startswith(
+        "你是一个名为'助手'的AI应用。\n\n请根据"
+    )
+    english = AIAppService.generate_system_prompt(GenerateSystemPromptRequest(app_name="Helper", locale="en-US"))
+    assert english.startswith("You are an AI application named 'Helper'.\n\n")
+
+
+def test_validate_on_save():
+    """创建和更新应用时校验系统提示词模板"""
+    from app.core.template import TemplateSyntaxError
+    from app.schemas.ai_app import AIAppCreate, AIAppUpdate
+    from app.services.ai_app import AIAppService
+    from conftest import temp_database
+
+    engine = temp_database("test_prompt_template_")
+    db = sessionmaker(bind=engine)()
+
+    app = AIAppService.create_ai_app(db, AIAppCreate(name="助手", identifier="assistant", system_prompt=TEMPLATE))
+    for call in (
+        lambda: AIAppService.create_ai_app(db, AIAppCreate(name="x", identifier="x", system_prompt="{% for %}")),
+        lambda: AIAppService.update_ai_app(db, app.id, AIAppUpdate.construct(system_prompt="{{ user.name | }}")),
+    ):
+        try:
+            call()
+            assert False, "模板有误时应当拒绝保存"
+        except TemplateSyntaxError:
+            pass
+    assert AIAppService.update_ai_app(db, app.id, AIAppUpdate.construct(system_prompt="{{ app.name }}")).version == 2
+
+
+def main():
+    """主测试函数"""
+    print("开始测试系统提示词模板...")
+    for test in (test_syntax, test_locale, test_includes, test_compile_cache_and_errors, test_nesting_limits, test_generate_system_prompt, test_validate_on_save):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+AI应用引用校验测试
+
+- 每类实体只执行一次 IN 查询，一次返回全部不存在的引用
+- 存在性缓存命中时不查询数据库，实体变更事件使缓存失效
+- 更新时只校验本次更新的引用
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_session():
+    from app.models.agent import Agent
+    from app.models.mcp import MCP
+    from conftest import temp_database
+
+    engine = temp_database("test_references_")
+    db = sessionmaker(bind=engine)()
+    db.add(MCP(id="mcp-1", name="工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    for i in range(100):
+        db.add(Agent(id=f"agent-{i}", name=f"Agent{i}", system_prompt="你是一个助手", mcp_id="mcp-1"))
+    db.commit()
+    return db, engine
+
+
+def _count_selects(engine):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+def _app(**fields):
+    from app.schemas.ai_app import AIAppCreate
+
+    return AIAppCreate(name="应用", identifier=fields.pop("identifier", "app-1"), **fields)
+
+
+def _agents(ids):
+    return [{"agent_id": agent_id, "name": agent_id} for agent_id in ids]
+
+
+def test_batched_lookup():
+    """50个Agent引用只查询一次，一次返回全部不存在的引用"""
+    from app.services.ai_app import AIAppService
+    from app.services.reference_service import DanglingReferences
+
+    db, engine = _create_session()
+    statements = _count_selects(engine)
+    ids = [f"agent-{i}" for i in range(48)] + ["ghost-1", "ghost-2"]
+    try:
+        AIAppService.create_ai_app(db, _app(
+            main_agent_id="ghost-main",
+            agent_list=_agents(ids),
+            mcp_list=[{"mcp_id": "mcp-1", "name": "工具", "description": ""}, {"mcp_id": "mcp-x", "name": "x", "description": ""}],
+        ))
+        assert False, "引用不存在的实体时应当报错"
+    except DanglingReferences as e:
+        assert [error["input"] for error in e.errors] == ["ghost-main", "ghost-1", "ghost-2", "mcp-x"]
+        assert e.errors[1]["loc"] == ["body", "agent_list", 48, "agent_id"]
+        assert e.errors[3]["loc"] == ["body", "mcp_list", 1, "mcp_id"]
+    # agent、mcp 各一次
+    assert len(statements) == 2
+
+    statements.clear()
+    app = AIAppService.create_ai_app(db, _app(agent_list=_agents(ids[:48]), mcp_list=[{"mcp_id": "mcp-1", "name": "工具", "description": ""}]))
+    assert len(app.agent_list) == 48
+    # 引用全部命中缓存，只有写入后的读取
+    assert not any("FROM agent" in s for s in statements)
+
+
+def test_cache_invalidation():
+    """实体变更事件使存在性缓存失效"""
+    from app.models.agent import Agent
+    from app.services.ai_app import AIAppService
+    from app.services.reference_service import DanglingReferences, existence_cache
+
+    db, _ = _create_session()
+    try:
+        AIAppService.create_ai_app(db, _app(main_agent_id="agent-new"))
+        assert False, "引用不存在的实体时应当报错"
+    except DanglingReferences:
+        pass
+
+    db.add(Agent(id="agent-new", name="新Agent", system_prompt="你是一个助手", mcp_id="mcp-1"))
+    db.commit()
+    # 缓存中仍然记录为不存在，事件到达后失效
+    try:
+        AIAppService.create_ai_app(db, _app(main_agent_id="agent-new"))
+        assert False, "缓存失效前仍然报错"
+    except DanglingReferences:
+        pass
+    from app.core.events import ChangeEvent
+    existence_cache.on_change(ChangeEvent("agent", "agent-new", "create", 1))
+    assert AIAppService.create_ai_app(db, _app(main_agent_id="agent-new")).main_agent_id == "agent-new"
+
+
+def test_update_checks_changed_fields():
+    """更新时只校验本次更新的引用"""
+    from app.schemas.ai_app import AIAppUpdate
+    from app.services.ai_app import AIAppService
+    from app.services.reference_service import DanglingReferences
+
+    db, _ = _create_session()
+    app = AIAppService.create_ai_app(db, _app(agent_list=_agents(["agent-1", "agent-2"])))
+    assert AIAppService.update_ai_app(db, app.id, AIAppUpdate(name="新名称")).name == "新名称"
+    try:
+        AIAppService.update_ai_app(db, app.id, AIAppUpdate(agent_list=_agents(["agent-1", "ghost"])))
+        assert False, "引用不存在的实体时应当报错"
+    except DanglingReferences as e:
+        assert [error["input"] for error in e.errors] == ["ghost"]
+    assert [agent.agent_id for agent in AIAppService.update_ai_app(db, app.id, AIAppUpdate(agent_list=_agents(["agent-3"]))).agent_list] == ["agent-3"]
+
+
+def main():
+    """主测试函数"""
+    print("开始测试AI应用引用校验...")
+    for test in (test_batched_lookup, test_cache_invalidation, test_update_checks_changed_fields):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+响应压缩测试
+
+- 按 Accept-Encoding 的q值和服务端优先顺序选择算法
+- 超过阈值的JSON响应压缩，小响应、流式响应、已压缩的响应原样返回
+- 相同内容的响应复用压缩结果
+- 压缩后ETag改为弱校验，If-None-Match 仍然命中
+
+不需要启动服务器。
+"""
+
+import gzip
+import json
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+ITEMS = [{"id": f"agent-{i:04d}", "name": f"智能助手{i}", "description": "数据分析Agent", "is_active": True} for i in range(200)]
+
+
+def _client(**options):
+    from app.core.response_compression import CompressionMiddleware
+
+    app = FastAPI()
+
+    @app.get("/items")
+    def items():
+        return ITEMS
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/versioned")
+    def versioned(request: Request):
+        etag = '"abc123"'
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(json.dumps(ITEMS), media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/precompressed")
+    def precompressed():
+        return Response(gzip.compress(json.dumps(ITEMS).encode()), media_type="application/json",
+                        headers={"Content-Encoding": "gzip"})
+
+    @app.get("/export")
+    def export():
+        return StreamingResponse((json.dumps(item) + "\n" for item in ITEMS), media_type="application/x-ndjson")
+
+    middleware = CompressionMiddleware(app, **options)
+    return TestClient(middleware), middleware
+
+
+def test_negotiate():
+    """按q值和服务端优先顺序选择压缩算法"""
+    from app.core.response_compression import negotiate
+
+    preferred = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, deflate, br", preferred) == "br"
+    assert negotiate("gzip;q=1.0, br;q=0.5", preferred) == "gzip"
+    assert negotiate("br;q=0, gzip", preferred) == "gzip"
+    assert negotiate("*", preferred) == "zstd"
+    assert negotiate("identity", preferred) is None
+    assert negotiate("deflate", preferred) is None
+
+
+def test_compress_json():
+    """超过阈值的JSON响应压缩，小响应原样返回"""
+    client, _ = _client(encodings=["gzip"], minimum_size=1024)
+    response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert int(response.headers["content-length"]) < len(json.dumps(ITEMS)) / 5
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json() == ITEMS
+
+    response = client.get("/items", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers and response.json() == ITEMS
+
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers and response.json() == {"ok": True}
+
+
+def test_all_encodings():
+    """各个已安装的算法都能被客户端正确解码"""
+    from app.core.response_compression import available_encodings
+
+    for encoding in available_encodings():
+        client, _ = _client(encodings=[encoding])
+        response = client.get("/items", headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.json() == ITEMS
+
+
+def test_passthrough():
+    """流式响应和已压缩的响应原样返回"""
+    client, middleware = _client(encodings=["gzip"])
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip" and response.json() == ITEMS
+
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert len(response.text.splitlines()) == len(ITEMS)
+    assert middleware.compressed == 0
+
+
+def test_reuse_compressed():
+    """相同内容的响应复用压缩结果"""
+    client, middleware = _client(encodings=["gzip"])
+    for _ in range(5):
+        assert client.get("/items", headers={"Accept-Encoding": "gzip"}).json() == ITEMS
+    assert middleware.compressed == 1 and middleware.reused == 4
+
+
+def test_weak_etag():
+    """压缩后ETag改为弱校验，If-None-Match 仍然命中"""
+    client, _ = _client(encodings=["gzip"])
+    response = client.get("/versioned", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["etag"] == 'W/"abc123"'
+    response = client.get("/versioned", headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
+
+
+def main():
+    """主测试函数"""
+    print("开始测试响应压缩...")
+    for test in (test_negotiate, test_compress_json, test_all_encodings, test_passthrough, test_reuse_compressed, test_weak_etag):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+全文检索测试
+
+- 分词：中文按二元组，英文/数字按单词
+- BM25 排序，名称命中排在描述命中之前
+- /search 的类型过滤、未知类型、分页和命中总数
+- 实体更新、删除后增量更新倒排索引；构建期间提交的写入不会遗漏
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_service():
+    from app.models.agent import Agent
+    from app.models.ai_app import AIApp
+    from app.models.mcp import MCP
+    from app.services.search_service import SearchService
+    from conftest import temp_database
+
+    factory = sessionmaker(bind=temp_database("test_search_"))
+    db = factory()
+    db.add(MCP(id="mcp-1", name="天气工具", provider="openai", model="gpt-4o", api_key="sk-test"))
+    db.add(MCP(id="mcp-2", name="备用", provider="azure", model="gpt-4o-mini", api_key="sk-test"))
+    db.add(AIApp(id="app-weather", name="天气助手", identifier="weather", description="查询城市天气预报", is_active=True))
+    db.add(AIApp(id="app-travel", name="出行规划", identifier="travel", description="结合天气安排行程", is_active=True))
+    for i in range(12):
+        db.add(Agent(id=f"agent-{i:02d}", name=f"数据分析{i}", description="分析报表数据",
+                     system_prompt="你是数据分析专家", mcp_id="mcp-1"))
+    db.commit()
+    return SearchService(session_factory=factory), db
+
+
+def _change(entity_type, entity_id, op="update"):
+    from app.core.events import ChangeEvent
+
+    return ChangeEvent(entity_type, entity_id, op, 0)
+
+
+def test_tokenize():
+    """中文按二元组、英文和数字按单词分词"""
+    from app.services.search_service import tokenize
+
+    assert tokenize("财务报表") == ["财务", "务报", "报表"]
+    assert tokenize("Review GPT-4o v1.2 代码") == ["review", "gpt-4o", "v1.2", "代码"]
+    assert tokenize("查 a") == ["查", "a"]
+    assert tokenize(None) == [] and tokenize("，。！") == []
+
+
+def test_bm25_order():
+    """BM25 排序，名称命中排在描述命中之前"""
+    from app.services.search_service import InvertedIndex
+
+    index = InvertedIndex()
+    index.add("ai_app", "in-description", "出行规划", ["结合天气安排行程"], "结合天气安排行程")
+    index.add("ai_app", "in-name", "天气助手", ["回答用户的问题"], "回答用户的问题")
+    index.add("agent", "unrelated", "翻译", ["中英互译"])
+    hits, total = index.search("天气")
+    assert total == 2
+    assert [hit["id"] for hit in hits] == ["in-name", "in-description"]
+    assert hits[0]["score"] > hits[1]["score"] and hits[1]["description"] == "结合天气安排行程"
+
+    assert index.search("天气", types=["agent"]) == ([], 0)
+    assert index.search("") == ([], 0)
+    index.remove("ai_app", "in-name")
+    assert [hit["id"] for hit in index.search("天气")[0]] == ["in-description"]
+
+
+def test_search_api():
+    """类型过滤、未知类型返回400、分页和命中总数"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api import search
+    from app.db.session import get_db
+
+    service, db = _create_service()
+    api = FastAPI()
+    api.include_router(search.router)
+    api.dependency_overrides[get_db] = lambda: db
+    client = TestClient(api)
+    previous, search.search_service = search.search_service, service
+    try:
+        body = client.get("/search", params={"q": "天气"}).json()
+        assert body["backend"] == "memory" and body["total"] == 3
+        assert body["results"][0]["id"] == "app-weather"
+        assert {hit["entity_type"] for hit in body["results"]} == {"ai_app", "mcp"}
+
+        body = client.get("/search", params={"q": "天气", "types": "mcp"}).json()
+        assert [hit["id"] for hit in body["results"]] == ["mcp-1"] and body["total"] == 1
+        assert client.get("/search", params={"q": "天气", "types": "mcp,tool"}).status_code == 400
+
+        seen = []
+        for page in (1, 2, 3):
+            body = client.get("/search", params={"q": "数据分析", "page": page, "size": 5}).json()
+            assert body["total"] == 12 and body["page"] == page and body["size"] == 5
+            seen.extend(hit["id"] for hit in body["results"])
+        assert len(seen) == len(set(seen)) == 12
+    finally:
+        search.search_service = previous
+
+
+def test_incremental_update():
+    """实体更新、删除后增量更新倒排索引"""
+    from app.models.ai_app import AIApp
+
+    service, db = _create_service()
+    service.ensure_index(db)
+    db.query(AIApp).filter(AIApp.id == "app-travel").update({"name": "航班查询", "description": "查询航班动态"})
+    db.commit()
+    service.on_change(_change("ai_app", "app-travel"))
+    assert [hit["id"] for hit in service.search(db, "航班")["results"]] == ["app-travel"]
+    assert "app-travel" not in [hit["id"] for hit in service.search(db, "天气")["results"]]
+
+    db.query(AIApp).filter(AIApp.id == "app-weather").delete()
+    db.commit()
+    service.on_change(_change("ai_app", "app-weather", "delete"))
+    assert [hit["id"] for hit in service.search(db, "天气", ["ai_app"])["results"]] == []
+
+
+def test_change_during_build():
+    """构建期间提交的写入在构建完成后可以检索到"""
+    from app.models.ai_app import AIApp
+
+    service, db = _create_service()
+    factory = service.session_factory
+    index_agent = service._index_agent
+
+    def index_agent_and_write(row):
+        # AI应用已经扫描完，此时提交的新应用不在扫描结果中，变更事件在构建完成前到达
+        if row.id == "agent-00":
+            writer = factory()
+            writer.add(AIApp(id="app-late", name="汇率换算", identifier="late", is_active=True))
+            writer.commit()
+            writer.close()
+            service.on_change(_change("ai_app", "app-late", "create"))
+        index_agent(row)
+
+    service._index_agent = index_agent_and_write
+    service.ensure_index(db)
+    assert [hit["id"] for hit in service.index.search("汇率")[0]] == ["app-late"]
+
+
+def main():
+    """主测试函数"""
+    print("开始测试全文检索...")
+    for test in (test_tokenize, test_bm25_order, test_search_api, test_incremental_update, test_change_during_build):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+目录统计测试
+
+- 服务层写入后统计增量更新，与 GROUP BY 全量计算结果一致
+- 全量重算修正偏差，重算期间的变更不被覆盖
+- 两次写入之间读取返回同一个快照，不访问数据库
+- 变更事件携带统计字段，处理事件不访问数据库，乱序到达的旧事件被忽略
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_service():
+    from app.core.events import get_bus
+    from app.services.stats_service import StatsService
+    from conftest import temp_database
+
+    engine = temp_database("test_stats_")
+    factory = sessionmaker(bind=engine)
+    service = StatsService(session_factory=factory)
+    get_bus().subscribe(service.on_change)
+    return service, factory(), engine
+
+
+def _close(service):
+    from app.core.events import get_bus
+
+    get_bus().unsubscribe(service.on_change)
+
+
+def _seed(db):
+    from app.schemas.agent import AgentCreate
+    from app.schemas.ai_app import AIAppCreate
+    from app.schemas.mcp import MCPCreate
+    from app.services import agent_service, mcp_service
+    from app.services.ai_app import AIAppService
+
+    for mcp_id, provider, model in (("m1", "openai", "gpt-4o"), ("m2", "openai", "gpt-4o-mini"), ("m3", "azure", "gpt-4o")):
+        mcp_service.create_mcp(db, MCPCreate(id=mcp_id, name=mcp_id, provider=provider, model=model, api_key="sk-test", temperature="0.7"))
+    for i, mcp_id in enumerate(("m1", "m1", "m2")):
+        agent_service.create_agent(db, AgentCreate(id=f"a{i}", name=f"a{i}", system_prompt="你是一个助手", mcp_id=mcp_id))
+    apps = [
+        AIAppService.create_ai_app(db, AIAppCreate(name="平台应用", identifier="platform-1")),
+        AIAppService.create_ai_app(db, AIAppCreate(name="我的应用", identifier="user-1", app_type="user", user_id="u1")),
+        AIAppService.create_ai_app(db, AIAppCreate(name="我的应用", identifier="user-2", app_type="user", user_id="u1", is_active=False)),
+        AIAppService.create_ai_app(db, AIAppCreate(name="我的应用", identifier="user-3", app_type="user", user_id="u2")),
+    ]
+    return apps
+
+
+def _group_by(db):
+    """用 GROUP BY 全量计算，作为对照"""
+    from app.models.agent import Agent
+    from app.models.ai_app import AIApp
+    from app.models.mcp import MCP
+
+    return {
+        "by_type": dict(db.query(AIApp.app_type, func.count()).group_by(AIApp.app_type).all()),
+        "active": db.query(func.count()).filter(AIApp.is_active.is_(True)).scalar(),
+        "per_user": dict(db.query(AIApp.user_id, func.count()).filter(AIApp.user_id.isnot(None)).group_by(AIApp.user_id).all()),
+        "per_mcp": dict(db.query(Agent.mcp_id, func.count()).group_by(Agent.mcp_id).all()),
+        "by_provider": dict(db.query(MCP.provider, func.count()).group_by(MCP.provider).all()),
+    }
+
+
+def _assert_matches(stats, db):
+    expected = _group_by(db)
+    assert stats["ai_apps"]["by_type"] == expected["by_type"], stats
+    assert stats["ai_apps"]["active"] == expected["active"]
+    assert stats["ai_apps"]["per_user"] == expected["per_user"]
+    assert stats["agents"]["per_mcp"] == expected["per_mcp"]
+    assert stats["mcps"]["by_provider"] == expected["by_provider"]
+
+
+def test_incremental():
+    """服务层写入后统计增量更新，与 GROUP BY 结果一致"""
+    from app.schemas.agent import AgentUpdate
+    from app.schemas.ai_app import AIAppUpdate
+    from app.schemas.mcp import MCPUpdate
+    from app.services import agent_service, mcp_service
+    from app.services.ai_app import AIAppService
+
+    service, db, _ = _create_service()
+    try:
+        stats = service.snapshot()
+        assert stats["ai_apps"]["total"] == 0 and stats["mcps"]["by_model"] == {}
+
+        apps = _seed(db)
+        stats = service.snapshot()
+        assert stats["ai_apps"] == {
+            "total": 4, "by_type": {"platform": 1, "user": 3}, "active": 3, "inactive": 1,
+            "users": 2, "per_user": {"u1": 2, "u2": 1},
+        }
+        assert stats["mcps"]["by_model"] == {"azure": {"gpt-4o": 1}, "openai": {"gpt-4o": 1, "gpt-4o-mini": 1}}
+        _assert_matches(stats, db)
+
+        AIAppService.update_ai_app(db, apps[2].id, AIAppUpdate(is_active=True))
+        AIAppService.delete_ai_app(db, apps[1].id)
+        # 更新Schema的字段没有默认值，只构造本次更新的字段
+        agent_service.update_agent(db, "a0", AgentUpdate.construct(mcp_id="m3"))
+        mcp_service.update_mcp(db, "m2", MCPUpdate.construct(model="gpt-4o"))
+        stats = service.snapshot()
+        assert stats["ai_apps"]["active"] == 3 and stats["ai_apps"]["inactive"] == 0
+        assert stats["ai_apps"]["per_user"] == {"u1": 1, "u2": 1}
+        assert stats["agents"]["per_mcp"] == {"m1": 1, "m2": 1, "m3": 1}
+        assert stats["mcps"]["by_model"] == {"azure": {"gpt-4o": 1}, "openai": {"gpt-4o": 2}}
+        _assert_matches(stats, db)
+    finally:
+        _close(service)
+
+
+def test_reconcile():
+    """全量重算修正偏差，重算期间的变更以增量结果为准"""
+    from app.models.ai_app import AIApp
+    from app.schemas.ai_app import AIAppCreate
+    from app.services.ai_app import AIAppService
+
+    service, db, _ = _create_service()
+    try:
+        _seed(db)
+        service.ensure_built()
+        # 绕过服务层直接修改，没有变更事件
+        db.query(AIApp).filter(AIApp.user_id == "u2").update({"user_id": "u3"})
+        db.commit()
+        assert service.snapshot()["ai_apps"]["per_user"] == {"u1": 2, "u2": 1}
+        assert service.reconcile() == 2
+        assert service.snapshot()["ai_apps"]["per_user"] == {"u1": 2, "u3": 1}
+        assert service.reconcile() == 0
+
+        # 全量加载读取完成后、替换前发生的写入
+        load_all = service._load_all
+
+        def load_then_write():
+            stats = load_all()
+            AIAppService.create_ai_app(db, AIAppCreate(name="我的应用", identifier="user-4", app_type="user", user_id="u4"))
+            return stats
+
+        service._load_all = load_then_write
+        service.reconcile()
+        assert service.snapshot()["ai_apps"]["users"] == 3
+        _assert_matches(service.snapshot(), db)
+    finally:
+        _close(service)
+
+
+def test_snapshot_reuse():
+    """两次写入之间读取返回同一个快照，不访问数据库"""
+    from app.schemas.ai_app import AIAppCreate
+    from app.services.ai_app import AIAppService
+
+    service, db, engine = _create_service()
+    service.top_n = 2
+    try:
+        _seed(db)
+        first = service.snapshot()
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        assert service.snapshot() is first
+        assert statements == []
+
+        AIAppService.create_ai_app(db, AIAppCreate(name="我的应用", identifier="user-9", app_type="user", user_id="u9"))
+        second = service.snapshot()
+        assert second is not first and second["version"] > first["version"]
+        # 只返回应用数最多的前两个用户
+        assert second["ai_apps"]["users"] == 3 and second["ai_apps"]["per_user"] == {"u1": 2, "u2": 1}
+    finally:
+        _close(service)
+
+
+def test_event_fields():
+    """变更事件携带统计字段，处理事件不访问数据库，乱序到达的旧事件被忽略"""
+    from app.core.events import ChangeEvent, row_to_event
+    from app.models.entity_change import EntityChangeLog
+
+    service, db, engine = _create_service()
+    try:
+        _seed(db)
+        service.ensure_built()
+        # 跨worker的事件从 entity_change 记录还原，同样带统计字段
+        row = db.query(EntityChangeLog).filter(EntityChangeLog.entity_id == "m3").first()
+        assert row_to_event(row).stats == ("azure", "gpt-4o")
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        service.on_change(ChangeEvent("agent", "a2", "update", 20, stats=("m3",)))
+        service.on_change(ChangeEvent("agent", "a2", "update", 10, stats=("m1",)))
+        service.on_change(ChangeEvent("agent", "a9", "create", 30, stats=("m3",)))
+        # 未携带统计字段的事件留给全量重算
+        service.on_change(ChangeEvent("agent", "a1", "update", 40))
+        service.on_change(ChangeEvent("agent", "a0", "delete", 50))
+        assert statements == []
+        assert service.snapshot()["agents"]["per_mcp"] == {"m1": 1, "m3": 2}
+    finally:
+        _close(service)
+
+
+def main():
+    """主测试函数"""
+    print("开始测试目录统计...")
+    for test in (test_incremental, test_reconcile, test_snapshot_reuse, test_event_fields):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
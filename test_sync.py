@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+增量同步测试
+
+- 变更记录与实体写入同一事务提交，回滚时一起回滚
+- 按游标分页，同一实体只返回最后一次变更
+- 删除的实体返回墓碑
+- 未稳定的变更不返回，游标不越过它们
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+
+def _create_session(settle_seconds: float = 0):
+    from app.config import settings
+    from conftest import temp_database
+
+    settings.CHANGES_SETTLE_SECONDS = settle_seconds
+    engine = temp_database("test_sync_")
+    return sessionmaker(bind=engine)()
+
+
+def _create_mcp(db, mcp_id: str):
+    from app.schemas.mcp import MCPCreate
+    from app.services import mcp_service
+
+    return mcp_service.create_mcp(db, MCPCreate(id=mcp_id, name=mcp_id, provider="openai", model="gpt-4o", api_key="sk-test"))
+
+
+def test_rollback_discards_change():
+    """实体写入回滚时变更记录一起回滚"""
+    from app.core.events import record_change
+    from app.services import sync_service
+
+    db = _create_session()
+    record_change(db, "mcp", "mcp-1", "create")
+    db.rollback()
+    assert sync_service.get_changes(db, 0)["changes"] == []
+
+
+def test_paging_and_tombstones():
+    """分页拉取，合并同一实体的多次变更，删除返回墓碑且不含敏感字段"""
+    from app.core.events import record_change
+    from app.services import mcp_service, sync_service
+
+    db = _create_session()
+    since = sync_service.get_cursor(db)
+    for i in range(5):
+        _create_mcp(db, f"mcp-{i}")
+    record_change(db, "mcp", "mcp-0", "update")
+    db.commit()
+    mcp_service.delete_mcp(db, "mcp-1")
+
+    first = sync_service.get_changes(db, since, limit=4)
+    assert first["has_more"]
+    assert [c["entity_id"] for c in first["changes"]] == ["mcp-0", "mcp-1", "mcp-2", "mcp-3"]
+
+    second = sync_service.get_changes(db, first["next_cursor"], limit=4)
+    assert not second["has_more"]
+    changes = {c["entity_id"]: c for c in second["changes"]}
+    assert changes["mcp-0"]["op"] == "update"
+    assert changes["mcp-1"] == {"seq": changes["mcp-1"]["seq"], "entity_type": "mcp", "entity_id": "mcp-1", "op": "delete", "data": None}
+    assert "api_key" not in changes["mcp-0"]["data"]
+
+    third = sync_service.get_changes(db, second["next_cursor"])
+    assert third["changes"] == [] and third["next_cursor"] == second["next_cursor"]
+
+
+def test_type_filter():
+    """按实体类型过滤"""
+    from app.core.events import record_change
+    from app.services import sync_service
+
+    db = _create_session()
+    _create_mcp(db, "mcp-1")
+    record_change(db, "agent", "agent-1", "delete")
+    db.commit()
+    result = sync_service.get_changes(db, 0, entity_types=["agent"])
+    assert [(c["entity_type"], c["op"]) for c in result["changes"]] == [("agent", "delete")]
+
+
+def test_unsettled_changes_held_back():
+    """刚写入的变更等待稳定后再返回"""
+    from app.services import sync_service
+
+    db = _create_session(settle_seconds=0.3)
+    _create_mcp(db, "mcp-1")
+    result = sync_service.get_changes(db, 0)
+    assert result["changes"] == [] and result["next_cursor"] == 0
+    time.sleep(0.4)
+    assert len(sync_service.get_changes(db, 0)["changes"]) == 1
+
+
+def main():
+    """主测试函数"""
+    print("开始测试增量同步...")
+    for test in (test_rollback_discards_change, test_paging_and_tombstones, test_type_filter, test_unsettled_changes_held_back):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+追踪测试
+
+- traceparent 的解析与注入，格式错误时忽略
+- 按 trace ID 比例采样，有上游 traceparent 时沿用其采样决定
+- 请求、处理函数、服务层和SQL的span父子关系，路由模板作为span名称，异常记录为错误
+- 未采样的请求和请求之外的调用不产生span
+- 队列满时丢弃最早的span；导出文件可以还原为span树
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import os
+import tempfile
+
+from sqlalchemy import text
+
+
+class _ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans):
+        self.spans.extend(spans)
+
+    def close(self):
+        pass
+
+
+def _tracer(sample_ratio=1.0, queue_size=10000):
+    from app.core import tracing
+
+    exporter = _ListExporter()
+    tracing.tracer = tracing.Tracer(tracing.BatchSpanProcessor(exporter, queue_size), sample_ratio)
+    return tracing.tracer, exporter
+
+
+def _client(tracer, engine):
+    from fastapi import APIRouter, FastAPI, HTTPException
+    from fastapi.testclient import TestClient
+
+    from app.core.tracing import TracedRoute, TracingMiddleware, traced
+
+    @traced
+    def load_item(item_id):
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT :id"), {"id": item_id}).scalar()
+
+    router = APIRouter(prefix="/items", route_class=TracedRoute)
+
+    @router.get("/{item_id}")
+    def get_item(item_id: str):
+        return {"id": load_item(item_id)}
+
+    @router.get("/{item_id}/fail")
+    async def fail(item_id: str):
+        raise HTTPException(status_code=503, detail="upstream")
+
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _engine():
+    from app.core.tracing import instrument_sqlalchemy, tracer
+    from conftest import temp_database
+
+    engine = temp_database("test_tracing_", tables=[])
+    instrument_sqlalchemy(tracer)
+    return engine
+
+
+def test_traceparent():
+    """traceparent 的解析与注入，格式错误时忽略"""
+    from app.core import tracing
+
+    parsed = tracing.parse_traceparent("00-0AF7651916CD43DD8448EB211C80319C-B7AD6B7169203331-01")
+    assert parsed == (0x0AF7651916CD43DD8448EB211C80319C, 0xB7AD6B7169203331, True)
+    assert tracing.parse_traceparent("00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00")[2] is False
+    for value in ("", "01-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+                  "00-00000000000000000000000000000000-b7ad6b7169203331-01", "00-0af7651916cd43dd-b7ad6b7169203331-01"):
+        assert tracing.parse_traceparent(value) is None, value
+
+    tracer, _ = _tracer()
+    assert tracing.inject({"Authorization": "Bearer k"}) == {"Authorization": "Bearer k"}
+    span = tracer.start_root("GET /", parent=parsed)
+    token = tracing._current.set(span)
+    try:
+        headers = tracing.inject()
+    finally:
+        tracing._current.reset(token)
+    assert headers["traceparent"] == f"00-0af7651916cd43dd8448eb211c80319c-{span.span_id:016x}-01"
+
+
+def test_sampling():
+    """按 trace ID 比例采样，有上游 traceparent 时沿用其采样决定"""
+    from app.core.tracing import BatchSpanProcessor, Tracer
+
+    none, everything, half = (Tracer(BatchSpanProcessor(), ratio) for ratio in (0.0, 1.0, 0.5))
+    assert not any(none.start_root("GET /").sampled for _ in range(200))
+    assert all(everything.start_root("GET /").sampled for _ in range(200))
+    assert 300 < sum(half.start_root("GET /").sampled for _ in range(1000)) < 700
+
+    assert none.start_root("GET /", parent=(1, 2, True)).sampled
+    assert not everything.start_root("GET /", parent=(1, 2, False)).sampled
+
+
+def test_request_spans():
+    """请求、处理函数、服务层和SQL的span父子关系"""
+    tracer, exporter = _tracer()
+    client = _client(tracer, _engine())
+    response = client.get("/items/a1", headers={"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"})
+    assert response.json() == {"id": "a1"}
+    assert response.headers["x-trace-id"] == "0af7651916cd43dd8448eb211c80319c"
+    tracer.processor.flush()
+
+    spans = {span["name"]: span for span in exporter.spans}
+    assert set(spans) == {"GET /items/{item_id}", "handler get_item", f"{__name__}.load_item", "db SELECT"}
+    assert all(span["trace_id"] == "0af7651916cd43dd8448eb211c80319c" for span in exporter.spans)
+    server = spans["GET /items/{item_id}"]
+    assert server["parent_span_id"] == "b7ad6b7169203331" and server["kind"] == "server"
+    assert server["attributes"]["http.status_code"] == 200 and server["attributes"]["http.route"] == "/items/{item_id}"
+    assert spans["handler get_item"]["parent_span_id"] == server["span_id"]
+    assert spans[f"{__name__}.load_item"]["parent_span_id"] == spans["handler get_item"]["span_id"]
+    db = spans["db SELECT"]
+    assert db["parent_span_id"] == spans[f"{__name__}.load_item"]["span_id"]
+    assert db["attributes"]["db.system"] == "sqlite" and db["attributes"]["db.statement"].startswith("SELECT")
+
+    exporter.spans.clear()
+    assert client.get("/items/a1/fail").status_code == 503
+    tracer.processor.flush()
+    spans = {span["name"]: span for span in exporter.spans}
+    assert spans["GET /items/{item_id}/fail"]["status"]["code"] == "ERROR"
+    assert spans["handler fail"]["status"]["code"] == "ERROR"
+    assert spans["handler fail"]["events"][0]["attributes"]["exception.type"] == "HTTPException"
+
+
+def test_unsampled():
+    """未采样的请求和请求之外的调用不产生span"""
+    tracer, exporter = _tracer(sample_ratio=0.0)
+    engine = _engine()
+    client = _client(tracer, engine)
+    response = client.get("/items/a1")
+    assert response.status_code == 200 and len(response.headers["x-trace-id"]) == 32
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert tracer.processor.flush() == 0 and exporter.spans == []
+
+
+def test_export():
+    """队列满时丢弃最早的span；导出文件可以还原为span树"""
+    from app.core import tracing
+
+    path = os.path.join(tempfile.mkdtemp(prefix="test_tracing_"), "traces", "spans.jsonl")
+    tracer = tracing.Tracer(tracing.BatchSpanProcessor(tracing.FileExporter(path), queue_size=3))
+    root = tracer.start_root("GET /ai-apps")
+    token = tracing._current.set(root)
+    try:
+        for i in range(3):
+            tracer.start_child(f"db SELECT {i}").end()
+    finally:
+        tracing._current.reset(token)
+    root.end()
+    assert tracer.processor.dropped == 1
+    tracer.stop()
+
+    traces = tracing.load_traces(path)
+    spans = traces[f"{root.trace_id:032x}"]
+    assert [span["name"] for span in spans] == ["db SELECT 1", "db SELECT 2", "GET /ai-apps"]
+    lines = tracing.format_trace(spans)
+    assert lines[0].endswith("GET /ai-apps") and lines[1].endswith("  db SELECT 1")
+
+
+def main():
+    """主测试函数"""
+    print("开始测试追踪...")
+    for test in (test_traceparent, test_sampling, test_request_spans, test_unsampled, test_export):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()
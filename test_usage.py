@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+大模型用量计量测试
+
+- 登记的记录批量写入明细表，并按小时、天累加到汇总表
+- 多次写入（多个worker）累加到同一时间段
+- 环形缓冲区写满时丢弃最早的记录，写入失败的一批下次重试
+- track() 记录耗时和失败
+- 按时间粒度和维度读取汇总
+
+不需要启动服务器，使用临时sqlite数据库。
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+# 2026-10-19 09:30 UTC
+T0 = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc).timestamp()
+
+
+def _create_engine(create_tables: bool = True):
+    from app.models.usage import LLMUsage, LLMUsageDaily, LLMUsageHourly
+    from conftest import temp_database
+
+    tables = [LLMUsage.__table__, LLMUsageHourly.__table__, LLMUsageDaily.__table__] if create_tables else []
+    return temp_database("test_usage_", tables=tables)
+
+
+def _record_calls(meter):
+    meter.record("app-1", "openai", "gpt-4o", 100, 20, 150, user_id="u1", started_at=T0)
+    meter.record("app-1", "openai", "gpt-4o", 50, 10, 250, user_id="u1", started_at=T0 + 60)
+    meter.record("app-1", "openai", "gpt-4o-mini", 10, 0, 30, error="TimeoutError", started_at=T0 + 3600)
+    meter.record("app-2", "azure", "gpt-4o", 1, 1, 5, started_at=T0)
+
+
+def test_flush_and_rollup():
+    """记录批量写入明细，按小时、天累加到汇总表"""
+    from app.models.usage import LLMUsage, LLMUsageDaily, LLMUsageHourly
+    from app.services.usage_service import UsageMeter
+
+    engine = _create_engine()
+    meter = UsageMeter(engine=engine)
+    _record_calls(meter)
+    assert meter.pending() == 4
+    assert meter.flush() == 4 and meter.pending() == 0
+
+    db = sessionmaker(bind=engine)()
+    assert db.query(LLMUsage).count() == 4
+    hourly = {(row.bucket.hour, row.user_id, row.model): row for row in db.query(LLMUsageHourly).filter(LLMUsageHourly.app_id == "app-1")}
+    assert set(hourly) == {(9, "u1", "gpt-4o"), (10, "", "gpt-4o-mini")}
+    row = hourly[(9, "u1", "gpt-4o")]
+    assert (row.calls, row.prompt_tokens, row.completion_tokens, row.latency_ms_sum, row.latency_ms_max) == (2, 150, 30, 400, 250)
+    assert hourly[(10, "", "gpt-4o-mini")].errors == 1
+    daily = db.query(LLMUsageDaily).filter(LLMUsageDaily.app_id == "app-1").all()
+    assert sorted((row.bucket, row.model, row.calls) for row in daily) == [
+        (datetime(2026, 10, 19), "gpt-4o", 2), (datetime(2026, 10, 19), "gpt-4o-mini", 1)]
+
+    # 另一个worker写入同一时间段，计数累加，最大耗时取较大值
+    other = UsageMeter(engine=engine)
+    other.record("app-1", "openai", "gpt-4o", 1, 1, 900, user_id="u1", started_at=T0 + 120)
+    other.flush()
+    db.expire_all()
+    row = db.query(LLMUsageHourly).filter(LLMUsageHourly.app_id == "app-1", LLMUsageHourly.user_id == "u1").one()
+    assert (row.calls, row.prompt_tokens, row.latency_ms_sum, row.latency_ms_max) == (3, 151, 1300, 900)
+
+
+def test_ring_buffer_and_retry():
+    """缓冲区写满时丢弃最早的记录，写入失败的一批下次重试"""
+    from app.db.session import Base
+    from app.models.usage import LLMUsage
+    from app.services.usage_service import UsageMeter
+
+    engine = _create_engine(create_tables=False)
+    meter = UsageMeter(capacity=3, batch_size=2, engine=engine)
+    for i in range(5):
+        meter.record(f"app-{i}", "openai", "gpt-4o", started_at=T0)
+    assert meter.pending() == 3 and meter.dropped == 2
+
+    # 表不存在，写入失败，取出的一批保留
+    try:
+        meter.flush()
+        assert False, "表不存在时应当写入失败"
+    except Exception:
+        pass
+    assert meter.pending() == 3
+
+    Base.metadata.create_all(engine)
+    assert meter.flush() == 3
+    db = sessionmaker(bind=engine)()
+    assert sorted(app_id for (app_id,) in db.query(LLMUsage.app_id)) == ["app-2", "app-3", "app-4"]
+
+
+def test_track():
+    """track() 记录token数和耗时，块内异常记为失败并继续抛出"""
+    from app.services.usage_service import UsageMeter
+
+    meter = UsageMeter(engine=_create_engine())
+    with meter.track("app-1", "openai", "gpt-4o", user_id="u1") as usage:
+        time.sleep(0.01)
+        usage["prompt_tokens"], usage["completion_tokens"] = 12, 34
+    try:
+        with meter.track("app-1", "openai", "gpt-4o"):
+            raise TimeoutError("模拟超时")
+    except TimeoutError:
+        pass
+    ok, failed = list(meter._buffer)
+    assert ok[:8] == ("app-1", "u1", "openai", "gpt-4o", 12, 34, ok[6], None) and ok[6] >= 10
+    assert failed[7] == "TimeoutError"
+
+
+def test_background_flush():
+    """后台线程积累到一批时提前写入，stop() 写完剩余记录"""
+    from app.models.usage import LLMUsage
+    from app.services.usage_service import UsageMeter
+
+    engine = _create_engine()
+    meter = UsageMeter(batch_size=10, flush_interval=60, engine=engine)
+    meter.start()
+    try:
+        for _ in range(10):
+            meter.record("app-1", "openai", "gpt-4o")
+        deadline = time.monotonic() + 5
+        while meter.written < 10 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert meter.written == 10
+        meter.record("app-1", "openai", "gpt-4o")
+    finally:
+        meter.stop()
+    assert sessionmaker(bind=engine)().query(LLMUsage).count() == 11
+
+
+def test_get_usage():
+    """按小时/天和维度读取汇总，时间范围校验"""
+    from app.services.usage_service import UsageMeter, get_usage
+
+    engine = _create_engine()
+    meter = UsageMeter(engine=engine)
+    _record_calls(meter)
+    meter.flush()
+    db = sessionmaker(bind=engine)()
+
+    start = datetime(2026, 10, 19, 9, 15)
+    result = get_usage(db, "app-1", "hour", start, datetime(2026, 10, 19, 12))
+    assert result["start"] == datetime(2026, 10, 19, 9)
+    assert [(item["bucket"].hour, item["calls"], item["errors"]) for item in result["items"]] == [(9, 2, 0), (10, 1, 1)]
+    assert result["items"][0]["avg_latency_ms"] == 200.0 and result["items"][0]["total_tokens"] == 180
+    assert result["total"]["calls"] == 3 and result["total"]["max_latency_ms"] == 250
+
+    by_model = get_usage(db, "app-1", "day", datetime(2026, 10, 19), datetime(2026, 10, 20), group_by="model")
+    assert [(item["model"], item["calls"]) for item in by_model["items"]] == [("gpt-4o", 2), ("gpt-4o-mini", 1)]
+    by_user = get_usage(db, "app-1", "day", datetime(2026, 10, 19), datetime(2026, 10, 20), group_by="user_id")
+    assert [(item["user_id"], item["calls"]) for item in by_user["items"]] == [(None, 1), ("u1", 2)]
+
+    # 带时区的时间按UTC处理
+    utc8 = timezone(timedelta(hours=8))
+    assert get_usage(db, "app-1", "hour", datetime(2026, 10, 19, 17, tzinfo=utc8), datetime(2026, 10, 19, 18, tzinfo=utc8))["total"]["calls"] == 2
+
+    for args in (("week",), ("hour", None, None, "region"), ("hour", datetime(2026, 1, 1), datetime(2026, 3, 1))):
+        try:
+            get_usage(db, "app-1", *args)
+            assert False, f"应当报错: {args}"
+        except ValueError:
+            pass
+
+
+def main():
+    """主测试函数"""
+    print("开始测试大模型用量计量...")
+    for test in (test_flush_and_rollup, test_ring_buffer_and_retry, test_track, test_background_flush, test_get_usage):
+        test()
+        print(f"✅ {test.__doc__}")
+    print("测试完成！")
+
+
+if __name__ == "__main__":
+    main()